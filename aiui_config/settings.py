@@ -184,6 +184,16 @@ DATABASES = {
 """
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
+# Caches: "default" is kept in each process's memory unless CACHE_URL sets another,
+# e.g. redis://redis:6379/1. "shared" is seen alike by every worker process, for the AI
+# model rate limits: SHARED_CACHE_URL, e.g. redis://redis:6379/2, or else a database
+# table (run manage.py createcachetable). Redis is preferred, as it counts atomically
+# where the database cache may let a burst of requests slightly overshoot a limit.
+CACHES = {
+    "default": env.dj_cache_url("CACHE_URL", default="locmem://"),
+    "shared": env.dj_cache_url("SHARED_CACHE_URL", default="db://aiui_shared_cache"),
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -282,3 +292,152 @@ logging.config.dictConfig(
 )
 
 # Project settings.
+# NOA speech-to-text: Whisper model (tiny, base, small); add "-int8" for int8 CPU inference.
+NOA_WHISPER_MODEL = env.str("NOA_WHISPER_MODEL", default="small")
+# NOA speech-to-text: Whisper model sizes to load when a worker process starts.
+NOA_WHISPER_WARMUP_MODELS = env.list("NOA_WHISPER_WARMUP_MODELS", default=[])
+# NOA speech-to-text worker pool. With 0 workers transcription runs on the request thread.
+NOA_TRANSCRIPTION_WORKERS = env.int("NOA_TRANSCRIPTION_WORKERS", default=2)
+NOA_TRANSCRIPTION_QUEUE_SIZE = env.int("NOA_TRANSCRIPTION_QUEUE_SIZE", default=8)
+NOA_TRANSCRIPTION_RETRY_AFTER = env.int("NOA_TRANSCRIPTION_RETRY_AFTER", default=5)
+NOA_TRANSCRIPTION_TIMEOUT = env.float("NOA_TRANSCRIPTION_TIMEOUT", default=120.0)
+# NOA transcription cache, keyed by audio content. A size of 0 disables it.
+NOA_TRANSCRIPTION_CACHE_SIZE = env.int("NOA_TRANSCRIPTION_CACHE_SIZE", default=256)
+NOA_TRANSCRIPTION_CACHE_TTL = env.float("NOA_TRANSCRIPTION_CACHE_TTL", default=600.0)
+# Trim silence from NOA audio and split it at pauses before transcription.
+NOA_TRANSCRIPTION_VAD = env.bool("NOA_TRANSCRIPTION_VAD", default=True)
+# Threads shared by NOA requests for running independent pipeline stages concurrently.
+NOA_PIPELINE_THREADS = env.int("NOA_PIPELINE_THREADS", default=8)
+# Batch NOA clips arriving within this window into one Whisper forward pass. 0 disables.
+NOA_TRANSCRIPTION_BATCH_WINDOW_MS = env.int("NOA_TRANSCRIPTION_BATCH_WINDOW_MS", default=0)
+NOA_TRANSCRIPTION_BATCH_SIZE = env.int("NOA_TRANSCRIPTION_BATCH_SIZE", default=8)
+# AI model provider clients: connection pool limits and timeouts (seconds).
+AIMODEL_CLIENT_MAX_CONNECTIONS = env.int("AIMODEL_CLIENT_MAX_CONNECTIONS", default=20)
+AIMODEL_CLIENT_MAX_KEEPALIVE = env.int("AIMODEL_CLIENT_MAX_KEEPALIVE", default=10)
+AIMODEL_CLIENT_KEEPALIVE_EXPIRY = env.float("AIMODEL_CLIENT_KEEPALIVE_EXPIRY", default=60.0)
+AIMODEL_CLIENT_CONNECT_TIMEOUT = env.float("AIMODEL_CLIENT_CONNECT_TIMEOUT", default=5.0)
+AIMODEL_CLIENT_TIMEOUT = env.float("AIMODEL_CLIENT_TIMEOUT", default=60.0)
+AIMODEL_CLIENT_MAX_RETRIES = env.int("AIMODEL_CLIENT_MAX_RETRIES", default=2)
+# Seconds an endpoint's client is kept after no AI model uses it, so requests still in
+# flight on it finish before it is closed.
+AIMODEL_CLIENT_RETIRE_SECONDS = env.float("AIMODEL_CLIENT_RETIRE_SECONDS", default=300.0)
+# Route prompts and the NOA endpoint to their async views. Use when running under ASGI.
+AIMODEL_ASYNC_VIEWS = env.bool("AIMODEL_ASYNC_VIEWS", default=False)
+# Stream chat responses to the page token by token instead of waiting for the whole reply.
+AIMODEL_STREAM_RESPONSES = env.bool("AIMODEL_STREAM_RESPONSES", default=False)
+# AI model response cache, for AI models with cache_responses set. The backend is a dotted
+# path, e.g. project_apps.aimodels.caching.DjangoResponseCacheBackend, and the options
+# its keyword arguments as JSON, e.g. {"max_entries": 1024} or {"alias": "responses"}.
+AIMODEL_RESPONSE_CACHE_BACKEND = env.str(
+    "AIMODEL_RESPONSE_CACHE_BACKEND",
+    default="project_apps.aimodels.caching.LRUResponseCacheBackend",
+)
+AIMODEL_RESPONSE_CACHE_OPTIONS = env.json("AIMODEL_RESPONSE_CACHE_OPTIONS", default={})
+AIMODEL_RESPONSE_CACHE_TTL = env.float("AIMODEL_RESPONSE_CACHE_TTL", default=3600.0)
+# Semantic response cache, for AI models with a semantic cache threshold: the length of
+# the prompt embeddings, and the most entries kept per AI model in each process.
+AIMODEL_SEMANTIC_CACHE_DIMENSIONS = env.int("AIMODEL_SEMANTIC_CACHE_DIMENSIONS", default=256)
+AIMODEL_SEMANTIC_CACHE_MAX_ENTRIES = env.int(
+    "AIMODEL_SEMANTIC_CACHE_MAX_ENTRIES", default=100000
+)
+# Share one AI model call between identical requests made at the same time. Set a cache
+# alias from CACHES, e.g. a Redis cache, to share calls across processes too.
+AIMODEL_COALESCE_REQUESTS = env.bool("AIMODEL_COALESCE_REQUESTS", default=True)
+AIMODEL_COALESCE_CACHE_ALIAS = env.str("AIMODEL_COALESCE_CACHE_ALIAS", default="")
+# AI model backends per access mode, as JSON in the shape of CACHES, overriding or adding
+# to the defaults, e.g. {"openai_api": {"OPTIONS": {"timeout": 30}}} or
+# {"vllm": {"BACKEND": "myapp.backends.VLLMBackend", "LABEL": "vLLM"}}.
+AIMODEL_BACKENDS = env.json("AIMODEL_BACKENDS", default={})
+# Local access mode: the Ollama style model server used when an AI model has no access
+# endpoint, how long it keeps models loaded between prompts, and models to load when a
+# worker process starts.
+AIMODEL_LOCAL_ENDPOINT = env.str("AIMODEL_LOCAL_ENDPOINT", default="http://localhost:11434")
+AIMODEL_LOCAL_KEEP_ALIVE = env.str("AIMODEL_LOCAL_KEEP_ALIVE", default="30m")
+AIMODEL_LOCAL_PRELOAD_MODELS = env.list("AIMODEL_LOCAL_PRELOAD_MODELS", default=[])
+# AI model routing for the NOA endpoint: the policy (cheapest, fastest, balanced, or
+# fixed to always use the endpoint's own AI model, the default so routing is opt-in),
+# the p95 latency SLO in seconds for cheapest, the reply size in tokens allowed for, the
+# error rate above which AI models are avoided, and the calls per AI model the latency
+# percentiles are taken over.
+AIMODEL_ROUTER_POLICY = env.str("AIMODEL_ROUTER_POLICY", default="fixed")
+AIMODEL_ROUTER_SLO_P95 = env.float("AIMODEL_ROUTER_SLO_P95", default=10.0)
+AIMODEL_ROUTER_OUTPUT_TOKENS = env.int("AIMODEL_ROUTER_OUTPUT_TOKENS", default=512)
+AIMODEL_ROUTER_MAX_ERROR_RATE = env.float("AIMODEL_ROUTER_MAX_ERROR_RATE", default=0.5)
+AIMODEL_ROUTER_WINDOW = env.int("AIMODEL_ROUTER_WINDOW", default=200)
+# Hedge requests to AI models that have a hedge AI model: also ask it when no answer has
+# come within this percentile of the AI model's recent latencies, or within
+# AIMODEL_HEDGE_DELAY seconds until AIMODEL_HEDGE_MIN_CALLS calls are measured. The
+# threads run hedged synchronous requests.
+AIMODEL_HEDGE_PERCENTILE = env.float("AIMODEL_HEDGE_PERCENTILE", default=95.0)
+AIMODEL_HEDGE_DELAY = env.float("AIMODEL_HEDGE_DELAY", default=2.0)
+AIMODEL_HEDGE_MIN_CALLS = env.int("AIMODEL_HEDGE_MIN_CALLS", default=20)
+AIMODEL_HEDGE_THREADS = env.int("AIMODEL_HEDGE_THREADS", default=16)
+# Circuit breakers per AI model endpoint: open after AIMODEL_CIRCUIT_FAILURE_RATE of the
+# last AIMODEL_CIRCUIT_WINDOW calls fail (once AIMODEL_CIRCUIT_MIN_CALLS are made), or the
+# last AIMODEL_CIRCUIT_MAX_TIMEOUTS calls time out, then fail fast for
+# AIMODEL_CIRCUIT_RESET_SECONDS before a trial call. Set a probe interval in seconds,
+# e.g. 30, to check the active AI models' endpoints in the background.
+AIMODEL_CIRCUIT_WINDOW = env.int("AIMODEL_CIRCUIT_WINDOW", default=20)
+AIMODEL_CIRCUIT_MIN_CALLS = env.int("AIMODEL_CIRCUIT_MIN_CALLS", default=5)
+AIMODEL_CIRCUIT_FAILURE_RATE = env.float("AIMODEL_CIRCUIT_FAILURE_RATE", default=0.5)
+AIMODEL_CIRCUIT_MAX_TIMEOUTS = env.int("AIMODEL_CIRCUIT_MAX_TIMEOUTS", default=3)
+AIMODEL_CIRCUIT_RESET_SECONDS = env.float("AIMODEL_CIRCUIT_RESET_SECONDS", default=30.0)
+AIMODEL_CIRCUIT_PROBE_INTERVAL = env.float("AIMODEL_CIRCUIT_PROBE_INTERVAL", default=0.0)
+# AI model rate limits, for AI models with a concurrency, requests or tokens per minute
+# limit: the cache alias from CACHES they are counted in (it must be shared by every
+# worker process, or each process allows the full limits; a system check warns when it
+# is not), the longest a request waits for them in seconds, and how long a crashed
+# request's concurrency slot is held.
+AIMODEL_RATE_LIMIT_CACHE_ALIAS = env.str(
+    "AIMODEL_RATE_LIMIT_CACHE_ALIAS", default="shared"
+)
+AIMODEL_RATE_LIMIT_MAX_WAIT = env.float("AIMODEL_RATE_LIMIT_MAX_WAIT", default=30.0)
+AIMODEL_RATE_LIMIT_LEASE_SECONDS = env.float(
+    "AIMODEL_RATE_LIMIT_LEASE_SECONDS", default=300.0
+)
+# Conversation history sent with each prompt: the most earlier turns kept per thread (0
+# sends none), the cache alias from CACHES they are kept in, and for how many seconds.
+CHAT_CONTEXT_MAX_TURNS = env.int("CHAT_CONTEXT_MAX_TURNS", default=50)
+CHAT_CONTEXT_CACHE_ALIAS = env.str("CHAT_CONTEXT_CACHE_ALIAS", default="default")
+CHAT_CONTEXT_CACHE_TIMEOUT = env.float("CHAT_CONTEXT_CACHE_TIMEOUT", default=3600.0)
+# Rolling thread summaries: the latest turns always sent as they are, the older turns
+# folded into the summary at a time once there are that many more (0 turns summaries
+# off), the longest summary asked for in words, and the threads summarising.
+CHAT_SUMMARY_KEEP_TURNS = env.int("CHAT_SUMMARY_KEEP_TURNS", default=10)
+CHAT_SUMMARY_FOLD_TURNS = env.int("CHAT_SUMMARY_FOLD_TURNS", default=10)
+CHAT_SUMMARY_MAX_WORDS = env.int("CHAT_SUMMARY_MAX_WORDS", default=200)
+CHAT_SUMMARY_THREADS = env.int("CHAT_SUMMARY_THREADS", default=2)
+# Token counting where the provider reports no usage: the tiktoken encoding ("" to
+# estimate from the text's length), the directory its vocabulary is kept in so workers
+# need not download it, and the most texts whose counts are remembered.
+AIMODEL_TOKENIZER_ENCODING = env.str(
+    "AIMODEL_TOKENIZER_ENCODING", default="cl100k_base"
+)
+AIMODEL_TOKENIZER_CACHE_DIR = env.str("AIMODEL_TOKENIZER_CACHE_DIR", default=None)
+AIMODEL_TOKENIZER_CACHE_SIZE = env.int("AIMODEL_TOKENIZER_CACHE_SIZE", default=4096)
+# Batch prompt jobs: the prompts a job sends at once through the worker pool, the
+# fewest prompts sent through a provider's batch API (0 never uses them), seconds
+# between checks on a provider batch, the times a prompt turned away by rate limits or
+# an open circuit is sent, the jobs answered at once in each process, and the most
+# prompts in a job.
+CHAT_BATCH_CONCURRENCY = env.int("CHAT_BATCH_CONCURRENCY", default=8)
+CHAT_BATCH_PROVIDER_MIN_PROMPTS = env.int(
+    "CHAT_BATCH_PROVIDER_MIN_PROMPTS", default=100
+)
+CHAT_BATCH_POLL_SECONDS = env.float("CHAT_BATCH_POLL_SECONDS", default=60.0)
+CHAT_BATCH_MAX_ATTEMPTS = env.int("CHAT_BATCH_MAX_ATTEMPTS", default=3)
+CHAT_BATCH_THREADS = env.int("CHAT_BATCH_THREADS", default=1)
+CHAT_BATCH_MAX_PROMPTS = env.int("CHAT_BATCH_MAX_PROMPTS", default=50000)
+# Queued chat responses: answer prompts in background workers from a database queue
+# instead of on the web request, while the page polls for the response. The jobs each
+# web process answers at once (0 leaves them to the run_prompt_worker command), the
+# times a prompt is sent before it fails, the seconds a worker holds a job before
+# another may take it, the seconds between a web process's checks for jobs that have
+# come due or been abandoned (0 stops them), and the longest the async response view
+# waits for a response before the page asks again.
+AIMODEL_QUEUE_RESPONSES = env.bool("AIMODEL_QUEUE_RESPONSES", default=False)
+CHAT_QUEUE_THREADS = env.int("CHAT_QUEUE_THREADS", default=4)
+CHAT_QUEUE_MAX_ATTEMPTS = env.int("CHAT_QUEUE_MAX_ATTEMPTS", default=5)
+CHAT_QUEUE_LEASE_SECONDS = env.float("CHAT_QUEUE_LEASE_SECONDS", default=300.0)
+CHAT_QUEUE_SWEEP_SECONDS = env.float("CHAT_QUEUE_SWEEP_SECONDS", default=30.0)
+CHAT_QUEUE_LONG_POLL_SECONDS = env.float("CHAT_QUEUE_LONG_POLL_SECONDS", default=20.0)
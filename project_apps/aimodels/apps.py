@@ -4,9 +4,25 @@ It has the Config class:
 """
 
 from django.apps import AppConfig
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
 
 class ModelsConfig(AppConfig):
     name: str = "project_apps.aimodels"
     verbose_name: str = _("AI Models")
+
+    def ready(self) -> None:
+        """Registers the app's system checks, and starts loading any local models
+        configured to load at worker boot, and the AI model endpoint health probes if
+        they are on."""
+        from . import checks
+
+        if settings.AIMODEL_LOCAL_PRELOAD_MODELS:
+            from .backends import preload_local_models
+
+            preload_local_models(settings.AIMODEL_LOCAL_PRELOAD_MODELS)
+        if settings.AIMODEL_CIRCUIT_PROBE_INTERVAL > 0:
+            from .circuits import start_health_probes
+
+            start_health_probes(settings.AIMODEL_CIRCUIT_PROBE_INTERVAL)
@@ -0,0 +1,1044 @@
+"""project_apps.aimodels.backends.py
+
+This module holds the backends that AI models send their prompts through, one per
+access mode.
+
+Each backend is a class that imports its client library when first used, so a worker
+that never serves an access mode never loads its library. Backends declare what they
+support with capability flags (streaming, batching, vision), and take their own
+timeout and options from settings.
+
+The backends are configured by access mode in AIMODEL_BACKENDS, in the same shape as
+Django's CACHES: a dotted BACKEND path, its OPTIONS and a LABEL shown in the access mode
+choices. Entries there override the defaults below, or add new access modes.
+
+class AIModelBackend
+    - The base class: generate, agenerate, stream, astream, check_health, capabilities
+      and status, and submit_batch, get_batch and get_batch_results for backends that
+      support batching.
+
+class OpenAIAPIBackend
+    - Chat completions through the shared OpenAI clients in clients.py, one at a time
+      or through the Batch API.
+
+class LocalBackend
+    - Local model inference through an Ollama style HTTP server on this host.
+
+class TransformerBackend
+    - The transformer library.
+
+class EchoBackend
+    - Echoes the prompt, for access modes without a backend.
+
+class BackendRegistry
+    - get: returns the backend for an access mode, building it on first use.
+    - status: the backends built in this process, for monitoring.
+
+get_backend_configs
+    - AIMODEL_BACKENDS merged over the defaults.
+
+get_access_mode_choices
+    - The access modes for AIModel.access_mode, including those added in settings.
+
+preload_local_models
+    - Loads local models on the local server at worker boot.
+
+get_backend_registry
+    - Returns the registry shared by the whole worker process.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import threading
+import time
+import weakref
+from collections.abc import AsyncIterator, Iterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+
+from .tokens import ResponseText, TokenUsage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKENDS: dict[str, dict] = {
+    "openai_api": {
+        "BACKEND": "project_apps.aimodels.backends.OpenAIAPIBackend",
+        "LABEL": _("OpenAI API"),
+    },
+    "local": {
+        "BACKEND": "project_apps.aimodels.backends.LocalBackend",
+        "LABEL": _("Local Access"),
+    },
+    "transformer": {
+        "BACKEND": "project_apps.aimodels.backends.TransformerBackend",
+        "LABEL": _("Transformer Library"),
+    },
+}
+
+
+class AIModelBackend:
+    """Sends prompts to AI models of one access mode.
+
+    Subclasses implement generate, stream if they set supports_streaming, and the
+    batch methods if they set supports_batching. The async methods run the sync ones
+    in a thread unless a subclass overrides them.
+    """
+
+    # The states of a provider batch that will not change again.
+    BATCH_FINISHED_STATES: tuple[str, ...] = (
+        "completed",
+        "failed",
+        "expired",
+        "cancelled",
+    )
+
+    supports_streaming: bool = False
+    supports_batching: bool = False
+    supports_vision: bool = False
+
+    def __init__(
+        self, access_mode: str, timeout: float | None = None, **options
+    ) -> None:
+        """Initialises the backend.
+
+        Args:
+            access_mode (str): The access mode the backend serves.
+            timeout (float | None): Seconds to wait for a response. None uses the
+                client default, AIMODEL_CLIENT_TIMEOUT.
+            **options: Backend specific options from AIMODEL_BACKENDS.
+        """
+        self.access_mode: str = access_mode
+        self.timeout: float | None = timeout
+        self.options: dict = options
+
+    def generate(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> object:
+        """Gets the AI model's response to a prompt.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            object: A chat completion, or the response text.
+        """
+        raise NotImplementedError
+
+    async def agenerate(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> object:
+        """Gets the AI model's response to a prompt without blocking the event loop.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            object: A chat completion, or the response text.
+        """
+        return await sync_to_async(self.generate)(aimodel, prompt, history)
+
+    def stream(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> Iterator[str]:
+        """Streams the AI model's response text as it is generated.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Yields:
+            str: The next piece of the response text.
+        """
+        raise NotImplementedError
+
+    async def astream(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> AsyncIterator[str]:
+        """Streams the AI model's response text, as stream does, for async views.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Yields:
+            str: The next piece of the response text.
+        """
+        raise NotImplementedError
+        yield  # Makes this an async generator, as overrides are.
+
+    def submit_batch(self, aimodel: object, prompts: dict[str, str]) -> str:
+        """Submits prompts to the provider's batch API, to be answered offline.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompts (dict[str, str]): The prompts, by an id unique within the batch.
+
+        Returns:
+            str: The provider's id for the batch.
+        """
+        raise NotImplementedError
+
+    def get_batch(self, aimodel: object, batch_id: str) -> dict:
+        """Gets the state of a batch submitted with submit_batch.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            batch_id (str): The provider's id for the batch.
+
+        Returns:
+            dict: The batch's status, one of BATCH_FINISHED_STATES once it will not
+                change again, and its completed and failed prompts.
+        """
+        raise NotImplementedError
+
+    def get_batch_results(self, aimodel: object, batch_id: str) -> dict[str, object]:
+        """Gets the responses to a finished batch's prompts.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            batch_id (str): The provider's id for the batch.
+
+        Returns:
+            dict[str, object]: The responses, as generate gives them, by the ids the
+                prompts were submitted with. Failed prompts are left out.
+        """
+        raise NotImplementedError
+
+    def check_health(self, aimodel: object) -> None:
+        """Checks that the AI model's endpoint is up, for the health probes.
+
+        Backends that cannot check cheaply, without generating, do nothing.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Raises:
+            Exception: If the endpoint is down.
+        """
+
+    def capabilities(self) -> dict:
+        """Lists what the backend supports.
+
+        Returns:
+            dict: The streaming, batching and vision flags.
+        """
+        return {
+            "streaming": self.supports_streaming,
+            "batching": self.supports_batching,
+            "vision": self.supports_vision,
+        }
+
+    def status(self) -> dict:
+        """Summarises the backend for monitoring.
+
+        Returns:
+            dict: The backend class, its capabilities and its timeout.
+        """
+        return {
+            "backend": type(self).__name__,
+            "capabilities": self.capabilities(),
+            "timeout": self.timeout,
+        }
+
+
+class OpenAIAPIBackend(AIModelBackend):
+    """Sends prompts to OpenAI compatible chat completion APIs.
+
+    The openai library is imported with the shared clients on the first prompt.
+    """
+
+    supports_streaming: bool = True
+    supports_batching: bool = True
+    supports_vision: bool = True
+
+    def generate(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> object:
+        """Gets a chat completion with the shared client for the AI model's endpoint.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            object: The chat completion.
+        """
+        from .clients import openai_client_registry
+
+        # The client, and its keep-alive connections, are shared across prompts.
+        client = openai_client_registry.get_client_for_aimodel(aimodel)
+        return client.chat.completions.create(
+            **self._get_request_kwargs(aimodel, prompt, history)
+        )
+
+    async def agenerate(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> object:
+        """Gets a chat completion with the event loop's shared async client.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            object: The chat completion.
+        """
+        from .clients import openai_client_registry
+
+        client = openai_client_registry.get_async_client_for_aimodel(aimodel)
+        return await client.chat.completions.create(
+            **self._get_request_kwargs(aimodel, prompt, history)
+        )
+
+    def stream(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> Iterator[str]:
+        """Streams the completion's content deltas. Closing early closes the stream.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Yields:
+            str: The next piece of the response text.
+        """
+        from .clients import openai_client_registry
+
+        client = openai_client_registry.get_client_for_aimodel(aimodel)
+        with client.chat.completions.create(
+            stream=True, **self._get_request_kwargs(aimodel, prompt, history)
+        ) as stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    async def astream(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> AsyncIterator[str]:
+        """Streams the completion's content deltas with the shared async client.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Yields:
+            str: The next piece of the response text.
+        """
+        from .clients import openai_client_registry
+
+        client = openai_client_registry.get_async_client_for_aimodel(aimodel)
+        async with await client.chat.completions.create(
+            stream=True, **self._get_request_kwargs(aimodel, prompt, history)
+        ) as stream:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    def submit_batch(self, aimodel: object, prompts: dict[str, str]) -> str:
+        """Uploads the prompts as a JSONL file and creates a Batch API job for them.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompts (dict[str, str]): The prompts, by an id unique within the batch.
+
+        Returns:
+            str: The provider's id for the batch.
+        """
+        from .clients import openai_client_registry
+
+        client = openai_client_registry.get_client_for_aimodel(aimodel)
+        lines: list[str] = []
+        for custom_id, prompt in prompts.items():
+            kwargs: dict = aimodel._get_completion_kwargs(prompt)
+            body: dict = {**kwargs.pop("extra_body", {}), **kwargs}
+            lines.append(
+                json.dumps(
+                    {
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": "/v1/chat/completions",
+                        "body": body,
+                    }
+                )
+            )
+        input_file = client.files.create(
+            file=("prompts.jsonl", "\n".join(lines).encode()), purpose="batch"
+        )
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        logger.info(f"Submitted {len(prompts)} prompts to {aimodel}, batch {batch.id}")
+        return batch.id
+
+    def get_batch(self, aimodel: object, batch_id: str) -> dict:
+        """Gets the state of a Batch API job.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            batch_id (str): The provider's id for the batch.
+
+        Returns:
+            dict: The batch's status, and its completed and failed prompts.
+        """
+        from .clients import openai_client_registry
+
+        batch = openai_client_registry.get_client_for_aimodel(
+            aimodel
+        ).batches.retrieve(batch_id)
+        counts: object | None = batch.request_counts
+        return {
+            "status": batch.status,
+            "completed": counts.completed if counts else 0,
+            "failed": counts.failed if counts else 0,
+        }
+
+    def get_batch_results(self, aimodel: object, batch_id: str) -> dict[str, object]:
+        """Downloads a finished Batch API job's output file and reads its completions.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            batch_id (str): The provider's id for the batch.
+
+        Returns:
+            dict[str, object]: The chat completions by the ids the prompts were
+                submitted with. Failed prompts are left out.
+        """
+        from openai.types.chat import ChatCompletion
+
+        from .clients import openai_client_registry
+
+        client = openai_client_registry.get_client_for_aimodel(aimodel)
+        batch = client.batches.retrieve(batch_id)
+        if not batch.output_file_id:
+            return {}
+        results: dict[str, object] = {}
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record: dict = json.loads(line)
+            response: dict | None = record.get("response")
+            if response and response.get("status_code") == 200:
+                results[record["custom_id"]] = ChatCompletion.model_validate(
+                    response["body"]
+                )
+        return results
+
+    def check_health(self, aimodel: object) -> None:
+        """Checks that the AI model's endpoint answers, by listing its models.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Raises:
+            openai.OpenAIError: If the endpoint is down or answers with an error.
+        """
+        from .clients import openai_client_registry
+
+        openai_client_registry.get_client_for_aimodel(aimodel).models.list()
+
+    def status(self) -> dict:
+        """Summarises the backend and the clients it holds.
+
+        Returns:
+            dict: The backend's status with the shared clients' status.
+        """
+        from .clients import openai_client_registry
+
+        return {**super().status(), "clients": openai_client_registry.status()}
+
+    def _get_request_kwargs(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> dict:
+        """Builds the chat completion request, with the backend's timeout if it has one.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            dict: The keyword arguments for chat.completions.create.
+        """
+        kwargs: dict = aimodel._get_completion_kwargs(prompt, history)
+        if self.timeout is not None:
+            kwargs["timeout"] = self.timeout
+        return kwargs
+
+
+class LocalBackend(AIModelBackend):
+    """Sends prompts to a model server on this host with Ollama's HTTP API.
+
+    Each server URL gets one HTTP client whose keep-alive connections are reused
+    across prompts. Every request asks the server to keep the model loaded for
+    keep_alive, so prompts after the first skip the model load. The server's own
+    timings split each call into load, prompt evaluation and generation time, and
+    are logged and kept per model for status.
+    """
+
+    supports_streaming: bool = True
+
+    def __init__(
+        self,
+        access_mode: str,
+        timeout: float | None = None,
+        base_url: str | None = None,
+        keep_alive: str | None = None,
+        **options,
+    ) -> None:
+        """Initialises the backend.
+
+        Args:
+            access_mode (str): The access mode the backend serves.
+            timeout (float | None): Seconds to wait for a response. None uses
+                AIMODEL_CLIENT_TIMEOUT.
+            base_url (str | None): The server for AI models without an access endpoint,
+                and for preloading. None uses AIMODEL_LOCAL_ENDPOINT.
+            keep_alive (str | None): How long the server keeps a model loaded, e.g.
+                "30m" or "-1" for ever. None uses AIMODEL_LOCAL_KEEP_ALIVE.
+            **options: Other options from AIMODEL_BACKENDS.
+        """
+        super().__init__(access_mode, timeout, **options)
+        self.base_url: str = base_url or settings.AIMODEL_LOCAL_ENDPOINT
+        self.keep_alive: str = keep_alive or settings.AIMODEL_LOCAL_KEEP_ALIVE
+        self._clients: dict[str, object] = {}
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._timings: dict[str, dict] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def generate(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> str:
+        """Gets the local model's response to a prompt.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            ResponseText: The response text, with the server's token counts.
+        """
+        base_url: str = self._get_base_url(aimodel)
+        started: float = time.perf_counter()
+        response = self._get_client(base_url).post(
+            "/api/chat",
+            json=self._get_request_body(aimodel, prompt, stream=False, history=history),
+        )
+        response.raise_for_status()
+        body: dict = response.json()
+        call: dict = self._record_timings(
+            aimodel.name, body, time.perf_counter() - started
+        )
+        return ResponseText(
+            body["message"]["content"],
+            TokenUsage(call["input_tokens"], call["output_tokens"]),
+        )
+
+    async def agenerate(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> str:
+        """Gets the local model's response with the event loop's HTTP client.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            ResponseText: The response text, with the server's token counts.
+        """
+        base_url: str = self._get_base_url(aimodel)
+        started: float = time.perf_counter()
+        response = await self._get_async_client(base_url).post(
+            "/api/chat",
+            json=self._get_request_body(aimodel, prompt, stream=False, history=history),
+        )
+        response.raise_for_status()
+        body: dict = response.json()
+        call: dict = self._record_timings(
+            aimodel.name, body, time.perf_counter() - started
+        )
+        return ResponseText(
+            body["message"]["content"],
+            TokenUsage(call["input_tokens"], call["output_tokens"]),
+        )
+
+    def stream(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> Iterator[str]:
+        """Streams the local model's response, one JSON line per piece.
+
+        Closing the iterator early closes the response, which stops generation.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Yields:
+            str: The next piece of the response text.
+        """
+        base_url: str = self._get_base_url(aimodel)
+        started: float = time.perf_counter()
+        with self._get_client(base_url).stream(
+            "POST",
+            "/api/chat",
+            json=self._get_request_body(aimodel, prompt, stream=True, history=history),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk: dict = json.loads(line)
+                if chunk.get("message", {}).get("content"):
+                    yield chunk["message"]["content"]
+                if chunk.get("done"):
+                    self._record_timings(
+                        aimodel.name, chunk, time.perf_counter() - started
+                    )
+
+    async def astream(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> AsyncIterator[str]:
+        """Streams the local model's response with the event loop's HTTP client.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Yields:
+            str: The next piece of the response text.
+        """
+        base_url: str = self._get_base_url(aimodel)
+        started: float = time.perf_counter()
+        async with self._get_async_client(base_url).stream(
+            "POST",
+            "/api/chat",
+            json=self._get_request_body(aimodel, prompt, stream=True, history=history),
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk: dict = json.loads(line)
+                if chunk.get("message", {}).get("content"):
+                    yield chunk["message"]["content"]
+                if chunk.get("done"):
+                    self._record_timings(
+                        aimodel.name, chunk, time.perf_counter() - started
+                    )
+
+    def preload(self, model_name: str, base_url: str | None = None) -> dict:
+        """Loads a model into the server's memory without generating anything.
+
+        Args:
+            model_name (str): The model's name on the server, e.g. "llama3.2".
+            base_url (str | None): The server. None uses the backend's base_url.
+
+        Returns:
+            dict: The load's timings, as recorded for status.
+        """
+        started: float = time.perf_counter()
+        response = self._get_client(base_url or self.base_url).post(
+            "/api/generate", json={"model": model_name, "keep_alive": self.keep_alive}
+        )
+        response.raise_for_status()
+        return self._record_timings(
+            model_name, response.json(), time.perf_counter() - started
+        )
+
+    def get_timings(self, model_name: str) -> dict | None:
+        """Returns the timings recorded for a model in this process.
+
+        Args:
+            model_name (str): The model's name on the server.
+
+        Returns:
+            dict | None: The call count, total seconds per phase and the last call's
+                timings, or None if the model has not been called.
+        """
+        with self._lock:
+            timings: dict | None = self._timings.get(model_name)
+            return copy.deepcopy(timings) if timings is not None else None
+
+    def check_health(self, aimodel: object) -> None:
+        """Checks that the AI model's server answers, by listing its loaded models.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Raises:
+            httpx2.HTTPError: If the server is down or answers with an error.
+        """
+        self._get_client(self._get_base_url(aimodel)).get("/api/ps").raise_for_status()
+
+    def status(self) -> dict:
+        """Summarises the backend, its clients and its timings per model.
+
+        Returns:
+            dict: The backend's status with its servers and timings.
+        """
+        with self._lock:
+            return {
+                **super().status(),
+                "keep_alive": self.keep_alive,
+                "servers": sorted(self._clients),
+                "models": copy.deepcopy(self._timings),
+            }
+
+    def _get_base_url(self, aimodel: object) -> str:
+        """Returns the server for an AI model.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            str: The AI model's access endpoint, or the backend's base_url.
+        """
+        return (aimodel.access_endpoint or self.base_url).rstrip("/")
+
+    def _get_request_body(
+        self,
+        aimodel: object,
+        prompt: str,
+        stream: bool,
+        history: list[dict] | None = None,
+    ) -> dict:
+        """Builds a chat request for the server.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            stream (bool): Whether to stream the response.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            dict: The JSON body for /api/chat.
+        """
+        return {
+            "model": aimodel.name,
+            "messages": aimodel.get_messages(prompt, history),
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+        }
+
+    def _get_client(self, base_url: str) -> object:
+        """Returns the HTTP client for a server, building it if required.
+
+        httpx2 is imported here, so workers without local models never load it.
+
+        Args:
+            base_url (str): The server's URL.
+
+        Returns:
+            httpx2.Client: The client.
+        """
+        client: object | None = self._clients.get(base_url)
+        if client is not None:
+            return client
+        import httpx2
+
+        with self._lock:
+            client = self._clients.get(base_url)
+            if client is None:
+                client = httpx2.Client(base_url=base_url, **self._get_client_options())
+                self._clients[base_url] = client
+                logger.info(f"Built local model client for {base_url}")
+        return client
+
+    def _get_async_client(self, base_url: str) -> object:
+        """Returns the running event loop's HTTP client for a server.
+
+        Args:
+            base_url (str): The server's URL.
+
+        Returns:
+            httpx2.AsyncClient: The client.
+        """
+        import httpx2
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        with self._lock:
+            loop_clients: dict = self._async_clients.setdefault(loop, {})
+            client: object | None = loop_clients.get(base_url)
+            if client is None:
+                client = httpx2.AsyncClient(
+                    base_url=base_url, **self._get_client_options()
+                )
+                loop_clients[base_url] = client
+        return client
+
+    def _get_client_options(self) -> dict:
+        """Reads the HTTP clients' timeouts and connection pool limits.
+
+        Returns:
+            dict: The timeout and limits keyword arguments for httpx2 clients.
+        """
+        import httpx2
+
+        return {
+            "timeout": httpx2.Timeout(
+                self.timeout or settings.AIMODEL_CLIENT_TIMEOUT,
+                connect=settings.AIMODEL_CLIENT_CONNECT_TIMEOUT,
+            ),
+            "limits": httpx2.Limits(
+                max_connections=settings.AIMODEL_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AIMODEL_CLIENT_MAX_KEEPALIVE,
+                keepalive_expiry=settings.AIMODEL_CLIENT_KEEPALIVE_EXPIRY,
+            ),
+        }
+
+    def _record_timings(self, model_name: str, body: dict, seconds: float) -> dict:
+        """Records a call's timings from the server's response, and logs them.
+
+        The server reports its durations in nanoseconds.
+
+        Args:
+            model_name (str): The model's name on the server.
+            body (dict): The final response body, with the server's durations.
+            seconds (float): The call's wall clock time in this process.
+
+        Returns:
+            dict: The call's timings in seconds, and its token counts.
+        """
+        call: dict = {
+            "load_seconds": body.get("load_duration", 0) / 1e9,
+            "prompt_seconds": body.get("prompt_eval_duration", 0) / 1e9,
+            "generation_seconds": body.get("eval_duration", 0) / 1e9,
+            "total_seconds": round(seconds, 6),
+            "input_tokens": body.get("prompt_eval_count", 0),
+            "output_tokens": body.get("eval_count", 0),
+        }
+        with self._lock:
+            timings: dict = self._timings.setdefault(
+                model_name,
+                {
+                    "calls": 0,
+                    "load_seconds": 0.0,
+                    "prompt_seconds": 0.0,
+                    "generation_seconds": 0.0,
+                },
+            )
+            timings["calls"] += 1
+            for phase in ("load_seconds", "prompt_seconds", "generation_seconds"):
+                timings[phase] = round(timings[phase] + call[phase], 6)
+            timings["last"] = call
+        logger.info(
+            f"Local model {model_name}: load {call['load_seconds']:.3f}s, "
+            f"prompt {call['prompt_seconds']:.3f}s, "
+            f"generation {call['generation_seconds']:.3f}s "
+            f"for {call['output_tokens']} tokens, {call['total_seconds']:.3f}s in all"
+        )
+        return call
+
+
+class TransformerBackend(AIModelBackend):
+    """Runs prompts through the transformer library."""
+
+    def generate(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> str:
+        """Gets the transformer model's response to a prompt.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            str: The response text.
+        """
+        # Here you would integrate with the transformer library
+        return f"Response from OpenRouter for prompt: {prompt.strip()}"
+
+
+class EchoBackend(AIModelBackend):
+    """Answers with the prompt, for access modes that have no backend configured."""
+
+    def generate(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> str:
+        """Echoes the prompt.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            str: The echoed prompt.
+        """
+        return f"Echo: {prompt.strip()}"
+
+
+class BackendRegistry:
+    """Builds each access mode's backend on first use and reuses it.
+
+    Only the backend classes of access modes in use are imported.
+    """
+
+    def __init__(self, configs: dict[str, dict]) -> None:
+        """Initialises the registry.
+
+        Args:
+            configs (dict[str, dict]): The BACKEND, OPTIONS and LABEL per access mode.
+        """
+        self.configs: dict[str, dict] = configs
+        self._backends: dict[str, AIModelBackend] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def get(self, access_mode: str) -> AIModelBackend:
+        """Returns the backend for an access mode, building it if required.
+
+        Args:
+            access_mode (str): The AI model's access mode.
+
+        Returns:
+            AIModelBackend: The backend, or an EchoBackend if none is configured.
+        """
+        backend: AIModelBackend | None = self._backends.get(access_mode)
+        if backend is not None:
+            return backend
+        with self._lock:
+            backend = self._backends.get(access_mode)
+            if backend is None:
+                backend = self._build_backend(access_mode)
+                self._backends[access_mode] = backend
+        return backend
+
+    def status(self) -> dict:
+        """Summarises the backends for monitoring.
+
+        Returns:
+            dict: The configured access modes and the status of each backend built.
+        """
+        return {
+            "configured": sorted(self.configs),
+            "loaded": {
+                access_mode: backend.status()
+                for access_mode, backend in self._backends.items()
+            },
+        }
+
+    def _build_backend(self, access_mode: str) -> AIModelBackend:
+        """Imports and builds the backend for an access mode.
+
+        Args:
+            access_mode (str): The access mode.
+
+        Returns:
+            AIModelBackend: The new backend.
+        """
+        config: dict | None = self.configs.get(access_mode)
+        if config is None:
+            logger.warning(f"No AI model backend for access mode {access_mode}")
+            return EchoBackend(access_mode)
+        backend_class: type = import_string(config["BACKEND"])
+        logger.info(f"AI model access mode {access_mode} uses {backend_class.__name__}")
+        return backend_class(access_mode, **config.get("OPTIONS", {}))
+
+
+def get_backend_configs() -> dict[str, dict]:
+    """Merges AIMODEL_BACKENDS over the default backends.
+
+    Returns:
+        dict[str, dict]: The BACKEND, OPTIONS and LABEL per access mode.
+    """
+    configs: dict[str, dict] = {
+        access_mode: dict(config) for access_mode, config in DEFAULT_BACKENDS.items()
+    }
+    for access_mode, config in settings.AIMODEL_BACKENDS.items():
+        configs[access_mode] = {**configs.get(access_mode, {}), **config}
+    return configs
+
+
+def get_access_mode_choices() -> list[tuple[str, str]]:
+    """Lists the access modes AI models can use, for AIModel.access_mode.
+
+    Returns:
+        list[tuple[str, str]]: The access mode and its label, per configured backend.
+    """
+    return [
+        (access_mode, config.get("LABEL", access_mode))
+        for access_mode, config in get_backend_configs().items()
+    ]
+
+
+def preload_local_models(model_names: list[str]) -> threading.Thread:
+    """Loads local models on the local server in the background.
+
+    The worker does not wait for the models; a model still loading when its first
+    prompt arrives is waited for by the server. Failures are logged.
+
+    Args:
+        model_names (list[str]): The models' names on the server.
+
+    Returns:
+        threading.Thread: The thread loading the models.
+    """
+
+    def preload() -> None:
+        backend: AIModelBackend = get_backend_registry().get("local")
+        for model_name in model_names:
+            try:
+                backend.preload(model_name)
+            except Exception:
+                logger.warning(
+                    f"Could not preload local model {model_name}", exc_info=True
+                )
+
+    thread = threading.Thread(target=preload, name="local-model-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+_backend_registry_lock: threading.Lock = threading.Lock()
+_backend_registry: BackendRegistry | None = None
+
+
+def get_backend_registry() -> BackendRegistry:
+    """Returns the process's backend registry, creating it from settings on first use.
+
+    Returns:
+        BackendRegistry: The registry.
+    """
+    global _backend_registry
+    if _backend_registry is None:
+        with _backend_registry_lock:
+            if _backend_registry is None:
+                _backend_registry = BackendRegistry(get_backend_configs())
+    return _backend_registry
@@ -0,0 +1,409 @@
+"""project_apps.aimodels.caching.py
+
+This module caches AI model responses so a repeated prompt is answered without calling
+the provider again.
+
+Responses are keyed on the AI model, its generation parameters, the conversation's
+earlier turns sent with the prompt, and the prompt after normalising its unicode form
+and whitespace, so only prompts that would produce the same request share an entry. A
+follow-up such as "why?" is therefore only answered from the cache in the conversation
+it was asked in. Caching is opted into per AI model with cache_responses.
+
+The storage is pluggable: AIMODEL_RESPONSE_CACHE_BACKEND names the backend class and
+AIMODEL_RESPONSE_CACHE_OPTIONS its keyword arguments.
+
+class LRUResponseCacheBackend
+    - An in-process store with least recently used eviction. The default.
+
+class DjangoResponseCacheBackend
+    - Stores responses in one of Django's CACHES, so processes can share them.
+
+class LookupCounters
+    - Hit and miss counters per AI model, shared with the semantic cache.
+
+get_generation_parameters
+    - What, besides the prompt, decides an AI model's response.
+
+class ResponseCache
+    - make_key: builds the key for an AI model, prompt and earlier turns.
+    - get/set: look up and store responses, counting hits and misses per AI model.
+    - stats / stats_for: hit-rate metrics overall and for one AI model.
+    - clear: removes every response and resets the counters.
+
+get_response_cache
+    - Returns the response cache shared by the whole worker process.
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalises a prompt so trivially different spellings share a cache entry.
+
+    Args:
+        prompt (str): The prompt as entered.
+
+    Returns:
+        str: The prompt in NFC form with runs of whitespace collapsed and trimmed.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", prompt)).strip()
+
+
+class LRUResponseCacheBackend:
+    """Holds responses in this process, evicting the least recently used when full.
+
+    Entries expire after the TTL they were stored with.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        """Initialises an empty store.
+
+        Args:
+            max_entries (int): The most responses to hold.
+        """
+        self.max_entries: int = max_entries
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        """Returns a stored response.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str | None: The response, or None if absent or expired.
+        """
+        with self._lock:
+            entry: tuple[float, str] | None = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, text: str, ttl_seconds: float) -> None:
+        """Stores a response, evicting the least recently used if full.
+
+        Args:
+            key (str): The cache key.
+            text (str): The response.
+            ttl_seconds (float): How long the response stays valid.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def entries(self) -> int | None:
+        """Counts the responses held.
+
+        Returns:
+            int | None: The number of entries.
+        """
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        """Removes every response."""
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoResponseCacheBackend:
+    """Stores responses in a Django cache, e.g. Redis or Memcached shared by processes.
+
+    clear empties the whole cache, so give responses a cache alias of their own.
+    """
+
+    def __init__(
+        self, alias: str = "default", key_prefix: str = "aimodel-response"
+    ) -> None:
+        """Initialises the backend.
+
+        Args:
+            alias (str): The name of the cache in the CACHES setting.
+            key_prefix (str): Prepended to every key.
+        """
+        self.alias: str = alias
+        self.key_prefix: str = key_prefix
+
+    def get(self, key: str) -> str | None:
+        """Returns a stored response.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str | None: The response, or None if absent or expired.
+        """
+        return caches[self.alias].get(f"{self.key_prefix}:{key}")
+
+    def set(self, key: str, text: str, ttl_seconds: float) -> None:
+        """Stores a response.
+
+        Args:
+            key (str): The cache key.
+            text (str): The response.
+            ttl_seconds (float): How long the response stays valid.
+        """
+        caches[self.alias].set(f"{self.key_prefix}:{key}", text, timeout=ttl_seconds)
+
+    def entries(self) -> int | None:
+        """Django caches cannot count their entries.
+
+        Returns:
+            int | None: None.
+        """
+        return None
+
+    def clear(self) -> None:
+        """Empties the Django cache."""
+        caches[self.alias].clear()
+
+
+class LookupCounters:
+    """Counts cache hits and misses per AI model in this process."""
+
+    def __init__(self) -> None:
+        """Initialises the counters at zero."""
+        self._counters: dict[str, dict[str, int]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def count(self, aimodel: object, hit: bool) -> None:
+        """Counts a lookup for an AI model.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            hit (bool): Whether the lookup found a response.
+        """
+        with self._lock:
+            counters: dict[str, int] = self._counters.setdefault(
+                str(aimodel.pk), {"hits": 0, "misses": 0}
+            )
+            counters["hits" if hit else "misses"] += 1
+
+    def summary(self) -> dict:
+        """Summarises the lookups of every AI model.
+
+        Returns:
+            dict: The hits, misses and hit rate overall, and per AI model in "models".
+        """
+        with self._lock:
+            per_model: dict[str, dict] = {
+                name: self._summarise(counters)
+                for name, counters in self._counters.items()
+            }
+            hits: int = sum(counters["hits"] for counters in self._counters.values())
+            misses: int = sum(
+                counters["misses"] for counters in self._counters.values()
+            )
+        return {
+            **self._summarise({"hits": hits, "misses": misses}),
+            "models": per_model,
+        }
+
+    def summary_for(self, aimodel: object) -> dict:
+        """Summarises the lookups of one AI model.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            dict: The AI model's hits, misses and hit rate.
+        """
+        with self._lock:
+            return self._summarise(
+                self._counters.get(str(aimodel.pk), {"hits": 0, "misses": 0})
+            )
+
+    def clear(self) -> None:
+        """Resets every counter."""
+        with self._lock:
+            self._counters.clear()
+
+    @staticmethod
+    def _summarise(counters: dict[str, int]) -> dict:
+        """Adds the hit rate to hit and miss counters.
+
+        Args:
+            counters (dict[str, int]): The hits and misses.
+
+        Returns:
+            dict: The hits, misses and hit rate.
+        """
+        lookups: int = counters["hits"] + counters["misses"]
+        return {
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+def get_generation_parameters(aimodel: object) -> dict:
+    """Collects what, besides the prompt, decides the response an AI model gives.
+
+    Args:
+        aimodel (object): The AIModel instance.
+
+    Returns:
+        dict: The access mode, endpoint and request parameters other than the messages.
+    """
+    parameters: dict = aimodel._get_completion_kwargs("")
+    parameters.pop("messages", None)
+    return {
+        "access_mode": aimodel.access_mode,
+        "access_endpoint": aimodel.access_endpoint,
+        "parameters": parameters,
+    }
+
+
+class ResponseCache:
+    """Caches AI model responses in a backend and keeps hit-rate metrics.
+
+    Hits and misses are counted per AI model in this process.
+    """
+
+    def __init__(self, backend: object, ttl_seconds: float) -> None:
+        """Initialises the cache.
+
+        Args:
+            backend: The store, e.g. an LRUResponseCacheBackend.
+            ttl_seconds (float): How long a response stays valid.
+        """
+        self.backend = backend
+        self.ttl_seconds: float = ttl_seconds
+        self.counters: LookupCounters = LookupCounters()
+
+    @staticmethod
+    def make_key(
+        aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> str:
+        """Builds the cache key for a prompt sent to an AI model.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The prompt.
+            history (list[dict] | None): The conversation's earlier turns sent with
+                the prompt as chat messages.
+
+        Returns:
+            str: The cache key.
+        """
+        request: str = json.dumps(
+            {
+                "aimodel": str(aimodel.pk),
+                **get_generation_parameters(aimodel),
+                "prompt": normalize_prompt(prompt),
+                "history": history or [],
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return f"{aimodel.pk}:{hashlib.sha256(request.encode()).hexdigest()}"
+
+    def get(
+        self, aimodel: object, prompt: str, history: list[dict] | None = None
+    ) -> str | None:
+        """Returns the cached response to a prompt, counting the hit or miss.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The prompt.
+            history (list[dict] | None): The earlier turns sent with the prompt.
+
+        Returns:
+            str | None: The response, or None if it is not cached.
+        """
+        text: str | None = self.backend.get(self.make_key(aimodel, prompt, history))
+        self.counters.count(aimodel, text is not None)
+        return text
+
+    def set(
+        self,
+        aimodel: object,
+        prompt: str,
+        text: str,
+        history: list[dict] | None = None,
+    ) -> None:
+        """Stores the response to a prompt.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The prompt.
+            text (str): The response.
+            history (list[dict] | None): The earlier turns sent with the prompt.
+        """
+        self.backend.set(
+            self.make_key(aimodel, prompt, history), text, self.ttl_seconds
+        )
+
+    def stats(self) -> dict:
+        """Summarises the cache for monitoring.
+
+        Returns:
+            dict: The entry count, TTL, and hit/miss counters overall and per AI model.
+        """
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.entries(),
+            "ttl_seconds": self.ttl_seconds,
+            **self.counters.summary(),
+        }
+
+    def stats_for(self, aimodel: object) -> dict:
+        """Summarises the hits and misses for one AI model.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            dict: The AI model's hits, misses and hit rate.
+        """
+        return self.counters.summary_for(aimodel)
+
+    def clear(self) -> None:
+        """Removes every response and resets the counters."""
+        self.backend.clear()
+        self.counters.clear()
+
+
+_response_cache_lock: threading.Lock = threading.Lock()
+_response_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Returns the process's response cache, creating it from settings on first use.
+
+    Returns:
+        ResponseCache: The cache, with the AIMODEL_RESPONSE_CACHE_BACKEND backend.
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                backend_class: type = import_string(
+                    settings.AIMODEL_RESPONSE_CACHE_BACKEND
+                )
+                _response_cache = ResponseCache(
+                    backend=backend_class(**settings.AIMODEL_RESPONSE_CACHE_OPTIONS),
+                    ttl_seconds=settings.AIMODEL_RESPONSE_CACHE_TTL,
+                )
+                logger.info(f"AI model response cache uses {backend_class.__name__}")
+    return _response_cache
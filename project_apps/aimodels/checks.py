@@ -0,0 +1,52 @@
+"""project_apps.aimodels.checks.py
+
+This module holds the aimodels app's system checks, run by manage.py check and at
+startup.
+
+check_rate_limit_cache
+    - Warns when the AI model rate limits are kept in a cache private to each process.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Cache backends that keep their entries in each process, or keep none.
+PROCESS_LOCAL_CACHE_BACKENDS: tuple[str, ...] = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches)
+def check_rate_limit_cache(app_configs=None, **kwargs) -> list:
+    """Warns when AIMODEL_RATE_LIMIT_CACHE_ALIAS is not shared by worker processes.
+
+    Each process would then count only its own requests, so the AI models' rate limits
+    would be multiplied by the number of processes.
+
+    Args:
+        app_configs: The apps being checked, or None for all.
+        **kwargs: Other check options.
+
+    Returns:
+        list: The warnings or errors found.
+    """
+    alias: str = settings.AIMODEL_RATE_LIMIT_CACHE_ALIAS
+    if alias not in settings.CACHES:
+        return [
+            Error(
+                f"AIMODEL_RATE_LIMIT_CACHE_ALIAS {alias!r} is not in CACHES.",
+                id="aimodels.E001",
+            )
+        ]
+    if settings.CACHES[alias]["BACKEND"] in PROCESS_LOCAL_CACHE_BACKENDS:
+        return [
+            Warning(
+                f"AI model rate limits are kept in the {alias!r} cache, which each "
+                "worker process keeps apart, so every process allows the full limits.",
+                hint="Set AIMODEL_RATE_LIMIT_CACHE_ALIAS to a shared cache, e.g. "
+                "Redis or the database cache.",
+                id="aimodels.W001",
+            )
+        ]
+    return []
@@ -0,0 +1,454 @@
+"""project_apps.aimodels.circuits.py
+
+This module stops AI model requests going to endpoints that are failing.
+
+Without it, when the provider behind an access endpoint degrades every request waits
+out the full timeout before failing, holding a worker all the while. Each endpoint, an
+access mode and access endpoint pair, has a circuit breaker:
+    - closed: requests go through. The circuit opens when at least
+      AIMODEL_CIRCUIT_MIN_CALLS of the last AIMODEL_CIRCUIT_WINDOW calls were made and
+      AIMODEL_CIRCUIT_FAILURE_RATE of them failed, or when the last
+      AIMODEL_CIRCUIT_MAX_TIMEOUTS calls all timed out.
+    - open: requests fail at once with CircuitOpenError, for
+      AIMODEL_CIRCUIT_RESET_SECONDS.
+    - half_open: one trial request goes through. If it succeeds the circuit closes,
+      otherwise it opens again.
+
+Only errors that show the endpoint failing count: timeouts, connection errors, and
+429 and 5xx responses. A bad request, e.g. a 400, 401 or 422, is the caller's fault and
+leaves the circuit as it was.
+
+Health probes, run every AIMODEL_CIRCUIT_PROBE_INTERVAL seconds on a background thread
+when set, ask each active AI model's backend whether its endpoint is up, opening the
+circuit of one that is not, and closing the circuit of one that has recovered.
+
+The model router skips AI models whose circuit is open, so the NOA endpoint goes to a
+healthy AI model; other callers fail fast.
+
+class CircuitOpenError
+    - Raised instead of sending a request to an endpoint whose circuit is open.
+
+class CircuitBreaker
+    - before_call: raises CircuitOpenError unless a request may go through.
+    - cancel_call: gives back a trial slot when the request was never sent.
+    - record_success / record_failure: a request's outcome.
+    - trip / reset: opens or closes the circuit, e.g. after a health probe.
+    - state / status: the circuit's state and figures.
+
+class CircuitBreakerRegistry
+    - get: the circuit breaker for an AI model's endpoint.
+    - status: every endpoint's circuit.
+
+get_endpoint_key
+    - The endpoint an AI model's requests go to.
+
+is_timeout / is_endpoint_failure
+    - Whether a request's error is a timeout, or counts against the endpoint.
+
+probe_endpoints / start_health_probes
+    - Check the AI models' endpoints, once or on a background thread.
+
+get_circuit_breakers
+    - Returns the registry shared by the whole worker process.
+"""
+
+import collections
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+CLOSED: str = "closed"
+OPEN: str = "open"
+HALF_OPEN: str = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to an endpoint whose circuit is open.
+
+    Attributes:
+        status_code (int): The HTTP status to answer with.
+        retry_after (int): Seconds until the endpoint will be tried again.
+    """
+
+    status_code: int = 503
+
+    def __init__(self, endpoint: str, retry_after: int) -> None:
+        """Initialises the error with the endpoint and the retry delay.
+
+        Args:
+            endpoint (str): The endpoint's key.
+            retry_after (int): Seconds until the endpoint will be tried again.
+        """
+        self.endpoint: str = endpoint
+        self.retry_after: int = retry_after
+        super().__init__(
+            f"The AI model at {endpoint} is unavailable, retry in {retry_after}s"
+        )
+
+
+def get_endpoint_key(aimodel: object) -> str:
+    """Names the endpoint an AI model's requests go to.
+
+    Args:
+        aimodel (object): The AIModel instance.
+
+    Returns:
+        str: The access mode and access endpoint, e.g. "openai_api:https://...".
+    """
+    return f"{aimodel.access_mode}:{aimodel.access_endpoint or ''}"
+
+
+def is_timeout(error: BaseException) -> bool:
+    """Tells whether an error is a timeout, from any client library.
+
+    Args:
+        error (BaseException): The error raised by a request.
+
+    Returns:
+        bool: True for timeouts, e.g. openai's APITimeoutError or httpx's.
+    """
+    return isinstance(error, TimeoutError) or "Timeout" in type(error).__name__
+
+
+def is_endpoint_failure(error: BaseException) -> bool:
+    """Tells whether an error shows the endpoint failing, rather than a bad request.
+
+    Args:
+        error (BaseException): The error raised by a request.
+
+    Returns:
+        bool: True for timeouts, connection errors, and 429 and 5xx responses, e.g.
+            openai's APIStatusError or httpx's HTTPStatusError.
+    """
+    if (
+        is_timeout(error)
+        or isinstance(error, ConnectionError)
+        or "Connection" in type(error).__name__
+    ):
+        return True
+    status_code: object = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+class CircuitBreaker:
+    """The circuit breaker for one endpoint."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        max_timeouts: int = 3,
+        reset_seconds: float = 30.0,
+    ) -> None:
+        """Initialises the circuit, closed.
+
+        Args:
+            endpoint (str): The endpoint's key.
+            window (int): The recent calls the failure rate is taken over.
+            min_calls (int): The fewest calls in the window to open the circuit on.
+            failure_rate (float): The failure rate that opens the circuit.
+            max_timeouts (int): The run of timeouts that opens the circuit.
+            reset_seconds (float): How long the circuit stays open before a trial.
+        """
+        self.endpoint: str = endpoint
+        self.min_calls: int = min_calls
+        self.failure_rate: float = failure_rate
+        self.max_timeouts: int = max_timeouts
+        self.reset_seconds: float = reset_seconds
+        self._calls: collections.deque = collections.deque(maxlen=window)
+        self._state: str = CLOSED
+        self._opened_at: float = 0.0
+        self._trial_started_at: float | None = None
+        self._last_error: str = ""
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """The circuit's state: closed, open or half_open."""
+        with self._lock:
+            return self._get_state()
+
+    def before_call(self) -> None:
+        """Checks that a request may go to the endpoint.
+
+        A half-open circuit lets one trial request through at a time. A trial that
+        never reports back, e.g. because it was cancelled, is replaced after
+        reset_seconds.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or a trial is in flight.
+        """
+        with self._lock:
+            state: str = self._get_state()
+            if state == CLOSED:
+                return
+            now: float = time.monotonic()
+            if state == HALF_OPEN and (
+                self._trial_started_at is None
+                or now - self._trial_started_at >= self.reset_seconds
+            ):
+                self._trial_started_at = now
+                return
+            retry_after: int = max(
+                1, math.ceil(self._opened_at + self.reset_seconds - now)
+            )
+        raise CircuitOpenError(self.endpoint, retry_after)
+
+    def cancel_call(self) -> None:
+        """Gives back a half-open circuit's trial slot when the request was never sent.
+
+        A request that is turned away before reaching the endpoint, e.g. by its rate
+        limits, tells nothing of the endpoint's health, so the next request may be the
+        trial instead.
+        """
+        with self._lock:
+            if self._get_state() == HALF_OPEN:
+                self._trial_started_at = None
+
+    def record_success(self) -> None:
+        """Records a successful request, closing a half-open circuit."""
+        with self._lock:
+            if self._get_state() == HALF_OPEN:
+                self._close()
+            self._calls.append((False, False))
+
+    def record_failure(self, error: BaseException) -> None:
+        """Records a failed request, opening the circuit if the endpoint is failing.
+
+        Errors that do not show the endpoint failing are not counted, and give back a
+        half-open circuit's trial slot.
+
+        Args:
+            error (BaseException): The error the request raised.
+        """
+        if not is_endpoint_failure(error):
+            self.cancel_call()
+            return
+        timed_out: bool = is_timeout(error)
+        with self._lock:
+            self._last_error = f"{type(error).__name__}: {error}"
+            self._calls.append((True, timed_out))
+            state: str = self._get_state()
+            if state == HALF_OPEN:
+                self._open()
+            if state != CLOSED:
+                return
+            failures: int = sum(failed for failed, _ in self._calls)
+            recent: list = list(self._calls)[-self.max_timeouts :]
+            if (
+                len(self._calls) >= self.min_calls
+                and failures / len(self._calls) >= self.failure_rate
+            ) or (
+                len(recent) == self.max_timeouts
+                and all(timed_out for _, timed_out in recent)
+            ):
+                self._open()
+
+    def trip(self, reason: str) -> None:
+        """Opens the circuit, e.g. when a health probe fails.
+
+        Args:
+            reason (str): Why the endpoint is unavailable.
+        """
+        with self._lock:
+            self._last_error = reason
+            self._open()
+
+    def reset(self) -> None:
+        """Closes the circuit, e.g. when a health probe succeeds."""
+        with self._lock:
+            self._close()
+
+    def status(self) -> dict:
+        """Summarises the circuit for monitoring.
+
+        Returns:
+            dict: The state, recent calls, failures, timeouts, failure rate, seconds
+                until a trial if open, and the last error.
+        """
+        with self._lock:
+            state: str = self._get_state()
+            calls: list[tuple[bool, bool]] = list(self._calls)
+            failures: int = sum(failed for failed, _ in calls)
+            return {
+                "endpoint": self.endpoint,
+                "state": state,
+                "calls": len(calls),
+                "failures": failures,
+                "timeouts": sum(timed_out for _, timed_out in calls),
+                "failure_rate": failures / len(calls) if calls else 0.0,
+                "retry_after": (
+                    max(
+                        0,
+                        math.ceil(
+                            self._opened_at + self.reset_seconds - time.monotonic()
+                        ),
+                    )
+                    if state == OPEN
+                    else 0
+                ),
+                "last_error": self._last_error,
+            }
+
+    def _get_state(self) -> str:
+        """Gives the state, turning an open circuit half-open once it is due a trial.
+
+        Returns:
+            str: The state. The caller holds the lock.
+        """
+        if (
+            self._state == OPEN
+            and time.monotonic() - self._opened_at >= self.reset_seconds
+        ):
+            self._state = HALF_OPEN
+            self._trial_started_at = None
+        return self._state
+
+    def _open(self) -> None:
+        """Opens the circuit. The caller holds the lock."""
+        if self._state == CLOSED:
+            logger.warning(
+                f"Opening the circuit for AI model endpoint {self.endpoint}: "
+                f"{self._last_error}"
+            )
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._trial_started_at = None
+
+    def _close(self) -> None:
+        """Closes the circuit and forgets its calls. The caller holds the lock."""
+        if self._state != CLOSED:
+            logger.info(f"Closing the circuit for AI model endpoint {self.endpoint}")
+        self._state = CLOSED
+        self._calls.clear()
+        self._trial_started_at = None
+
+
+class CircuitBreakerRegistry:
+    """Holds a circuit breaker for each endpoint."""
+
+    def __init__(self, **options) -> None:
+        """Initialises the registry.
+
+        Args:
+            **options: The CircuitBreaker options for every endpoint.
+        """
+        self.options: dict = options
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def get(self, aimodel: object) -> CircuitBreaker:
+        """Returns the circuit breaker for an AI model's endpoint.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            CircuitBreaker: The endpoint's circuit breaker, created on first use.
+        """
+        endpoint: str = get_endpoint_key(aimodel)
+        with self._lock:
+            breaker: CircuitBreaker | None = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(
+                    endpoint, **self.options
+                )
+            return breaker
+
+    def status(self) -> dict:
+        """Summarises every endpoint's circuit.
+
+        Returns:
+            dict: The status per endpoint.
+        """
+        with self._lock:
+            breakers: list[CircuitBreaker] = list(self._breakers.values())
+        return {breaker.endpoint: breaker.status() for breaker in breakers}
+
+
+def probe_endpoints(aimodels: list) -> dict[str, bool]:
+    """Checks each AI model's endpoint, once per endpoint, and sets its circuit.
+
+    Args:
+        aimodels (list): The AIModel instances, e.g. the active ones.
+
+    Returns:
+        dict[str, bool]: Whether each endpoint is up, by endpoint key.
+    """
+    registry: CircuitBreakerRegistry = get_circuit_breakers()
+    healthy: dict[str, bool] = {}
+    for aimodel in aimodels:
+        endpoint: str = get_endpoint_key(aimodel)
+        if endpoint in healthy:
+            continue
+        breaker: CircuitBreaker = registry.get(aimodel)
+        try:
+            aimodel.get_backend().check_health(aimodel)
+        except Exception as error:
+            healthy[endpoint] = False
+            breaker.trip(f"Health probe failed: {type(error).__name__}: {error}")
+        else:
+            healthy[endpoint] = True
+            if breaker.state != CLOSED:
+                breaker.reset()
+    return healthy
+
+
+def start_health_probes(interval: float) -> threading.Thread:
+    """Probes the active AI models' endpoints on a background thread.
+
+    Args:
+        interval (float): The seconds between rounds of probes.
+
+    Returns:
+        threading.Thread: The probing thread.
+    """
+    from .models import AIModel
+
+    def probe() -> None:
+        while True:
+            try:
+                probe_endpoints(AIModel.objects.filter(is_active=True))
+            except Exception:
+                logger.warning("Could not probe AI model endpoints", exc_info=True)
+            finally:
+                close_old_connections()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=probe, name="aimodel-health-probe", daemon=True)
+    thread.start()
+    return thread
+
+
+_circuit_breakers: CircuitBreakerRegistry | None = None
+_circuit_breakers_lock: threading.Lock = threading.Lock()
+
+
+def get_circuit_breakers() -> CircuitBreakerRegistry:
+    """Returns the process's circuit breakers, created from settings on first use.
+
+    Returns:
+        CircuitBreakerRegistry: The registry.
+    """
+    global _circuit_breakers
+    if _circuit_breakers is None:
+        with _circuit_breakers_lock:
+            if _circuit_breakers is None:
+                _circuit_breakers = CircuitBreakerRegistry(
+                    window=settings.AIMODEL_CIRCUIT_WINDOW,
+                    min_calls=settings.AIMODEL_CIRCUIT_MIN_CALLS,
+                    failure_rate=settings.AIMODEL_CIRCUIT_FAILURE_RATE,
+                    max_timeouts=settings.AIMODEL_CIRCUIT_MAX_TIMEOUTS,
+                    reset_seconds=settings.AIMODEL_CIRCUIT_RESET_SECONDS,
+                )
+    return _circuit_breakers
@@ -0,0 +1,297 @@
+"""project_apps.aimodels.clients.py
+
+This module keeps the HTTP clients used to reach AI model providers.
+
+Creating an OpenAI client per prompt throws away its connection pool, so every chat turn
+pays for a new TCP and TLS handshake. Clients are instead held in a process-wide
+registry keyed by endpoint and credentials, and reused with keep-alive connections.
+
+Async clients are held the same way, one set per event loop, since their connections
+belong to the loop that opened them. Under ASGI there is a single loop per process, so
+every async request shares them.
+
+class OpenAIClientRegistry
+    - get_client: returns the shared client for an endpoint and API key.
+    - get_client_for_aimodel: as get_client, rebuilding the client when the AI model's
+      endpoint changes.
+    - get_async_client / get_async_client_for_aimodel: the async equivalents.
+    - status: the clients held, for monitoring.
+    - clear: closes every client.
+
+openai_client_registry
+    - The registry instance shared by the whole worker process.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import weakref
+
+import httpx2
+from django.conf import settings
+from openai import (
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+    OpenAI,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAIClientRegistry:
+    """Builds one OpenAI client per endpoint and API key and reuses it.
+
+    Each client has its own connection pool, sized and timed out from settings.
+    Clients are tracked by the AI models using them, so when a model's endpoint changes
+    its old client is closed once no model has used it for
+    AIMODEL_CLIENT_RETIRE_SECONDS. Until then, requests still in flight on it finish,
+    e.g. those of an AIModel instance loaded before the change, and a model using it
+    again keeps it.
+    """
+
+    def __init__(self) -> None:
+        """Initialises an empty registry."""
+        self._clients: dict[tuple[str, str], OpenAI] = {}
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._owners: dict[object, tuple[str, str]] = {}
+        self._retired: dict[tuple[str, str], float] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def make_key(endpoint: str, api_key: str) -> tuple[str, str]:
+        """Builds the registry key for an endpoint and API key.
+
+        The key holds a hash of the API key rather than the key itself.
+
+        Args:
+            endpoint (str): The provider's base URL.
+            api_key (str): The API key.
+
+        Returns:
+            tuple[str, str]: The endpoint and the API key's hash.
+        """
+        return endpoint, hashlib.sha256(api_key.encode()).hexdigest()
+
+    def get_client(self, endpoint: str, api_key: str) -> OpenAI:
+        """Returns the shared client for an endpoint and API key, building it if required.
+
+        Args:
+            endpoint (str): The provider's base URL.
+            api_key (str): The API key.
+
+        Returns:
+            OpenAI: The client.
+        """
+        key: tuple[str, str] = self.make_key(endpoint, api_key)
+        client: OpenAI | None = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._build_client(endpoint, api_key)
+                self._clients[key] = client
+        return client
+
+    def get_client_for_aimodel(self, aimodel: object) -> OpenAI:
+        """Returns the client for an AI model's endpoint and the configured API key.
+
+        If the model last used a different endpoint, that endpoint's client is closed
+        once no model has used it for AIMODEL_CLIENT_RETIRE_SECONDS.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            OpenAI: The client.
+        """
+        self._track_owner(aimodel)
+        return self.get_client(aimodel.access_endpoint, settings.OPEN_AI_MODEL_KEY)
+
+    def get_async_client(self, endpoint: str, api_key: str) -> AsyncOpenAI:
+        """Returns the running event loop's async client for an endpoint and API key.
+
+        Must be called from a coroutine.
+
+        Args:
+            endpoint (str): The provider's base URL.
+            api_key (str): The API key.
+
+        Returns:
+            AsyncOpenAI: The client.
+        """
+        key: tuple[str, str] = self.make_key(endpoint, api_key)
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        with self._lock:
+            loop_clients: dict = self._async_clients.setdefault(loop, {})
+            client: AsyncOpenAI | None = loop_clients.get(key)
+            if client is None:
+                client = self._build_async_client(endpoint, api_key)
+                loop_clients[key] = client
+        return client
+
+    def get_async_client_for_aimodel(self, aimodel: object) -> AsyncOpenAI:
+        """Returns the async client for an AI model, as get_client_for_aimodel does.
+
+        Must be called from a coroutine.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            AsyncOpenAI: The client.
+        """
+        self._track_owner(aimodel)
+        return self.get_async_client(
+            aimodel.access_endpoint, settings.OPEN_AI_MODEL_KEY
+        )
+
+    def status(self) -> dict:
+        """Summarises the clients held in this process.
+
+        Returns:
+            dict: The number of clients and the endpoints they connect to.
+        """
+        return {
+            "clients": len(self._clients),
+            "async_clients": sum(
+                len(loop_clients) for loop_clients in self._async_clients.values()
+            ),
+            "endpoints": sorted({endpoint for endpoint, _ in self._clients}),
+        }
+
+    def clear(self) -> None:
+        """Closes every client and forgets the AI models using them."""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+            self._async_clients.clear()
+            self._owners.clear()
+            self._retired.clear()
+
+    def _build_client(self, endpoint: str, api_key: str) -> OpenAI:
+        """Builds a client with a keep-alive connection pool.
+
+        Args:
+            endpoint (str): The provider's base URL.
+            api_key (str): The API key.
+
+        Returns:
+            OpenAI: The new client.
+        """
+        timeout, limits = self._get_timeout_and_limits()
+        # The openai library's own HTTP client, with its defaults, but our pool limits.
+        http_client = DefaultHttpxClient(timeout=timeout, limits=limits)
+        logger.info(f"Built AI model client for {endpoint}")
+        return OpenAI(
+            base_url=endpoint,
+            api_key=api_key,
+            timeout=timeout,
+            max_retries=settings.AIMODEL_CLIENT_MAX_RETRIES,
+            http_client=http_client,
+        )
+
+    def _build_async_client(self, endpoint: str, api_key: str) -> AsyncOpenAI:
+        """Builds an async client with a keep-alive connection pool.
+
+        Args:
+            endpoint (str): The provider's base URL.
+            api_key (str): The API key.
+
+        Returns:
+            AsyncOpenAI: The new client.
+        """
+        timeout, limits = self._get_timeout_and_limits()
+        http_client = DefaultAsyncHttpxClient(timeout=timeout, limits=limits)
+        logger.info(f"Built async AI model client for {endpoint}")
+        return AsyncOpenAI(
+            base_url=endpoint,
+            api_key=api_key,
+            timeout=timeout,
+            max_retries=settings.AIMODEL_CLIENT_MAX_RETRIES,
+            http_client=http_client,
+        )
+
+    def _get_timeout_and_limits(self) -> tuple[httpx2.Timeout, httpx2.Limits]:
+        """Reads the clients' timeouts and connection pool limits from settings.
+
+        Returns:
+            tuple[httpx2.Timeout, httpx2.Limits]: The timeouts and pool limits.
+        """
+        timeout = httpx2.Timeout(
+            settings.AIMODEL_CLIENT_TIMEOUT,
+            connect=settings.AIMODEL_CLIENT_CONNECT_TIMEOUT,
+        )
+        limits = httpx2.Limits(
+            max_connections=settings.AIMODEL_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.AIMODEL_CLIENT_MAX_KEEPALIVE,
+            keepalive_expiry=settings.AIMODEL_CLIENT_KEEPALIVE_EXPIRY,
+        )
+        return timeout, limits
+
+    def _track_owner(self, aimodel: object) -> None:
+        """Records the endpoint an AI model uses, retiring its previous one if it changed.
+
+        A retired client is closed once it has gone unused for
+        AIMODEL_CLIENT_RETIRE_SECONDS, rather than at once, as another instance of the
+        AI model may still have a request in flight on it.
+
+        Args:
+            aimodel (object): The AIModel instance.
+        """
+        key: tuple[str, str] = self.make_key(
+            aimodel.access_endpoint, settings.OPEN_AI_MODEL_KEY
+        )
+        previous_key: tuple[str, str] | None = self._owners.get(aimodel.pk)
+        if previous_key == key and not self._retired:
+            return
+        with self._lock:
+            self._owners[aimodel.pk] = key
+            self._retired.pop(key, None)
+            if (
+                previous_key is not None
+                and previous_key != key
+                and previous_key not in self._owners.values()
+            ):
+                self._retired[previous_key] = time.monotonic()
+            self._close_retired()
+
+    def _close_retired(self) -> None:
+        """Closes the retired clients that have gone unused long enough.
+
+        Called with the lock held.
+        """
+        now: float = time.monotonic()
+        for key, retired_at in list(self._retired.items()):
+            if now - retired_at >= settings.AIMODEL_CLIENT_RETIRE_SECONDS:
+                del self._retired[key]
+                self._release(key)
+
+    def _release(self, key: tuple[str, str]) -> None:
+        """Closes a client if no AI model uses it any more. Called with the lock held.
+
+        Args:
+            key (tuple[str, str]): The client's registry key.
+        """
+        if key in self._owners.values():
+            return
+        client: OpenAI | None = self._clients.pop(key, None)
+        if client is not None:
+            logger.info(f"Closed AI model client for {key[0]}")
+            client.close()
+        try:
+            running_loop: asyncio.AbstractEventLoop | None = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        for loop, loop_clients in list(self._async_clients.items()):
+            async_client: AsyncOpenAI | None = loop_clients.pop(key, None)
+            # Clients of other loops can only be closed from their loop; they are dropped.
+            if async_client is not None and loop is running_loop:
+                loop.create_task(async_client.close())
+
+
+openai_client_registry: OpenAIClientRegistry = OpenAIClientRegistry()
@@ -0,0 +1,398 @@
+"""project_apps.aimodels.coalescing.py
+
+This module makes concurrent identical AI model requests share one provider call.
+
+When a client sends the same prompt several times at once, each copy would otherwise
+be a separate, separately billed provider call. Requests are instead keyed on the AI
+model, its generation parameters and the exact prompt and earlier turns sent. The
+first request with a key makes the call, and requests with the same key that arrive
+while it is in flight wait for it and share its response, or its error.
+
+Within a process this needs no setup. Across processes it is optional: with
+AIMODEL_COALESCE_CACHE_ALIAS set, the calling process holds a lock in that Django
+cache, e.g. Redis, and publishes the response there for waiting processes to read.
+
+make_request_key
+    - Builds the key that identical requests share.
+
+class SharedFlightLock
+    - A lock and result slot per request key in a Django cache.
+
+class RequestCoalescer
+    - call: runs a request once for all concurrent callers with the same key.
+    - acall: the same for coroutines.
+    - stats: counts of calls made and calls saved.
+
+get_request_coalescer
+    - Returns the coalescer shared by the whole worker process.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+import weakref
+from concurrent.futures import Future
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .caching import get_generation_parameters
+
+logger = logging.getLogger(__name__)
+
+_PENDING: object = object()
+_ABANDONED: object = object()
+
+
+def make_request_key(
+    aimodel: object, prompt: str, history: list[dict] | None = None
+) -> str:
+    """Builds the key for a request, the same for requests that would be identical.
+
+    Args:
+        aimodel (object): The AIModel instance.
+        prompt (str): The prompt.
+        history (list[dict] | None): The conversation's earlier turns as chat
+            messages, oldest first.
+
+    Returns:
+        str: The request key.
+    """
+    request: str = json.dumps(
+        {
+            "aimodel": str(aimodel.pk),
+            **get_generation_parameters(aimodel),
+            "prompt": prompt.strip(),
+            "history": history or [],
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return f"{aimodel.pk}:{hashlib.sha256(request.encode()).hexdigest()}"
+
+
+class SharedFlightLock:
+    """Lets processes agree on which of them makes a request, through a Django cache.
+
+    The process that adds the request's lock key makes the call. The lock holds a token
+    for that call, and the response is stored under the token for result_ttl seconds,
+    long enough for the processes waiting on that call to read it. Responses that
+    cannot be pickled are not shared; processes waiting for them make their own call
+    once the lock is released.
+    """
+
+    def __init__(
+        self,
+        alias: str,
+        timeout: float,
+        poll_interval: float = 0.05,
+        result_ttl: float = 5.0,
+    ) -> None:
+        """Initialises the lock.
+
+        Args:
+            alias (str): The name of the cache in the CACHES setting.
+            timeout (float): How long a lock is held at most, and waited for.
+            poll_interval (float): How often waiting processes check for the response.
+            result_ttl (float): How long a published response is kept.
+        """
+        self.alias: str = alias
+        self.timeout: float = timeout
+        self.poll_interval: float = poll_interval
+        self.result_ttl: float = result_ttl
+
+    def acquire(self, key: str) -> tuple[str | None, str | None]:
+        """Takes the lock for a request, or finds the call holding it.
+
+        Args:
+            key (str): The request key.
+
+        Returns:
+            tuple[str | None, str | None]: This call's token if the lock was taken,
+                otherwise None and the token of the call holding it, if it still is.
+        """
+        cache = caches[self.alias]
+        token: str = uuid.uuid4().hex
+        if cache.add(f"aimodel-flight:lock:{key}", token, self.timeout):
+            return token, None
+        return None, cache.get(f"aimodel-flight:lock:{key}")
+
+    def release(self, key: str, token: str) -> None:
+        """Releases the lock for a request, if this call still holds it.
+
+        Args:
+            key (str): The request key.
+            token (str): The token from acquire.
+        """
+        cache = caches[self.alias]
+        if cache.get(f"aimodel-flight:lock:{key}") == token:
+            cache.delete(f"aimodel-flight:lock:{key}")
+
+    def publish(self, token: str, result: object) -> None:
+        """Stores a call's response for the processes waiting for it.
+
+        Args:
+            token (str): The call's token from acquire.
+            result (object): The response.
+        """
+        try:
+            caches[self.alias].set(
+                f"aimodel-flight:result:{token}", result, self.result_ttl
+            )
+        except Exception:
+            logger.warning(f"Could not share a {type(result).__name__} across processes")
+
+    def poll(self, key: str, token: str) -> object:
+        """Checks on a call another process is making.
+
+        Args:
+            key (str): The request key.
+            token (str): The token of the call holding the lock.
+
+        Returns:
+            object: The response if it has been published, _ABANDONED if the lock was
+                released without one, or _PENDING if the call is still in flight.
+        """
+        cache = caches[self.alias]
+        result: object = cache.get(f"aimodel-flight:result:{token}", _PENDING)
+        if result is not _PENDING:
+            return result
+        if cache.get(f"aimodel-flight:lock:{key}") != token:
+            return _ABANDONED
+        return _PENDING
+
+
+class RequestCoalescer:
+    """Runs each request once for all the callers that ask for it at the same time.
+
+    Callers that share a call also share its error if it fails. If a process waiting
+    on another gives up after the lock's timeout, it makes the call itself.
+    """
+
+    def __init__(self, shared_lock: SharedFlightLock | None = None) -> None:
+        """Initialises the coalescer.
+
+        Args:
+            shared_lock (SharedFlightLock | None): Coalesces across processes if given.
+        """
+        self.shared_lock: SharedFlightLock | None = shared_lock
+        self._flights: dict[str, Future] = {}
+        self._async_flights: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock: threading.Lock = threading.Lock()
+        self.calls: int = 0
+        self.coalesced: int = 0
+        self.coalesced_across_processes: int = 0
+
+    def call(self, key: str, func: object) -> object:
+        """Returns func's result, calling it only if no identical call is in flight.
+
+        Args:
+            key (str): The request key from make_request_key.
+            func: Makes the request when called with no arguments.
+
+        Returns:
+            object: The response.
+        """
+        with self._lock:
+            flight: Future | None = self._flights.get(key)
+            is_leader: bool = flight is None
+            if is_leader:
+                flight = Future()
+                self._flights[key] = flight
+            else:
+                self.coalesced += 1
+        if not is_leader:
+            return flight.result()
+
+        try:
+            result: object = self._call_once_across_processes(key, func)
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    async def acall(self, key: str, coroutine_function: object) -> object:
+        """Returns the result of awaiting coroutine_function(), as call does.
+
+        Must be called from a coroutine. Calls are shared within the running event loop.
+
+        Args:
+            key (str): The request key from make_request_key.
+            coroutine_function: Returns a coroutine that makes the request.
+
+        Returns:
+            object: The response.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        with self._lock:
+            flights: dict[str, asyncio.Task] = self._async_flights.setdefault(loop, {})
+            task: asyncio.Task | None = flights.get(key)
+            if task is None:
+                task = loop.create_task(
+                    self._acall_once_across_processes(key, coroutine_function)
+                )
+                flights[key] = task
+                task.add_done_callback(lambda _: flights.pop(key, None))
+            else:
+                self.coalesced += 1
+        # A caller that goes away must not cancel the call others are waiting for.
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        """Summarises the calls made and saved for monitoring.
+
+        Returns:
+            dict: The calls made, calls saved in this process and across processes,
+                and the calls in flight.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "coalesced_across_processes": self.coalesced_across_processes,
+                "saved": self.coalesced + self.coalesced_across_processes,
+                "in_flight": len(self._flights)
+                + sum(len(flights) for flights in self._async_flights.values()),
+                "shared": self.shared_lock is not None,
+            }
+
+    def _call_once_across_processes(self, key: str, func: object) -> object:
+        """Makes the call, or waits for another process making it.
+
+        Args:
+            key (str): The request key.
+            func: Makes the request.
+
+        Returns:
+            object: The response.
+        """
+        if self.shared_lock is None:
+            return self._count_call(func)
+        deadline: float = time.monotonic() + self.shared_lock.timeout
+        while time.monotonic() < deadline:
+            token, holder = self.shared_lock.acquire(key)
+            if token is not None:
+                try:
+                    result: object = self._count_call(func)
+                    self.shared_lock.publish(token, result)
+                    return result
+                finally:
+                    self.shared_lock.release(key, token)
+            if holder is None:
+                continue
+            outcome: object = self.shared_lock.poll(key, holder)
+            while outcome is _PENDING and time.monotonic() < deadline:
+                time.sleep(self.shared_lock.poll_interval)
+                outcome = self.shared_lock.poll(key, holder)
+            if outcome is not _PENDING and outcome is not _ABANDONED:
+                return self._count_shared(outcome)
+        return self._count_call(func)
+
+    async def _acall_once_across_processes(
+        self, key: str, coroutine_function: object
+    ) -> object:
+        """Makes the call, or waits for another process making it, from a coroutine.
+
+        Args:
+            key (str): The request key.
+            coroutine_function: Returns a coroutine that makes the request.
+
+        Returns:
+            object: The response.
+        """
+        if self.shared_lock is None:
+            return await self._acount_call(coroutine_function)
+        deadline: float = time.monotonic() + self.shared_lock.timeout
+        while time.monotonic() < deadline:
+            token, holder = await sync_to_async(self.shared_lock.acquire)(key)
+            if token is not None:
+                try:
+                    result: object = await self._acount_call(coroutine_function)
+                    await sync_to_async(self.shared_lock.publish)(token, result)
+                    return result
+                finally:
+                    await sync_to_async(self.shared_lock.release)(key, token)
+            if holder is None:
+                continue
+            outcome: object = await sync_to_async(self.shared_lock.poll)(key, holder)
+            while outcome is _PENDING and time.monotonic() < deadline:
+                await asyncio.sleep(self.shared_lock.poll_interval)
+                outcome = await sync_to_async(self.shared_lock.poll)(key, holder)
+            if outcome is not _PENDING and outcome is not _ABANDONED:
+                return self._count_shared(outcome)
+        return await self._acount_call(coroutine_function)
+
+    def _count_call(self, func: object) -> object:
+        """Makes a call to the provider and counts it.
+
+        Args:
+            func: Makes the request.
+
+        Returns:
+            object: The response.
+        """
+        with self._lock:
+            self.calls += 1
+        return func()
+
+    async def _acount_call(self, coroutine_function: object) -> object:
+        """Makes a call to the provider from a coroutine and counts it.
+
+        Args:
+            coroutine_function: Returns a coroutine that makes the request.
+
+        Returns:
+            object: The response.
+        """
+        with self._lock:
+            self.calls += 1
+        return await coroutine_function()
+
+    def _count_shared(self, result: object) -> object:
+        """Counts a response received from another process.
+
+        Args:
+            result (object): The response.
+
+        Returns:
+            object: The response.
+        """
+        with self._lock:
+            self.coalesced_across_processes += 1
+        return result
+
+
+_request_coalescer_lock: threading.Lock = threading.Lock()
+_request_coalescer: RequestCoalescer | None = None
+
+
+def get_request_coalescer() -> RequestCoalescer | None:
+    """Returns the process's request coalescer, creating it from settings on first use.
+
+    Returns:
+        RequestCoalescer | None: The coalescer, or None if coalescing is disabled.
+    """
+    global _request_coalescer
+    if not settings.AIMODEL_COALESCE_REQUESTS:
+        return None
+    if _request_coalescer is None:
+        with _request_coalescer_lock:
+            if _request_coalescer is None:
+                shared_lock: SharedFlightLock | None = None
+                if settings.AIMODEL_COALESCE_CACHE_ALIAS:
+                    shared_lock = SharedFlightLock(
+                        settings.AIMODEL_COALESCE_CACHE_ALIAS,
+                        timeout=settings.AIMODEL_CLIENT_TIMEOUT,
+                    )
+                _request_coalescer = RequestCoalescer(shared_lock)
+    return _request_coalescer
@@ -14,6 +14,12 @@ class AIModelForm(forms.ModelForm)
         - best_use_cases
         - max_tokens
         - is_active
+        - cache_responses
+        - semantic_cache_threshold
+        - hedge_aimodel
+        - max_concurrent_requests
+        - requests_per_minute
+        - tokens_per_minute
     - widgets:
         "name": forms.TextInput(
         "description": forms.Textarea(
@@ -24,6 +30,12 @@ class AIModelForm(forms.ModelForm)
         "best_use_cases": forms.Textarea(
         "max_tokens": forms.NumberInput(
         "is_active": forms.CheckboxInput(
+        "cache_responses": forms.CheckboxInput(
+        "semantic_cache_threshold": forms.NumberInput(
+        "hedge_aimodel": forms.Select(
+        "max_concurrent_requests": forms.NumberInput(
+        "requests_per_minute": forms.NumberInput(
+        "tokens_per_minute": forms.NumberInput(
 
     - error messages:
 
@@ -57,6 +69,12 @@ class AIModelForm(forms.ModelForm):
             "best_use_cases",
             "max_tokens",
             "is_active",
+            "cache_responses",
+            "semantic_cache_threshold",
+            "hedge_aimodel",
+            "max_concurrent_requests",
+            "requests_per_minute",
+            "tokens_per_minute",
         )
 
         widgets: dict[str, forms.Widget] = {
@@ -115,4 +133,41 @@ class AIModelForm(forms.ModelForm):
                     "class": "form-check-input",
                 }
             ),
+            "cache_responses": forms.CheckboxInput(
+                attrs={
+                    "class": "form-check-input",
+                }
+            ),
+            "semantic_cache_threshold": forms.NumberInput(
+                attrs={
+                    "class": "form-control form-control-lg",
+                    "step": "0.01",
+                    "placeholder": _(
+                        "How similar (0 to 1) a prompt must be to a cached one, e.g. 0.9"
+                    ),
+                }
+            ),
+            "hedge_aimodel": forms.Select(
+                attrs={
+                    "class": "form-select form-select-md text-white",
+                }
+            ),
+            "max_concurrent_requests": forms.NumberInput(
+                attrs={
+                    "class": "form-control form-control-lg",
+                    "placeholder": _("No limit"),
+                }
+            ),
+            "requests_per_minute": forms.NumberInput(
+                attrs={
+                    "class": "form-control form-control-lg",
+                    "placeholder": _("No limit"),
+                }
+            ),
+            "tokens_per_minute": forms.NumberInput(
+                attrs={
+                    "class": "form-control form-control-lg",
+                    "placeholder": _("No limit"),
+                }
+            ),
         }
@@ -0,0 +1,337 @@
+"""project_apps.aimodels.hedging.py
+
+This module hedges AI model requests, to cut the slowest responses.
+
+A provider's slowest responses take several times its median. When an AI model has a
+hedge AI model, a request goes to the AI model first and, if it has not answered
+within the hedge delay, the same request goes to the hedge AI model too. Whichever
+answers first is used and the other is cancelled. If the AI model fails before the
+delay, the hedge AI model is asked straight away, so it is a fallback as well.
+
+The delay is a percentile (AIMODEL_HEDGE_PERCENTILE) of the AI model's recent
+latencies from the routing latency tracker, so only about that share of its requests
+are hedged. Until AIMODEL_HEDGE_MIN_CALLS calls are measured, AIMODEL_HEDGE_DELAY is
+used. Those latencies are the provider's alone, so the delay is counted from when the
+request signals that its provider call has started: waiting for a rate limit lease or
+for a thread in the hedge pool does not trigger a hedge, which would double the spend
+of a busy process just when it is being held back.
+
+Coroutines are cancelled outright, closing their connection. A thread cannot be
+stopped, so a losing synchronous request that has started runs to its end in the
+hedge thread pool, and its response is dropped.
+
+class RequestHedger
+    - call / acall: send a request, hedged after the delay.
+    - get_delay: the delay for an AI model.
+    - stats_for / status: hedge rate and hedge win rate per AI model.
+
+get_request_hedger
+    - Returns the hedger shared by the whole worker process.
+"""
+
+import asyncio
+import logging
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from .routing import LatencyTracker, get_latency_tracker
+
+logger = logging.getLogger(__name__)
+
+
+class RequestHedger:
+    """Sends requests to an AI model, and to its hedge AI model if it is slow."""
+
+    def __init__(
+        self,
+        tracker: LatencyTracker,
+        percentile: float = 95.0,
+        default_delay: float = 2.0,
+        min_calls: int = 20,
+        max_workers: int = 16,
+    ) -> None:
+        """Initialises the hedger.
+
+        Args:
+            tracker (LatencyTracker): The AI models' measured latencies.
+            percentile (float): The latency percentile to wait for before hedging.
+            default_delay (float): The seconds to wait before min_calls are measured.
+            min_calls (int): The successful calls needed to use the percentile.
+            max_workers (int): The threads running synchronous requests.
+        """
+        self.tracker: LatencyTracker = tracker
+        self.percentile: float = percentile
+        self.default_delay: float = default_delay
+        self.min_calls: int = min_calls
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="aimodel-hedge"
+        )
+        self._stats: dict[str, dict[str, int]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def get_delay(self, aimodel: object) -> float:
+        """Gives how long to wait for an AI model before hedging.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        delay: float | None = self.tracker.percentile(
+            aimodel, self.percentile, self.min_calls
+        )
+        return self.default_delay if delay is None else delay
+
+    def call(
+        self,
+        aimodel: object,
+        hedge_aimodel: object,
+        request: Callable[[object, threading.Event], object],
+    ) -> object:
+        """Sends a request, hedged with the hedge AI model after the delay.
+
+        Args:
+            aimodel (object): The AIModel to ask first.
+            hedge_aimodel (object): The AIModel to ask if the first is slow or fails.
+            request (Callable[[object, threading.Event], object]): Sends the request
+                to an AIModel, setting the event as its provider call starts.
+
+        Returns:
+            object: The first successful response.
+
+        Raises:
+            Exception: The first AI model's error, if both fail.
+        """
+        started: threading.Event = threading.Event()
+        primary: Future = self._executor.submit(
+            self._run_request, request, aimodel, started
+        )
+        futures: list[Future] = [primary]
+        try:
+            started.wait()
+            done, _ = wait(futures, timeout=self.get_delay(aimodel))
+            if done and primary.exception() is None:
+                self._count(aimodel, hedged=False, won=False)
+                return primary.result()
+            self._log_hedge(aimodel, hedge_aimodel, failed=bool(done))
+            hedge: Future = self._executor.submit(
+                request, hedge_aimodel, threading.Event()
+            )
+            futures.append(hedge)
+            pending: set[Future] = {hedge} if done else {primary, hedge}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in futures:
+                    if future in done and future.exception() is None:
+                        self._count(aimodel, hedged=True, won=future is hedge)
+                        return future.result()
+            self._count(aimodel, hedged=True, won=False)
+            return primary.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    async def acall(
+        self,
+        aimodel: object,
+        hedge_aimodel: object,
+        arequest: Callable[[object, asyncio.Event], Awaitable[object]],
+    ) -> object:
+        """Sends a request as call does, from a coroutine, cancelling the loser.
+
+        Args:
+            aimodel (object): The AIModel to ask first.
+            hedge_aimodel (object): The AIModel to ask if the first is slow or fails.
+            arequest (Callable[[object, asyncio.Event], Awaitable[object]]): Sends the
+                request to an AIModel, setting the event as its provider call starts.
+
+        Returns:
+            object: The first successful response.
+
+        Raises:
+            Exception: The first AI model's error, if both fail.
+        """
+        started: asyncio.Event = asyncio.Event()
+        primary: asyncio.Future = asyncio.ensure_future(
+            self._arun_request(arequest, aimodel, started)
+        )
+        tasks: list[asyncio.Future] = [primary]
+        try:
+            await started.wait()
+            done, _ = await asyncio.wait(tasks, timeout=self.get_delay(aimodel))
+            if done and primary.exception() is None:
+                self._count(aimodel, hedged=False, won=False)
+                return primary.result()
+            self._log_hedge(aimodel, hedge_aimodel, failed=bool(done))
+            hedge: asyncio.Future = asyncio.ensure_future(
+                arequest(hedge_aimodel, asyncio.Event())
+            )
+            tasks.append(hedge)
+            pending: set[asyncio.Future] = {hedge} if done else {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in tasks:
+                    if task in done and task.exception() is None:
+                        self._count(aimodel, hedged=True, won=task is hedge)
+                        return task.result()
+            self._count(aimodel, hedged=True, won=False)
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats_for(self, aimodel: object) -> dict:
+        """Summarises an AI model's hedged requests in this process.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            dict: The requests, how many were hedged, how many the hedge AI model
+                answered first, the hedge rate and the hedge win rate.
+        """
+        with self._lock:
+            counts: dict[str, int] = dict(
+                self._stats.get(str(aimodel.pk), {"requests": 0, "hedged": 0, "won": 0})
+            )
+        return self._summarise(counts)
+
+    def status(self) -> dict:
+        """Summarises the hedged requests of every AI model in this process.
+
+        Returns:
+            dict: The summary per AI model id.
+        """
+        with self._lock:
+            stats: dict[str, dict[str, int]] = {
+                pk: dict(counts) for pk, counts in self._stats.items()
+            }
+        return {pk: self._summarise(counts) for pk, counts in stats.items()}
+
+    def clear(self) -> None:
+        """Forgets the hedged request counts."""
+        with self._lock:
+            self._stats.clear()
+
+    @staticmethod
+    def _run_request(
+        request: Callable[[object, threading.Event], object],
+        aimodel: object,
+        started: threading.Event,
+    ) -> object:
+        """Sends the first request, setting started however it ends.
+
+        Args:
+            request (Callable[[object, threading.Event], object]): Sends the request.
+            aimodel (object): The AIModel to ask.
+            started (threading.Event): Set as the provider call starts.
+
+        Returns:
+            object: The response.
+        """
+        try:
+            return request(aimodel, started)
+        finally:
+            # A request that fails before its provider call must not be waited for.
+            started.set()
+
+    @staticmethod
+    async def _arun_request(
+        arequest: Callable[[object, asyncio.Event], Awaitable[object]],
+        aimodel: object,
+        started: asyncio.Event,
+    ) -> object:
+        """Sends the first request as _run_request does, from a coroutine.
+
+        Args:
+            arequest (Callable[[object, asyncio.Event], Awaitable[object]]): Sends
+                the request.
+            aimodel (object): The AIModel to ask.
+            started (asyncio.Event): Set as the provider call starts.
+
+        Returns:
+            object: The response.
+        """
+        try:
+            return await arequest(aimodel, started)
+        finally:
+            started.set()
+
+    def _count(self, aimodel: object, hedged: bool, won: bool) -> None:
+        """Counts a request to an AI model.
+
+        Args:
+            aimodel (object): The AIModel asked first.
+            hedged (bool): Whether the hedge AI model was asked too.
+            won (bool): Whether the hedge AI model's response was used.
+        """
+        with self._lock:
+            counts: dict[str, int] = self._stats.setdefault(
+                str(aimodel.pk), {"requests": 0, "hedged": 0, "won": 0}
+            )
+            counts["requests"] += 1
+            counts["hedged"] += hedged
+            counts["won"] += won
+
+    def _log_hedge(self, aimodel: object, hedge_aimodel: object, failed: bool) -> None:
+        """Logs that a request is being hedged.
+
+        Args:
+            aimodel (object): The AIModel asked first.
+            hedge_aimodel (object): The hedge AIModel.
+            failed (bool): Whether the first AI model failed, rather than being slow.
+        """
+        logger.info(
+            f"Hedging AI model {aimodel} with {hedge_aimodel}: "
+            f"{'it failed' if failed else 'no answer within the hedge delay'}"
+        )
+
+    @staticmethod
+    def _summarise(counts: dict[str, int]) -> dict:
+        """Adds the hedge rate and hedge win rate to request counts.
+
+        Args:
+            counts (dict[str, int]): The requests, hedged and won counts.
+
+        Returns:
+            dict: The counts with the rates.
+        """
+        return {
+            **counts,
+            "hedge_rate": (
+                counts["hedged"] / counts["requests"] if counts["requests"] else 0.0
+            ),
+            "win_rate": counts["won"] / counts["hedged"] if counts["hedged"] else 0.0,
+        }
+
+
+_request_hedger: RequestHedger | None = None
+_request_hedger_lock: threading.Lock = threading.Lock()
+
+
+def get_request_hedger() -> RequestHedger:
+    """Returns the process's request hedger, creating it from settings on first use.
+
+    Returns:
+        RequestHedger: The hedger.
+    """
+    global _request_hedger
+    if _request_hedger is None:
+        tracker: LatencyTracker = get_latency_tracker()
+        with _request_hedger_lock:
+            if _request_hedger is None:
+                _request_hedger = RequestHedger(
+                    tracker,
+                    percentile=settings.AIMODEL_HEDGE_PERCENTILE,
+                    default_delay=settings.AIMODEL_HEDGE_DELAY,
+                    min_calls=settings.AIMODEL_HEDGE_MIN_CALLS,
+                    max_workers=settings.AIMODEL_HEDGE_THREADS,
+                )
+    return _request_hedger
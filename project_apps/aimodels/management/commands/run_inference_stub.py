@@ -0,0 +1,61 @@
+"""This module provides the run_inference_stub management command.
+
+It runs the stub local model server from stub_server.py, so AI models with the local
+access mode can be tried without installing a model server.
+
+    Useage:
+        python manage.py run_inference_stub
+        python manage.py run_inference_stub --port 11435 --load-seconds 2
+"""
+
+from django.core.management.base import BaseCommand
+
+from project_apps.aimodels.stub_server import StubInferenceServer
+
+
+class Command(BaseCommand):
+    help = "Runs a stub Ollama style model server for offline development."
+
+    def add_arguments(self, parser) -> None:
+        """Adds the server's options.
+
+        Args:
+            parser: The command's argument parser.
+        """
+        parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+        parser.add_argument(
+            "--port", type=int, default=11434, help="Port to listen on."
+        )
+        parser.add_argument(
+            "--load-seconds",
+            type=float,
+            default=1.0,
+            help="Time taken to load a model that is not loaded.",
+        )
+        parser.add_argument(
+            "--word-seconds",
+            type=float,
+            default=0.02,
+            help="Time taken to generate each word.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Serves until interrupted.
+
+        Args:
+            *args: Positional arguments.
+            **options: The parsed options.
+        """
+        server = StubInferenceServer(
+            options["host"],
+            options["port"],
+            load_seconds=options["load_seconds"],
+            word_seconds=options["word_seconds"],
+        )
+        self.stdout.write(f"Stub model server listening on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
+        finally:
+            server.stop()
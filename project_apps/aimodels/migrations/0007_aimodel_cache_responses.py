@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aimodels', '0006_alter_aimodel_access_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodel',
+            name='cache_responses',
+            field=models.BooleanField(default=False, help_text='Answer repeated prompts from the response cache?', verbose_name='Cache Responses'),
+        ),
+    ]
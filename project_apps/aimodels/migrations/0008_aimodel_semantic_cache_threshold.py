@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:53
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aimodels', '0007_aimodel_cache_responses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodel',
+            name='semantic_cache_threshold',
+            field=models.FloatField(blank=True, help_text='Also answer prompts at least this similar (0 to 1) to a cached prompt. Leave empty to only answer repeated prompts.', null=True, validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)], verbose_name='Semantic Cache Threshold'),
+        ),
+    ]
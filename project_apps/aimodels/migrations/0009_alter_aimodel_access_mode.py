@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:08
+
+import project_apps.aimodels.backends
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aimodels', '0008_aimodel_semantic_cache_threshold'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='aimodel',
+            name='access_mode',
+            field=models.CharField(choices=project_apps.aimodels.backends.get_access_mode_choices, default='openai_api', max_length=50, verbose_name='Access Mode'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aimodels', '0009_alter_aimodel_access_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodel',
+            name='hedge_aimodel',
+            field=models.ForeignKey(blank=True, help_text='Also ask this AI model when this one is slow to answer or fails, and use whichever answers first.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='hedged_aimodels', to='aimodels.aimodel', verbose_name='Hedge AI Model'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:40
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aimodels', '0010_aimodel_hedge_aimodel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aimodel',
+            name='max_concurrent_requests',
+            field=models.PositiveIntegerField(blank=True, help_text='Most requests in flight at once, across all workers. Leave empty for no limit.', null=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Max Concurrent Requests'),
+        ),
+        migrations.AddField(
+            model_name='aimodel',
+            name='requests_per_minute',
+            field=models.PositiveIntegerField(blank=True, help_text="The provider's request rate limit. Leave empty for no limit.", null=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Requests per Minute'),
+        ),
+        migrations.AddField(
+            model_name='aimodel',
+            name='tokens_per_minute',
+            field=models.PositiveIntegerField(blank=True, help_text="The provider's token rate limit. Leave empty for no limit.", null=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Tokens per Minute'),
+        ),
+    ]
@@ -13,6 +13,12 @@ class AIModel(models.Model)
     best_use_cases: str
     max_tokens: int
     is_active: bool
+    cache_responses: bool
+    semantic_cache_threshold: float
+    hedge_aimodel: "AIModel"
+    max_concurrent_requests: int
+    requests_per_minute: int
+    tokens_per_minute: int
 
     created_by: "get_user_model()"
     created_at: "datetime.date"
@@ -21,14 +27,30 @@ class AIModel(models.Model)
 
 """
 
+import asyncio
+import threading
+import time
 import uuid
+from collections.abc import AsyncIterator, Iterator
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
-from openai import OpenAI
+
+from .caching import get_response_cache
+from .backends import get_access_mode_choices, get_backend_registry
+from .circuits import get_circuit_breakers
+from .coalescing import get_request_coalescer, make_request_key
+from .hedging import get_request_hedger
+from .ratelimits import RateLimitLease, get_rate_limiter, get_used_tokens
+from .routing import estimate_tokens, get_latency_tracker
+from .semantic_cache import get_semantic_cache
+from .tokens import ResponseText, get_usage
 
 
 class AIModel(models.Model):
@@ -57,7 +79,7 @@ class AIModel(models.Model):
     )
     access_mode: str = models.CharField(
         max_length=50,
-        choices=ACCESS_MODE_CHOICES,
+        choices=get_access_mode_choices,
         default=ACCESS_MODE_OPENAI_API,
         verbose_name=_("Access Mode"),
     )
@@ -96,6 +118,57 @@ class AIModel(models.Model):
         verbose_name=_("Is Active"),
         help_text=_("Is this model currently available for use?"),
     )
+    cache_responses: bool = models.BooleanField(
+        default=False,
+        verbose_name=_("Cache Responses"),
+        help_text=_("Answer repeated prompts from the response cache?"),
+    )
+    semantic_cache_threshold: float = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+        verbose_name=_("Semantic Cache Threshold"),
+        help_text=_(
+            "Also answer prompts at least this similar (0 to 1) to a cached prompt. "
+            "Leave empty to only answer repeated prompts."
+        ),
+    )
+    hedge_aimodel: "AIModel" = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="hedged_aimodels",
+        verbose_name=_("Hedge AI Model"),
+        help_text=_(
+            "Also ask this AI model when this one is slow to answer or fails, and use "
+            "whichever answers first."
+        ),
+    )
+    max_concurrent_requests: int = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)],
+        verbose_name=_("Max Concurrent Requests"),
+        help_text=_(
+            "Most requests in flight at once, across all workers. Leave empty for no "
+            "limit."
+        ),
+    )
+    requests_per_minute: int = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)],
+        verbose_name=_("Requests per Minute"),
+        help_text=_("The provider's request rate limit. Leave empty for no limit."),
+    )
+    tokens_per_minute: int = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)],
+        verbose_name=_("Tokens per Minute"),
+        help_text=_("The provider's token rate limit. Leave empty for no limit."),
+    )
 
     created_by: "get_user_model()" = models.ForeignKey(
         get_user_model(),
@@ -140,42 +213,591 @@ class AIModel(models.Model):
         """
         return reverse("aimodel_detail", args=[self.id])
 
-    def get_aimodel_response(self, prompt: str) -> str:
+    def clean(self) -> None:
+        """Checks the AI model is not its own hedge AI model.
+
+        Raises:
+            ValidationError: If the hedge AI model is this AI model.
+        """
+        if self.hedge_aimodel_id is not None and self.hedge_aimodel_id == self.pk:
+            raise ValidationError(
+                {"hedge_aimodel": _("An AI model cannot be its own hedge AI model.")}
+            )
+
+    def save(self, *args, **kwargs) -> None:
+        """Saves the AI model and drops its semantic cache entries, as they may be stale."""
+        super().save(*args, **kwargs)
+        get_semantic_cache().invalidate(self)
+
+    def delete(self, *args, **kwargs) -> tuple[int, dict]:
+        """Deletes the AI model and drops its semantic cache entries.
+
+        Returns:
+            tuple[int, dict]: The number of objects deleted, and the number per type.
+        """
+        get_semantic_cache().invalidate(self)
+        return super().delete(*args, **kwargs)
+
+    def get_aimodel_response(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> str:
         """Gets a response from the AI model based on the provided prompt.
 
-        This method routes the prompt to the appropriate backend based on the model's access mode.
-        It supports OpenAI API, local inference, OpenRouter, and native API endpoints.
+        Identical requests made at the same time share one call to the model, and its
+        response (see coalescing.py). Slow requests are hedged with the hedge AI model,
+        if there is one (see hedging.py).
 
         Args:
             prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
 
         Returns:
             str: The response generated by the AI model.
         """
-        if self.access_mode == self.ACCESS_MODE_OPENAI_API:
-            # Here you would integrate with the OpenAI API using the access_endpoint
-            client = OpenAI(
-                base_url=self.access_endpoint,
-                api_key=settings.OPEN_AI_MODEL_KEY,
+        coalescer = get_request_coalescer()
+        if coalescer is None:
+            return self._send_aimodel_request(prompt, history)
+        return coalescer.call(
+            make_request_key(self, prompt, history),
+            lambda: self._send_aimodel_request(prompt, history),
+        )
+
+    def get_hedge_aimodel(self) -> "AIModel | None":
+        """Returns the AI model to hedge this one's slow requests with.
+
+        Returns:
+            AIModel | None: The hedge AI model, or None if there is none or it is not
+                active.
+        """
+        if self.hedge_aimodel_id is None or self.hedge_aimodel_id == self.pk:
+            return None
+        hedge_aimodel: AIModel | None = self.hedge_aimodel
+        return hedge_aimodel if hedge_aimodel.is_active else None
+
+    def get_circuit_status(self) -> dict:
+        """Summarises the circuit breaker of this AI model's endpoint, in this process.
+
+        Returns:
+            dict: The circuit's state, recent failures and the last error.
+        """
+        return get_circuit_breakers().get(self).status()
+
+    def get_latency_stats(self) -> dict:
+        """Summarises this AI model's recent provider latency, in this process.
+
+        Returns:
+            dict: The calls, p50 and p95 latency in seconds, and the error rate.
+        """
+        return get_latency_tracker().summary(self)
+
+    def get_rate_limit_stats(self) -> dict:
+        """Summarises how long this AI model's requests waited for its rate limits.
+
+        Returns:
+            dict: The requests, how many waited or were rejected, and the p50 and p95
+                queue wait in seconds.
+        """
+        return get_rate_limiter().stats_for(self)
+
+    def get_hedge_stats(self) -> dict:
+        """Summarises how often this AI model's requests are hedged, in this process.
+
+        Returns:
+            dict: The requests, hedged requests, hedge wins, hedge rate and win rate.
+        """
+        return get_request_hedger().stats_for(self)
+
+    def get_backend(self) -> object:
+        """Returns the backend for this AI model's access mode (see backends.py).
+
+        Returns:
+            AIModelBackend: The backend.
+        """
+        return get_backend_registry().get(self.access_mode)
+
+    def _send_aimodel_request(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> object:
+        """Sends a prompt to the AI model, hedged with its hedge AI model if it has one.
+
+        Args:
+            prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            object: A chat completion, or the response text.
+        """
+        hedge_aimodel: AIModel | None = self.get_hedge_aimodel()
+        if hedge_aimodel is None:
+            return self._request_aimodel_response(prompt, history)
+        return get_request_hedger().call(
+            self,
+            hedge_aimodel,
+            lambda aimodel, call_started: aimodel._request_aimodel_response(
+                prompt, history, call_started
+            ),
+        )
+
+    def _request_aimodel_response(
+        self,
+        prompt: str,
+        history: list[dict] | None = None,
+        call_started: threading.Event | None = None,
+    ) -> object:
+        """Sends a prompt to the AI model through its access mode's backend.
+
+        Each call's latency, and whether it failed, is recorded for routing and for
+        the endpoint's circuit breaker, which fails the call at once while it is open.
+        The call waits its turn within the AI model's rate limits first; that wait is
+        not part of the latency recorded, and a call turned away by the limits gives
+        back a half-open circuit's trial slot.
+
+        Args:
+            prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+            call_started (threading.Event | None): Set as the provider call starts,
+                for the hedger to time it from.
+
+        Returns:
+            object: A chat completion, or the response text.
+
+        Raises:
+            CircuitOpenError: If the AI model's endpoint is unavailable.
+            RateLimitExceededError: If the call cannot start within the rate limits.
+        """
+        circuit = get_circuit_breakers().get(self)
+        circuit.before_call()
+        try:
+            lease: RateLimitLease | None = self._acquire_rate_limit(prompt, history)
+        except BaseException:
+            circuit.cancel_call()
+            raise
+        aimodel_response: object = None
+        if call_started is not None:
+            call_started.set()
+        started: float = time.perf_counter()
+        try:
+            aimodel_response = self.get_backend().generate(self, prompt, history)
+        except Exception as error:
+            get_latency_tracker().record(self, time.perf_counter() - started, True)
+            circuit.record_failure(error)
+            raise
+        finally:
+            if lease is not None:
+                get_rate_limiter().release(lease, get_used_tokens(aimodel_response))
+        get_latency_tracker().record(self, time.perf_counter() - started)
+        circuit.record_success()
+        return aimodel_response
+
+    def _acquire_rate_limit(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> RateLimitLease | None:
+        """Waits for a request to fit within this AI model's rate limits.
+
+        Args:
+            prompt (str): The input prompt, to estimate the request's tokens from.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            RateLimitLease | None: The request's place, or None without limits.
+        """
+        if not get_rate_limiter().has_limits(self):
+            return None
+        return get_rate_limiter().acquire(
+            self, self._estimate_request_tokens(prompt, history)
+        )
+
+    async def _aacquire_rate_limit(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> RateLimitLease | None:
+        """Waits as _acquire_rate_limit does, from a coroutine.
+
+        Args:
+            prompt (str): The input prompt, to estimate the request's tokens from.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            RateLimitLease | None: The request's place, or None without limits.
+        """
+        if not get_rate_limiter().has_limits(self):
+            return None
+        return await get_rate_limiter().aacquire(
+            self, self._estimate_request_tokens(prompt, history)
+        )
+
+    @staticmethod
+    def _estimate_request_tokens(prompt: str, history: list[dict] | None = None) -> int:
+        """Estimates a request's prompt and reply tokens before it is sent.
+
+        Args:
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            int: The estimated tokens, allowing AIMODEL_ROUTER_OUTPUT_TOKENS to reply.
+        """
+        return (
+            estimate_tokens(prompt)
+            + sum(estimate_tokens(message["content"]) for message in history or ())
+            + settings.AIMODEL_ROUTER_OUTPUT_TOKENS
+        )
+
+    async def aget_aimodel_response(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> str:
+        """Gets a response from the AI model without blocking the event loop.
+
+        The async counterpart of get_aimodel_response for async views. OpenAI API calls
+        use a shared async client, so one process can keep many prompts in flight while
+        they wait on the provider. Backends without async support run in a thread.
+
+        Args:
+            prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            str: The response generated by the AI model.
+        """
+        coalescer = get_request_coalescer()
+        if coalescer is None:
+            return await self._asend_aimodel_request(prompt, history)
+        return await coalescer.acall(
+            make_request_key(self, prompt, history),
+            lambda: self._asend_aimodel_request(prompt, history),
+        )
+
+    async def _asend_aimodel_request(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> object:
+        """Sends a prompt as _send_aimodel_request does, from a coroutine.
+
+        The losing request of a hedged pair is cancelled.
+
+        Args:
+            prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            object: A chat completion, or the response text.
+        """
+        hedge_aimodel: AIModel | None = None
+        if self.hedge_aimodel_id is not None:
+            hedge_aimodel = await sync_to_async(self.get_hedge_aimodel)()
+        if hedge_aimodel is None:
+            return await self._arequest_aimodel_response(prompt, history)
+        return await get_request_hedger().acall(
+            self,
+            hedge_aimodel,
+            lambda aimodel, call_started: aimodel._arequest_aimodel_response(
+                prompt, history, call_started
+            ),
+        )
+
+    async def _arequest_aimodel_response(
+        self,
+        prompt: str,
+        history: list[dict] | None = None,
+        call_started: asyncio.Event | None = None,
+    ) -> object:
+        """Sends a prompt to the AI model through its backend, from a coroutine.
+
+        Args:
+            prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+            call_started (asyncio.Event | None): Set as the provider call starts, for
+                the hedger to time it from.
+
+        Returns:
+            object: A chat completion, or the response text.
+
+        Raises:
+            CircuitOpenError: If the AI model's endpoint is unavailable.
+            RateLimitExceededError: If the call cannot start within the rate limits.
+        """
+        circuit = get_circuit_breakers().get(self)
+        circuit.before_call()
+        try:
+            lease: RateLimitLease | None = await self._aacquire_rate_limit(
+                prompt, history
+            )
+        except BaseException:
+            circuit.cancel_call()
+            raise
+        aimodel_response: object = None
+        if call_started is not None:
+            call_started.set()
+        started: float = time.perf_counter()
+        try:
+            aimodel_response = await self.get_backend().agenerate(
+                self, prompt, history
             )
+        except Exception as error:
+            get_latency_tracker().record(self, time.perf_counter() - started, True)
+            circuit.record_failure(error)
+            raise
+        finally:
+            if lease is not None:
+                await sync_to_async(get_rate_limiter().release)(
+                    lease, get_used_tokens(aimodel_response)
+                )
+        get_latency_tracker().record(self, time.perf_counter() - started)
+        circuit.record_success()
+        return aimodel_response
+
+    def stream_aimodel_response(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> Iterator[str]:
+        """Streams the AI model's response to a prompt as it is generated.
 
-            return client.chat.completions.create(
-                # extra_headers={
-                #     "HTTP-Referer": "<YOUR_SITE_URL>",  # Optional. Site URL for rankings on openrouter.ai.
-                #     "X-Title": "<YOUR_SITE_NAME>",  # Optional. Site title for rankings on openrouter.ai.
-                # },
-                extra_body={},
-                model="openai/gpt-oss-20b:free",
-                messages=[{"role": "user", "content": prompt.strip()}],
+        Backends that support streaming give the provider's tokens as they arrive.
+        Others give their whole response as one piece. Closing the iterator early
+        closes the provider's stream.
+
+        Args:
+            prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Yields:
+            str: The next piece of the response text.
+
+        Raises:
+            CircuitOpenError: If the AI model's endpoint is unavailable.
+            RateLimitExceededError: If the stream cannot start within the rate limits.
+        """
+        backend = self.get_backend()
+        if not backend.supports_streaming:
+            yield self.get_response_content(self.get_aimodel_response(prompt, history))
+            return
+        circuit = get_circuit_breakers().get(self)
+        circuit.before_call()
+        try:
+            lease: RateLimitLease | None = self._acquire_rate_limit(prompt, history)
+        except BaseException:
+            circuit.cancel_call()
+            raise
+        try:
+            yield from backend.stream(self, prompt, history)
+        except Exception as error:
+            circuit.record_failure(error)
+            raise
+        finally:
+            if lease is not None:
+                get_rate_limiter().release(lease)
+        circuit.record_success()
+
+    async def astream_aimodel_response(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> AsyncIterator[str]:
+        """Streams the AI model's response as stream_aimodel_response does, for async views.
+
+        Args:
+            prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Yields:
+            str: The next piece of the response text.
+        """
+        backend = self.get_backend()
+        if not backend.supports_streaming:
+            aimodel_response: object = await self.aget_aimodel_response(prompt, history)
+            yield self.get_response_content(aimodel_response)
+            return
+        circuit = get_circuit_breakers().get(self)
+        circuit.before_call()
+        try:
+            lease: RateLimitLease | None = await self._aacquire_rate_limit(
+                prompt, history
             )
-        elif self.access_mode == self.ACCESS_MODE_LOCAL:
-            # Here you would integrate with a local model inference (e.g. ollama)
-            return f"Response from Local Model for prompt: {prompt.strip()}"
-        elif self.access_mode == self.ACCESS_MODE_TRANSFORMER:
-            # Here you would integrate with the transformer library
-            return f"Response from OpenRouter for prompt: {prompt.strip()}"
-        else:
-            return f"Echo: {prompt.strip()}"
+        except BaseException:
+            circuit.cancel_call()
+            raise
+        try:
+            async for piece in backend.astream(self, prompt, history):
+                yield piece
+        except Exception as error:
+            circuit.record_failure(error)
+            raise
+        finally:
+            if lease is not None:
+                await sync_to_async(get_rate_limiter().release)(lease)
+        circuit.record_success()
+
+    def get_response_text(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> tuple[str, bool]:
+        """Gets the text of the AI model's response, from the cache if it is there.
+
+        Responses are only cached for AI models with cache_responses set. They are
+        cached by the prompt with the turns sent before it, so a follow-up is only
+        answered from the cache in the same conversation.
+
+        Args:
+            prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            tuple[str, bool]: The response text, and True if it came from the cache.
+        """
+        cached_text: str | None = self.get_cached_response(prompt, history)
+        if cached_text is not None:
+            return cached_text, True
+        text: str = self.get_response_content(
+            self.get_aimodel_response(prompt, history)
+        )
+        self.cache_response(prompt, text, history)
+        return text, False
+
+    async def aget_response_text(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> tuple[str, bool]:
+        """Gets the response text as get_response_text does, for async views.
+
+        Args:
+            prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            tuple[str, bool]: The response text, and True if it came from the cache.
+        """
+        # Cache backends may do network I/O, so they are used from a thread.
+        cached_text: str | None = await sync_to_async(self.get_cached_response)(
+            prompt, history
+        )
+        if cached_text is not None:
+            return cached_text, True
+        aimodel_response: object = await self.aget_aimodel_response(prompt, history)
+        text: str = self.get_response_content(aimodel_response)
+        await sync_to_async(self.cache_response)(prompt, text, history)
+        return text, False
+
+    def get_cached_response(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> str | None:
+        """Looks up a cached response to the prompt after the same earlier turns.
+
+        A prompt that is not cached word for word can still be answered from the
+        response to a similar prompt, if the AI model has a semantic cache threshold.
+        Similarity is judged on the prompt alone, so only prompts that open a
+        conversation use the semantic cache.
+
+        Args:
+            prompt (str): The input prompt.
+            history (list[dict] | None): The conversation's earlier turns sent with
+                the prompt as chat messages.
+
+        Returns:
+            str | None: The cached response, or None if not cached or caching is off.
+        """
+        if not self.cache_responses:
+            return None
+        text: str | None = get_response_cache().get(self, prompt, history)
+        if text is None and not history and self.semantic_cache_threshold is not None:
+            text = get_semantic_cache().get(self, prompt, self.semantic_cache_threshold)
+        return text
+
+    def cache_response(
+        self, prompt: str, text: str, history: list[dict] | None = None
+    ) -> None:
+        """Stores a response to the prompt, if this AI model caches responses.
+
+        Empty responses are not stored.
+
+        Args:
+            prompt (str): The input prompt.
+            text (str): The AI model's response text.
+            history (list[dict] | None): The conversation's earlier turns sent with
+                the prompt as chat messages.
+        """
+        if self.cache_responses and text:
+            # Cached responses cost no tokens, so the provider's usage is not kept.
+            text = str(text)
+            get_response_cache().set(self, prompt, text, history)
+            if not history and self.semantic_cache_threshold is not None:
+                get_semantic_cache().set(self, prompt, text)
+
+    def get_response_cache_stats(self) -> dict:
+        """Summarises this AI model's response cache hits and misses in this process.
+
+        Returns:
+            dict: The hits, misses and hit rate.
+        """
+        return get_response_cache().stats_for(self)
+
+    def get_semantic_cache_stats(self) -> dict:
+        """Summarises this AI model's semantic cache entries, hits and misses.
+
+        Returns:
+            dict: The entry count, hits, misses and hit rate.
+        """
+        return get_semantic_cache().stats_for(self)
+
+    @staticmethod
+    def get_response_content(aimodel_response: object) -> str:
+        """Extracts the text from a response returned by get_aimodel_response.
+
+        Args:
+            aimodel_response: A chat completion, or the text other access modes give.
+
+        Returns:
+            str: The response text, a ResponseText carrying the provider's token usage
+                if it reported it.
+        """
+        if isinstance(aimodel_response, str):
+            return aimodel_response
+        return ResponseText(
+            aimodel_response.choices[0].message.content or "",
+            get_usage(aimodel_response),
+        )
+
+    @staticmethod
+    def get_messages(prompt: str, history: list[dict] | None = None) -> list[dict]:
+        """Builds the chat messages for a prompt that follows earlier turns.
+
+        Args:
+            prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            list[dict]: The earlier turns' messages, then the prompt's.
+        """
+        return [*(history or ()), {"role": "user", "content": prompt.strip()}]
+
+    def _get_completion_kwargs(
+        self, prompt: str, history: list[dict] | None = None
+    ) -> dict:
+        """Builds the chat completion request for a prompt.
+
+        Args:
+            prompt (str): The input prompt to send to the AI model.
+            history (list[dict] | None): The conversation's earlier turns as chat
+                messages, oldest first.
+
+        Returns:
+            dict: The keyword arguments for chat.completions.create.
+        """
+        return {
+            # "extra_headers": {
+            #     "HTTP-Referer": "<YOUR_SITE_URL>",  # Optional. Site URL for rankings on openrouter.ai.
+            #     "X-Title": "<YOUR_SITE_NAME>",  # Optional. Site title for rankings on openrouter.ai.
+            # },
+            "extra_body": {},
+            "model": self.name,
+            "messages": self.get_messages(prompt, history),
+        }
 
     """
     Hook for doing any extra model-wide validation after clean() has been
@@ -0,0 +1,449 @@
+"""project_apps.aimodels.ratelimits.py
+
+This module keeps each AI model's requests within its provider's rate limits.
+
+Bursts of prompts otherwise run into the provider's limits, and the 429 responses and
+blind retries that follow make the burst worse. An AI model can set:
+    - max_concurrent_requests: requests in flight at once,
+    - requests_per_minute: requests started in any minute,
+    - tokens_per_minute: prompt and reply tokens in any minute.
+A request waits in turn, polling, until it fits within all three, for up to
+AIMODEL_RATE_LIMIT_MAX_WAIT seconds, after which RateLimitExceededError is raised
+rather than calling the provider.
+
+The limits are kept in the Django cache AIMODEL_RATE_LIMIT_CACHE_ALIAS, the "shared"
+cache by default, so they hold across all worker processes. A cache kept in each
+process's memory would multiply them by the number of processes, so a system check
+(see checks.py) warns of one. The cache API only offers atomic add and incr, so:
+    - each concurrent request holds a lease, a slot key added for the request and
+      deleted after it, which expires after AIMODEL_RATE_LIMIT_LEASE_SECONDS should
+      its process die,
+    - the per minute buckets are counters per second, summed over the last minute.
+      A request adds itself to the current second first and takes itself off again
+      if that overfills the minute, so concurrent requests never overfill it. As
+      with a token bucket, a full minute's allowance can be used in a burst, and it
+      refills as the counted seconds age out.
+Token counts are estimated before the call, with AIMODEL_ROUTER_OUTPUT_TOKENS allowed
+for the reply, and corrected once the provider reports the tokens it used.
+
+Time spent waiting for the limits is recorded apart from the provider's latency, which
+the routing latency tracker records.
+
+class RateLimitExceededError
+    - Raised when a request cannot start within the maximum wait.
+
+class RateLimitLease
+    - A request's place within the limits, returned when the request ends.
+
+class RateLimiter
+    - acquire / aacquire: wait for a request to fit within an AI model's limits.
+    - release: end the request, correcting its token count.
+    - stats_for / status: queue waits and rejections per AI model.
+
+get_used_tokens
+    - The tokens a provider response reports it used.
+
+get_rate_limiter
+    - Returns the limiter shared by the whole worker process.
+"""
+
+import asyncio
+import collections
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceededError(Exception):
+    """Raised when a request cannot start within an AI model's limits in time.
+
+    Attributes:
+        status_code (int): The HTTP status to answer with.
+        retry_after (int): Seconds the client should wait before retrying.
+    """
+
+    status_code: int = 429
+
+    def __init__(self, aimodel_name: str, reason: str, retry_after: int) -> None:
+        """Initialises the error with the limit that was reached.
+
+        Args:
+            aimodel_name (str): The AI model's name.
+            reason (str): The limit that was reached.
+            retry_after (int): Seconds the client should wait before retrying.
+        """
+        self.reason: str = reason
+        self.retry_after: int = retry_after
+        super().__init__(
+            f"The AI model {aimodel_name} is at its {reason} limit, "
+            f"retry in {retry_after}s"
+        )
+
+
+@dataclass
+class RateLimitLease:
+    """A request's place within an AI model's limits.
+
+    Attributes:
+        aimodel_pk (str): The AI model's id.
+        slot_key (str | None): The concurrency slot held, if the AI model has a limit.
+        token (str): The request's token, held in the slot.
+        second (int): The second the request was counted in.
+        tokens (int): The tokens counted for the request.
+        queue_seconds (float): How long the request waited for the limits.
+    """
+
+    aimodel_pk: str
+    slot_key: str | None
+    token: str
+    second: int
+    tokens: int
+    queue_seconds: float
+
+
+class RateLimiter:
+    """Holds requests back until they fit within their AI model's limits."""
+
+    def __init__(
+        self,
+        alias: str = "default",
+        max_wait: float = 30.0,
+        lease_seconds: float = 300.0,
+        poll_interval: float = 0.05,
+        window_seconds: int = 60,
+        history: int = 200,
+    ) -> None:
+        """Initialises the limiter.
+
+        Args:
+            alias (str): The name of the cache in the CACHES setting.
+            max_wait (float): The longest a request waits for the limits.
+            lease_seconds (float): How long a concurrency slot is held at most.
+            poll_interval (float): How often a waiting request tries again.
+            window_seconds (int): The window the per minute limits are counted over.
+            history (int): The queue waits kept per AI model for the percentiles.
+        """
+        self.alias: str = alias
+        self.max_wait: float = max_wait
+        self.lease_seconds: float = lease_seconds
+        self.poll_interval: float = poll_interval
+        self.window_seconds: int = window_seconds
+        self.history: int = history
+        self._stats: dict[str, dict] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def has_limits(aimodel: object) -> bool:
+        """Tells whether an AI model has any limits set.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            bool: True if any of its limits are set.
+        """
+        return bool(
+            aimodel.max_concurrent_requests
+            or aimodel.requests_per_minute
+            or aimodel.tokens_per_minute
+        )
+
+    def acquire(self, aimodel: object, tokens: int) -> RateLimitLease:
+        """Waits until a request fits within the AI model's limits.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            tokens (int): The request's estimated prompt and reply tokens.
+
+        Returns:
+            RateLimitLease: The request's place, to release when it ends.
+
+        Raises:
+            RateLimitExceededError: If the request does not fit within max_wait.
+        """
+        started: float = time.monotonic()
+        while True:
+            lease, reason, retry_after = self._try_acquire(aimodel, tokens, started)
+            if lease is not None:
+                return lease
+            if time.monotonic() - started + self.poll_interval > self.max_wait:
+                raise self._reject(aimodel, reason, retry_after, started)
+            time.sleep(self.poll_interval)
+
+    async def aacquire(self, aimodel: object, tokens: int) -> RateLimitLease:
+        """Waits as acquire does, from a coroutine, without blocking the event loop.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            tokens (int): The request's estimated prompt and reply tokens.
+
+        Returns:
+            RateLimitLease: The request's place, to release when it ends.
+
+        Raises:
+            RateLimitExceededError: If the request does not fit within max_wait.
+        """
+        started: float = time.monotonic()
+        while True:
+            # Cache backends may do network I/O, so they are used from a thread.
+            lease, reason, retry_after = await sync_to_async(self._try_acquire)(
+                aimodel, tokens, started
+            )
+            if lease is not None:
+                return lease
+            if time.monotonic() - started + self.poll_interval > self.max_wait:
+                raise self._reject(aimodel, reason, retry_after, started)
+            await asyncio.sleep(self.poll_interval)
+
+    def release(self, lease: RateLimitLease, used_tokens: int | None = None) -> None:
+        """Ends a request, freeing its slot and correcting its token count.
+
+        Args:
+            lease (RateLimitLease): The request's place from acquire.
+            used_tokens (int | None): The tokens the provider reports the request
+                used, if known.
+        """
+        cache = caches[self.alias]
+        if lease.slot_key is not None and cache.get(lease.slot_key) == lease.token:
+            cache.delete(lease.slot_key)
+        if used_tokens is not None and lease.tokens and used_tokens != lease.tokens:
+            self._add(
+                cache,
+                f"aimodel-limit:{lease.aimodel_pk}:tokens:{lease.second}",
+                used_tokens - lease.tokens,
+            )
+
+    def stats_for(self, aimodel: object) -> dict:
+        """Summarises an AI model's queue waits in this process.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            dict: The requests, how many waited, how many were rejected, and the p50
+                and p95 queue wait in seconds.
+        """
+        return self._summarise(str(aimodel.pk))
+
+    def status(self) -> dict:
+        """Summarises the queue waits of every limited AI model in this process.
+
+        Returns:
+            dict: The summary per AI model id.
+        """
+        with self._lock:
+            pks: list[str] = list(self._stats)
+        return {pk: self._summarise(pk) for pk in pks}
+
+    def _try_acquire(
+        self, aimodel: object, tokens: int, started: float
+    ) -> tuple[RateLimitLease | None, str, int]:
+        """Tries once to fit a request within the AI model's limits.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            tokens (int): The request's estimated prompt and reply tokens.
+            started (float): When the request started waiting, from time.monotonic.
+
+        Returns:
+            tuple[RateLimitLease | None, str, int]: The lease, or None with the limit
+                reached and the seconds until it may have room.
+        """
+        cache = caches[self.alias]
+        pk: str = str(aimodel.pk)
+        token: str = uuid.uuid4().hex
+        slot_key: str | None = None
+        if aimodel.max_concurrent_requests:
+            slot_key = next(
+                (
+                    key
+                    for key in (
+                        f"aimodel-limit:{pk}:slot:{slot}"
+                        for slot in range(aimodel.max_concurrent_requests)
+                    )
+                    if cache.add(key, token, self.lease_seconds)
+                ),
+                None,
+            )
+            if slot_key is None:
+                return None, "concurrency", 1
+
+        second: int = int(time.time())
+        tokens = min(tokens, aimodel.tokens_per_minute or tokens)
+        counted: list[tuple[str, int]] = []
+        for name, limit, amount in (
+            ("requests", aimodel.requests_per_minute, 1),
+            ("tokens", aimodel.tokens_per_minute, tokens),
+        ):
+            if not limit:
+                continue
+            prefix: str = f"aimodel-limit:{pk}:{name}"
+            self._add(cache, f"{prefix}:{second}", amount)
+            counted.append((f"{prefix}:{second}", amount))
+            window: dict[str, int] = cache.get_many(
+                [
+                    f"{prefix}:{counted_second}"
+                    for counted_second in range(
+                        second - self.window_seconds + 1, second + 1
+                    )
+                ]
+            )
+            if sum(window.values()) > limit:
+                for key, counted_amount in counted:
+                    self._add(cache, key, -counted_amount)
+                if slot_key is not None:
+                    cache.delete(slot_key)
+                oldest: int = min(
+                    int(key.rsplit(":", 1)[1]) for key, value in window.items() if value
+                )
+                return (
+                    None,
+                    f"{name} per minute",
+                    max(1, oldest + self.window_seconds - second),
+                )
+
+        queue_seconds: float = time.monotonic() - started
+        self._record(pk, queue_seconds)
+        if queue_seconds >= self.poll_interval:
+            logger.info(
+                f"AI model {aimodel} request waited {queue_seconds:.2f}s for its limits"
+            )
+        return (
+            RateLimitLease(
+                pk,
+                slot_key,
+                token,
+                second,
+                tokens if aimodel.tokens_per_minute else 0,
+                queue_seconds,
+            ),
+            "",
+            0,
+        )
+
+    def _add(self, cache: object, key: str, amount: int) -> None:
+        """Adds to a per second counter, creating it if needed.
+
+        Args:
+            cache (object): The cache the counters are kept in.
+            key (str): The counter's key.
+            amount (int): The amount to add, negative to take off.
+        """
+        cache.add(key, 0, self.window_seconds * 2)
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            # The counter expired between add and incr.
+            cache.set(key, max(amount, 0), self.window_seconds * 2)
+
+    def _reject(
+        self, aimodel: object, reason: str, retry_after: int, started: float
+    ) -> RateLimitExceededError:
+        """Records a rejected request and builds its error.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            reason (str): The limit that was reached.
+            retry_after (int): The seconds until the limit may have room.
+            started (float): When the request started waiting, from time.monotonic.
+
+        Returns:
+            RateLimitExceededError: The error to raise.
+        """
+        self._record(str(aimodel.pk), time.monotonic() - started, rejected=True)
+        logger.warning(
+            f"AI model {aimodel} request rejected after waiting "
+            f"{time.monotonic() - started:.2f}s for its {reason} limit"
+        )
+        return RateLimitExceededError(aimodel.name, reason, retry_after)
+
+    def _record(self, pk: str, queue_seconds: float, rejected: bool = False) -> None:
+        """Records how long a request waited for the limits.
+
+        Args:
+            pk (str): The AI model's id.
+            queue_seconds (float): The wait.
+            rejected (bool): Whether the request gave up waiting.
+        """
+        with self._lock:
+            stats: dict = self._stats.setdefault(
+                pk,
+                {
+                    "requests": 0,
+                    "waited": 0,
+                    "rejected": 0,
+                    "waits": collections.deque(maxlen=self.history),
+                },
+            )
+            stats["requests"] += 1
+            stats["waited"] += queue_seconds >= self.poll_interval
+            stats["rejected"] += rejected
+            stats["waits"].append(queue_seconds)
+
+    def _summarise(self, pk: str) -> dict:
+        """Summarises the queue waits of the AI model with an id.
+
+        Args:
+            pk (str): The AI model's id.
+
+        Returns:
+            dict: The counts, and the p50 and p95 queue wait in seconds.
+        """
+        with self._lock:
+            stats: dict = self._stats.get(pk, {})
+            waits: list[float] = list(stats.get("waits", ()))
+            counts: dict = {
+                name: stats.get(name, 0) for name in ("requests", "waited", "rejected")
+            }
+        p50, p95 = np.percentile(waits, [50, 95]).tolist() if waits else (0.0, 0.0)
+        return {
+            **counts,
+            "queue_wait_p50": round(p50, 3),
+            "queue_wait_p95": round(p95, 3),
+        }
+
+
+def get_used_tokens(aimodel_response: object) -> int | None:
+    """Reads the tokens a response used from its usage, if the provider reported it.
+
+    Args:
+        aimodel_response (object): A chat completion, the text other access modes
+            give, or None.
+
+    Returns:
+        int | None: The prompt and reply tokens, or None if not reported.
+    """
+    usage: object | None = getattr(aimodel_response, "usage", None)
+    total_tokens: object | None = getattr(usage, "total_tokens", None)
+    return total_tokens if isinstance(total_tokens, int) else None
+
+
+_rate_limiter: RateLimiter | None = None
+_rate_limiter_lock: threading.Lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Returns the process's rate limiter, creating it from settings on first use.
+
+    Returns:
+        RateLimiter: The limiter.
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(
+                    settings.AIMODEL_RATE_LIMIT_CACHE_ALIAS,
+                    max_wait=settings.AIMODEL_RATE_LIMIT_MAX_WAIT,
+                    lease_seconds=settings.AIMODEL_RATE_LIMIT_LEASE_SECONDS,
+                )
+    return _rate_limiter
@@ -0,0 +1,462 @@
+"""project_apps.aimodels.routing.py
+
+This module chooses which AI model answers a prompt, trading cost against latency.
+
+Every provider call's latency and outcome is recorded per AI model over a rolling
+window, giving each model's p50 and p95 latency and error rate in this process. The
+router then picks among the active AI models:
+    - models whose max_tokens cannot hold the prompt and its reply are skipped,
+    - models whose endpoint's circuit is open are skipped (see circuits.py),
+    - models whose best_use_cases mention the request's use case are preferred,
+    - models failing more often than AIMODEL_ROUTER_MAX_ERROR_RATE are avoided,
+and the policy ranks the rest:
+    - cheapest: the lowest estimated cost among models meeting the p95 latency SLO,
+    - fastest: the lowest p50 latency,
+    - balanced: the best of cost, p95 latency and error rate, each scaled to 0..1,
+    - fixed: always the caller's default AI model.
+
+Models without measurements are taken to just meet the SLO, so new models get tried.
+Every decision is logged as JSON with the figures it was based on, to audit spend
+against latency.
+
+estimate_tokens
+    - The token count of text, for sizing prompts (see tokens.py).
+
+class LatencyTracker
+    - record: records a call's latency and whether it failed.
+    - summary / status: p50, p95 and error rate per AI model.
+    - percentile: any latency percentile for an AI model.
+
+class RoutingDecision
+    - The AI model chosen, the policy and the candidates' figures.
+
+class ModelRouter
+    - choose: picks the AI model for a prompt.
+
+get_latency_tracker / get_model_router
+    - Return the tracker and router shared by the whole worker process.
+"""
+
+import collections
+import json
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.conf import settings
+
+from .circuits import get_circuit_breakers
+from .tokens import get_token_counter
+
+logger = logging.getLogger(__name__)
+
+ROUTING_POLICIES: tuple[str, ...] = ("cheapest", "fastest", "balanced", "fixed")
+
+
+def estimate_tokens(text: str) -> int:
+    """Counts the tokens in text with the tokenizer, or estimates them without it.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The token count.
+    """
+    return get_token_counter().count(text)
+
+
+class LatencyTracker:
+    """Keeps the latest call latencies and outcomes for each AI model."""
+
+    def __init__(self, window: int = 200) -> None:
+        """Initialises the tracker.
+
+        Args:
+            window (int): The number of recent calls kept per AI model.
+        """
+        self.window: int = window
+        self._calls: dict[str, collections.deque] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def record(self, aimodel: object, seconds: float, failed: bool = False) -> None:
+        """Records a call to an AI model.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            seconds (float): How long the call took.
+            failed (bool): Whether the call raised an error.
+        """
+        with self._lock:
+            calls: collections.deque = self._calls.setdefault(
+                str(aimodel.pk), collections.deque(maxlen=self.window)
+            )
+            calls.append((seconds, failed))
+
+    def summary(self, aimodel: object) -> dict:
+        """Summarises an AI model's recent calls.
+
+        Latency percentiles are over successful calls only.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            dict: The number of calls, p50 and p95 latency in seconds (None without
+                successful calls) and the error rate.
+        """
+        return self._summarise(str(aimodel.pk))
+
+    def percentile(
+        self, aimodel: object, percent: float, min_calls: int = 1
+    ) -> float | None:
+        """Gives a percentile of an AI model's recent successful call latencies.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            percent (float): The percentile, from 0 to 100.
+            min_calls (int): The fewest successful calls to give a percentile from.
+
+        Returns:
+            float | None: The latency in seconds, or None with too few calls.
+        """
+        with self._lock:
+            calls: list[tuple[float, bool]] = list(self._calls.get(str(aimodel.pk), ()))
+        latencies: list[float] = [seconds for seconds, failed in calls if not failed]
+        if not latencies or len(latencies) < min_calls:
+            return None
+        return float(np.percentile(latencies, percent))
+
+    def status(self) -> dict:
+        """Summarises every AI model called in this process.
+
+        Returns:
+            dict: The summary per AI model id.
+        """
+        with self._lock:
+            pks: list[str] = list(self._calls)
+        return {pk: self._summarise(pk) for pk in pks}
+
+    def clear(self) -> None:
+        """Forgets every call."""
+        with self._lock:
+            self._calls.clear()
+
+    def _summarise(self, pk: str) -> dict:
+        """Summarises the recent calls to the AI model with an id.
+
+        Args:
+            pk (str): The AI model's id.
+
+        Returns:
+            dict: The number of calls, p50 and p95 latency and the error rate.
+        """
+        with self._lock:
+            calls: list[tuple[float, bool]] = list(self._calls.get(pk, ()))
+        latencies: list[float] = [seconds for seconds, failed in calls if not failed]
+        p50, p95 = (
+            np.percentile(latencies, [50, 95]).tolist() if latencies else (None, None)
+        )
+        return {
+            "calls": len(calls),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None,
+            "error_rate": (
+                round(sum(failed for _, failed in calls) / len(calls), 3)
+                if calls
+                else 0.0
+            ),
+        }
+
+
+@dataclass
+class RoutingDecision:
+    """The outcome of routing a prompt.
+
+    Attributes:
+        aimodel: The AIModel chosen, or None if no AI model fits.
+        policy (str): The policy used.
+        reason (str): Why the AI model was chosen.
+        prompt_tokens (int): The prompt's estimated size.
+        candidates (list[dict]): The figures for each AI model considered.
+    """
+
+    aimodel: object | None
+    policy: str
+    reason: str
+    prompt_tokens: int
+    candidates: list[dict] = field(default_factory=list)
+
+    def as_log(self) -> str:
+        """Formats the decision for the audit log.
+
+        Returns:
+            str: The decision as JSON.
+        """
+        return json.dumps(
+            {
+                "chosen": self.aimodel.name if self.aimodel is not None else None,
+                "policy": self.policy,
+                "reason": self.reason,
+                "prompt_tokens": self.prompt_tokens,
+                "candidates": self.candidates,
+            },
+            default=str,
+        )
+
+
+class ModelRouter:
+    """Chooses an AI model for each prompt according to a policy."""
+
+    def __init__(
+        self,
+        tracker: LatencyTracker,
+        policy: str = "fixed",
+        slo_p95_seconds: float = 10.0,
+        output_tokens: int = 512,
+        max_error_rate: float = 0.5,
+        circuits: object | None = None,
+    ) -> None:
+        """Initialises the router.
+
+        Args:
+            tracker (LatencyTracker): The AI models' measured latencies.
+            policy (str): One of ROUTING_POLICIES.
+            slo_p95_seconds (float): The p95 latency the cheapest policy must meet.
+            output_tokens (int): The reply size to allow for and to estimate cost with.
+            max_error_rate (float): AI models failing more often are avoided.
+            circuits (object | None): The endpoints' CircuitBreakerRegistry. AI models
+                whose circuit is open are skipped.
+
+        Raises:
+            ValueError: If the policy is not one of ROUTING_POLICIES.
+        """
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown AI model routing policy {policy!r}")
+        self.tracker: LatencyTracker = tracker
+        self.policy: str = policy
+        self.slo_p95_seconds: float = slo_p95_seconds
+        self.output_tokens: int = output_tokens
+        self.max_error_rate: float = max_error_rate
+        self.circuits: object | None = circuits
+
+    def choose(
+        self,
+        prompt: str,
+        aimodels: list,
+        default_name: str = "",
+        use_case: str = "",
+    ) -> RoutingDecision:
+        """Chooses the AI model to answer a prompt, and logs the decision.
+
+        Args:
+            prompt (str): The prompt.
+            aimodels (list): The AI models to choose from, e.g. the active ones.
+            default_name (str): The AI model for the fixed policy, and for when no
+                other fits.
+            use_case (str): Words describing the request, matched to best_use_cases.
+
+        Returns:
+            RoutingDecision: The AI model chosen and why. Its aimodel is None if no
+                AI model fits and the default is not among them.
+        """
+        prompt_tokens: int = estimate_tokens(prompt)
+        aimodels = list(aimodels)
+        default: object | None = next(
+            (aimodel for aimodel in aimodels if aimodel.name == default_name), None
+        )
+        if self.policy == "fixed":
+            decision = RoutingDecision(default, self.policy, "fixed", prompt_tokens)
+        else:
+            decision = self._rank(prompt_tokens, aimodels, default, use_case)
+        logger.info(f"AI model routing decision: {decision.as_log()}")
+        return decision
+
+    def _rank(
+        self, prompt_tokens: int, aimodels: list, default: object | None, use_case: str
+    ) -> RoutingDecision:
+        """Filters the AI models and ranks the rest by the policy.
+
+        Args:
+            prompt_tokens (int): The prompt's estimated size.
+            aimodels (list): The AI models to choose from.
+            default (object | None): The AI model to use if none fits.
+            use_case (str): Words describing the request.
+
+        Returns:
+            RoutingDecision: The AI model chosen and why.
+        """
+        figures: list[dict] = [
+            self._get_figures(aimodel, prompt_tokens, use_case) for aimodel in aimodels
+        ]
+        available: list[dict] = [
+            figure
+            for figure in figures
+            if figure["fits"] and figure["circuit"] != "open"
+        ]
+        candidates: list[dict] = [
+            figure
+            for figure in available
+            if figure["error_rate"] <= self.max_error_rate or not figure["calls"]
+        ] or available
+        if use_case and any(figure["use_case_match"] for figure in candidates):
+            candidates = [figure for figure in candidates if figure["use_case_match"]]
+        logged: list[dict] = [
+            {key: value for key, value in figure.items() if key != "aimodel"}
+            for figure in figures
+        ]
+        if not candidates:
+            return RoutingDecision(
+                default, self.policy, "no AI model fits", prompt_tokens, logged
+            )
+
+        reason: str = self.policy
+        if self.policy == "cheapest":
+            within_slo: list[dict] = [
+                figure
+                for figure in candidates
+                if figure["expected_p95"] <= self.slo_p95_seconds
+            ]
+            if within_slo:
+                chosen: dict = min(
+                    within_slo, key=lambda figure: (figure["cost"], figure["name"])
+                )
+            else:
+                reason = "cheapest: none meets the SLO, so fastest"
+                chosen = min(
+                    candidates,
+                    key=lambda figure: (figure["expected_p95"], figure["name"]),
+                )
+        elif self.policy == "fastest":
+            chosen = min(
+                candidates, key=lambda figure: (figure["expected_p50"], figure["name"])
+            )
+        else:
+            chosen = min(
+                candidates,
+                key=lambda figure: (
+                    self._get_balanced_score(figure, candidates),
+                    figure["name"],
+                ),
+            )
+        return RoutingDecision(
+            chosen["aimodel"], self.policy, reason, prompt_tokens, logged
+        )
+
+    def _get_figures(
+        self, aimodel: object, prompt_tokens: int, use_case: str
+    ) -> dict:
+        """Gathers what the policies rank an AI model on.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt_tokens (int): The prompt's estimated size.
+            use_case (str): Words describing the request.
+
+        Returns:
+            dict: The AI model's latency, error rate, estimated cost, fit and circuit
+                state.
+        """
+        summary: dict = self.tracker.summary(aimodel)
+        cost: float = (
+            prompt_tokens * float(aimodel.token_cost_per_1M_input)
+            + self.output_tokens * float(aimodel.token_cost_per_1M_output)
+        ) / 1_000_000
+        use_case_words: set[str] = _get_words(use_case)
+        return {
+            "aimodel": aimodel,
+            "name": aimodel.name,
+            **summary,
+            # Unmeasured AI models are taken to just meet the SLO.
+            "expected_p50": (
+                summary["p50"] if summary["p50"] is not None else self.slo_p95_seconds
+            ),
+            "expected_p95": (
+                summary["p95"] if summary["p95"] is not None else self.slo_p95_seconds
+            ),
+            "cost": round(cost, 8),
+            "fits": prompt_tokens + self.output_tokens <= aimodel.max_tokens,
+            "circuit": (
+                self.circuits.get(aimodel).state if self.circuits is not None else None
+            ),
+            "use_case_match": bool(
+                use_case_words & _get_words(aimodel.best_use_cases)
+            ),
+        }
+
+    @staticmethod
+    def _get_balanced_score(figure: dict, candidates: list[dict]) -> float:
+        """Scores an AI model on cost, p95 latency and errors, lower being better.
+
+        Cost and latency are scaled by the highest among the candidates.
+
+        Args:
+            figure (dict): The AI model's figures.
+            candidates (list[dict]): Every candidate's figures.
+
+        Returns:
+            float: The score, from 0 to 3.
+        """
+        highest_cost: float = max(candidate["cost"] for candidate in candidates)
+        highest_p95: float = max(
+            candidate["expected_p95"] for candidate in candidates
+        )
+        return (
+            (figure["cost"] / highest_cost if highest_cost else 0.0)
+            + (figure["expected_p95"] / highest_p95 if highest_p95 else 0.0)
+            + figure["error_rate"]
+        )
+
+
+def _get_words(text: str) -> set[str]:
+    """Splits text into lowercase words of three or more letters.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        set[str]: The words.
+    """
+    return {word for word in re.findall(r"[a-z]+", text.lower()) if len(word) > 2}
+
+
+_routing_lock: threading.Lock = threading.Lock()
+_latency_tracker: LatencyTracker | None = None
+_model_router: ModelRouter | None = None
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """Returns the process's latency tracker, creating it on first use.
+
+    Returns:
+        LatencyTracker: The tracker, keeping AIMODEL_ROUTER_WINDOW calls per AI model.
+    """
+    global _latency_tracker
+    if _latency_tracker is None:
+        with _routing_lock:
+            if _latency_tracker is None:
+                _latency_tracker = LatencyTracker(settings.AIMODEL_ROUTER_WINDOW)
+    return _latency_tracker
+
+
+def get_model_router() -> ModelRouter:
+    """Returns the process's model router, creating it from settings on first use.
+
+    Returns:
+        ModelRouter: The router.
+    """
+    global _model_router
+    if _model_router is None:
+        tracker: LatencyTracker = get_latency_tracker()
+        with _routing_lock:
+            if _model_router is None:
+                _model_router = ModelRouter(
+                    tracker,
+                    policy=settings.AIMODEL_ROUTER_POLICY,
+                    slo_p95_seconds=settings.AIMODEL_ROUTER_SLO_P95,
+                    output_tokens=settings.AIMODEL_ROUTER_OUTPUT_TOKENS,
+                    max_error_rate=settings.AIMODEL_ROUTER_MAX_ERROR_RATE,
+                    circuits=get_circuit_breakers(),
+                )
+    return _model_router
@@ -0,0 +1,508 @@
+"""project_apps.aimodels.semantic_cache.py
+
+This module answers paraphrased prompts from earlier responses.
+
+The exact-match response cache only helps when a prompt is repeated word for word, but
+many NOA prompts are rewordings of one another. Here prompts are embedded on the CPU
+with a hashing vectorizer, which needs no model download, and kept with their responses
+in a NumPy index per AI model. A prompt whose embedding is close enough, by cosine
+similarity, to a stored one gets that prompt's response. Each AI model sets its own
+similarity threshold, as how loosely prompts may match depends on what it is used for.
+
+Small indexes are searched exhaustively. Large ones use random-projection hashing, so a
+lookup only scores the few thousand entries that hash like the prompt, keeping it to
+a few milliseconds at a million entries.
+
+class HashingEmbedder
+    - embed: turns a prompt into a unit vector of hashed word and character features.
+
+class SemanticIndex
+    - add: stores a vector and its response, evicting the least recently used if full.
+    - search: the response of the most similar live entry above a threshold.
+
+class SemanticResponseCache
+    - get/set: look up and store responses by prompt meaning, per AI model.
+    - invalidate: drops an AI model's entries.
+    - stats / stats_for: entry counts and hit-rate metrics.
+    - clear: drops every entry and resets the counters.
+
+get_semantic_cache
+    - Returns the semantic cache shared by the whole worker process.
+"""
+
+import functools
+import hashlib
+import itertools
+import json
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .caching import LookupCounters, get_generation_parameters, normalize_prompt
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=65536)
+def _hash_feature(feature: str) -> int:
+    """Hashes a feature to a stable 64-bit integer, the same in every process.
+
+    Args:
+        feature (str): The feature, e.g. a word or character trigram.
+
+    Returns:
+        int: The hash.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little"
+    )
+
+
+class HashingEmbedder:
+    """Embeds text as a signed hashing vector of its words, word pairs and trigrams.
+
+    Character trigrams let inflected or misspelt words still overlap, and word pairs
+    keep some word order. Vectors are scaled to unit length, so their dot product is
+    their cosine similarity.
+    """
+
+    def __init__(self, dimensions: int = 256) -> None:
+        """Initialises the embedder.
+
+        Args:
+            dimensions (int): The length of the vectors.
+        """
+        self.dimensions: int = dimensions
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embeds a piece of text.
+
+        Args:
+            text (str): The text, e.g. a prompt.
+
+        Returns:
+            np.ndarray: A float32 unit vector, or zeros if the text has no words.
+        """
+        vector: np.ndarray = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, weight in self._get_features(text):
+            feature_hash: int = _hash_feature(feature)
+            sign: float = 1.0 if feature_hash >> 63 else -1.0
+            vector[feature_hash % self.dimensions] += sign * weight
+        norm: float = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _get_features(self, text: str) -> list[tuple[str, float]]:
+        """Splits text into weighted features.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            list[tuple[str, float]]: Each feature with its weight.
+        """
+        words: list[str] = re.findall(r"\w+", normalize_prompt(text).lower())
+        features: list[tuple[str, float]] = [(f"w:{word}", 1.0) for word in words]
+        features.extend(
+            (f"b:{first} {second}", 0.5) for first, second in zip(words, words[1:])
+        )
+        for word in words:
+            padded: str = f"#{word}#"
+            features.extend(
+                (f"c:{padded[start:start + 3]}", 0.25)
+                for start in range(len(padded) - 2)
+            )
+        return features
+
+
+class SemanticIndex:
+    """A bounded index of unit vectors and the responses they were stored with.
+
+    Vectors live in one preallocated float32 matrix that grows as required up to
+    max_entries rows. Up to exact_search_limit entries, every row is scored with one
+    matrix-vector product. Beyond that, each vector is hashed by the signs of its
+    projections onto random hyperplanes in several tables, and only rows sharing a
+    bucket with the query in some table are scored.
+
+    When full, expired entries are dropped first, then the least recently used.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        max_entries: int,
+        exact_search_limit: int = 65536,
+        tables: int = 16,
+        bits: int = 12,
+        seed: int = 0,
+    ) -> None:
+        """Initialises an empty index.
+
+        Args:
+            dimensions (int): The length of the vectors.
+            max_entries (int): The most entries to hold.
+            exact_search_limit (int): The most entries searched exhaustively.
+            tables (int): The number of hash tables for larger indexes.
+            bits (int): The hyperplanes per table; each table has 2**bits buckets.
+            seed (int): Seeds the hyperplanes.
+        """
+        self.dimensions: int = dimensions
+        self.max_entries: int = max_entries
+        self.exact_search_limit: int = exact_search_limit
+        self.tables: int = tables
+        self.bits: int = bits
+        self._planes: np.ndarray = (
+            np.random.default_rng(seed)
+            .standard_normal((tables * bits, dimensions))
+            .astype(np.float32)
+        )
+        self._bit_values: np.ndarray = 1 << np.arange(bits, dtype=np.int64)
+        self._vectors: np.ndarray = np.zeros((0, dimensions), dtype=np.float32)
+        self._codes: np.ndarray = np.zeros((0, tables), dtype=np.int64)
+        self._expires: np.ndarray = np.zeros(0, dtype=np.float64)
+        self._last_used: np.ndarray = np.zeros(0, dtype=np.float64)
+        self._live: np.ndarray = np.zeros(0, dtype=bool)
+        self._hashed: np.ndarray = np.zeros(0, dtype=bool)
+        self._texts: list[str | None] = []
+        self._buckets: list[dict[int, list[int]]] = [{} for _ in range(tables)]
+        self._free_rows: list[int] = []
+        self._rows: int = 0
+        self._hashing: bool = False
+        self.size: int = 0
+        self.evictions: int = 0
+
+    def add(self, vector: np.ndarray, text: str, ttl_seconds: float) -> None:
+        """Stores a vector and its response.
+
+        Args:
+            vector (np.ndarray): The prompt's unit vector.
+            text (str): The response.
+            ttl_seconds (float): How long the entry stays valid.
+        """
+        if self.size >= self.max_entries:
+            self._evict()
+        row: int = self._free_rows.pop() if self._free_rows else self._append_row()
+        now: float = time.monotonic()
+        self._vectors[row] = vector
+        self._expires[row] = now + ttl_seconds
+        self._last_used[row] = now
+        self._live[row] = True
+        self._texts[row] = text
+        self.size += 1
+        if self._hashed[row]:
+            self._unhash_row(row)
+        if self._hashing:
+            self._hash_rows(np.array([row]))
+        elif self.size > self.exact_search_limit:
+            # Too large to search exhaustively from now on, so hash every entry.
+            self._hashing = True
+            self._hash_rows(np.flatnonzero(self._live[: self._rows]))
+
+    def search(self, vector: np.ndarray, threshold: float) -> str | None:
+        """Finds the response of the most similar live entry.
+
+        Args:
+            vector (np.ndarray): The prompt's unit vector.
+            threshold (float): The lowest cosine similarity that counts as a match.
+
+        Returns:
+            str | None: The response, or None if no entry is similar enough.
+        """
+        if not self.size:
+            return None
+        if self._hashing:
+            rows: np.ndarray | slice = self._get_candidates(vector)
+            if not len(rows):
+                return None
+        else:
+            rows = slice(0, self._rows)
+        scores: np.ndarray = self._vectors[rows] @ vector
+        now: float = time.monotonic()
+        scores[~(self._live[rows] & (self._expires[rows] >= now))] = -np.inf
+        best: int = int(np.argmax(scores))
+        if scores[best] < threshold:
+            return None
+        row: int = int(rows[best]) if self._hashing else best
+        self._last_used[row] = now
+        return self._texts[row]
+
+    def _get_candidates(self, vector: np.ndarray) -> np.ndarray:
+        """Picks the rows that share a bucket with a query in some table.
+
+        Args:
+            vector (np.ndarray): The query's unit vector.
+
+        Returns:
+            np.ndarray: Row numbers.
+        """
+        codes: np.ndarray = self._get_codes(vector[np.newaxis, :])[0]
+        rows = itertools.chain.from_iterable(
+            self._buckets[table].get(int(code), ())
+            for table, code in enumerate(codes)
+        )
+        return np.unique(np.fromiter(rows, dtype=np.int64))
+
+    def _get_codes(self, vectors: np.ndarray) -> np.ndarray:
+        """Hashes vectors to a bucket in each table.
+
+        Args:
+            vectors (np.ndarray): Vectors, one per row.
+
+        Returns:
+            np.ndarray: Each vector's bucket in each table.
+        """
+        signs: np.ndarray = (vectors @ self._planes.T) > 0
+        return signs.reshape(len(vectors), self.tables, self.bits) @ self._bit_values
+
+    def _hash_rows(self, rows: np.ndarray) -> None:
+        """Adds rows to the hash tables' buckets.
+
+        Args:
+            rows (np.ndarray): The rows to add.
+        """
+        if not len(rows):
+            return
+        codes: np.ndarray = self._get_codes(self._vectors[rows])
+        self._codes[rows] = codes
+        self._hashed[rows] = True
+        for table, buckets in enumerate(self._buckets):
+            for row, code in zip(rows.tolist(), codes[:, table].tolist()):
+                buckets.setdefault(code, []).append(row)
+
+    def _unhash_row(self, row: int) -> None:
+        """Removes a reused row from the buckets of the entry it used to hold.
+
+        Args:
+            row (int): The row.
+        """
+        for table, code in enumerate(self._codes[row].tolist()):
+            self._buckets[table][code].remove(row)
+        self._hashed[row] = False
+
+    def _append_row(self) -> int:
+        """Takes the next unused row, growing the arrays if they are full.
+
+        Returns:
+            int: The row.
+        """
+        if self._rows == len(self._vectors):
+            capacity: int = min(self.max_entries, max(1024, 2 * len(self._vectors)))
+            grow: int = capacity - len(self._vectors)
+            self._vectors = np.concatenate(
+                [self._vectors, np.zeros((grow, self.dimensions), dtype=np.float32)]
+            )
+            self._codes = np.concatenate(
+                [self._codes, np.zeros((grow, self.tables), dtype=np.int64)]
+            )
+            self._expires = np.concatenate([self._expires, np.zeros(grow)])
+            self._last_used = np.concatenate([self._last_used, np.zeros(grow)])
+            self._live = np.concatenate([self._live, np.zeros(grow, dtype=bool)])
+            self._hashed = np.concatenate([self._hashed, np.zeros(grow, dtype=bool)])
+            self._texts.extend([None] * grow)
+        self._rows += 1
+        return self._rows - 1
+
+    def _evict(self) -> None:
+        """Frees rows: every expired entry, or else the least recently used 1%.
+
+        Evicting in batches keeps the cost of scanning for them off most inserts.
+        """
+        live: np.ndarray = self._live[: self._rows]
+        expired: np.ndarray = np.flatnonzero(
+            live & (self._expires[: self._rows] < time.monotonic())
+        )
+        if len(expired):
+            rows: np.ndarray = expired
+        else:
+            batch: int = max(1, self.max_entries // 100)
+            last_used: np.ndarray = np.where(
+                live, self._last_used[: self._rows], np.inf
+            )
+            rows = np.argpartition(last_used, batch - 1)[:batch]
+        self._live[rows] = False
+        for row in rows.tolist():
+            self._texts[row] = None
+        self._free_rows.extend(rows.tolist())
+        self.size -= len(rows)
+        self.evictions += len(rows)
+
+
+class SemanticResponseCache:
+    """Keeps a SemanticIndex per AI model and counts its hits and misses.
+
+    An AI model's entries are dropped when its generation parameters change, which is
+    checked on every lookup, so processes that did not make the change notice it too.
+    """
+
+    def __init__(
+        self,
+        embedder: HashingEmbedder,
+        max_entries: int,
+        ttl_seconds: float,
+        **index_options,
+    ) -> None:
+        """Initialises an empty cache.
+
+        Args:
+            embedder (HashingEmbedder): Embeds prompts.
+            max_entries (int): The most entries per AI model.
+            ttl_seconds (float): How long a response stays valid.
+            **index_options: Passed on to each SemanticIndex.
+        """
+        self.embedder: HashingEmbedder = embedder
+        self.max_entries: int = max_entries
+        self.ttl_seconds: float = ttl_seconds
+        self.index_options: dict = index_options
+        self.counters: LookupCounters = LookupCounters()
+        self._indexes: dict[str, SemanticIndex] = {}
+        self._fingerprints: dict[str, str] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def make_fingerprint(aimodel: object) -> str:
+        """Summarises the settings that decide an AI model's responses.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            str: A hash that changes when the AI model's generation parameters do.
+        """
+        parameters: str = json.dumps(
+            get_generation_parameters(aimodel), sort_keys=True, default=str
+        )
+        return hashlib.sha256(parameters.encode()).hexdigest()
+
+    def get(self, aimodel: object, prompt: str, threshold: float) -> str | None:
+        """Returns the response to the most similar cached prompt, counting the lookup.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The prompt.
+            threshold (float): The lowest cosine similarity that counts as a match.
+
+        Returns:
+            str | None: The response, or None if no cached prompt is similar enough.
+        """
+        vector: np.ndarray = self.embedder.embed(prompt)
+        with self._lock:
+            index: SemanticIndex | None = self._get_index(aimodel, create=False)
+            text: str | None = index.search(vector, threshold) if index else None
+        self.counters.count(aimodel, text is not None)
+        return text
+
+    def set(self, aimodel: object, prompt: str, text: str) -> None:
+        """Stores the response to a prompt.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            prompt (str): The prompt.
+            text (str): The response.
+        """
+        vector: np.ndarray = self.embedder.embed(prompt)
+        if not vector.any():
+            return
+        with self._lock:
+            self._get_index(aimodel, create=True).add(vector, text, self.ttl_seconds)
+
+    def invalidate(self, aimodel: object) -> None:
+        """Drops every entry of an AI model.
+
+        Args:
+            aimodel (object): The AIModel instance.
+        """
+        with self._lock:
+            if self._indexes.pop(str(aimodel.pk), None) is not None:
+                logger.info(f"Dropped semantic cache entries of AI model {aimodel}")
+            self._fingerprints.pop(str(aimodel.pk), None)
+
+    def stats(self) -> dict:
+        """Summarises the cache for monitoring.
+
+        Returns:
+            dict: Entries per AI model, bounds and hit/miss counters.
+        """
+        with self._lock:
+            entries: dict[str, int] = {
+                name: index.size for name, index in self._indexes.items()
+            }
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            **self.counters.summary(),
+        }
+
+    def stats_for(self, aimodel: object) -> dict:
+        """Summarises one AI model's entries, hits and misses.
+
+        Args:
+            aimodel (object): The AIModel instance.
+
+        Returns:
+            dict: The entry count, hits, misses and hit rate.
+        """
+        with self._lock:
+            index: SemanticIndex | None = self._indexes.get(str(aimodel.pk))
+            entries: int = index.size if index else 0
+        return {"entries": entries, **self.counters.summary_for(aimodel)}
+
+    def clear(self) -> None:
+        """Drops every entry and resets the counters."""
+        with self._lock:
+            self._indexes.clear()
+            self._fingerprints.clear()
+        self.counters.clear()
+
+    def _get_index(self, aimodel: object, create: bool) -> SemanticIndex | None:
+        """Returns an AI model's index, dropping it if the model has changed since.
+
+        Called with the lock held.
+
+        Args:
+            aimodel (object): The AIModel instance.
+            create (bool): Create the index if the AI model has none.
+
+        Returns:
+            SemanticIndex | None: The index, or None if there is none to return.
+        """
+        name: str = str(aimodel.pk)
+        fingerprint: str = self.make_fingerprint(aimodel)
+        if self._fingerprints.get(name) != fingerprint:
+            if self._indexes.pop(name, None) is not None:
+                logger.info(f"AI model {aimodel} changed, dropped its semantic cache")
+            self._fingerprints[name] = fingerprint
+        index: SemanticIndex | None = self._indexes.get(name)
+        if index is None and create:
+            index = SemanticIndex(
+                self.embedder.dimensions, self.max_entries, **self.index_options
+            )
+            self._indexes[name] = index
+        return index
+
+
+_semantic_cache_lock: threading.Lock = threading.Lock()
+_semantic_cache: SemanticResponseCache | None = None
+
+
+def get_semantic_cache() -> SemanticResponseCache:
+    """Returns the process's semantic cache, creating it from settings on first use.
+
+    Returns:
+        SemanticResponseCache: The cache.
+    """
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticResponseCache(
+                    embedder=HashingEmbedder(
+                        settings.AIMODEL_SEMANTIC_CACHE_DIMENSIONS
+                    ),
+                    max_entries=settings.AIMODEL_SEMANTIC_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.AIMODEL_RESPONSE_CACHE_TTL,
+                )
+    return _semantic_cache
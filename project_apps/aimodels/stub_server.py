@@ -0,0 +1,339 @@
+"""project_apps.aimodels.stub_server.py
+
+This module provides a stand-in for a local model server, so the local backend can be
+developed and tested without a model or a network.
+
+It answers Ollama's /api/chat, /api/generate and /api/ps, and OpenAI style /v1/models
+and non-streamed /v1/chat/completions, over HTTP/1.1 keep-alive connections. Each reply
+repeats the prompt. Loading a model, and generating each word, take configurable time,
+and a model stays loaded for the keep_alive its requests ask for, as with a real server.
+The reply carries the server's timings in nanoseconds, as Ollama's does.
+
+class StubInferenceServer
+    - start / stop: runs the server on a background thread.
+    - url: the server's base URL.
+    - loaded_models: the models loaded now.
+    - connections / requests: counts for checking connection reuse.
+
+parse_keep_alive
+    - Converts a keep_alive value, e.g. "5m", to seconds.
+
+    Useage:
+        python manage.py run_inference_stub --port 11434 --load-seconds 2
+"""
+
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_KEEP_ALIVE_SECONDS: float = 300.0
+
+
+def parse_keep_alive(keep_alive: object) -> float:
+    """Converts a keep_alive value to seconds.
+
+    Args:
+        keep_alive: Seconds as a number, or a duration such as "30s", "5m" or "1h".
+            Negative values keep the model loaded for ever.
+
+    Returns:
+        float: The seconds to keep the model loaded, infinite if negative.
+    """
+    if keep_alive is None:
+        return DEFAULT_KEEP_ALIVE_SECONDS
+    match = re.fullmatch(r"(-?[\d.]+)([smh]?)", str(keep_alive).strip())
+    if match is None:
+        return DEFAULT_KEEP_ALIVE_SECONDS
+    seconds: float = float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[
+        match.group(2)
+    ]
+    return float("inf") if seconds < 0 else seconds
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    """Handles one connection's requests to the stub server."""
+
+    protocol_version: str = "HTTP/1.1"
+
+    def setup(self) -> None:
+        """Counts the new connection."""
+        super().setup()
+        self.server.stub.count("connections")
+
+    def log_message(self, format: str, *args) -> None:
+        """Keeps request logs out of test output."""
+
+    def do_GET(self) -> None:
+        """Lists the loaded models at /api/ps and /v1/models."""
+        self.server.stub.count("requests")
+        names: list[str] = self.server.stub.loaded_models
+        if self.path == "/api/ps":
+            self._send_json({"models": [{"name": name} for name in names]})
+        elif self.path == "/v1/models":
+            self._send_json(
+                {
+                    "object": "list",
+                    "data": [
+                        {
+                            "id": name,
+                            "object": "model",
+                            "created": 0,
+                            "owned_by": "stub",
+                        }
+                        for name in names
+                    ],
+                }
+            )
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self) -> None:
+        """Answers chat, generate and chat completion requests."""
+        stub: StubInferenceServer = self.server.stub
+        stub.count("requests")
+        length: int = int(self.headers.get("Content-Length", 0))
+        body: dict = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/api/chat":
+            self._chat(stub, body)
+        elif self.path == "/api/generate":
+            load_ns: int = stub.load(body["model"], body.get("keep_alive"))
+            self._send_json(
+                {
+                    "model": body["model"],
+                    "response": "",
+                    "done": True,
+                    "done_reason": "load",
+                    "load_duration": load_ns,
+                }
+            )
+        elif self.path == "/v1/chat/completions":
+            self._chat_completion(stub, body)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _chat(self, stub: "StubInferenceServer", body: dict) -> None:
+        """Answers an Ollama chat request, streamed as JSON lines if asked.
+
+        Args:
+            stub (StubInferenceServer): The server's state.
+            body (dict): The request.
+        """
+        model: str = body["model"]
+        load_ns: int = stub.load(model, body.get("keep_alive"))
+        words: list[str] = stub.make_reply(body["messages"]).split(" ")
+        prompt_tokens: int = len(body["messages"][-1]["content"].split())
+        started: float = time.perf_counter()
+        timings: dict = {"load_duration": load_ns, "prompt_eval_count": prompt_tokens}
+        if not body.get("stream", True):
+            time.sleep(stub.word_seconds * len(words))
+            self._send_json(
+                {
+                    "model": model,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "done": True,
+                    "eval_count": len(words),
+                    "eval_duration": int((time.perf_counter() - started) * 1e9),
+                    **timings,
+                }
+            )
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for number, word in enumerate(words):
+            time.sleep(stub.word_seconds)
+            self._send_chunk(
+                {
+                    "model": model,
+                    "message": {
+                        "role": "assistant",
+                        "content": word if number == 0 else f" {word}",
+                    },
+                    "done": False,
+                }
+            )
+        self._send_chunk(
+            {
+                "model": model,
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "eval_count": len(words),
+                "eval_duration": int((time.perf_counter() - started) * 1e9),
+                **timings,
+            }
+        )
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chat_completion(self, stub: "StubInferenceServer", body: dict) -> None:
+        """Answers an OpenAI style chat completion request.
+
+        Args:
+            stub (StubInferenceServer): The server's state.
+            body (dict): The request.
+        """
+        stub.load(body["model"], None)
+        reply: str = stub.make_reply(body["messages"])
+        time.sleep(stub.word_seconds * len(reply.split(" ")))
+        prompt_tokens: int = len(body["messages"][-1]["content"].split())
+        completion_tokens: int = len(reply.split(" "))
+        self._send_json(
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": reply},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
+
+    def _send_json(self, data: dict, status: int = 200) -> None:
+        """Sends a JSON response with a length, so the connection can be reused.
+
+        Args:
+            data (dict): The response body.
+            status (int): The HTTP status.
+        """
+        payload: bytes = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_chunk(self, data: dict) -> None:
+        """Sends one JSON line of a chunked response.
+
+        Args:
+            data (dict): The line's content.
+        """
+        line: bytes = json.dumps(data).encode() + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+
+class StubInferenceServer:
+    """A local model server stand-in that runs on a background thread.
+
+    Models load on their first request, taking load_seconds, and unload once their
+    keep_alive has passed without a request.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        load_seconds: float = 0.0,
+        word_seconds: float = 0.0,
+    ) -> None:
+        """Initialises the server. Port 0 picks a free port.
+
+        Args:
+            host (str): The address to listen on.
+            port (int): The port to listen on.
+            load_seconds (float): How long loading a model takes.
+            word_seconds (float): How long generating each word takes.
+        """
+        self.load_seconds: float = load_seconds
+        self.word_seconds: float = word_seconds
+        self.connections: int = 0
+        self.requests: int = 0
+        self._expiries: dict[str, float] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._server: ThreadingHTTPServer = ThreadingHTTPServer(
+            (host, port), _StubRequestHandler
+        )
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """The server's base URL."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def loaded_models(self) -> list[str]:
+        """The models loaded now."""
+        now: float = time.monotonic()
+        with self._lock:
+            return sorted(
+                name for name, expiry in self._expiries.items() if expiry > now
+            )
+
+    def start(self) -> "StubInferenceServer":
+        """Starts serving on a background thread.
+
+        Returns:
+            StubInferenceServer: The server, for chaining.
+        """
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="inference-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving and closes the listening socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        """Serves on the calling thread until interrupted."""
+        self._server.serve_forever()
+
+    def count(self, name: str) -> None:
+        """Adds one to a counter.
+
+        Args:
+            name (str): "connections" or "requests".
+        """
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def load(self, model: str, keep_alive: object) -> int:
+        """Loads a model if it is not loaded, and keeps it for keep_alive.
+
+        Args:
+            model (str): The model's name.
+            keep_alive: How long to keep the model loaded after this request.
+
+        Returns:
+            int: The time spent loading, in nanoseconds.
+        """
+        with self._lock:
+            is_loaded: bool = self._expiries.get(model, 0.0) > time.monotonic()
+        started: float = time.perf_counter()
+        if not is_loaded:
+            time.sleep(self.load_seconds)
+        load_ns: int = int((time.perf_counter() - started) * 1e9)
+        with self._lock:
+            self._expiries[model] = time.monotonic() + parse_keep_alive(keep_alive)
+        return load_ns
+
+    @staticmethod
+    def make_reply(messages: list[dict]) -> str:
+        """Builds the reply to a conversation.
+
+        Args:
+            messages (list[dict]): The chat messages.
+
+        Returns:
+            str: The reply, repeating the last message.
+        """
+        return f"Stub reply to: {messages[-1]['content']}"
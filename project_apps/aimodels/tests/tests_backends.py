@@ -0,0 +1,265 @@
+"""This module unit tests the AI model backend registry.
+
+It has the test cases:
+    BackendRegistryTest: This ensures backends are built on first use per access mode, from the defaults and settings.
+    OpenAIAPIBackendTest: This ensures the OpenAI API backend uses the shared clients with its own timeout.
+    AIModelBackendTest: This ensures AI models send prompts through their access mode's backend.
+"""
+
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from django.urls import reverse
+
+from project_apps.aimodels import backends
+from project_apps.aimodels.backends import (
+    AIModelBackend,
+    BackendRegistry,
+    EchoBackend,
+    OpenAIAPIBackend,
+    TransformerBackend,
+    get_access_mode_choices,
+    get_backend_configs,
+    get_backend_registry,
+)
+from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from standard.tests.utils import UserSetupMixin
+
+
+class ReverseBackend(AIModelBackend):
+    """
+    This class is a backend added through settings that reverses the prompt
+
+    methods:
+        generate
+    """
+
+    def generate(self, aimodel, prompt, history=None):
+        return prompt.strip()[::-1]
+
+
+@tag("model")
+class BackendRegistryTest(SimpleTestCase):
+    """
+    This class tests building backends per access mode
+
+    Attributes:
+
+    methods:
+        test_backend_built_once_per_access_mode
+        test_unknown_access_mode_echoes
+        test_settings_override_and_add_backends
+        test_openai_not_imported_until_used
+    """
+
+    def test_backend_built_once_per_access_mode(self):
+        """
+        This function tests that each access mode's backend is built on first use only.
+
+        args:
+
+        returns:
+        """
+        registry = BackendRegistry(get_backend_configs())
+        self.assertEqual(registry.status()["loaded"], {})
+        backend = registry.get("transformer")
+        self.assertIsInstance(backend, TransformerBackend)
+        self.assertIs(registry.get("transformer"), backend)
+        self.assertEqual(list(registry.status()["loaded"]), ["transformer"])
+        self.assertEqual(
+            backend.capabilities(),
+            {"streaming": False, "batching": False, "vision": False},
+        )
+
+    def test_unknown_access_mode_echoes(self):
+        """
+        This function tests that an access mode without a backend echoes the prompt.
+
+        args:
+
+        returns:
+        """
+        backend = BackendRegistry({}).get("carrier_pigeon")
+        self.assertIsInstance(backend, EchoBackend)
+        self.assertEqual(backend.generate(None, " Hello "), "Echo: Hello")
+
+    @override_settings(
+        AIMODEL_BACKENDS={
+            "openai_api": {"OPTIONS": {"timeout": 12.5}},
+            "reverse": {
+                "BACKEND": f"{__name__}.ReverseBackend",
+                "LABEL": "Reverse",
+            },
+        }
+    )
+    def test_settings_override_and_add_backends(self):
+        """
+        This function tests that settings set backend options and add access modes.
+
+        args:
+
+        returns:
+        """
+        registry = BackendRegistry(get_backend_configs())
+        backend = registry.get("openai_api")
+        self.assertIsInstance(backend, OpenAIAPIBackend)
+        self.assertEqual(backend.timeout, 12.5)
+        self.assertIsInstance(registry.get("reverse"), ReverseBackend)
+        self.assertIn(("reverse", "Reverse"), get_access_mode_choices())
+        self.assertEqual(get_access_mode_choices()[0][0], "openai_api")
+
+    def test_openai_not_imported_until_used(self):
+        """
+        This function tests that loading the site does not import the openai library.
+
+        args:
+
+        returns:
+        """
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, django; django.setup(); import aiui_config.urls; "
+                "print('openai' in sys.modules)",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "False")
+
+
+@tag("model")
+class OpenAIAPIBackendTest(SimpleTestCase):
+    """
+    This class tests the OpenAI API backend
+
+    Attributes:
+
+    methods:
+        setUp
+        test_backend_timeout_sent_with_request
+        test_client_default_timeout_without_backend_timeout
+    """
+
+    def setUp(self):
+        self.aimodel = AIModel(
+            name="openai/gpt-oss-20b:free", access_endpoint="https://a.example/v1"
+        )
+        self.client = MagicMock()
+        patcher = patch(
+            "project_apps.aimodels.clients.openai_client_registry.get_client_for_aimodel",
+            return_value=self.client,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_backend_timeout_sent_with_request(self):
+        """
+        This function tests that a backend timeout is passed on each request.
+
+        args:
+
+        returns:
+        """
+        OpenAIAPIBackend("openai_api", timeout=12.5).generate(self.aimodel, "Hi")
+        self.assertEqual(
+            self.client.chat.completions.create.call_args.kwargs["timeout"], 12.5
+        )
+
+    def test_client_default_timeout_without_backend_timeout(self):
+        """
+        This function tests that without a backend timeout the client's is used.
+
+        args:
+
+        returns:
+        """
+        OpenAIAPIBackend("openai_api").generate(self.aimodel, "Hi")
+        self.assertNotIn(
+            "timeout", self.client.chat.completions.create.call_args.kwargs
+        )
+
+
+@tag("model")
+@override_settings(
+    AIMODEL_COALESCE_REQUESTS=False,
+    AIMODEL_BACKENDS={
+        "reverse": {"BACKEND": f"{__name__}.ReverseBackend", "LABEL": "Reverse"}
+    },
+)
+class AIModelBackendTest(UserSetupMixin, TestCase):
+    """
+    This class tests AI models' use of backends
+
+    Attributes:
+
+    methods:
+        setUp
+        test_prompt_sent_through_settings_backend
+        test_backend_without_streaming_streams_whole_response
+        test_status_reports_loaded_backends
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(backends, "_backend_registry", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ai_model = create_ai_model(
+            self.user1,
+            "openai/gpt-oss-20b:free",
+            "Open-weight model",
+            0.0,
+            0.0,
+            "Edge devices and focused tasks.",
+            access_mode="reverse",
+        )
+
+    def test_prompt_sent_through_settings_backend(self):
+        """
+        This function tests that a model with an added access mode uses its backend.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.full_clean()
+        self.assertIsInstance(self.ai_model.get_backend(), ReverseBackend)
+        self.assertEqual(self.ai_model.get_aimodel_response("Hello"), "olleH")
+        self.assertEqual(
+            async_to_sync(self.ai_model.aget_aimodel_response)("Hello"), "olleH"
+        )
+
+    def test_backend_without_streaming_streams_whole_response(self):
+        """
+        This function tests that a backend without streaming gives one piece.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(list(self.ai_model.stream_aimodel_response("Hello")), ["olleH"])
+
+    def test_status_reports_loaded_backends(self):
+        """
+        This function tests that the AI model status endpoint lists loaded backends.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.get_aimodel_response("Hello")
+        self.client.force_login(self.user1)
+        response = self.client.get(reverse("noa-aimodel-status"), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["backends"]["loaded"]["reverse"]["backend"],
+            "ReverseBackend",
+        )
+        self.assertIn("reverse", get_backend_registry().status()["configured"])
@@ -0,0 +1,323 @@
+"""This module unit tests the AI model response cache.
+
+It has the test cases:
+    ResponseCacheTest: This ensures responses are keyed on the model, its parameters and the normalised prompt, with hit rates counted.
+    LRUResponseCacheBackendTest: This ensures the in-process backend evicts the least recently used responses and expires old ones.
+    DjangoResponseCacheBackendTest: This ensures responses can be shared through a Django cache.
+    AIModelResponseCacheTest: This ensures AI models only use the cache when they opt in.
+"""
+
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+
+from project_apps.aimodels import caching
+from project_apps.aimodels.caching import (
+    DjangoResponseCacheBackend,
+    LRUResponseCacheBackend,
+    ResponseCache,
+    get_response_cache,
+    normalize_prompt,
+)
+from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from standard.tests.utils import UserSetupMixin
+
+
+def create_aimodel_response(content):
+    """
+    This function creates a chat completion like the provider's.
+
+    args:
+        content: the response text
+
+    returns:
+        response: a mock with choices[0].message.content set
+    """
+    response = MagicMock()
+    response.choices[0].message.content = content
+    return response
+
+
+@tag("model")
+class ResponseCacheTest(SimpleTestCase):
+    """
+    This class tests the response cache's keys and metrics
+
+    Attributes:
+
+    methods:
+        setUp
+        test_prompt_normalized
+        test_equivalent_prompts_share_a_key
+        test_key_depends_on_model_and_endpoint
+        test_hit_rate_counted_per_model
+    """
+
+    def setUp(self):
+        self.cache = ResponseCache(LRUResponseCacheBackend(max_entries=8), 60.0)
+        self.aimodel = AIModel(
+            name="openai/gpt-oss-20b:free", access_endpoint="https://a.example/v1"
+        )
+
+    def test_prompt_normalized(self):
+        """
+        This function tests that unicode forms and whitespace are normalised.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(
+            normalize_prompt("  Café   in\n Paris? "),
+            "Café in Paris?",
+        )
+
+    def test_equivalent_prompts_share_a_key(self):
+        """
+        This function tests that prompts differing only in whitespace share an entry.
+
+        args:
+
+        returns:
+        """
+        self.cache.set(self.aimodel, "What's the capital  of France?", "Paris")
+        self.assertEqual(
+            self.cache.get(self.aimodel, " What's the capital of France?\n"), "Paris"
+        )
+        self.assertIsNone(self.cache.get(self.aimodel, "What's the capital of Spain?"))
+
+    def test_key_depends_on_model_and_endpoint(self):
+        """
+        This function tests that other models, a changed endpoint, or other earlier
+        turns miss the cache.
+
+        args:
+
+        returns:
+        """
+        key = self.cache.make_key(self.aimodel, "Hello")
+        self.assertEqual(key, self.cache.make_key(self.aimodel, "Hello", []))
+        history = [{"role": "user", "content": "Hi"}]
+        self.assertNotEqual(key, self.cache.make_key(self.aimodel, "Hello", history))
+        other_aimodel = AIModel(
+            name="another", access_endpoint=self.aimodel.access_endpoint
+        )
+        self.assertNotEqual(key, self.cache.make_key(other_aimodel, "Hello"))
+        self.aimodel.access_endpoint = "https://b.example/v1"
+        self.assertNotEqual(key, self.cache.make_key(self.aimodel, "Hello"))
+
+    def test_hit_rate_counted_per_model(self):
+        """
+        This function tests the hit and miss counters overall and per model.
+
+        args:
+
+        returns:
+        """
+        other_aimodel = AIModel(name="another")
+        self.cache.set(self.aimodel, "Hello", "Hi")
+        self.cache.get(self.aimodel, "Hello")
+        self.cache.get(self.aimodel, "Hello")
+        self.cache.get(self.aimodel, "Goodbye")
+        self.cache.get(other_aimodel, "Hello")
+
+        self.assertEqual(
+            self.cache.stats_for(self.aimodel),
+            {"hits": 2, "misses": 1, "hit_rate": 0.667},
+        )
+        stats = self.cache.stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+        self.assertEqual(stats["hit_rate"], 0.5)
+        self.assertEqual(len(stats["models"]), 2)
+
+        self.cache.clear()
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        self.assertEqual(self.cache.stats()["hits"], 0)
+
+
+@tag("model")
+class LRUResponseCacheBackendTest(SimpleTestCase):
+    """
+    This class tests the in-process response cache backend
+
+    Attributes:
+
+    methods:
+        test_least_recently_used_evicted
+        test_expired_responses_dropped
+    """
+
+    def test_least_recently_used_evicted(self):
+        """
+        This function tests that the least recently used response is evicted when full.
+
+        args:
+
+        returns:
+        """
+        backend = LRUResponseCacheBackend(max_entries=2)
+        backend.set("a", "A", 60.0)
+        backend.set("b", "B", 60.0)
+        backend.get("a")
+        backend.set("c", "C", 60.0)
+        self.assertEqual(backend.get("a"), "A")
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("c"), "C")
+        self.assertEqual(backend.entries(), 2)
+
+    def test_expired_responses_dropped(self):
+        """
+        This function tests that responses are not returned after their TTL.
+
+        args:
+
+        returns:
+        """
+        backend = LRUResponseCacheBackend()
+        backend.set("a", "A", -1.0)
+        self.assertIsNone(backend.get("a"))
+        self.assertEqual(backend.entries(), 0)
+
+
+@tag("model")
+@override_settings(
+    CACHES={
+        "responses": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+)
+class DjangoResponseCacheBackendTest(SimpleTestCase):
+    """
+    This class tests the Django cache response cache backend
+
+    Attributes:
+
+    methods:
+        test_responses_stored_in_django_cache
+    """
+
+    def test_responses_stored_in_django_cache(self):
+        """
+        This function tests that responses go to the named Django cache with a prefix.
+
+        args:
+
+        returns:
+        """
+        from django.core.cache import caches
+
+        backend = DjangoResponseCacheBackend(alias="responses")
+        self.addCleanup(backend.clear)
+        backend.set("a", "A", 60.0)
+        self.assertEqual(backend.get("a"), "A")
+        self.assertEqual(caches["responses"].get("aimodel-response:a"), "A")
+        self.assertIsNone(backend.entries())
+
+
+@tag("model")
+@override_settings(
+    AIMODEL_RESPONSE_CACHE_BACKEND="project_apps.aimodels.caching.LRUResponseCacheBackend",
+    AIMODEL_RESPONSE_CACHE_OPTIONS={"max_entries": 4},
+    AIMODEL_RESPONSE_CACHE_TTL=60.0,
+)
+class AIModelResponseCacheTest(UserSetupMixin, TestCase):
+    """
+    This class tests AI models' use of the response cache
+
+    Attributes:
+
+    methods:
+        setUp
+        test_cache_built_from_settings
+        test_opted_in_model_answers_from_cache
+        test_async_response_text_uses_cache
+        test_model_without_opt_in_not_cached
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(caching, "_response_cache", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ai_model = create_ai_model(
+            self.user1,
+            "openai/gpt-oss-20b:free",
+            "Open-weight model",
+            0.0,
+            0.0,
+            "Edge devices and focused tasks.",
+        )
+        self.ai_model.cache_responses = True
+        self.ai_model.save()
+
+    def test_cache_built_from_settings(self):
+        """
+        This function tests that the cache's backend and TTL come from settings.
+
+        args:
+
+        returns:
+        """
+        cache = get_response_cache()
+        self.assertIs(cache, get_response_cache())
+        self.assertIsInstance(cache.backend, LRUResponseCacheBackend)
+        self.assertEqual(cache.backend.max_entries, 4)
+        self.assertEqual(cache.ttl_seconds, 60.0)
+
+    def test_opted_in_model_answers_from_cache(self):
+        """
+        This function tests that a repeated prompt does not call the provider again.
+
+        args:
+
+        returns:
+        """
+        with patch(
+            "project_apps.aimodels.models.AIModel.get_aimodel_response",
+            return_value=create_aimodel_response("Paris"),
+        ) as get_aimodel_response:
+            first = self.ai_model.get_response_text("Capital of France?")
+            second = self.ai_model.get_response_text(" Capital of  France? ")
+        self.assertEqual(first, ("Paris", False))
+        self.assertEqual(second, ("Paris", True))
+        get_aimodel_response.assert_called_once()
+        self.assertEqual(
+            self.ai_model.get_response_cache_stats(),
+            {"hits": 1, "misses": 1, "hit_rate": 0.5},
+        )
+
+    def test_async_response_text_uses_cache(self):
+        """
+        This function tests that the async path reads and fills the same cache.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.cache_response("Capital of France?", "Paris")
+        self.assertEqual(
+            async_to_sync(self.ai_model.aget_response_text)("Capital of France?"),
+            ("Paris", True),
+        )
+
+    def test_model_without_opt_in_not_cached(self):
+        """
+        This function tests that models without cache_responses always call the provider.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.cache_responses = False
+        with patch(
+            "project_apps.aimodels.models.AIModel.get_aimodel_response",
+            return_value=create_aimodel_response("Paris"),
+        ) as get_aimodel_response:
+            self.ai_model.get_response_text("Capital of France?")
+            self.assertEqual(
+                self.ai_model.get_response_text("Capital of France?"), ("Paris", False)
+            )
+        self.assertEqual(get_aimodel_response.call_count, 2)
+        self.assertEqual(get_response_cache().stats()["hits"], 0)
@@ -0,0 +1,378 @@
+"""This module unit tests the AI model endpoint circuit breakers and health probes.
+
+It has the test cases:
+    CircuitBreakerTest: This ensures circuits open on endpoint errors and timeouts, fail fast, and close after a trial.
+    HealthProbeTest: This ensures health probes open the circuits of endpoints that are down.
+    AIModelCircuitTest: This ensures AI models fail fast, route around, and show their open circuits.
+"""
+
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from django.urls import reverse
+
+from project_apps.aimodels import backends, circuits, routing
+from project_apps.aimodels.backends import TransformerBackend
+from project_apps.aimodels.circuits import (
+    CircuitBreaker,
+    CircuitOpenError,
+    get_circuit_breakers,
+    probe_endpoints,
+)
+from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.ratelimits import RateLimitExceededError
+from project_apps.aimodels.routing import LatencyTracker, ModelRouter
+from project_apps.aimodels.tests.tests_local_backend import start_stub_server
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from project_apps.chats.tests.tests_models import create_conversation_thread
+from standard.tests.utils import UserSetupMixin
+
+
+@tag("model")
+class CircuitBreakerTest(SimpleTestCase):
+    """
+    This class tests the circuit breaker's states
+
+    Attributes:
+
+    methods:
+        setUp
+        test_opens_on_failure_rate
+        test_opens_on_run_of_timeouts
+        test_open_circuit_fails_fast
+        test_half_open_trial_closes_or_reopens
+        status_error
+        test_bad_requests_not_counted
+    """
+
+    def setUp(self):
+        self.circuit = CircuitBreaker(
+            "local:", window=10, min_calls=4, failure_rate=0.5, reset_seconds=0.1
+        )
+
+    def test_opens_on_failure_rate(self):
+        """
+        This function tests that the circuit opens once enough calls fail.
+
+        args:
+
+        returns:
+        """
+        self.circuit.record_success()
+        self.circuit.record_success()
+        self.circuit.record_failure(ConnectionError("refused"))
+        self.assertEqual(self.circuit.state, "closed")
+        with self.assertLogs("project_apps.aimodels.circuits", "WARNING"):
+            self.circuit.record_failure(ConnectionError("refused"))
+        status = self.circuit.status()
+        self.assertEqual(status["state"], "open")
+        self.assertEqual((status["calls"], status["failures"]), (4, 2))
+        self.assertEqual(status["last_error"], "ConnectionError: refused")
+
+    def test_opens_on_run_of_timeouts(self):
+        """
+        This function tests that a run of timeouts opens the circuit before min_calls.
+
+        args:
+
+        returns:
+        """
+        self.circuit.min_calls = 100
+        with self.assertLogs("project_apps.aimodels.circuits", "WARNING"):
+            for _ in range(3):
+                self.circuit.record_failure(TimeoutError("read timed out"))
+        self.assertEqual(self.circuit.state, "open")
+        self.assertEqual(self.circuit.status()["timeouts"], 3)
+
+    def test_open_circuit_fails_fast(self):
+        """
+        This function tests that an open circuit rejects calls with a retry delay.
+
+        args:
+
+        returns:
+        """
+        self.circuit.reset_seconds = 30.0
+        with self.assertLogs("project_apps.aimodels.circuits", "WARNING"):
+            self.circuit.trip("Health probe failed")
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.circuit.before_call()
+        self.assertEqual(raised.exception.retry_after, 30)
+        self.assertEqual(raised.exception.status_code, 503)
+
+    def test_half_open_trial_closes_or_reopens(self):
+        """
+        This function tests that one trial is let through, and its outcome decides.
+
+        args:
+
+        returns:
+        """
+        with self.assertLogs("project_apps.aimodels.circuits", "INFO"):
+            self.circuit.trip("down")
+            time.sleep(0.1)
+            self.assertEqual(self.circuit.state, "half_open")
+            self.circuit.before_call()
+            with self.assertRaises(CircuitOpenError):
+                self.circuit.before_call()
+            self.circuit.record_failure(ConnectionError("still down"))
+            self.assertEqual(self.circuit.state, "open")
+            time.sleep(0.1)
+            self.circuit.before_call()
+            self.circuit.record_success()
+        self.assertEqual(self.circuit.state, "closed")
+        self.circuit.before_call()
+
+    def status_error(self, status_code):
+        """
+        This function makes an error like the one a client library raises for an HTTP
+        status, e.g. openai's APIStatusError.
+
+        args:
+            status_code (int): The response's status.
+
+        returns:
+            Exception: The error.
+        """
+        error = Exception(f"Error code: {status_code}")
+        error.status_code = status_code
+        return error
+
+    def test_bad_requests_not_counted(self):
+        """
+        This function tests that only errors showing the endpoint failing count, and
+        that a bad request gives back a half-open circuit's trial.
+
+        args:
+
+        returns:
+        """
+        for status_code in (400, 401, 422, 400):
+            self.circuit.record_failure(self.status_error(status_code))
+        self.assertEqual(self.circuit.state, "closed")
+        self.assertEqual(self.circuit.status()["calls"], 0)
+        with self.assertLogs("project_apps.aimodels.circuits", "WARNING"):
+            for status_code in (429, 503):
+                self.circuit.record_failure(self.status_error(status_code))
+            for _ in range(2):
+                self.circuit.record_failure(ConnectionError("refused"))
+        self.assertEqual(self.circuit.state, "open")
+        time.sleep(0.1)
+        self.circuit.before_call()
+        self.circuit.record_failure(self.status_error(400))
+        self.assertEqual(self.circuit.state, "half_open")
+        self.circuit.before_call()
+        self.circuit.record_failure(self.status_error(502))
+        self.assertEqual(self.circuit.state, "open")
+
+
+@tag("model")
+class HealthProbeTest(SimpleTestCase):
+    """
+    This class tests probing AI model endpoints
+
+    Attributes:
+
+    methods:
+        setUp
+        test_down_endpoint_opened_and_recovered_endpoint_closed
+    """
+
+    def setUp(self):
+        for module, name in (
+            (circuits, "_circuit_breakers"),
+            (backends, "_backend_registry"),
+        ):
+            patcher = patch.object(module, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_down_endpoint_opened_and_recovered_endpoint_closed(self):
+        """
+        This function tests probes against a running and a stopped stub server.
+
+        args:
+
+        returns:
+        """
+        server = start_stub_server(self)
+        stopped = start_stub_server(self)
+        stopped.stop()
+        up = AIModel(name="up", access_mode="local", access_endpoint=server.url)
+        same = AIModel(name="same", access_mode="local", access_endpoint=server.url)
+        down = AIModel(name="down", access_mode="local", access_endpoint=stopped.url)
+        with self.assertLogs("project_apps.aimodels.circuits", "INFO"):
+            healthy = probe_endpoints([up, same, down])
+            self.assertEqual(list(healthy.values()), [True, False])
+            self.assertEqual(server.requests, 1)
+            self.assertEqual(get_circuit_breakers().get(down).state, "open")
+            self.assertIn(
+                "Health probe failed",
+                get_circuit_breakers().get(down).status()["last_error"],
+            )
+            down.access_endpoint = server.url
+            get_circuit_breakers().get(up).trip("down earlier")
+            probe_endpoints([down])
+        self.assertEqual(get_circuit_breakers().get(up).state, "closed")
+
+
+@tag("model")
+@override_settings(
+    AIMODEL_COALESCE_REQUESTS=False,
+    AIMODEL_CIRCUIT_MIN_CALLS=2,
+    AIMODEL_CIRCUIT_RESET_SECONDS=60.0,
+)
+class AIModelCircuitTest(UserSetupMixin, TestCase):
+    """
+    This class tests AI models behind circuit breakers
+
+    Attributes:
+
+    methods:
+        setUp
+        open_circuit
+        test_open_circuit_fails_fast_without_calling_backend
+        test_rate_limited_trial_frees_slot
+        test_router_skips_open_circuit
+        test_send_prompt_answers_unavailable
+        test_circuit_on_detail_page
+    """
+
+    def setUp(self):
+        super().setUp()
+        for module, name in (
+            (circuits, "_circuit_breakers"),
+            (routing, "_latency_tracker"),
+        ):
+            patcher = patch.object(module, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.ai_model = create_ai_model(
+            self.user1, "flaky", "Flaky", 0.1, 0.1, "General.", "transformer"
+        )
+        self.healthy = create_ai_model(
+            self.user1,
+            "healthy",
+            "Healthy",
+            1.0,
+            1.0,
+            "General.",
+            "transformer",
+            "https://healthy.example.com/v1",
+        )
+
+    def open_circuit(self):
+        """
+        This function fails the AI model's requests until its circuit opens.
+
+        args:
+
+        returns:
+        """
+        with patch.object(
+            TransformerBackend, "generate", side_effect=ConnectionError("refused")
+        ):
+            with self.assertLogs("project_apps.aimodels.circuits", "WARNING"):
+                for _ in range(2):
+                    with self.assertRaises(ConnectionError):
+                        self.ai_model.get_aimodel_response("Hi")
+
+    def test_open_circuit_fails_fast_without_calling_backend(self):
+        """
+        This function tests that an open circuit's AI model is not called.
+
+        args:
+
+        returns:
+        """
+        self.open_circuit()
+        with patch.object(TransformerBackend, "generate") as generate:
+            with self.assertRaises(CircuitOpenError):
+                self.ai_model.get_aimodel_response("Hi")
+            with self.assertRaises(CircuitOpenError):
+                list(self.ai_model.stream_aimodel_response("Hi"))
+        generate.assert_not_called()
+        self.assertEqual(
+            self.healthy.get_aimodel_response("Hi"),
+            "Response from OpenRouter for prompt: Hi",
+        )
+
+    def test_rate_limited_trial_frees_slot(self):
+        """
+        This function tests that a trial turned away by the rate limits does not hold
+        the half-open circuit's trial slot.
+
+        args:
+
+        returns:
+        """
+        circuit = get_circuit_breakers().get(self.ai_model)
+        circuit.reset_seconds = 0.05
+        with self.assertLogs("project_apps.aimodels.circuits", "WARNING"):
+            circuit.trip("down")
+        time.sleep(0.05)
+        with patch.object(
+            AIModel,
+            "_acquire_rate_limit",
+            side_effect=RateLimitExceededError("flaky", "concurrency", 1),
+        ):
+            for _ in range(2):
+                with self.assertRaises(RateLimitExceededError):
+                    self.ai_model.get_aimodel_response("Hi")
+        self.assertEqual(circuit.state, "half_open")
+        with self.assertLogs("project_apps.aimodels.circuits", "INFO"):
+            self.ai_model.get_aimodel_response("Hi")
+        self.assertEqual(circuit.state, "closed")
+
+    def test_router_skips_open_circuit(self):
+        """
+        This function tests that routing avoids an AI model whose circuit is open.
+
+        args:
+
+        returns:
+        """
+        router = ModelRouter(
+            LatencyTracker(), policy="cheapest", circuits=get_circuit_breakers()
+        )
+        aimodels = [self.ai_model, self.healthy]
+        self.assertIs(router.choose("Hi", aimodels).aimodel, self.ai_model)
+        self.open_circuit()
+        self.assertIs(router.choose("Hi", aimodels).aimodel, self.healthy)
+
+    def test_send_prompt_answers_unavailable(self):
+        """
+        This function tests that the chat page answers at once when the circuit is open.
+
+        args:
+
+        returns:
+        """
+        self.open_circuit()
+        conversation_thread = create_conversation_thread(
+            self.user1, "Flaky", "", "web", self.ai_model
+        )
+        self.client.force_login(self.user1)
+        response = self.client.post(
+            reverse("send_prompt_with_id", args=[conversation_thread.id]),
+            {"prompt": "Hi"},
+            secure=True,
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "60")
+        self.assertContains(response, "The AI model is unavailable.", status_code=503)
+
+    def test_circuit_on_detail_page(self):
+        """
+        This function tests that the detail page shows an open circuit and its error.
+
+        args:
+
+        returns:
+        """
+        self.open_circuit()
+        self.client.force_login(self.user1)
+        response = self.client.get(self.ai_model.get_absolute_url(), secure=True)
+        self.assertContains(response, "Open: unavailable, retrying in 60s")
+        self.assertContains(response, "Last error: ConnectionError: refused")
@@ -0,0 +1,148 @@
+"""This module unit tests the shared AI model provider clients.
+
+It has the test cases:
+    OpenAIClientRegistryTest: This ensures provider clients are reused per endpoint and rebuilt when an endpoint changes.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings, tag
+
+from project_apps.aimodels.clients import OpenAIClientRegistry
+
+
+@tag("model")
+@override_settings(
+    OPEN_AI_MODEL_KEY="key",
+    AIMODEL_CLIENT_CONNECT_TIMEOUT=2.0,
+    AIMODEL_CLIENT_TIMEOUT=30.0,
+    AIMODEL_CLIENT_MAX_RETRIES=1,
+)
+class OpenAIClientRegistryTest(SimpleTestCase):
+    """
+    This class tests the process-wide OpenAI client registry
+
+    Attributes:
+
+    methods:
+        setUp
+        test_client_reused_per_endpoint_and_key
+        test_client_configured_from_settings
+        test_endpoint_change_rebuilds_client
+        test_old_client_kept_for_stale_instance
+        test_shared_client_kept_while_in_use
+        test_async_clients_shared_within_an_event_loop
+    """
+
+    def setUp(self):
+        self.registry = OpenAIClientRegistry()
+        self.addCleanup(self.registry.clear)
+
+    def test_client_reused_per_endpoint_and_key(self):
+        """
+        This function tests that one client is built for each endpoint and API key.
+
+        args:
+
+        returns:
+        """
+        client = self.registry.get_client("https://a.example/v1", "key")
+        self.assertIs(client, self.registry.get_client("https://a.example/v1", "key"))
+        self.assertIsNot(client, self.registry.get_client("https://b.example/v1", "key"))
+        self.assertIsNot(client, self.registry.get_client("https://a.example/v1", "other"))
+        self.assertEqual(self.registry.status()["clients"], 3)
+
+    def test_client_configured_from_settings(self):
+        """
+        This function tests that clients take their timeouts and retries from settings.
+
+        args:
+
+        returns:
+        """
+        client = self.registry.get_client("https://a.example/v1", "key")
+        self.assertEqual(client.timeout.connect, 2.0)
+        self.assertEqual(client.timeout.read, 30.0)
+        self.assertEqual(client.max_retries, 1)
+
+    @override_settings(AIMODEL_CLIENT_RETIRE_SECONDS=0)
+    def test_endpoint_change_rebuilds_client(self):
+        """
+        This function tests that changing an AI model's endpoint closes its old client.
+
+        args:
+
+        returns:
+        """
+        aimodel = SimpleNamespace(pk=1, access_endpoint="https://a.example/v1")
+        old_client = self.registry.get_client_for_aimodel(aimodel)
+        self.assertIs(old_client, self.registry.get_client_for_aimodel(aimodel))
+
+        aimodel.access_endpoint = "https://b.example/v1"
+        new_client = self.registry.get_client_for_aimodel(aimodel)
+        self.assertIsNot(new_client, old_client)
+        self.assertTrue(old_client.is_closed())
+        self.assertEqual(self.registry.status()["endpoints"], ["https://b.example/v1"])
+
+    def test_old_client_kept_for_stale_instance(self):
+        """
+        This function tests that an AI model instance loaded before its endpoint changed
+        keeps its client until it has gone unused for the retire period.
+
+        args:
+
+        returns:
+        """
+        stale = SimpleNamespace(pk=1, access_endpoint="https://a.example/v1")
+        current = SimpleNamespace(pk=1, access_endpoint="https://b.example/v1")
+        old_client = self.registry.get_client_for_aimodel(stale)
+        new_client = self.registry.get_client_for_aimodel(current)
+        self.assertIsNot(new_client, old_client)
+        self.assertFalse(old_client.is_closed())
+        self.assertIs(old_client, self.registry.get_client_for_aimodel(stale))
+        self.assertIs(new_client, self.registry.get_client_for_aimodel(current))
+        self.assertFalse(old_client.is_closed())
+
+        with override_settings(AIMODEL_CLIENT_RETIRE_SECONDS=0):
+            self.registry.get_client_for_aimodel(current)
+        self.assertTrue(old_client.is_closed())
+        self.assertFalse(new_client.is_closed())
+
+    def test_shared_client_kept_while_in_use(self):
+        """
+        This function tests that a client still used by another AI model is not closed.
+
+        args:
+
+        returns:
+        """
+        first = SimpleNamespace(pk=1, access_endpoint="https://a.example/v1")
+        second = SimpleNamespace(pk=2, access_endpoint="https://a.example/v1")
+        shared_client = self.registry.get_client_for_aimodel(first)
+        self.registry.get_client_for_aimodel(second)
+
+        first.access_endpoint = "https://b.example/v1"
+        self.registry.get_client_for_aimodel(first)
+        self.assertFalse(shared_client.is_closed())
+        self.assertIs(shared_client, self.registry.get_client_for_aimodel(second))
+
+    def test_async_clients_shared_within_an_event_loop(self):
+        """
+        This function tests that async clients are reused within an event loop, not across loops.
+
+        args:
+
+        returns:
+        """
+
+        async def get_clients():
+            return (
+                self.registry.get_async_client("https://a.example/v1", "key"),
+                self.registry.get_async_client("https://a.example/v1", "key"),
+            )
+
+        first, second = asyncio.run(get_clients())
+        self.assertIs(first, second)
+        other_loop_client, _ = asyncio.run(get_clients())
+        self.assertIsNot(other_loop_client, first)
@@ -0,0 +1,319 @@
+"""This module unit tests coalescing identical in-flight AI model requests.
+
+It has the test cases:
+    RequestCoalescerTest: This ensures concurrent identical requests share one call, and its result or error.
+    SharedFlightLockTest: This ensures processes share a call through a Django cache.
+    AIModelCoalescingTest: This ensures AI model requests are coalesced and the calls saved are reported.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from django.urls import reverse
+
+from project_apps.aimodels import coalescing
+from project_apps.aimodels.coalescing import (
+    RequestCoalescer,
+    SharedFlightLock,
+    get_request_coalescer,
+    make_request_key,
+)
+from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from standard.tests.utils import UserSetupMixin
+
+
+class BlockingCall:
+    """
+    This class is a provider call that blocks until released, counting its calls
+
+    methods:
+        __call__
+    """
+
+    def __init__(self, result="Paris"):
+        self.result = result
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@tag("model")
+class RequestCoalescerTest(SimpleTestCase):
+    """
+    This class tests coalescing within a process
+
+    Attributes:
+
+    methods:
+        setUp
+        call_concurrently
+        test_concurrent_identical_calls_share_one_call
+        test_errors_shared_with_waiting_callers
+        test_different_keys_not_coalesced
+        test_async_calls_share_one_call
+    """
+
+    def setUp(self):
+        self.coalescer = RequestCoalescer()
+
+    def call_concurrently(self, provider_call, callers=4):
+        """
+        This function makes the same call from several threads while the first is in flight.
+
+        args:
+            provider_call: the BlockingCall to share
+            callers: how many threads call
+
+        returns:
+            futures: each caller's future
+        """
+        executor = ThreadPoolExecutor(max_workers=callers)
+        self.addCleanup(executor.shutdown)
+        futures = [executor.submit(self.coalescer.call, "key", provider_call)]
+        provider_call.started.wait(5)
+        futures += [
+            executor.submit(self.coalescer.call, "key", provider_call)
+            for _ in range(callers - 1)
+        ]
+        while self.coalescer.stats()["coalesced"] < callers - 1:
+            threading.Event().wait(0.01)
+        provider_call.release.set()
+        return futures
+
+    def test_concurrent_identical_calls_share_one_call(self):
+        """
+        This function tests that callers arriving mid-call get the first call's result.
+
+        args:
+
+        returns:
+        """
+        provider_call = BlockingCall()
+        futures = self.call_concurrently(provider_call)
+        self.assertEqual([future.result(5) for future in futures], ["Paris"] * 4)
+        self.assertEqual(provider_call.calls, 1)
+        stats = self.coalescer.stats()
+        self.assertEqual((stats["calls"], stats["coalesced"], stats["saved"]), (1, 3, 3))
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_errors_shared_with_waiting_callers(self):
+        """
+        This function tests that a failed call fails every caller waiting on it.
+
+        args:
+
+        returns:
+        """
+        provider_call = BlockingCall(ValueError("provider down"))
+        futures = self.call_concurrently(provider_call, callers=2)
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(5)
+        self.assertEqual(provider_call.calls, 1)
+
+    def test_different_keys_not_coalesced(self):
+        """
+        This function tests that calls made one after another are not shared.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(self.coalescer.call("a", lambda: 1), 1)
+        self.assertEqual(self.coalescer.call("a", lambda: 2), 2)
+        self.assertEqual(self.coalescer.call("b", lambda: 3), 3)
+        self.assertEqual(self.coalescer.stats()["coalesced"], 0)
+
+    def test_async_calls_share_one_call(self):
+        """
+        This function tests that concurrent coroutines share one awaited call.
+
+        args:
+
+        returns:
+        """
+        calls = []
+
+        async def provider_call():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "Paris"
+
+        async def call_together():
+            return await asyncio.gather(
+                *(self.coalescer.acall("key", provider_call) for _ in range(3))
+            )
+
+        self.assertEqual(async_to_sync(call_together)(), ["Paris"] * 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.coalescer.stats()["coalesced"], 2)
+
+
+@tag("model")
+@override_settings(
+    CACHES={"flights": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class SharedFlightLockTest(SimpleTestCase):
+    """
+    This class tests coalescing across processes through a Django cache
+
+    Attributes:
+
+    methods:
+        setUp
+        test_waiting_process_reads_published_result
+        test_abandoned_lock_makes_own_call
+        test_earlier_results_not_reused
+    """
+
+    def setUp(self):
+        self.shared_lock = SharedFlightLock("flights", timeout=2.0, poll_interval=0.01)
+        self.coalescer = RequestCoalescer(self.shared_lock)
+
+    def test_waiting_process_reads_published_result(self):
+        """
+        This function tests that a call in flight elsewhere is waited for, not repeated.
+
+        args:
+
+        returns:
+        """
+        token, _ = self.shared_lock.acquire("key")
+        timer = threading.Timer(
+            0.05,
+            lambda: (
+                self.shared_lock.publish(token, "Paris"),
+                self.shared_lock.release("key", token),
+            ),
+        )
+        timer.start()
+        self.addCleanup(timer.cancel)
+        provider_call = MagicMock(return_value="Madrid")
+        self.assertEqual(self.coalescer.call("key", provider_call), "Paris")
+        provider_call.assert_not_called()
+        self.assertEqual(self.coalescer.stats()["coalesced_across_processes"], 1)
+
+    def test_abandoned_lock_makes_own_call(self):
+        """
+        This function tests that a lock released without a result leads to a new call.
+
+        args:
+
+        returns:
+        """
+        token, _ = self.shared_lock.acquire("key")
+        timer = threading.Timer(0.05, self.shared_lock.release, args=("key", token))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertEqual(self.coalescer.call("key", lambda: "Madrid"), "Madrid")
+        self.assertEqual(self.coalescer.stats()["calls"], 1)
+
+    def test_earlier_results_not_reused(self):
+        """
+        This function tests that a finished call's result is not given to a later call.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(self.coalescer.call("key", lambda: "Paris"), "Paris")
+        self.assertEqual(self.coalescer.call("key", lambda: "Madrid"), "Madrid")
+        self.assertEqual(self.coalescer.stats()["calls"], 2)
+
+
+@tag("model")
+@override_settings(AIMODEL_COALESCE_REQUESTS=True, AIMODEL_COALESCE_CACHE_ALIAS="")
+class AIModelCoalescingTest(UserSetupMixin, TestCase):
+    """
+    This class tests coalescing AI model requests
+
+    Attributes:
+
+    methods:
+        setUp
+        test_request_key_ignores_surrounding_whitespace_only
+        test_concurrent_prompts_share_a_provider_call
+        test_status_reports_calls_saved
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(coalescing, "_request_coalescer", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ai_model = create_ai_model(
+            self.user1,
+            "openai/gpt-oss-20b:free",
+            "Open-weight model",
+            0.0,
+            0.0,
+            "Edge devices and focused tasks.",
+        )
+
+    def test_request_key_ignores_surrounding_whitespace_only(self):
+        """
+        This function tests which prompts count as the same request.
+
+        args:
+
+        returns:
+        """
+        key = make_request_key(self.ai_model, "Capital of France?")
+        self.assertEqual(key, make_request_key(self.ai_model, " Capital of France?\n"))
+        self.assertNotEqual(key, make_request_key(self.ai_model, "Capital of Spain?"))
+        self.assertNotEqual(key, make_request_key(AIModel(name="other"), "Capital of France?"))
+
+    def test_concurrent_prompts_share_a_provider_call(self):
+        """
+        This function tests that identical concurrent prompts make one provider call.
+
+        args:
+
+        returns:
+        """
+        provider_call = BlockingCall()
+        with patch(
+            "project_apps.aimodels.models.AIModel._request_aimodel_response",
+            side_effect=lambda prompt, history: provider_call(),
+        ):
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                first = executor.submit(self.ai_model.get_aimodel_response, "Hi")
+                provider_call.started.wait(5)
+                others = [
+                    executor.submit(self.ai_model.get_aimodel_response, "Hi")
+                    for _ in range(2)
+                ]
+                while get_request_coalescer().stats()["coalesced"] < 2:
+                    threading.Event().wait(0.01)
+                provider_call.release.set()
+                results = [future.result(5) for future in [first, *others]]
+        self.assertEqual(results, ["Paris"] * 3)
+        self.assertEqual(provider_call.calls, 1)
+
+    def test_status_reports_calls_saved(self):
+        """
+        This function tests that the AI model status endpoint reports the counters.
+
+        args:
+
+        returns:
+        """
+        self.client.force_login(self.user1)
+        get_request_coalescer().coalesced = 2
+        response = self.client.get(reverse("noa-aimodel-status"), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["coalescing"]["saved"], 2)
+        self.assertIn("response_cache", response.json())
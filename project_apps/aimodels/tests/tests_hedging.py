@@ -0,0 +1,376 @@
+"""This module unit tests hedging slow AI model requests.
+
+It has the test cases:
+    RequestHedgerTest: This ensures slow or failing requests are hedged and the first answer is used.
+    AIModelHedgingTest: This ensures AI models with a hedge AI model hedge their requests.
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+
+from project_apps.aimodels import hedging, routing
+from project_apps.aimodels.hedging import RequestHedger
+from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.routing import LatencyTracker
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from standard.tests.utils import UserSetupMixin
+
+
+@tag("model")
+class RequestHedgerTest(SimpleTestCase):
+    """
+    This class tests the request hedger
+
+    Attributes:
+
+    methods:
+        setUp
+        request
+        arequest
+        test_fast_request_not_hedged
+        test_slow_request_hedged_and_first_answer_used
+        test_wait_before_provider_call_not_hedged
+        test_failed_request_falls_back_at_once
+        test_first_error_raised_when_both_fail
+        test_delay_from_latency_percentile
+        test_async_loser_cancelled
+    """
+
+    def setUp(self):
+        self.tracker = LatencyTracker()
+        self.hedger = RequestHedger(self.tracker, default_delay=0.05, min_calls=5)
+        self.primary = AIModel(name="primary")
+        self.hedge = AIModel(name="hedge")
+        self.delays = {"primary": 0.0, "hedge": 0.0}
+        self.waits = {"primary": 0.0, "hedge": 0.0}
+        self.errors = {}
+        self.asked = []
+        self.cancelled = []
+
+    def request(self, aimodel, started):
+        """
+        This function stands in for a provider call, after a wait for a rate limit.
+
+        args:
+            aimodel: the AI model asked
+            started: set as the provider call starts
+
+        returns:
+            text: the AI model's name
+        """
+        self.asked.append(aimodel.name)
+        time.sleep(self.waits[aimodel.name])
+        started.set()
+        time.sleep(self.delays[aimodel.name])
+        if aimodel.name in self.errors:
+            raise self.errors[aimodel.name]
+        return aimodel.name
+
+    async def arequest(self, aimodel, started):
+        """
+        This function stands in for an async provider call.
+
+        args:
+            aimodel: the AI model asked
+            started: set as the provider call starts
+
+        returns:
+            text: the AI model's name
+        """
+        self.asked.append(aimodel.name)
+        started.set()
+        try:
+            await asyncio.sleep(self.delays[aimodel.name])
+        except asyncio.CancelledError:
+            self.cancelled.append(aimodel.name)
+            raise
+        return aimodel.name
+
+    def test_fast_request_not_hedged(self):
+        """
+        This function tests that an answer within the delay is not hedged.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(
+            self.hedger.call(self.primary, self.hedge, self.request), "primary"
+        )
+        self.assertEqual(self.asked, ["primary"])
+        self.assertEqual(
+            self.hedger.stats_for(self.primary),
+            {
+                "requests": 1,
+                "hedged": 0,
+                "won": 0,
+                "hedge_rate": 0.0,
+                "win_rate": 0.0,
+            },
+        )
+
+    def test_slow_request_hedged_and_first_answer_used(self):
+        """
+        This function tests that a slow request is hedged and the hedge's answer used.
+
+        args:
+
+        returns:
+        """
+        self.delays["primary"] = 0.5
+        started = time.perf_counter()
+        with self.assertLogs("project_apps.aimodels.hedging", "INFO"):
+            text = self.hedger.call(self.primary, self.hedge, self.request)
+        self.assertEqual(text, "hedge")
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual(self.asked, ["primary", "hedge"])
+        stats = self.hedger.stats_for(self.primary)
+        self.assertEqual((stats["hedge_rate"], stats["win_rate"]), (1.0, 1.0))
+        self.assertEqual(list(self.hedger.status()), [str(self.primary.pk)])
+
+    def test_wait_before_provider_call_not_hedged(self):
+        """
+        This function tests that waiting for a rate limit or a thread does not count
+        towards the delay, as the latencies it is taken from are the provider's.
+
+        args:
+
+        returns:
+        """
+        self.waits["primary"] = 0.3
+        self.assertEqual(
+            self.hedger.call(self.primary, self.hedge, self.request), "primary"
+        )
+        self.assertEqual(self.asked, ["primary"])
+        self.assertEqual(self.hedger.stats_for(self.primary)["hedged"], 0)
+
+    def test_failed_request_falls_back_at_once(self):
+        """
+        This function tests that the hedge AI model is asked as soon as the first fails.
+
+        args:
+
+        returns:
+        """
+        self.hedger.default_delay = 10.0
+        self.errors["primary"] = ConnectionError("down")
+        started = time.perf_counter()
+        with self.assertLogs("project_apps.aimodels.hedging", "INFO") as logs:
+            text = self.hedger.call(self.primary, self.hedge, self.request)
+        self.assertEqual(text, "hedge")
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertIn("it failed", logs.output[0])
+        self.assertEqual(self.hedger.stats_for(self.primary)["won"], 1)
+
+    def test_first_error_raised_when_both_fail(self):
+        """
+        This function tests that the first AI model's error is raised if both fail.
+
+        args:
+
+        returns:
+        """
+        self.errors = {"primary": ConnectionError("down"), "hedge": ValueError("bad")}
+        with self.assertLogs("project_apps.aimodels.hedging", "INFO"):
+            with self.assertRaisesMessage(ConnectionError, "down"):
+                self.hedger.call(self.primary, self.hedge, self.request)
+        stats = self.hedger.stats_for(self.primary)
+        self.assertEqual((stats["hedged"], stats["won"]), (1, 0))
+
+    def test_delay_from_latency_percentile(self):
+        """
+        This function tests that the delay is the latency percentile once measured.
+
+        args:
+
+        returns:
+        """
+        for seconds in (1.0, 2.0, 3.0, 4.0):
+            self.tracker.record(self.primary, seconds)
+        self.assertEqual(self.hedger.get_delay(self.primary), 0.05)
+        self.tracker.record(self.primary, 5.0)
+        self.tracker.record(self.primary, 60.0, failed=True)
+        self.assertAlmostEqual(self.hedger.get_delay(self.primary), 4.8)
+
+    def test_async_loser_cancelled(self):
+        """
+        This function tests that the losing coroutine is cancelled.
+
+        args:
+
+        returns:
+        """
+        self.delays["primary"] = 5.0
+        with self.assertLogs("project_apps.aimodels.hedging", "INFO"):
+            text = async_to_sync(self.hedger.acall)(
+                self.primary, self.hedge, self.arequest
+            )
+        self.assertEqual(text, "hedge")
+        self.assertEqual(self.cancelled, ["primary"])
+        self.assertEqual(self.hedger.stats_for(self.primary)["won"], 1)
+
+
+@tag("model")
+@override_settings(AIMODEL_COALESCE_REQUESTS=False, AIMODEL_HEDGE_DELAY=0.05)
+class AIModelHedgingTest(UserSetupMixin, TestCase):
+    """
+    This class tests AI models with a hedge AI model
+
+    Attributes:
+
+    methods:
+        setUp
+        slow_primary
+        test_slow_model_answered_by_hedge
+        test_hedge_asks_for_its_own_model
+        test_inactive_hedge_not_used
+        test_own_hedge_rejected
+        test_hedge_stats_on_detail_page
+    """
+
+    def setUp(self):
+        super().setUp()
+        for module, name in (
+            (hedging, "_request_hedger"),
+            (routing, "_latency_tracker"),
+        ):
+            patcher = patch.object(module, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.hedge = create_ai_model(
+            self.user1, "hedge", "Hedge", 1.0, 1.0, "General.", "transformer"
+        )
+        self.ai_model = create_ai_model(
+            self.user1, "primary", "Primary", 0.5, 0.5, "General.", "transformer"
+        )
+        self.ai_model.hedge_aimodel = self.hedge
+        self.ai_model.save()
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def slow_primary(self, aimodel, prompt, history=None, call_started=None):
+        """
+        This function answers slowly for the primary AI model only.
+
+        args:
+            aimodel: the AI model asked
+            prompt: the prompt
+            history: the earlier turns
+            call_started: set as the provider call starts
+
+        returns:
+            text: the answer
+        """
+        if call_started is not None:
+            call_started.set()
+        if aimodel.name == "primary":
+            self.release.wait(5)
+        return f"{aimodel.name}: {prompt}"
+
+    def test_slow_model_answered_by_hedge(self):
+        """
+        This function tests that a slow AI model's prompt is answered by its hedge.
+
+        args:
+
+        returns:
+        """
+        with patch.object(
+            AIModel,
+            "_request_aimodel_response",
+            autospec=True,
+            side_effect=self.slow_primary,
+        ):
+            with self.assertLogs("project_apps.aimodels.hedging", "INFO"):
+                self.assertEqual(
+                    self.ai_model.get_response_text("Hi"), ("hedge: Hi", False)
+                )
+        self.assertEqual(self.ai_model.get_hedge_stats()["won"], 1)
+
+    def test_hedge_asks_for_its_own_model(self):
+        """
+        This function tests that a hedge AI model on the same endpoint asks the
+        provider for its own model, not a duplicate of the first request.
+
+        args:
+
+        returns:
+        """
+        for aimodel in (self.ai_model, self.hedge):
+            aimodel.access_mode = AIModel.ACCESS_MODE_OPENAI_API
+            aimodel.save()
+
+        def create(**kwargs):
+            if kwargs["model"] == "primary":
+                self.release.wait(5)
+            response = MagicMock(usage=None)
+            response.choices[0].message.content = kwargs["model"]
+            return response
+
+        client = MagicMock()
+        client.chat.completions.create.side_effect = create
+        with (
+            patch(
+                "project_apps.aimodels.clients.openai_client_registry.get_client_for_aimodel",
+                return_value=client,
+            ),
+            self.assertLogs("project_apps.aimodels.hedging", "INFO"),
+        ):
+            self.assertEqual(self.ai_model.get_response_text("Hi"), ("hedge", False))
+        create_calls = client.chat.completions.create.call_args_list
+        self.assertEqual(
+            [call.kwargs["model"] for call in create_calls], ["primary", "hedge"]
+        )
+
+    def test_inactive_hedge_not_used(self):
+        """
+        This function tests that an inactive hedge AI model is not asked.
+
+        args:
+
+        returns:
+        """
+        self.hedge.is_active = False
+        self.hedge.save()
+        ai_model = AIModel.objects.get(pk=self.ai_model.pk)
+        self.assertIsNone(ai_model.get_hedge_aimodel())
+        self.release.set()
+        with patch.object(
+            AIModel,
+            "_request_aimodel_response",
+            autospec=True,
+            side_effect=self.slow_primary,
+        ):
+            self.assertEqual(ai_model.get_aimodel_response("Hi"), "primary: Hi")
+        self.assertEqual(ai_model.get_hedge_stats()["requests"], 0)
+
+    def test_own_hedge_rejected(self):
+        """
+        This function tests that an AI model cannot be its own hedge AI model.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.hedge_aimodel = self.ai_model
+        with self.assertRaises(ValidationError):
+            self.ai_model.full_clean()
+
+    def test_hedge_stats_on_detail_page(self):
+        """
+        This function tests that the detail page shows the hedge AI model and rates.
+
+        args:
+
+        returns:
+        """
+        self.client.force_login(self.user1)
+        response = self.client.get(self.ai_model.get_absolute_url(), secure=True)
+        self.assertContains(response, "Hedge AI Model")
+        self.assertContains(response, "hedge: 0 of 0 requests hedged (0%)")
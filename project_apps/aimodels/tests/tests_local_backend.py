@@ -0,0 +1,242 @@
+"""This module unit tests the local inference backend against the bundled stub server.
+
+It has the test cases:
+    StubInferenceServerTest: This ensures the stub server loads models and keeps them for their keep_alive.
+    LocalBackendTest: This ensures prompts reuse connections, stream, preload models and report load and generation time.
+    AIModelLocalAccessTest: This ensures AI models with the local access mode answer through the local server.
+"""
+
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+
+from project_apps.aimodels import backends, clients
+from project_apps.aimodels.backends import LocalBackend, OpenAIAPIBackend
+from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.stub_server import StubInferenceServer, parse_keep_alive
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from standard.tests.utils import UserSetupMixin
+
+
+def start_stub_server(test_case, **kwargs):
+    """
+    This function starts a stub model server that stops when the test ends.
+
+    args:
+        test_case: the running test
+        kwargs: the server's load_seconds and word_seconds
+
+    returns:
+        server: the running StubInferenceServer
+    """
+    server = StubInferenceServer(**kwargs).start()
+    test_case.addCleanup(server.stop)
+    return server
+
+
+@tag("model")
+class StubInferenceServerTest(SimpleTestCase):
+    """
+    This class tests the stub model server
+
+    Attributes:
+
+    methods:
+        test_keep_alive_parsed
+        test_model_unloaded_after_keep_alive
+    """
+
+    def test_keep_alive_parsed(self):
+        """
+        This function tests keep_alive values in seconds and durations.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(parse_keep_alive("30m"), 1800.0)
+        self.assertEqual(parse_keep_alive(45), 45.0)
+        self.assertEqual(parse_keep_alive("-1"), float("inf"))
+        self.assertEqual(parse_keep_alive(None), 300.0)
+
+    def test_model_unloaded_after_keep_alive(self):
+        """
+        This function tests that a model with keep_alive 0 does not stay loaded.
+
+        args:
+
+        returns:
+        """
+        server = start_stub_server(self)
+        server.load("small", "5m")
+        server.load("tiny", 0)
+        self.assertEqual(server.loaded_models, ["small"])
+
+
+@tag("model")
+class LocalBackendTest(SimpleTestCase):
+    """
+    This class tests the local backend
+
+    Attributes:
+
+    methods:
+        setUp
+        test_prompts_share_one_connection
+        test_load_time_split_from_generation_time
+        test_stream_yields_pieces_and_records_timings
+        test_async_generate_and_stream
+        test_preload_loads_model_before_first_prompt
+    """
+
+    def setUp(self):
+        self.server = start_stub_server(self, load_seconds=0.05)
+        self.backend = LocalBackend("local", base_url=self.server.url, keep_alive="5m")
+        self.aimodel = AIModel(name="llama3.2", access_endpoint="")
+
+    def test_prompts_share_one_connection(self):
+        """
+        This function tests that prompts reuse a keep-alive connection.
+
+        args:
+
+        returns:
+        """
+        for _ in range(3):
+            text = self.backend.generate(self.aimodel, " Hello ")
+        self.assertEqual(text, "Stub reply to: Hello")
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.backend.status()["servers"], [self.server.url])
+
+    def test_load_time_split_from_generation_time(self):
+        """
+        This function tests that only the first prompt pays the model load.
+
+        args:
+
+        returns:
+        """
+        self.backend.generate(self.aimodel, "Hello")
+        first = self.backend.get_timings("llama3.2")["last"]
+        self.backend.generate(self.aimodel, "Hello again")
+        timings = self.backend.get_timings("llama3.2")
+        self.assertGreaterEqual(first["load_seconds"], 0.05)
+        self.assertLess(timings["last"]["load_seconds"], 0.05)
+        self.assertEqual(timings["calls"], 2)
+        self.assertEqual(timings["last"]["output_tokens"], 5)
+        self.assertGreaterEqual(timings["last"]["total_seconds"], 0.0)
+
+    def test_stream_yields_pieces_and_records_timings(self):
+        """
+        This function tests that a streamed reply arrives word by word.
+
+        args:
+
+        returns:
+        """
+        pieces = list(self.backend.stream(self.aimodel, "Hello there"))
+        self.assertEqual(pieces, ["Stub", " reply", " to:", " Hello", " there"])
+        self.assertEqual(self.backend.get_timings("llama3.2")["calls"], 1)
+        self.assertEqual(self.server.loaded_models, ["llama3.2"])
+
+    def test_async_generate_and_stream(self):
+        """
+        This function tests the async calls against the same server.
+
+        args:
+
+        returns:
+        """
+
+        async def call():
+            text = await self.backend.agenerate(self.aimodel, "Hello")
+            pieces = [piece async for piece in self.backend.astream(self.aimodel, "Hi")]
+            return text, "".join(pieces)
+
+        self.assertEqual(
+            async_to_sync(call)(), ("Stub reply to: Hello", "Stub reply to: Hi")
+        )
+        self.assertEqual(self.backend.get_timings("llama3.2")["calls"], 2)
+
+    def test_preload_loads_model_before_first_prompt(self):
+        """
+        This function tests that a preloaded model's first prompt has no load time.
+
+        args:
+
+        returns:
+        """
+        self.assertGreaterEqual(self.backend.preload("llama3.2")["load_seconds"], 0.05)
+        self.assertEqual(self.server.loaded_models, ["llama3.2"])
+        self.backend.generate(self.aimodel, "Hello")
+        self.assertLess(
+            self.backend.get_timings("llama3.2")["last"]["load_seconds"], 0.05
+        )
+
+
+@tag("model")
+@override_settings(AIMODEL_COALESCE_REQUESTS=False)
+class AIModelLocalAccessTest(UserSetupMixin, TestCase):
+    """
+    This class tests AI models served by a local model server
+
+    Attributes:
+
+    methods:
+        setUp
+        test_local_model_answers_and_streams
+        test_openai_compatible_server_answers
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(backends, "_backend_registry", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(clients.openai_client_registry.clear)
+        self.server = start_stub_server(self)
+        self.ai_model = create_ai_model(
+            self.user1,
+            "llama3.2",
+            "Local model",
+            0.0,
+            0.0,
+            "Private prompts.",
+            access_mode=AIModel.ACCESS_MODE_LOCAL,
+            access_endpoint=self.server.url,
+        )
+
+    def test_local_model_answers_and_streams(self):
+        """
+        This function tests that a local AI model answers from its access endpoint.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(
+            self.ai_model.get_response_text("Hello"), ("Stub reply to: Hello", False)
+        )
+        self.assertEqual(
+            "".join(self.ai_model.stream_aimodel_response("Hello")),
+            "Stub reply to: Hello",
+        )
+        self.assertEqual(
+            self.ai_model.get_backend().status()["models"]["llama3.2"]["calls"], 2
+        )
+
+    def test_openai_compatible_server_answers(self):
+        """
+        This function tests the OpenAI API backend against the stub's /v1 API.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.access_mode = AIModel.ACCESS_MODE_OPENAI_API
+        self.ai_model.access_endpoint = f"{self.server.url}/v1"
+        response = OpenAIAPIBackend("openai_api").generate(self.ai_model, "Hello")
+        self.assertEqual(response.choices[0].message.content, "Stub reply to: Hello")
+        self.assertEqual(response.usage.prompt_tokens, 1)
@@ -5,6 +5,8 @@ It has the test cases:
     ModelModelValidationTest: This ensures that a Model model is validated as required. Also enforces some model best practice (e.g. get_absolute_url).
     ModelItemModelCRUDTest: This ensures that basic CRUD actions can be taken on the ModelItem model.
     ModelItemModelValidationTest: This ensures that a ModelItem model is validated as required. Also enforces some model best practice (e.g. get_absolute_url).
+    AIModelAsyncResponseTest: This ensures AI model responses can be awaited without blocking.
+    AIModelStreamResponseTest: This ensures AI model responses can be streamed as they are generated.
 
 There are also 3 helper functions that are used by these tests but can also be imported into other tests.
     create_model
@@ -28,6 +30,9 @@ There are also 3 helper functions that are used by these tests but can also be i
 """
 
 from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from asgiref.sync import async_to_sync
 
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
@@ -487,3 +492,127 @@ class AIModelModelCRUDTest(UserSetupMixin, TestCase):
             ai_response.choices[0].message.content,
             "The response from the AI model did not contain the expected text.",
         )
+
+
+@tag("model")
+class AIModelAsyncResponseTest(UserSetupMixin, TestCase):
+    """
+    This class tests getting responses from AI models asynchronously
+
+    Attributes:
+
+    methods:
+        setUp
+        test_openai_api_awaits_shared_async_client
+        test_other_access_modes_answered_in_a_thread
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.ai_model = create_ai_model(
+            self.user1,
+            "openai/gpt-oss-20b:free",
+            "Open-weight model",
+            0.0,
+            0.0,
+            "Edge devices and focused tasks.",
+        )
+
+    def test_openai_api_awaits_shared_async_client(self):
+        """
+        This function tests that OpenAI API models are called with the shared async client.
+
+        args:
+
+        returns:
+        """
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value="Paris")
+        with patch(
+            "project_apps.aimodels.clients.openai_client_registry.get_async_client_for_aimodel",
+            return_value=client,
+        ) as get_client:
+            response = async_to_sync(self.ai_model.aget_aimodel_response)(
+                " What is the capital of France? "
+            )
+        self.assertEqual(response, "Paris")
+        get_client.assert_called_once_with(self.ai_model)
+        self.assertEqual(
+            client.chat.completions.create.await_args.kwargs["messages"],
+            [{"role": "user", "content": "What is the capital of France?"}],
+        )
+
+    def test_other_access_modes_answered_in_a_thread(self):
+        """
+        This function tests that other access modes give the same answer as the sync call.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.access_mode = AIModel.ACCESS_MODE_TRANSFORMER
+        response = async_to_sync(self.ai_model.aget_aimodel_response)("Hello")
+        self.assertEqual(response, self.ai_model.get_aimodel_response("Hello"))
+
+
+@tag("model")
+class AIModelStreamResponseTest(UserSetupMixin, TestCase):
+    """
+    This class tests streaming responses from AI models
+
+    Attributes:
+
+    methods:
+        setUp
+        test_openai_api_streams_content_deltas
+        test_other_access_modes_stream_whole_response
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.ai_model = create_ai_model(
+            self.user1,
+            "openai/gpt-oss-20b:free",
+            "Open-weight model",
+            0.0,
+            0.0,
+            "Edge devices and focused tasks.",
+        )
+
+    def test_openai_api_streams_content_deltas(self):
+        """
+        This function tests that the text of each streamed chunk is yielded, skipping empty ones.
+
+        args:
+
+        returns:
+        """
+        chunks = []
+        for content in ("Paris", None, " is the capital."):
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = content
+            chunks.append(chunk)
+        client = MagicMock()
+        stream = client.chat.completions.create.return_value.__enter__.return_value
+        stream.__iter__.return_value = iter(chunks)
+        with patch(
+            "project_apps.aimodels.clients.openai_client_registry.get_client_for_aimodel",
+            return_value=client,
+        ):
+            pieces = list(self.ai_model.stream_aimodel_response("Capital of France?"))
+        self.assertEqual(pieces, ["Paris", " is the capital."])
+        self.assertTrue(client.chat.completions.create.call_args.kwargs["stream"])
+
+    def test_other_access_modes_stream_whole_response(self):
+        """
+        This function tests that modes without streaming give their response in one piece.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.access_mode = AIModel.ACCESS_MODE_TRANSFORMER
+        self.assertEqual(
+            list(self.ai_model.stream_aimodel_response("Hello")),
+            [self.ai_model.get_aimodel_response("Hello")],
+        )
@@ -0,0 +1,274 @@
+"""This module unit tests the AI model concurrency and rate limits.
+
+It has the test cases:
+    RateLimiterTest: This ensures requests queue for their limits, and give up after the maximum wait.
+    AIModelRateLimitTest: This ensures AI models keep to their limits and show their queue waits.
+    RateLimitCacheCheckTest: This ensures a rate limit cache private to each process is warned of.
+"""
+
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from django.urls import reverse
+
+from project_apps.aimodels import ratelimits, routing
+from project_apps.aimodels.checks import check_rate_limit_cache
+from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.ratelimits import RateLimiter, RateLimitExceededError
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from project_apps.chats.tests.tests_models import create_conversation_thread
+from standard.tests.utils import UserSetupMixin
+
+
+@tag("model")
+class RateLimiterTest(SimpleTestCase):
+    """
+    This class tests the rate limiter
+
+    Attributes:
+
+    methods:
+        setUp
+        test_concurrency_slot_held_until_released
+        test_requests_per_minute_rejected_with_retry_after
+        test_tokens_corrected_from_usage
+        test_waiting_request_served_when_slot_freed
+        test_async_acquire_waits_without_blocking
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        self.limiter = RateLimiter(max_wait=0.2, poll_interval=0.02)
+        self.aimodel = AIModel(name="limited")
+
+    def test_concurrency_slot_held_until_released(self):
+        """
+        This function tests that a request waits for a concurrency slot.
+
+        args:
+
+        returns:
+        """
+        self.aimodel.max_concurrent_requests = 1
+        lease = self.limiter.acquire(self.aimodel, 10)
+        with self.assertLogs("project_apps.aimodels.ratelimits", "WARNING"):
+            with self.assertRaises(RateLimitExceededError) as raised:
+                self.limiter.acquire(self.aimodel, 10)
+        self.assertEqual(raised.exception.reason, "concurrency")
+        self.assertEqual(raised.exception.status_code, 429)
+        self.limiter.release(lease)
+        self.limiter.release(self.limiter.acquire(self.aimodel, 10))
+
+    def test_requests_per_minute_rejected_with_retry_after(self):
+        """
+        This function tests that requests beyond the minute's allowance are rejected.
+
+        args:
+
+        returns:
+        """
+        self.aimodel.requests_per_minute = 2
+        for _ in range(2):
+            self.limiter.release(self.limiter.acquire(self.aimodel, 10))
+        with self.assertLogs("project_apps.aimodels.ratelimits", "WARNING"):
+            with self.assertRaises(RateLimitExceededError) as raised:
+                self.limiter.acquire(self.aimodel, 10)
+        self.assertEqual(raised.exception.reason, "requests per minute")
+        self.assertTrue(55 <= raised.exception.retry_after <= 60)
+        stats = self.limiter.stats_for(self.aimodel)
+        self.assertEqual((stats["requests"], stats["rejected"]), (3, 1))
+
+    def test_tokens_corrected_from_usage(self):
+        """
+        This function tests that the tokens a provider reports replace the estimate.
+
+        args:
+
+        returns:
+        """
+        self.aimodel.tokens_per_minute = 100
+        self.limiter.release(self.limiter.acquire(self.aimodel, 80), used_tokens=30)
+        lease = self.limiter.acquire(self.aimodel, 60)
+        with self.assertLogs("project_apps.aimodels.ratelimits", "WARNING"):
+            with self.assertRaises(RateLimitExceededError) as raised:
+                self.limiter.acquire(self.aimodel, 20)
+        self.assertEqual(raised.exception.reason, "tokens per minute")
+        self.assertEqual(lease.tokens, 60)
+
+    def test_waiting_request_served_when_slot_freed(self):
+        """
+        This function tests that a queued request starts once a slot is freed.
+
+        args:
+
+        returns:
+        """
+        self.aimodel.max_concurrent_requests = 1
+        self.limiter.max_wait = 5.0
+        lease = self.limiter.acquire(self.aimodel, 10)
+        timer = threading.Timer(0.2, self.limiter.release, [lease])
+        timer.start()
+        self.addCleanup(timer.cancel)
+        with self.assertLogs("project_apps.aimodels.ratelimits", "INFO"):
+            waited = self.limiter.acquire(self.aimodel, 10)
+        self.assertGreaterEqual(waited.queue_seconds, 0.15)
+        stats = self.limiter.stats_for(self.aimodel)
+        self.assertEqual((stats["requests"], stats["waited"]), (2, 1))
+        self.assertGreaterEqual(stats["queue_wait_p95"], 0.15)
+        self.assertEqual(list(self.limiter.status()), [str(self.aimodel.pk)])
+
+    def test_async_acquire_waits_without_blocking(self):
+        """
+        This function tests that a coroutine queues for a slot as a thread does.
+
+        args:
+
+        returns:
+        """
+        self.aimodel.max_concurrent_requests = 1
+        self.limiter.max_wait = 5.0
+        lease = self.limiter.acquire(self.aimodel, 10)
+        timer = threading.Timer(0.2, self.limiter.release, [lease])
+        timer.start()
+        self.addCleanup(timer.cancel)
+        with self.assertLogs("project_apps.aimodels.ratelimits", "INFO"):
+            waited = async_to_sync(self.limiter.aacquire)(self.aimodel, 10)
+        self.assertGreaterEqual(waited.queue_seconds, 0.15)
+
+
+@tag("model")
+@override_settings(AIMODEL_COALESCE_REQUESTS=False, AIMODEL_RATE_LIMIT_MAX_WAIT=0.1)
+class AIModelRateLimitTest(UserSetupMixin, TestCase):
+    """
+    This class tests AI models with rate limits
+
+    Attributes:
+
+    methods:
+        setUp
+        test_request_beyond_limit_rejected_before_backend
+        test_send_prompt_answers_too_many_requests
+        test_queue_wait_and_latency_on_detail_page
+    """
+
+    def setUp(self):
+        super().setUp()
+        for module, name in (
+            (ratelimits, "_rate_limiter"),
+            (routing, "_latency_tracker"),
+        ):
+            patcher = patch.object(module, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        self.ai_model = create_ai_model(
+            self.user1, "limited", "Limited", 0.1, 0.1, "General.", "transformer"
+        )
+        self.ai_model.requests_per_minute = 1
+        self.ai_model.save()
+
+    def test_request_beyond_limit_rejected_before_backend(self):
+        """
+        This function tests that a request beyond the limit is not sent.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(
+            self.ai_model.get_aimodel_response("Hi"),
+            "Response from OpenRouter for prompt: Hi",
+        )
+        with self.assertLogs("project_apps.aimodels.ratelimits", "WARNING"):
+            with self.assertRaises(RateLimitExceededError):
+                self.ai_model.get_aimodel_response("Hello")
+            with self.assertRaises(RateLimitExceededError):
+                list(self.ai_model.stream_aimodel_response("Hello"))
+        self.assertEqual(self.ai_model.get_latency_stats()["calls"], 1)
+
+    def test_send_prompt_answers_too_many_requests(self):
+        """
+        This function tests that the chat page answers 429 when the limit is reached.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.get_aimodel_response("Hi")
+        conversation_thread = create_conversation_thread(
+            self.user1, "Limited", "", "web", self.ai_model
+        )
+        self.client.force_login(self.user1)
+        with self.assertLogs("project_apps.aimodels.ratelimits", "WARNING"):
+            response = self.client.post(
+                reverse("send_prompt_with_id", args=[conversation_thread.id]),
+                {"prompt": "Hello"},
+                secure=True,
+            )
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response["Retry-After"]) <= 60)
+        self.assertContains(response, "The AI model is unavailable.", status_code=429)
+
+    def test_queue_wait_and_latency_on_detail_page(self):
+        """
+        This function tests that the detail page shows queue waits and latency apart.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.get_aimodel_response("Hi")
+        self.client.force_login(self.user1)
+        response = self.client.get(self.ai_model.get_absolute_url(), secure=True)
+        self.assertContains(
+            response,
+            "Any concurrent, 1 requests and any tokens per minute: "
+            "0 of 1 requests queued, 0 rejected",
+        )
+        self.assertContains(response, "over 1 calls")
+
+
+@tag("model")
+class RateLimitCacheCheckTest(SimpleTestCase):
+    """
+    This class tests the system check on the rate limit cache
+
+    Attributes:
+
+    methods:
+        test_shared_cache_passes
+        test_process_local_cache_warned
+    """
+
+    def test_shared_cache_passes(self):
+        """
+        This function tests that the default shared cache raises no warning.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(check_rate_limit_cache(), [])
+
+    @override_settings(AIMODEL_RATE_LIMIT_CACHE_ALIAS="default")
+    def test_process_local_cache_warned(self):
+        """
+        This function tests that a memory cache kept in each process is warned of,
+        and an unknown alias is an error.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(
+            [message.id for message in check_rate_limit_cache()], ["aimodels.W001"]
+        )
+        with override_settings(AIMODEL_RATE_LIMIT_CACHE_ALIAS="missing"):
+            self.assertEqual(
+                [message.id for message in check_rate_limit_cache()], ["aimodels.E001"]
+            )
@@ -0,0 +1,392 @@
+"""This module unit tests the latency- and cost-aware AI model router.
+
+It has the test cases:
+    LatencyTrackerTest: This ensures latency percentiles and error rates are kept over a rolling window.
+    ModelRouterTest: This ensures each policy picks the expected AI model, within token limits and use cases.
+    NOAEndpointRoutingTest: This ensures the NOA endpoint answers with the AI model the router chooses.
+"""
+
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings, tag
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from project_apps.aimodels import routing
+from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.routing import (
+    LatencyTracker,
+    ModelRouter,
+    estimate_tokens,
+    get_latency_tracker,
+)
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from standard.tests.utils import UserSetupMixin
+
+
+def create_routable_model(name, cost, max_tokens=4096, best_use_cases=""):
+    """
+    This function creates an unsaved AI model for routing.
+
+    args:
+        name: the AI model's name
+        cost: its cost per 1M input and output tokens
+        max_tokens: its context size
+        best_use_cases: what it is good at
+
+    returns:
+        aimodel: the AIModel instance
+    """
+    return AIModel(
+        name=name,
+        token_cost_per_1M_input=Decimal(cost),
+        token_cost_per_1M_output=Decimal(cost),
+        max_tokens=max_tokens,
+        best_use_cases=best_use_cases,
+    )
+
+
+@tag("model")
+class LatencyTrackerTest(SimpleTestCase):
+    """
+    This class tests the rolling latency tracker
+
+    Attributes:
+
+    methods:
+        test_percentiles_and_error_rate
+        test_only_latest_calls_kept
+    """
+
+    def test_percentiles_and_error_rate(self):
+        """
+        This function tests p50, p95 and the error rate, ignoring failed calls' times.
+
+        args:
+
+        returns:
+        """
+        tracker = LatencyTracker()
+        aimodel = create_routable_model("a", 1)
+        self.assertEqual(
+            tracker.summary(aimodel),
+            {"calls": 0, "p50": None, "p95": None, "error_rate": 0.0},
+        )
+        for seconds in range(1, 21):
+            tracker.record(aimodel, float(seconds))
+        tracker.record(aimodel, 99.0, failed=True)
+        summary = tracker.summary(aimodel)
+        self.assertEqual(summary["calls"], 21)
+        self.assertEqual(summary["p50"], 10.5)
+        self.assertEqual(summary["p95"], 19.05)
+        self.assertEqual(summary["error_rate"], round(1 / 21, 3))
+        self.assertEqual(list(tracker.status()), [str(aimodel.pk)])
+
+    def test_only_latest_calls_kept(self):
+        """
+        This function tests that calls older than the window are forgotten.
+
+        args:
+
+        returns:
+        """
+        tracker = LatencyTracker(window=3)
+        aimodel = create_routable_model("a", 1)
+        for seconds in (100.0, 1.0, 1.0, 1.0):
+            tracker.record(aimodel, seconds)
+        self.assertEqual(tracker.summary(aimodel)["p95"], 1.0)
+
+
+@tag("model")
+class ModelRouterTest(SimpleTestCase):
+    """
+    This class tests the routing policies
+
+    Attributes:
+
+    methods:
+        setUp
+        make_router
+        test_cheapest_meeting_slo_chosen
+        test_fastest_chosen_when_none_meet_slo
+        test_fastest_policy_uses_p50
+        test_balanced_trades_cost_against_latency
+        test_models_too_small_for_prompt_skipped
+        test_failing_models_avoided
+        test_use_case_preferred
+        test_fixed_policy_and_no_fit_use_default
+        test_decision_logged
+        test_unknown_policy_rejected
+    """
+
+    def setUp(self):
+        self.tracker = LatencyTracker()
+        self.cheap_slow = create_routable_model("cheap-slow", "0.1")
+        self.mid = create_routable_model("mid", "1")
+        self.dear_fast = create_routable_model("dear-fast", "10")
+        for aimodel, seconds in (
+            (self.cheap_slow, 20.0),
+            (self.mid, 4.0),
+            (self.dear_fast, 1.0),
+        ):
+            for _ in range(10):
+                self.tracker.record(aimodel, seconds)
+        self.aimodels = [self.cheap_slow, self.mid, self.dear_fast]
+
+    def make_router(self, policy, **kwargs):
+        """
+        This function creates a router over the test's tracker.
+
+        args:
+            policy: the routing policy
+            kwargs: other router settings
+
+        returns:
+            router: the ModelRouter
+        """
+        return ModelRouter(self.tracker, policy=policy, slo_p95_seconds=5.0, **kwargs)
+
+    def test_cheapest_meeting_slo_chosen(self):
+        """
+        This function tests that the cheapest model within the SLO is chosen.
+
+        args:
+
+        returns:
+        """
+        decision = self.make_router("cheapest").choose("Hi", self.aimodels)
+        self.assertIs(decision.aimodel, self.mid)
+        self.assertEqual(len(decision.candidates), 3)
+
+    def test_fastest_chosen_when_none_meet_slo(self):
+        """
+        This function tests the cheapest policy's fallback when no model meets the SLO.
+
+        args:
+
+        returns:
+        """
+        router = self.make_router("cheapest")
+        router.slo_p95_seconds = 0.5
+        decision = router.choose("Hi", self.aimodels)
+        self.assertIs(decision.aimodel, self.dear_fast)
+        self.assertIn("none meets the SLO", decision.reason)
+
+    def test_fastest_policy_uses_p50(self):
+        """
+        This function tests that the fastest policy picks the lowest p50.
+
+        args:
+
+        returns:
+        """
+        self.assertIs(
+            self.make_router("fastest").choose("Hi", self.aimodels).aimodel,
+            self.dear_fast,
+        )
+
+    def test_balanced_trades_cost_against_latency(self):
+        """
+        This function tests that balanced avoids both the slowest and the dearest.
+
+        args:
+
+        returns:
+        """
+        self.assertIs(
+            self.make_router("balanced").choose("Hi", self.aimodels).aimodel, self.mid
+        )
+
+    def test_models_too_small_for_prompt_skipped(self):
+        """
+        This function tests that a model too small for the prompt is skipped.
+
+        args:
+
+        returns:
+        """
+        self.mid.max_tokens = 600
+        prompt = "word " * 400
+        self.assertGreater(estimate_tokens(prompt) + 512, 600)
+        decision = self.make_router("cheapest").choose(prompt, self.aimodels)
+        self.assertIs(decision.aimodel, self.dear_fast)
+
+    def test_failing_models_avoided(self):
+        """
+        This function tests that models failing above the error rate limit are avoided.
+
+        args:
+
+        returns:
+        """
+        for _ in range(20):
+            self.tracker.record(self.mid, 4.0, failed=True)
+        decision = self.make_router("cheapest").choose("Hi", self.aimodels)
+        self.assertIs(decision.aimodel, self.dear_fast)
+
+    def test_use_case_preferred(self):
+        """
+        This function tests that models suited to the use case are preferred.
+
+        args:
+
+        returns:
+        """
+        self.dear_fast.best_use_cases = "Coding, debugging and code review."
+        decision = self.make_router("cheapest").choose(
+            "Hi", self.aimodels, use_case="debugging"
+        )
+        self.assertIs(decision.aimodel, self.dear_fast)
+
+    def test_fixed_policy_and_no_fit_use_default(self):
+        """
+        This function tests that the default model is used by fixed, and when none fit.
+
+        args:
+
+        returns:
+        """
+        decision = self.make_router("fixed").choose(
+            "Hi", self.aimodels, default_name="cheap-slow"
+        )
+        self.assertIs(decision.aimodel, self.cheap_slow)
+        decision = self.make_router("cheapest", output_tokens=10000).choose(
+            "Hi", self.aimodels, default_name="cheap-slow"
+        )
+        self.assertIs(decision.aimodel, self.cheap_slow)
+        self.assertEqual(decision.reason, "no AI model fits")
+
+    def test_decision_logged(self):
+        """
+        This function tests that each decision is logged with the candidates' figures.
+
+        args:
+
+        returns:
+        """
+        with self.assertLogs("project_apps.aimodels.routing", "INFO") as logs:
+            self.make_router("cheapest").choose("Hi", self.aimodels)
+        self.assertIn('"chosen": "mid"', logs.output[0])
+        self.assertIn('"p95": 20.0', logs.output[0])
+        self.assertIn('"cost": ', logs.output[0])
+
+    def test_unknown_policy_rejected(self):
+        """
+        This function tests that an unknown policy is an error.
+
+        args:
+
+        returns:
+        """
+        with self.assertRaises(ValueError):
+            ModelRouter(self.tracker, policy="random")
+
+
+@tag("model")
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    AIMODEL_ROUTER_POLICY="cheapest",
+    AIMODEL_COALESCE_REQUESTS=False,
+)
+class NOAEndpointRoutingTest(UserSetupMixin, APITestCase):
+    """
+    This class tests routing the NOA endpoint's prompts
+
+    Attributes:
+
+    methods:
+        setUp
+        test_cheapest_active_model_answers
+        test_routed_model_named_in_request
+        test_provider_latency_recorded
+    """
+
+    def setUp(self):
+        super().setUp()
+        for name in ("_latency_tracker", "_model_router"):
+            patcher = patch.object(routing, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.default = create_ai_model(
+            self.user1, "openai/gpt-oss-20b:free", "Default", 2.0, 2.0, "General."
+        )
+        self.cheap = create_ai_model(self.user1, "cheap", "Cheap", 0.5, 0.5, "General.")
+        inactive = create_ai_model(
+            self.user1, "inactive", "Inactive", 0.0, 0.0, "General."
+        )
+        inactive.is_active = False
+        inactive.save()
+
+    def test_cheapest_active_model_answers(self):
+        """
+        This function tests that the cheapest active model is asked.
+
+        args:
+
+        returns:
+        """
+        with patch.object(
+            AIModel, "get_response_text", autospec=True, return_value=("Paris", False)
+        ) as get_response_text:
+            response = self.client.post(
+                reverse("noa-mm-endpoint"),
+                {
+                    "prompt": "What's the capital of France?",
+                    "location": "Liverpool, United Kingdom",
+                    "time": "2025-07-02 11:29:48.054846",
+                },
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_response_text.call_args.args[0], self.cheap)
+
+    def test_routed_model_named_in_request(self):
+        """
+        This function tests that the provider is asked for the AI model routed to, so
+        rows on the same endpoint send different models.
+
+        args:
+
+        returns:
+        """
+        client = MagicMock()
+        client.chat.completions.create.return_value.choices[0].message.content = "Paris"
+        client.chat.completions.create.return_value.usage = None
+        data = {
+            "prompt": "What's the capital of France?",
+            "location": "Liverpool, United Kingdom",
+            "time": "2025-07-02 11:29:48.054846",
+        }
+        with patch(
+            "project_apps.aimodels.clients.openai_client_registry.get_client_for_aimodel",
+            return_value=client,
+        ):
+            self.client.post(reverse("noa-mm-endpoint"), data, format="multipart")
+            routing._model_router = None
+            with override_settings(AIMODEL_ROUTER_POLICY="fixed"):
+                self.client.post(reverse("noa-mm-endpoint"), data, format="multipart")
+        create = client.chat.completions.create
+        self.assertEqual(
+            [call.kwargs["model"] for call in create.call_args_list],
+            ["cheap", "openai/gpt-oss-20b:free"],
+        )
+
+    def test_provider_latency_recorded(self):
+        """
+        This function tests that each provider call's latency is recorded.
+
+        args:
+
+        returns:
+        """
+        self.cheap.access_mode = AIModel.ACCESS_MODE_TRANSFORMER
+        self.cheap.get_aimodel_response("Hello")
+        self.assertEqual(get_latency_tracker().summary(self.cheap)["calls"], 1)
+        self.client.force_login(self.user1)
+        response = self.client.get(reverse("noa-aimodel-status"))
+        self.assertEqual(response.data["routing"]["policy"], "cheapest")
+        self.assertEqual(
+            response.data["routing"]["latency"][str(self.cheap.pk)]["calls"], 1
+        )
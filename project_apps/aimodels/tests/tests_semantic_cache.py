@@ -0,0 +1,376 @@
+"""This module unit tests the semantic response cache.
+
+It has the test cases:
+    HashingEmbedderTest: This ensures prompts are embedded as unit vectors that are close for paraphrases.
+    SemanticIndexTest: This ensures the index finds similar entries, searches large indexes through its hash tables, and evicts.
+    SemanticResponseCacheTest: This ensures responses are kept per AI model and dropped when a model changes.
+    AIModelSemanticCacheTest: This ensures AI models with a threshold answer paraphrased prompts from the cache.
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, tag
+
+from project_apps.aimodels import caching, semantic_cache
+from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.semantic_cache import (
+    HashingEmbedder,
+    SemanticIndex,
+    SemanticResponseCache,
+    get_semantic_cache,
+)
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from standard.tests.utils import UserSetupMixin
+
+
+def random_unit_vectors(count, dimensions=64, seed=0):
+    """
+    This function creates random unit vectors.
+
+    args:
+        count: how many vectors
+        dimensions: their length
+        seed: seeds the generator
+
+    returns:
+        vectors: a float32 array with one vector per row
+    """
+    vectors = (
+        np.random.default_rng(seed)
+        .standard_normal((count, dimensions))
+        .astype(np.float32)
+    )
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@tag("model")
+class HashingEmbedderTest(SimpleTestCase):
+    """
+    This class tests the hashing prompt embedder
+
+    Attributes:
+
+    methods:
+        setUp
+        test_embeddings_are_unit_vectors
+        test_paraphrases_closer_than_unrelated_prompts
+        test_prompt_without_words_embeds_to_zeros
+    """
+
+    def setUp(self):
+        self.embedder = HashingEmbedder(dimensions=256)
+
+    def test_embeddings_are_unit_vectors(self):
+        """
+        This function tests that embeddings have unit length and are repeatable.
+
+        args:
+
+        returns:
+        """
+        vector = self.embedder.embed("What's the capital of France?")
+        self.assertEqual(vector.shape, (256,))
+        self.assertEqual(vector.dtype, np.float32)
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+        np.testing.assert_array_equal(
+            vector, self.embedder.embed("what's the capital of  FRANCE?")
+        )
+
+    def test_paraphrases_closer_than_unrelated_prompts(self):
+        """
+        This function tests that a paraphrase scores well above an unrelated prompt.
+
+        args:
+
+        returns:
+        """
+        prompt = self.embedder.embed("What's the capital of France?")
+        paraphrase = self.embedder.embed("what is the capital city of France")
+        unrelated = self.embedder.embed("How long should bread dough rise?")
+        self.assertGreater(float(prompt @ paraphrase), 0.6)
+        self.assertLess(float(prompt @ unrelated), 0.3)
+
+    def test_prompt_without_words_embeds_to_zeros(self):
+        """
+        This function tests that a prompt of only punctuation has no features.
+
+        args:
+
+        returns:
+        """
+        self.assertFalse(self.embedder.embed(" ?! ").any())
+
+
+@tag("model")
+class SemanticIndexTest(SimpleTestCase):
+    """
+    This class tests the NumPy vector index
+
+    Attributes:
+
+    methods:
+        test_most_similar_entry_above_threshold_found
+        test_expired_entries_not_found
+        test_least_recently_used_evicted_when_full
+        test_large_index_searched_through_hash_tables
+        test_reused_rows_rehashed
+    """
+
+    def test_most_similar_entry_above_threshold_found(self):
+        """
+        This function tests exhaustive search against the threshold.
+
+        args:
+
+        returns:
+        """
+        vectors = random_unit_vectors(3)
+        index = SemanticIndex(64, 10)
+        for number, vector in enumerate(vectors):
+            index.add(vector, f"response {number}", 60.0)
+        query = vectors[1] + 0.1 * vectors[2]
+        query /= np.linalg.norm(query)
+        self.assertEqual(index.search(query, 0.9), "response 1")
+        self.assertIsNone(index.search(random_unit_vectors(1, seed=1)[0], 0.9))
+
+    def test_expired_entries_not_found(self):
+        """
+        This function tests that entries past their TTL are not returned.
+
+        args:
+
+        returns:
+        """
+        vector = random_unit_vectors(1)[0]
+        index = SemanticIndex(64, 10)
+        index.add(vector, "old", -1.0)
+        self.assertIsNone(index.search(vector, 0.9))
+
+    def test_least_recently_used_evicted_when_full(self):
+        """
+        This function tests that a full index drops the least recently used entry.
+
+        args:
+
+        returns:
+        """
+        vectors = random_unit_vectors(4)
+        index = SemanticIndex(64, 3)
+        for number, vector in enumerate(vectors[:3]):
+            index.add(vector, f"response {number}", 60.0)
+        index.search(vectors[0], 0.99)
+        index.add(vectors[3], "response 3", 60.0)
+        self.assertEqual(index.size, 3)
+        self.assertEqual(index.evictions, 1)
+        self.assertEqual(index.search(vectors[0], 0.99), "response 0")
+        self.assertIsNone(index.search(vectors[1], 0.99))
+        self.assertEqual(index.search(vectors[3], 0.99), "response 3")
+
+    def test_large_index_searched_through_hash_tables(self):
+        """
+        This function tests that past the exhaustive limit only hashed candidates are scored.
+
+        args:
+
+        returns:
+        """
+        vectors = random_unit_vectors(200)
+        index = SemanticIndex(64, 500, exact_search_limit=50, tables=8, bits=6)
+        for number, vector in enumerate(vectors):
+            index.add(vector, f"response {number}", 60.0)
+        for number in (0, 120, 199):
+            self.assertLess(len(index._get_candidates(vectors[number])), 200)
+            self.assertEqual(index.search(vectors[number], 0.99), f"response {number}")
+
+    def test_reused_rows_rehashed(self):
+        """
+        This function tests that a row reused after eviction is found by its new vector.
+
+        args:
+
+        returns:
+        """
+        vectors = random_unit_vectors(30)
+        index = SemanticIndex(64, 20, exact_search_limit=5, tables=4, bits=4)
+        for number, vector in enumerate(vectors):
+            index.add(vector, f"response {number}", 60.0)
+        self.assertEqual(index.size, 20)
+        self.assertEqual(index.search(vectors[29], 0.99), "response 29")
+        bucket_rows = sum(
+            len(rows) for buckets in index._buckets for rows in buckets.values()
+        )
+        self.assertEqual(bucket_rows, 4 * index._rows)
+
+
+@tag("model")
+class SemanticResponseCacheTest(SimpleTestCase):
+    """
+    This class tests the per AI model semantic response cache
+
+    Attributes:
+
+    methods:
+        setUp
+        test_paraphrase_answered_per_model
+        test_changed_model_entries_dropped
+        test_invalidate_drops_entries
+    """
+
+    def setUp(self):
+        self.cache = SemanticResponseCache(HashingEmbedder(256), 100, 60.0)
+        self.aimodel = AIModel(
+            name="openai/gpt-oss-20b:free", access_endpoint="https://a.example/v1"
+        )
+
+    def test_paraphrase_answered_per_model(self):
+        """
+        This function tests that a paraphrase hits for the same model only.
+
+        args:
+
+        returns:
+        """
+        self.cache.set(self.aimodel, "What's the capital of France?", "Paris")
+        self.assertEqual(
+            self.cache.get(self.aimodel, "what is the capital city of France", 0.6),
+            "Paris",
+        )
+        self.assertIsNone(
+            self.cache.get(self.aimodel, "what is the capital city of France", 0.95)
+        )
+        self.assertIsNone(
+            self.cache.get(AIModel(name="another"), "What's the capital of France?", 0.6)
+        )
+        self.assertEqual(
+            self.cache.stats_for(self.aimodel),
+            {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5},
+        )
+
+    def test_changed_model_entries_dropped(self):
+        """
+        This function tests that changing a model's endpoint drops its entries.
+
+        args:
+
+        returns:
+        """
+        self.cache.set(self.aimodel, "What's the capital of France?", "Paris")
+        self.aimodel.access_endpoint = "https://b.example/v1"
+        self.assertIsNone(
+            self.cache.get(self.aimodel, "What's the capital of France?", 0.6)
+        )
+        self.assertEqual(self.cache.stats()["entries"], {})
+
+    def test_invalidate_drops_entries(self):
+        """
+        This function tests that invalidate drops a model's entries.
+
+        args:
+
+        returns:
+        """
+        self.cache.set(self.aimodel, "What's the capital of France?", "Paris")
+        self.cache.invalidate(self.aimodel)
+        self.assertEqual(self.cache.stats_for(self.aimodel)["entries"], 0)
+
+
+@tag("model")
+class AIModelSemanticCacheTest(UserSetupMixin, TestCase):
+    """
+    This class tests AI models' use of the semantic cache
+
+    Attributes:
+
+    methods:
+        setUp
+        test_paraphrase_answered_from_cache
+        test_follow_up_prompts_not_matched
+        test_no_threshold_matches_exact_prompts_only
+        test_saving_model_drops_entries
+    """
+
+    def setUp(self):
+        super().setUp()
+        for module, name in (
+            (caching, "_response_cache"),
+            (semantic_cache, "_semantic_cache"),
+        ):
+            patcher = patch.object(module, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.ai_model = create_ai_model(
+            self.user1,
+            "openai/gpt-oss-20b:free",
+            "Open-weight model",
+            0.0,
+            0.0,
+            "Edge devices and focused tasks.",
+        )
+        self.ai_model.cache_responses = True
+        self.ai_model.semantic_cache_threshold = 0.6
+        self.ai_model.save()
+        self.ai_model.cache_response("What's the capital of France?", "Paris")
+
+    def test_paraphrase_answered_from_cache(self):
+        """
+        This function tests that a paraphrased prompt gets the cached response.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(
+            self.ai_model.get_cached_response("what is the capital city of France"),
+            "Paris",
+        )
+        self.assertEqual(self.ai_model.get_semantic_cache_stats()["hits"], 1)
+
+    def test_follow_up_prompts_not_matched(self):
+        """
+        This function tests that a prompt after earlier turns is not matched by
+        similarity, or stored for it.
+
+        args:
+
+        returns:
+        """
+        history = [{"role": "user", "content": "Tell me about Spain."}]
+        self.assertIsNone(
+            self.ai_model.get_cached_response(
+                "what is the capital city of France", history
+            )
+        )
+        self.ai_model.cache_response("And its capital?", "Madrid", history)
+        self.assertIsNone(self.ai_model.get_cached_response("And its capital city?"))
+        self.assertEqual(
+            self.ai_model.get_cached_response("And its capital?", history), "Madrid"
+        )
+
+    def test_no_threshold_matches_exact_prompts_only(self):
+        """
+        This function tests that without a threshold only exact prompts hit.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.semantic_cache_threshold = None
+        self.assertIsNone(
+            self.ai_model.get_cached_response("what is the capital city of France")
+        )
+        self.assertEqual(
+            self.ai_model.get_cached_response("What's the capital of France?"), "Paris"
+        )
+
+    def test_saving_model_drops_entries(self):
+        """
+        This function tests that saving the AI model invalidates its semantic entries.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(get_semantic_cache().stats_for(self.ai_model)["entries"], 1)
+        self.ai_model.save()
+        self.assertEqual(get_semantic_cache().stats_for(self.ai_model)["entries"], 0)
@@ -0,0 +1,223 @@
+"""This module unit tests counting the tokens prompts and responses use.
+
+It has the test cases:
+    TokenCounterTest: This ensures tokens are counted with the tokenizer, remembered, and estimated without it.
+    TokenUsageTest: This ensures the provider's usage is used when reported, and items store their input and output tokens.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from django.urls import reverse
+
+from project_apps.aimodels import tokens
+from project_apps.aimodels.backends import LocalBackend, TransformerBackend
+from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.tests.tests_local_backend import start_stub_server
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from project_apps.aimodels.tokens import (
+    ResponseText,
+    TokenCounter,
+    TokenUsage,
+    count_token_usage,
+)
+from project_apps.chats.models import ConversationItem
+from project_apps.chats.tests.tests_models import create_conversation_thread
+from standard.tests.utils import UserSetupMixin
+
+
+@tag("model")
+class TokenCounterTest(SimpleTestCase):
+    """
+    This class tests the token counter
+
+    Attributes:
+
+    methods:
+        test_counts_remembered
+        test_estimated_without_tokenizer
+        test_estimated_when_vocabulary_cannot_load
+        test_messages_counted_with_their_overhead
+    """
+
+    def test_counts_remembered(self):
+        """
+        This function tests that a text is only tokenized once.
+
+        args:
+
+        returns:
+        """
+        tokenizer = Mock()
+        tokenizer.encode.return_value = [1, 2, 3]
+        counter = TokenCounter()
+        with patch.object(counter, "_load_tokenizer", return_value=tokenizer) as load:
+            self.assertEqual(counter.count("Capital of France?"), 3)
+            self.assertEqual(counter.count("Capital of France?"), 3)
+            self.assertEqual(counter.source, "tokenizer")
+        load.assert_called_once_with()
+        tokenizer.encode.assert_called_once_with(
+            "Capital of France?", disallowed_special=()
+        )
+
+    def test_estimated_without_tokenizer(self):
+        """
+        This function tests that tokens are estimated when no encoding is set.
+
+        args:
+
+        returns:
+        """
+        counter = TokenCounter(encoding="")
+        self.assertEqual(counter.count("Capital of France?"), 5)
+        self.assertEqual(counter.source, "estimate")
+
+    def test_estimated_when_vocabulary_cannot_load(self):
+        """
+        This function tests that tokens are estimated if the vocabulary cannot load.
+
+        args:
+
+        returns:
+        """
+        counter = TokenCounter(encoding="no_such_encoding")
+        with self.assertLogs("project_apps.aimodels.tokens", "WARNING"):
+            self.assertEqual(counter.count("Paris"), 2)
+        self.assertEqual(counter.count("Madrid"), 2)
+
+    def test_messages_counted_with_their_overhead(self):
+        """
+        This function tests that each message and the reply add their overhead.
+
+        args:
+
+        returns:
+        """
+        counter = TokenCounter(encoding="")
+        self.assertEqual(
+            counter.count_messages(
+                [
+                    {"role": "user", "content": "Capital of France?"},
+                    {"role": "assistant", "content": "Paris"},
+                ]
+            ),
+            3 + (3 + 5) + (3 + 2),
+        )
+
+
+@tag("model")
+@override_settings(AIMODEL_COALESCE_REQUESTS=False, AIMODEL_TOKENIZER_ENCODING="")
+class TokenUsageTest(UserSetupMixin, TestCase):
+    """
+    This class tests the token usage recorded for prompts
+
+    Attributes:
+
+    methods:
+        setUp
+        test_provider_usage_read_from_completion
+        test_send_prompt_stores_provider_usage
+        test_send_prompt_counts_tokens_without_usage
+        test_local_model_reports_server_counts
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(tokens, "_token_counter", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        self.ai_model = create_ai_model(
+            self.user1, "tokens", "Tokens", 0.1, 0.1, "General.", "transformer"
+        )
+        self.conversation_thread = create_conversation_thread(
+            self.user1, "Capitals", "", "web", self.ai_model
+        )
+        self.client.force_login(self.user1)
+
+    def test_provider_usage_read_from_completion(self):
+        """
+        This function tests that a completion's usage block is kept with its text.
+
+        args:
+
+        returns:
+        """
+        completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Paris"))],
+            usage=SimpleNamespace(prompt_tokens=12, completion_tokens=1),
+        )
+        text = AIModel.get_response_content(completion)
+        self.assertEqual(text, "Paris")
+        self.assertEqual(text.usage, TokenUsage(12, 1))
+        self.assertEqual(
+            count_token_usage("Capital of France?", text), TokenUsage(12, 1)
+        )
+        self.assertEqual(
+            count_token_usage("Capital of France?", "Paris"),
+            TokenUsage(3 + 3 + 5, 2, "estimate"),
+        )
+
+    def test_send_prompt_stores_provider_usage(self):
+        """
+        This function tests that an item stores the provider's input and output tokens.
+
+        args:
+
+        returns:
+        """
+        with patch.object(
+            TransformerBackend,
+            "generate",
+            return_value=ResponseText("Paris", TokenUsage(40, 2)),
+        ):
+            self.client.post(
+                reverse("send_prompt_with_id", args=[self.conversation_thread.id]),
+                {"prompt": "Capital of France?"},
+                secure=True,
+            )
+        item = ConversationItem.objects.get(
+            conversation_thread=self.conversation_thread
+        )
+        self.assertEqual(
+            (item.input_tokens, item.output_tokens, item.tokens), (40, 2, 42)
+        )
+
+    def test_send_prompt_counts_tokens_without_usage(self):
+        """
+        This function tests that an item's tokens are counted without provider usage.
+
+        args:
+
+        returns:
+        """
+        with patch.object(TransformerBackend, "generate", return_value="Paris"):
+            self.client.post(
+                reverse("send_prompt_with_id", args=[self.conversation_thread.id]),
+                {"prompt": "Capital of France?"},
+                secure=True,
+            )
+        item = ConversationItem.objects.get(
+            conversation_thread=self.conversation_thread
+        )
+        self.assertEqual(
+            (item.input_tokens, item.output_tokens, item.tokens), (11, 2, 13)
+        )
+
+    def test_local_model_reports_server_counts(self):
+        """
+        This function tests that a local model's response carries the server's counts.
+
+        args:
+
+        returns:
+        """
+        server = start_stub_server(self)
+        self.ai_model.access_endpoint = server.url
+        text = LocalBackend("local").generate(self.ai_model, "Hello")
+        self.assertEqual(text, "Stub reply to: Hello")
+        self.assertEqual(text.usage.output_tokens, 4)
+        self.assertGreater(text.usage.input_tokens, 0)
@@ -0,0 +1,267 @@
+"""project_apps.aimodels.tokens.py
+
+This module counts the tokens prompts and responses use.
+
+Providers report the prompt and completion tokens a request used in the response's
+usage block, and those counts are used when there are any. Other responses, e.g.
+cached or streamed ones, are counted with an offline BPE tokenizer (tiktoken with the
+AIMODEL_TOKENIZER_ENCODING vocabulary). The vocabulary is loaded once per process,
+from AIMODEL_TOKENIZER_CACHE_DIR if set, so workers need not download it, and the
+counts of the latest AIMODEL_TOKENIZER_CACHE_SIZE texts are memoised, as the same
+turns are counted again with each prompt in a thread. Should the tokenizer be
+unavailable, tokens are estimated at about four characters a token.
+
+class TokenUsage
+    - The input and output tokens of a request, and where the counts came from.
+
+class ResponseText
+    - Response text that carries the provider's token usage.
+
+class TokenCounter
+    - count: the tokens in a text.
+    - count_messages: the tokens in chat messages, as sent to the AI model.
+
+get_usage
+    - The token usage a provider response reports, if any.
+
+count_token_usage
+    - The token usage of a prompt and its response, from the provider or counted.
+
+get_token_counter
+    - Returns the counter shared by the whole worker process.
+"""
+
+import functools
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# The tokens each chat message adds for its role and separators, and the tokens that
+# start the reply, as OpenAI chat models count them.
+MESSAGE_TOKENS: int = 3
+REPLY_TOKENS: int = 3
+
+
+@dataclass(frozen=True)
+class TokenUsage:
+    """The tokens a request used.
+
+    Attributes:
+        input_tokens (int): The prompt's tokens, with its history.
+        output_tokens (int): The response's tokens.
+        source (str): "provider" if the provider reported them, "tokenizer" if they
+            were counted, or "estimate" if the tokenizer is unavailable.
+    """
+
+    input_tokens: int
+    output_tokens: int
+    source: str = "provider"
+
+    @property
+    def total_tokens(self) -> int:
+        """The input and output tokens together."""
+        return self.input_tokens + self.output_tokens
+
+    def as_dict(self) -> dict:
+        """Gives the counts for JSON.
+
+        Returns:
+            dict: The input, output and total tokens.
+        """
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+        }
+
+
+class ResponseText(str):
+    """Response text that carries the token usage the provider reported for it."""
+
+    usage: TokenUsage | None
+
+    def __new__(cls, text: str, usage: TokenUsage | None = None) -> "ResponseText":
+        """Creates the text.
+
+        Args:
+            text (str): The response text.
+            usage (TokenUsage | None): The provider's token usage, if reported.
+
+        Returns:
+            ResponseText: The text.
+        """
+        response_text: ResponseText = super().__new__(cls, text)
+        response_text.usage = usage
+        return response_text
+
+
+class TokenCounter:
+    """Counts tokens with a BPE tokenizer, remembering the latest counts."""
+
+    def __init__(
+        self,
+        encoding: str = "cl100k_base",
+        cache_dir: str | None = None,
+        cache_size: int = 4096,
+    ) -> None:
+        """Initialises the counter. The vocabulary is loaded on first use.
+
+        Args:
+            encoding (str): The tiktoken encoding. "" estimates tokens instead.
+            cache_dir (str | None): The directory the vocabulary is kept in.
+            cache_size (int): The most texts whose counts are remembered.
+        """
+        self.encoding: str = encoding
+        self.cache_dir: str | None = cache_dir
+        self._tokenizer: object | None = None
+        self._loaded: bool = False
+        self._lock: threading.Lock = threading.Lock()
+        self.count = functools.lru_cache(maxsize=cache_size)(self._count)
+
+    @property
+    def source(self) -> str:
+        """"tokenizer" if counts come from the tokenizer, otherwise "estimate"."""
+        return "tokenizer" if self._get_tokenizer() is not None else "estimate"
+
+    def count_messages(self, messages: list[dict]) -> int:
+        """Counts the tokens in chat messages, as sent to the AI model.
+
+        Args:
+            messages (list[dict]): The chat messages.
+
+        Returns:
+            int: The messages' tokens, with each message's and the reply's overhead.
+        """
+        return REPLY_TOKENS + sum(
+            MESSAGE_TOKENS + self.count(message["content"]) for message in messages
+        )
+
+    def _count(self, text: str) -> int:
+        """Counts the tokens in text, without remembering the count.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            int: The token count, or an estimate if the tokenizer is unavailable.
+        """
+        tokenizer: object | None = self._get_tokenizer()
+        if tokenizer is None:
+            return math.ceil(len(text) / 4)
+        return len(tokenizer.encode(text, disallowed_special=()))
+
+    def _get_tokenizer(self) -> object | None:
+        """Returns the tokenizer, loading its vocabulary if required.
+
+        tiktoken is imported here, so workers that never count tokens never load it.
+
+        Returns:
+            tiktoken.Encoding | None: The tokenizer, or None if it is unavailable.
+        """
+        if self._loaded:
+            return self._tokenizer
+        with self._lock:
+            if not self._loaded:
+                self._tokenizer = self._load_tokenizer()
+                self._loaded = True
+        return self._tokenizer
+
+    def _load_tokenizer(self) -> object | None:
+        """Loads the tokenizer's vocabulary.
+
+        Returns:
+            tiktoken.Encoding | None: The tokenizer, or None if it cannot be loaded.
+        """
+        if not self.encoding:
+            return None
+        if self.cache_dir:
+            os.environ.setdefault("TIKTOKEN_CACHE_DIR", self.cache_dir)
+        try:
+            import tiktoken
+
+            tokenizer = tiktoken.get_encoding(self.encoding)
+        except Exception:
+            logger.warning(
+                f"Could not load the {self.encoding} tokenizer, so tokens are "
+                "estimated from the text's length",
+                exc_info=True,
+            )
+            return None
+        logger.info(f"Loaded the {self.encoding} tokenizer")
+        return tokenizer
+
+
+def get_usage(aimodel_response: object) -> TokenUsage | None:
+    """Reads the token usage a provider response reports, if there is any.
+
+    Args:
+        aimodel_response (object): A chat completion, the text other access modes
+            give, or None.
+
+    Returns:
+        TokenUsage | None: The prompt and completion tokens, or None if not reported.
+    """
+    usage: object | None = getattr(aimodel_response, "usage", None)
+    if isinstance(usage, TokenUsage):
+        return usage
+    input_tokens: object | None = getattr(usage, "prompt_tokens", None)
+    output_tokens: object | None = getattr(usage, "completion_tokens", None)
+    if isinstance(input_tokens, int) and isinstance(output_tokens, int):
+        return TokenUsage(input_tokens, output_tokens)
+    return None
+
+
+def count_token_usage(
+    prompt: str, response_text: str, history: list[dict] | None = None
+) -> TokenUsage:
+    """Gives the token usage of a prompt and its response.
+
+    Args:
+        prompt (str): The prompt.
+        response_text (str): The response text, a ResponseText if the provider
+            reported its usage.
+        history (list[dict] | None): The conversation's earlier turns sent with the
+            prompt as chat messages.
+
+    Returns:
+        TokenUsage: The provider's usage if it reported it, otherwise the counts.
+    """
+    usage: TokenUsage | None = get_usage(response_text)
+    if usage is not None:
+        return usage
+    counter: TokenCounter = get_token_counter()
+    return TokenUsage(
+        counter.count_messages(
+            [*(history or ()), {"role": "user", "content": prompt.strip()}]
+        ),
+        counter.count(response_text) if response_text else 0,
+        counter.source,
+    )
+
+
+_token_counter: TokenCounter | None = None
+_token_counter_lock: threading.Lock = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    """Returns the process's token counter, creating it from settings on first use.
+
+    Returns:
+        TokenCounter: The counter.
+    """
+    global _token_counter
+    if _token_counter is None:
+        with _token_counter_lock:
+            if _token_counter is None:
+                _token_counter = TokenCounter(
+                    settings.AIMODEL_TOKENIZER_ENCODING,
+                    cache_dir=settings.AIMODEL_TOKENIZER_CACHE_DIR,
+                    cache_size=settings.AIMODEL_TOKENIZER_CACHE_SIZE,
+                )
+    return _token_counter
@@ -13,6 +13,8 @@ from .models import (
     APIConversationThread,
     ConversationItem,
     NOAConversationThread,
+    PromptBatchJob,
+    PromptJob,
     WebConversationThread,
 )
 
@@ -102,3 +104,47 @@ class APIConversationThreadAdmin(ConversationThreadAdmin):
 admin.site.register(WebConversationThread, WebConversationThreadAdmin)
 admin.site.register(NOAConversationThread, NOAConversationThreadAdmin)
 admin.site.register(APIConversationThread, APIConversationThreadAdmin)
+
+
+class PromptBatchJobAdmin(admin.ModelAdmin):
+    """Admin configuration for PromptBatchJob models.
+
+    Lists batch jobs with their progress and throughput.
+    """
+
+    list_display: tuple[str, ...] = (
+        "name",
+        "aimodel",
+        "status",
+        "mode",
+        "total_prompts",
+        "completed_prompts",
+        "failed_prompts",
+        "prompts_per_second",
+        "created_at",
+    )
+    list_filter: tuple[str, ...] = ("status", "mode")
+
+
+admin.site.register(PromptBatchJob, PromptBatchJobAdmin)
+
+
+class PromptJobAdmin(admin.ModelAdmin):
+    """Admin configuration for PromptJob models.
+
+    Lists queued prompts with the worker answering them.
+    """
+
+    list_display: tuple[str, ...] = (
+        "conversation_item",
+        "status",
+        "attempts",
+        "run_after",
+        "claimed_by",
+        "created_at",
+        "finished_at",
+    )
+    list_filter: tuple[str, ...] = ("status",)
+
+
+admin.site.register(PromptJob, PromptJobAdmin)
@@ -0,0 +1,255 @@
+"""api/audio.py
+
+This module decodes uploaded audio into the sample format Whisper expects: mono float32
+samples in the range [-1, 1] at 16 kHz.
+
+Uploads are decoded straight from memory rather than being written to a temporary file
+and re-read. PCM WAV, which is what the Frame glasses send, is decoded in Python; other
+formats are piped through ffmpeg's stdin and stdout. Formats that ffmpeg cannot read
+from a pipe (e.g. MP4 containers with the index at the end) raise AudioDecodeError so
+the caller can fall back to a temporary file.
+
+class AudioDecodeError(Exception)
+    - Raised when audio cannot be decoded in memory.
+
+decode_audio
+    - Decodes audio bytes of any supported format.
+
+decode_wav
+    - Decodes PCM WAV bytes.
+
+decode_with_ffmpeg
+    - Decodes audio bytes by piping them through ffmpeg.
+
+resample
+    - Resamples mono audio to a new sample rate.
+
+Recordings made while walking contain long pauses, and Whisper's time grows with the
+length of what it is given, silence included. A lightweight energy-based voice activity
+detector trims the silence and splits the speech at pauses so the pieces can be
+transcribed in parallel.
+
+split_speech_segments
+    - Splits decoded audio into speech chunks, dropping silence.
+"""
+
+import io
+import logging
+import math
+import subprocess
+import wave
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE: int = 16000
+
+
+class AudioDecodeError(Exception):
+    """Raised when audio cannot be decoded in memory."""
+
+
+def decode_audio(data: bytes) -> np.ndarray:
+    """Decodes audio bytes into mono float32 samples at 16 kHz.
+
+    Args:
+        data (bytes): The raw bytes of the uploaded audio file.
+
+    Returns:
+        np.ndarray: The decoded samples.
+
+    Raises:
+        AudioDecodeError: If the audio cannot be decoded in memory.
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            return decode_wav(data)
+        except AudioDecodeError:
+            logger.info("WAV not decodable in Python, trying ffmpeg pipe")
+    return decode_with_ffmpeg(data)
+
+
+def decode_wav(data: bytes) -> np.ndarray:
+    """Decodes PCM WAV bytes into mono float32 samples at 16 kHz.
+
+    Args:
+        data (bytes): The raw bytes of a WAV file.
+
+    Returns:
+        np.ndarray: The decoded samples.
+
+    Raises:
+        AudioDecodeError: If the WAV is not an integer PCM format.
+    """
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav_file:
+            channels: int = wav_file.getnchannels()
+            sample_width: int = wav_file.getsampwidth()
+            frame_rate: int = wav_file.getframerate()
+            frames: bytes = wav_file.readframes(wav_file.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise AudioDecodeError(str(e)) from e
+
+    if sample_width == 1:
+        # 8-bit WAV samples are unsigned.
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+    elif sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        widened = (
+            raw[:, 0].astype(np.int32)
+            | (raw[:, 1].astype(np.int32) << 8)
+            | (raw[:, 2].astype(np.int32) << 16)
+        )
+        widened = np.where(widened & 0x800000, widened - 0x1000000, widened)
+        samples = widened.astype(np.float32) / 8388608
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise AudioDecodeError(f"Unsupported WAV sample width: {sample_width}")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return resample(samples, frame_rate, SAMPLE_RATE)
+
+
+def decode_with_ffmpeg(data: bytes) -> np.ndarray:
+    """Decodes audio bytes by piping them through ffmpeg, without touching the disk.
+
+    Args:
+        data (bytes): The raw bytes of the audio file.
+
+    Returns:
+        np.ndarray: The decoded samples.
+
+    Raises:
+        AudioDecodeError: If ffmpeg is unavailable or cannot decode the audio from a pipe.
+    """
+    command: list[str] = [
+        "ffmpeg",
+        "-threads",
+        "0",
+        "-i",
+        "pipe:0",
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+    try:
+        decoded: bytes = subprocess.run(
+            command, input=data, capture_output=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise AudioDecodeError(f"ffmpeg could not decode audio: {e}") from e
+    if not decoded:
+        raise AudioDecodeError("ffmpeg produced no audio")
+    return np.frombuffer(decoded, dtype="<i2").astype(np.float32) / 32768
+
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """Resamples mono audio by linear interpolation.
+
+    Speech recognition is tolerant of the small high-frequency loss this introduces.
+
+    Args:
+        samples (np.ndarray): The mono float32 samples.
+        from_rate (int): The current sample rate.
+        to_rate (int): The target sample rate.
+
+    Returns:
+        np.ndarray: The resampled float32 samples.
+    """
+    if from_rate == to_rate or not len(samples):
+        return np.ascontiguousarray(samples, dtype=np.float32)
+    target_length: int = int(round(len(samples) * to_rate / from_rate))
+    positions = np.arange(target_length, dtype=np.float64) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def split_speech_segments(
+    samples: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    frame_ms: int = 30,
+    min_silence_ms: int = 500,
+    padding_ms: int = 150,
+    min_chunk_seconds: float = 5.0,
+    energy_floor_db: float = -45.0,
+    noise_margin_db: float = 10.0,
+) -> list[np.ndarray]:
+    """Splits audio into chunks of speech using frame energy.
+
+    Frames louder than a threshold are speech. The threshold sits a margin above the
+    clip's noise floor (its quietest frames), but never below an absolute floor, and
+    never so high that the loudest speech would not pass. Speech separated by a pause of
+    at least min_silence_ms starts a new region, and silence before, after and between
+    regions is dropped. Adjacent regions are then joined into chunks of at least
+    min_chunk_seconds, because Whisper processes audio in 30 second windows and very
+    short chunks waste a whole window each.
+
+    Args:
+        samples (np.ndarray): Mono float32 samples.
+        sample_rate (int): The sample rate of the samples.
+        frame_ms (int): The length of each analysis frame.
+        min_silence_ms (int): The shortest pause that splits speech.
+        padding_ms (int): Audio kept either side of each speech region.
+        min_chunk_seconds (float): The shortest chunk returned, other than the last.
+        energy_floor_db (float): Frames quieter than this (dBFS) are always silence.
+        noise_margin_db (float): How far above the noise floor speech must be.
+
+    Returns:
+        list[np.ndarray]: The speech chunks in order, or an empty list if there is no speech.
+    """
+    frame_length: int = int(sample_rate * frame_ms / 1000)
+    frame_count: int = len(samples) // frame_length
+    if frame_count == 0:
+        return [samples] if len(samples) else []
+
+    frames = samples[: frame_count * frame_length].reshape(frame_count, frame_length)
+    energy_db = 20 * np.log10(np.sqrt(np.mean(frames**2, axis=1)) + 1e-10)
+    threshold: float = max(
+        energy_floor_db,
+        min(np.percentile(energy_db, 10) + noise_margin_db, energy_db.max() - 20),
+    )
+    voiced_frames = np.flatnonzero(energy_db > threshold)
+    if not len(voiced_frames):
+        return []
+
+    # Regions of speech are runs of voiced frames with no pause of min_silence_ms.
+    max_gap: int = math.ceil(min_silence_ms / frame_ms)
+    breaks = np.flatnonzero(np.diff(voiced_frames) > max_gap)
+    region_starts = np.concatenate(([voiced_frames[0]], voiced_frames[breaks + 1]))
+    region_ends = np.concatenate((voiced_frames[breaks], [voiced_frames[-1]])) + 1
+    padding: int = int(padding_ms / frame_ms)
+    regions: list[tuple[int, int]] = [
+        (
+            max(0, start - padding) * frame_length,
+            min(len(samples), (end + padding) * frame_length),
+        )
+        for start, end in zip(region_starts, region_ends)
+    ]
+
+    min_chunk_length: int = int(min_chunk_seconds * sample_rate)
+    chunks: list[list[tuple[int, int]]] = []
+    for region in regions:
+        if chunks and sum(end - start for start, end in chunks[-1]) < min_chunk_length:
+            chunks[-1].append(region)
+        else:
+            chunks.append([region])
+    if (
+        len(chunks) > 1
+        and sum(end - start for start, end in chunks[-1]) < min_chunk_length
+    ):
+        chunks[-2].extend(chunks.pop())
+
+    return [
+        np.concatenate([samples[start:end] for start, end in chunk])
+        for chunk in chunks
+    ]
@@ -0,0 +1,138 @@
+"""api/batching.py
+
+This module batches Whisper inference across concurrent NOA requests.
+
+When several clips arrive at about the same time, running one forward pass per clip
+repeats the model's fixed costs for each of them. The batcher instead collects the clips
+that arrive within a short window (or until the batch is full), hands them over as one
+batch, and gives each caller back its own result.
+
+class TranscriptionBatcher
+    - submit: queues a clip and returns a Future for its text.
+    - stats: counts of batches and clips for tuning the window and batch size.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionBatcher:
+    """Groups clips that arrive close together into batches.
+
+    A background thread waits for a clip, then keeps collecting until window_seconds
+    have passed or max_batch_size clips are waiting, and passes the batch to dispatch.
+    dispatch must return a Future that resolves to one text per clip, in order; it can
+    hand the batch to a worker pool so the batcher can start collecting the next one.
+    """
+
+    def __init__(
+        self, dispatch: object, window_seconds: float, max_batch_size: int
+    ) -> None:
+        """Initialises the batcher. Its thread starts with the first clip.
+
+        Args:
+            dispatch: Called with a list of clips, returns a Future of their texts.
+            window_seconds (float): How long to wait for more clips after the first.
+            max_batch_size (int): The most clips in one batch.
+        """
+        self.dispatch = dispatch
+        self.window_seconds: float = window_seconds
+        self.max_batch_size: int = max_batch_size
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock: threading.Lock = threading.Lock()
+        self.batches: int = 0
+        self.clips: int = 0
+        self.largest_batch: int = 0
+
+    def submit(self, audio: object) -> Future:
+        """Queues a clip for the next batch.
+
+        Args:
+            audio: The clip's float32 samples.
+
+        Returns:
+            Future: Resolves to the clip's text.
+        """
+        future: Future = Future()
+        self._queue.put((audio, future))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._collect_batches, name="whisper-batcher", daemon=True
+                )
+                self._thread.start()
+        return future
+
+    def stats(self) -> dict:
+        """Summarises the batches dispatched so far.
+
+        Returns:
+            dict: The window, batch size limit and counts of batches and clips.
+        """
+        return {
+            "window_seconds": self.window_seconds,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "clips": self.clips,
+            "largest_batch": self.largest_batch,
+            "average_batch": round(self.clips / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _collect_batches(self) -> None:
+        """Forever collects the next batch and dispatches it."""
+        while True:
+            batch: list[tuple[object, Future]] = [self._queue.get()]
+            deadline: float = time.monotonic() + self.window_seconds
+            while len(batch) < self.max_batch_size:
+                remaining: float = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch_batch(batch)
+
+    def _dispatch_batch(self, batch: list[tuple[object, Future]]) -> None:
+        """Dispatches a batch and arranges for each caller's Future to be resolved.
+
+        Args:
+            batch (list[tuple[object, Future]]): The clips and their callers' Futures.
+        """
+        self.batches += 1
+        self.clips += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            texts_future: Future = self.dispatch([audio for audio, _ in batch])
+        except Exception as e:
+            self._resolve_batch(batch, None, e)
+            return
+        texts_future.add_done_callback(
+            lambda done: self._resolve_batch(batch, done, done.exception())
+        )
+
+    def _resolve_batch(
+        self,
+        batch: list[tuple[object, Future]],
+        texts_future: Future | None,
+        error: BaseException | None,
+    ) -> None:
+        """Passes a batch's texts, or its error, to each caller.
+
+        Args:
+            batch (list[tuple[object, Future]]): The clips and their callers' Futures.
+            texts_future (Future | None): The finished batch, if it was dispatched.
+            error (BaseException | None): The error that failed the batch, if any.
+        """
+        if error is not None:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        for (_, future), text in zip(batch, texts_future.result()):
+            future.set_result(text)
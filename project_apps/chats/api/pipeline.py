@@ -0,0 +1,287 @@
+"""api/pipeline.py
+
+This module runs the NOA endpoint's processing as an explicit graph of stages.
+
+Each stage names the stages it depends on. Stages whose dependencies are met run at the
+same time, so independent work such as transcribing audio, handling an image and looking
+up the AI model overlaps rather than running back to back. End-to-end time then tends
+towards the slowest chain of stages instead of the sum of all of them.
+
+Stages that use the database run on the calling thread (inline), since Django database
+connections belong to the thread that opened them; the others run on a shared thread pool.
+
+Async views run the same graph with arun. There, stage functions may be coroutines, which
+are awaited on the event loop; inline stages run on Django's thread for sync code, and the
+rest on the shared thread pool, so none of them block the loop.
+
+class Stage
+    - A named step with its dependencies.
+
+class StagePipeline
+    - run: runs the stages in dependency order, concurrently where possible.
+    - arun: as run, from a coroutine.
+    - format_timings: the recorded stage durations as text for the NOA response.
+
+get_stage_executor
+    - Returns the thread pool shared by every pipeline in the process.
+"""
+
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+
+class Stage:
+    """A named step in a StagePipeline.
+
+    Attributes:
+        name (str): The stage's name, used for its result and timing.
+        func: Called with the results of the stages run so far, returns the stage's result.
+            May be a coroutine function when the pipeline is run with arun.
+        depends_on (tuple[str, ...]): The stages that must finish first.
+        inline (bool): Run on the calling thread, e.g. because it uses the database.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: object,
+        depends_on: tuple[str, ...] = (),
+        inline: bool = False,
+    ) -> None:
+        """Initialises the stage.
+
+        Args:
+            name (str): The stage's name.
+            func: Called with the results dict, returns the stage's result.
+            depends_on (tuple[str, ...]): The stages that must finish first.
+            inline (bool): Run on the calling thread.
+        """
+        self.name: str = name
+        self.func = func
+        self.depends_on: tuple[str, ...] = depends_on
+        self.inline: bool = inline
+
+
+class StagePipeline:
+    """Runs a graph of stages, overlapping the ones that do not depend on each other.
+
+    The graph is run in waves: every stage whose dependencies have finished starts
+    together, and the next wave starts when they have all finished.
+    """
+
+    def __init__(self, stages: list[Stage], executor: ThreadPoolExecutor) -> None:
+        """Initialises the pipeline.
+
+        Args:
+            stages (list[Stage]): The stages to run.
+            executor (ThreadPoolExecutor): The pool that runs non-inline stages.
+
+        Raises:
+            ValueError: If a stage depends on a stage that is not in the pipeline.
+        """
+        names: set[str] = {stage.name for stage in stages}
+        for stage in stages:
+            missing: set[str] = set(stage.depends_on) - names
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown {missing}")
+        self.stages: list[Stage] = stages
+        self.executor: ThreadPoolExecutor = executor
+        self.timings: dict[str, float] = {}
+
+    def run(self, results: dict | None = None) -> dict:
+        """Runs every stage and returns their results.
+
+        Args:
+            results (dict | None): Results already known, e.g. the validated request data.
+
+        Returns:
+            dict: Each stage's result keyed by its name, plus any results passed in.
+
+        Raises:
+            ValueError: If the remaining stages' dependencies can never be met.
+            Exception: Whatever a stage raises. If several stages in a wave fail, the
+                error from the stage listed first is raised.
+        """
+        results = dict(results or {})
+        pending: list[Stage] = list(self.stages)
+        started: float = time.perf_counter()
+        while pending:
+            ready: list[Stage] = self._get_ready_stages(pending, results)
+            snapshot: dict = dict(results)
+            futures: dict[str, Future] = {
+                stage.name: self.executor.submit(self._run_stage, stage, snapshot)
+                for stage in ready
+                if not stage.inline
+            }
+            errors: dict[str, Exception] = {}
+            for stage in ready:
+                if stage.inline:
+                    try:
+                        results[stage.name] = self._run_stage(stage, snapshot)
+                    except Exception as e:
+                        errors[stage.name] = e
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+            self._raise_first_error(ready, errors)
+            pending = [stage for stage in pending if stage not in ready]
+
+        self.timings["total"] = time.perf_counter() - started
+        return results
+
+    async def arun(self, results: dict | None = None) -> dict:
+        """Runs every stage from a coroutine and returns their results.
+
+        Args:
+            results (dict | None): Results already known, e.g. the validated request data.
+
+        Returns:
+            dict: Each stage's result keyed by its name, plus any results passed in.
+
+        Raises:
+            ValueError: If the remaining stages' dependencies can never be met.
+            Exception: Whatever a stage raises, as for run.
+        """
+        results = dict(results or {})
+        pending: list[Stage] = list(self.stages)
+        started: float = time.perf_counter()
+        while pending:
+            ready: list[Stage] = self._get_ready_stages(pending, results)
+            snapshot: dict = dict(results)
+            outcomes: list = await asyncio.gather(
+                *(self._arun_stage(stage, snapshot) for stage in ready),
+                return_exceptions=True,
+            )
+            errors: dict[str, Exception] = {}
+            for stage, outcome in zip(ready, outcomes):
+                if isinstance(outcome, Exception):
+                    errors[stage.name] = outcome
+                else:
+                    results[stage.name] = outcome
+            self._raise_first_error(ready, errors)
+            pending = [stage for stage in pending if stage not in ready]
+
+        self.timings["total"] = time.perf_counter() - started
+        return results
+
+    def format_timings(self) -> str:
+        """Formats the recorded durations, e.g. "Total: 2.31s, transcribe_audio: 1.90s".
+
+        Returns:
+            str: The stage durations, total first.
+        """
+        parts: list[str] = []
+        if "total" in self.timings:
+            parts.append(f"Total: {self.timings['total']:.2f}s")
+        parts.extend(
+            f"{name}: {seconds:.2f}s"
+            for name, seconds in self.timings.items()
+            if name != "total"
+        )
+        return ", ".join(parts)
+
+    def _get_ready_stages(self, pending: list[Stage], results: dict) -> list[Stage]:
+        """Finds the pending stages whose dependencies have all finished.
+
+        Args:
+            pending (list[Stage]): The stages not yet run.
+            results (dict): The results of the stages run so far.
+
+        Returns:
+            list[Stage]: The stages that can run now.
+
+        Raises:
+            ValueError: If no pending stage can ever run.
+        """
+        ready: list[Stage] = [
+            stage
+            for stage in pending
+            if all(name in results for name in stage.depends_on)
+        ]
+        if not ready:
+            raise ValueError(
+                f"Stages {[stage.name for stage in pending]} have circular dependencies"
+            )
+        return ready
+
+    def _raise_first_error(
+        self, ready: list[Stage], errors: dict[str, Exception]
+    ) -> None:
+        """Raises the error of the first failed stage in a finished wave.
+
+        Every stage in the wave has finished, so errors are reported in stage order.
+
+        Args:
+            ready (list[Stage]): The wave's stages in order.
+            errors (dict[str, Exception]): The errors raised, keyed by stage name.
+        """
+        for stage in ready:
+            if stage.name in errors:
+                raise errors[stage.name]
+
+    async def _arun_stage(self, stage: Stage, results: dict) -> object:
+        """Runs one stage from a coroutine and records how long it took.
+
+        Args:
+            stage (Stage): The stage to run.
+            results (dict): The results of the stages run before it.
+
+        Returns:
+            object: The stage's result.
+        """
+        started: float = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(stage.func):
+                return await stage.func(results)
+            if stage.inline:
+                return await sync_to_async(stage.func)(results)
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, stage.func, results
+            )
+        finally:
+            self.timings[stage.name] = time.perf_counter() - started
+
+    def _run_stage(self, stage: Stage, results: dict) -> object:
+        """Runs one stage and records how long it took.
+
+        Args:
+            stage (Stage): The stage to run.
+            results (dict): The results of the stages run before it.
+
+        Returns:
+            object: The stage's result.
+        """
+        started: float = time.perf_counter()
+        try:
+            return stage.func(results)
+        finally:
+            self.timings[stage.name] = time.perf_counter() - started
+
+
+_stage_executor: ThreadPoolExecutor | None = None
+_stage_executor_lock: threading.Lock = threading.Lock()
+
+
+def get_stage_executor() -> ThreadPoolExecutor:
+    """Returns the process's stage thread pool, creating it on first use.
+
+    Returns:
+        ThreadPoolExecutor: The pool sized by NOA_PIPELINE_THREADS.
+    """
+    global _stage_executor
+    if _stage_executor is None:
+        with _stage_executor_lock:
+            if _stage_executor is None:
+                _stage_executor = ThreadPoolExecutor(
+                    max_workers=settings.NOA_PIPELINE_THREADS,
+                    thread_name_prefix="noa-stage",
+                )
+    return _stage_executor
@@ -1,6 +1,13 @@
+from django.conf import settings
 from rest_framework import serializers
 
-from project_apps.chats.models import ConversationItem, ConversationThread
+from project_apps.aimodels.models import AIModel
+from project_apps.chats.batches import parse_prompts_jsonl
+from project_apps.chats.models import (
+    ConversationItem,
+    ConversationThread,
+    PromptBatchJob,
+)
 
 
 class MessageSerializer(serializers.Serializer):
@@ -66,4 +73,80 @@ class ConversationItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ConversationItem
-        fields = ["id", "prompt", "response", "tokens", "created_at"]
+        fields = [
+            "id",
+            "prompt",
+            "response",
+            "tokens",
+            "input_tokens",
+            "output_tokens",
+            "created_at",
+        ]
+
+
+class PromptBatchRequestSerializer(serializers.Serializer):
+    """Serializer for submitting a batch job of prompts, as a list or a JSONL file."""
+
+    aimodel = serializers.SlugRelatedField(
+        slug_field="name", queryset=AIModel.objects.filter(is_active=True)
+    )
+    name = serializers.CharField(required=False, max_length=150)
+    prompts = serializers.ListField(
+        child=serializers.CharField(), required=False, allow_empty=False
+    )
+    file = serializers.FileField(required=False)
+
+    def validate(self, data: dict) -> dict:
+        """Reads the prompts from the JSONL file if one was sent, and checks them.
+
+        Args:
+            data (dict): The field values.
+
+        Returns:
+            dict: The field values, with the prompts.
+
+        Raises:
+            serializers.ValidationError: If there are no prompts, too many, or the file
+                is not valid.
+        """
+        if "file" in data:
+            try:
+                data["prompts"] = parse_prompts_jsonl(data.pop("file"))
+            except (UnicodeDecodeError, ValueError) as error:
+                raise serializers.ValidationError({"file": str(error)}) from error
+        prompts: list[str] = data.get("prompts") or []
+        if not prompts:
+            raise serializers.ValidationError("Send prompts, or a JSONL file of them.")
+        if len(prompts) > settings.CHAT_BATCH_MAX_PROMPTS:
+            raise serializers.ValidationError(
+                f"A batch job takes at most {settings.CHAT_BATCH_MAX_PROMPTS} prompts."
+            )
+        return data
+
+
+class PromptBatchJobSerializer(serializers.ModelSerializer):
+    """Serializer for a batch job's progress."""
+
+    aimodel = serializers.SlugRelatedField(slug_field="name", read_only=True)
+    prompts_per_second = serializers.FloatField(
+        source="get_prompts_per_second", read_only=True
+    )
+
+    class Meta:
+        model = PromptBatchJob
+        fields = [
+            "id",
+            "name",
+            "aimodel",
+            "conversation_thread",
+            "status",
+            "mode",
+            "total_prompts",
+            "completed_prompts",
+            "failed_prompts",
+            "prompts_per_second",
+            "error",
+            "started_at",
+            "finished_at",
+            "created_at",
+        ]
@@ -0,0 +1,849 @@
+"""api/transcription.py
+
+This module manages the Whisper speech-to-text models used by the NOA endpoint.
+
+Loading a Whisper model reads several hundred MB of weights from disk, so the models are
+held in a process-wide registry: each model size is loaded once per worker process and
+then reused by every request that carries audio.
+
+A model name is a Whisper size such as "tiny", "base" or "small", optionally with an
+"-int8" suffix (e.g. "small-int8"). The suffix loads the model on the CPU with its linear
+layers dynamically quantized to int8, which shrinks their weights to a quarter and
+speeds up CPU inference for a small loss of accuracy.
+
+parse_model_name
+    - Splits a model name into its Whisper size and whether it is quantized.
+
+quantize_model
+    - Dynamically quantizes a Whisper model's linear layers to int8.
+
+class WhisperModelRegistry
+    - get_model: returns the warm model for a size, loading it on first use.
+    - get_inference_lock: the lock held while a model size transcribes.
+    - warm_up: eagerly loads a list of model sizes (e.g. at worker boot).
+    - is_warm: whether a model size has already been loaded.
+    - memory_usage: bytes held by a loaded model's parameters and buffers.
+    - status: a summary of every loaded model for monitoring.
+
+whisper_model_registry
+    - The registry instance shared by the whole worker process.
+
+Whisper inference is CPU heavy, so it can be run in a dedicated pool of processes rather
+than on the web request thread. The pool has a fixed number of workers and a bounded
+number of waiting jobs; once both are used up new jobs are rejected straight away so the
+caller can answer 503 instead of queueing indefinitely.
+
+class TranscriptionQueueFullError(Exception)
+    - Raised when the pool has no free worker or queue slot.
+
+class TranscriptionWorkerPool
+    - submit: runs a function in a worker process, respecting the queue bound.
+    - free_slots: the jobs the pool can accept now.
+    - transcribe: transcribes audio in a worker process.
+    - stats: queue depth, wait times and rejections for sizing the pool.
+
+transcribe_audio
+    - Transcribes audio through the pool if one is configured, otherwise in-process.
+
+transcribe_audio_segments
+    - Transcribes speech chunks in parallel through the pool and joins them in order.
+
+get_transcription_batcher
+    - Returns the batcher that groups concurrent clips into one Whisper forward pass.
+
+Clients retry uploads on flaky connections, so finished transcriptions are cached by a
+hash of the audio bytes and the model size.
+
+class TranscriptionCache
+    - get/set: look up and store transcriptions, with LRU eviction and a TTL.
+    - stats: entry count and hit/miss counters.
+
+word_error_rate
+    - Scores a transcription against a reference for comparing model names.
+"""
+
+import atexit
+import collections
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+import torch
+import whisper
+from django.conf import settings
+from whisper.normalizers import EnglishTextNormalizer
+
+from .batching import TranscriptionBatcher
+
+logger = logging.getLogger(__name__)
+
+QUANTIZED_SUFFIX: str = "-int8"
+
+
+def parse_model_name(name: str) -> tuple[str, bool]:
+    """Splits a model name into its Whisper size and whether it is int8 quantized.
+
+    Args:
+        name (str): The model name, e.g. "small" or "small-int8".
+
+    Returns:
+        tuple[str, bool]: The Whisper size and True if the name asks for int8.
+    """
+    if name.endswith(QUANTIZED_SUFFIX):
+        return name[: -len(QUANTIZED_SUFFIX)], True
+    return name, False
+
+
+def quantize_model(model: object) -> object:
+    """Dynamically quantizes a Whisper model's linear layers to int8 for the CPU.
+
+    Whisper's linear layers subclass torch.nn.Linear only to cast their weights to the
+    input's dtype, which is a no-op in float32, and torch only quantizes the base class,
+    so they are turned back into plain linear layers first.
+
+    Args:
+        model (object): A float32 Whisper model on the CPU.
+
+    Returns:
+        object: The model with int8 weights in its linear layers.
+    """
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(
+        model.eval(), {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+
+
+class WhisperModelRegistry:
+    """Loads each Whisper model size once and keeps it warm for reuse.
+
+    Loading is guarded by a lock per model size, so concurrent requests for a cold
+    model wait for a single load rather than each loading their own copy. Each size
+    also has an inference lock: Whisper installs its key/value cache hooks on the
+    shared model for every decode, so two threads transcribing with one model at once
+    would corrupt each other's caches.
+    """
+
+    def __init__(self) -> None:
+        """Initialises an empty registry."""
+        self._models: dict[str, object] = {}
+        self._load_seconds: dict[str, float] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._inference_locks: dict[str, threading.Lock] = {}
+        self._registry_lock: threading.Lock = threading.Lock()
+
+    def get_model(self, size: str) -> object:
+        """Returns the Whisper model for the given size, loading it if required.
+
+        Args:
+            size (str): The model name (e.g. "tiny", "base", "small", "small-int8").
+
+        Returns:
+            object: The loaded Whisper model.
+        """
+        model = self._models.get(size)
+        if model is not None:
+            return model
+
+        with self._get_lock(size):
+            # Another thread may have finished loading while this one waited.
+            model = self._models.get(size)
+            if model is None:
+                model = self._load_model(size)
+        return model
+
+    def get_inference_lock(self, size: str) -> threading.Lock:
+        """Returns the lock to hold while a model size transcribes.
+
+        Args:
+            size (str): The Whisper model size.
+
+        Returns:
+            threading.Lock: The lock serialising inference with that size's model.
+        """
+        with self._registry_lock:
+            return self._inference_locks.setdefault(size, threading.Lock())
+
+    def warm_up(self, sizes: list[str]) -> None:
+        """Eagerly loads the given model sizes so the first request is not cold.
+
+        Args:
+            sizes (list[str]): The Whisper model sizes to load.
+        """
+        for size in sizes:
+            self.get_model(size)
+
+    def is_warm(self, size: str) -> bool:
+        """Checks whether a model size has already been loaded in this process.
+
+        Args:
+            size (str): The Whisper model size.
+
+        Returns:
+            bool: True if the model is loaded, False otherwise.
+        """
+        return size in self._models
+
+    def memory_usage(self, size: str) -> int:
+        """Returns the memory held by a loaded model's parameters and buffers.
+
+        Args:
+            size (str): The Whisper model size.
+
+        Returns:
+            int: The size in bytes, or 0 if the model is not loaded.
+        """
+        model = self._models.get(size)
+        if model is None:
+            return 0
+        tensors = list(model.parameters()) + list(model.buffers())
+        for module in model.modules():
+            # Quantized layers pack their weights outside parameters() and buffers().
+            if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+                tensors.extend(t for t in module._weight_bias() if t is not None)
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+    def status(self) -> dict:
+        """Summarises every model loaded in this process.
+
+        Returns:
+            dict: Keyed by model size, with warm state, memory in bytes and load time.
+        """
+        return {
+            size: {
+                "warm": True,
+                "memory_bytes": self.memory_usage(size),
+                "load_seconds": round(self._load_seconds.get(size, 0.0), 3),
+            }
+            for size in list(self._models)
+        }
+
+    def clear(self) -> None:
+        """Drops every loaded model, releasing their memory on the next collection."""
+        with self._registry_lock:
+            self._models.clear()
+            self._load_seconds.clear()
+
+    def _get_lock(self, size: str) -> threading.Lock:
+        """Returns the load lock for a model size, creating it if required.
+
+        Args:
+            size (str): The Whisper model size.
+
+        Returns:
+            threading.Lock: The lock guarding loads of that size.
+        """
+        with self._registry_lock:
+            return self._locks.setdefault(size, threading.Lock())
+
+    def _load_model(self, size: str) -> object:
+        """Loads a Whisper model from disk and stores it in the registry.
+
+        Args:
+            size (str): The Whisper model size.
+
+        Returns:
+            object: The loaded Whisper model.
+        """
+        started: float = time.perf_counter()
+        whisper_size, quantized = parse_model_name(size)
+        if quantized:
+            model = quantize_model(whisper.load_model(whisper_size, device="cpu"))
+        else:
+            model = whisper.load_model(whisper_size)
+        self._load_seconds[size] = time.perf_counter() - started
+        self._models[size] = model
+        logger.info(
+            f"Loaded Whisper model '{size}' in {self._load_seconds[size]:.2f}s "
+            f"({self.memory_usage(size) / 1024 / 1024:.0f} MB)"
+        )
+        return model
+
+
+whisper_model_registry: WhisperModelRegistry = WhisperModelRegistry()
+
+
+class TranscriptionQueueFullError(Exception):
+    """Raised when the transcription pool cannot accept another job.
+
+    Attributes:
+        status_code (int): The HTTP status to answer with.
+        retry_after (int): Seconds the client should wait before retrying.
+    """
+
+    status_code: int = 503
+
+    def __init__(self, retry_after: int) -> None:
+        """Initialises the error with the suggested retry delay.
+
+        Args:
+            retry_after (int): Seconds the client should wait before retrying.
+        """
+        super().__init__("Transcription queue is full, please retry later")
+        self.retry_after: int = retry_after
+
+
+def _warm_up_worker(sizes: list[str]) -> None:
+    """Loads Whisper models when a worker process starts.
+
+    Args:
+        sizes (list[str]): The Whisper model sizes to load.
+    """
+    whisper_model_registry.warm_up(sizes)
+
+
+def _run_job(submitted_at: float, func: object, *args: object) -> tuple[float, object]:
+    """Runs a job in a worker process, recording when it started.
+
+    Args:
+        submitted_at (float): The wall clock time the job was submitted.
+        func: The function to run.
+        *args: The arguments for the function.
+
+    Returns:
+        tuple[float, object]: The seconds the job waited in the queue and its result.
+    """
+    return time.time() - submitted_at, func(*args)
+
+
+def _transcribe_in_process(size: str, audio: object) -> str:
+    """Transcribes audio with a model from this process's registry.
+
+    The model is shared by every thread in the process, so its inference lock is held
+    while it transcribes.
+
+    Args:
+        size (str): The Whisper model size.
+        audio: A path to an audio file or a float32 sample array.
+
+    Returns:
+        str: The transcribed text.
+    """
+    model = whisper_model_registry.get_model(size)
+    with whisper_model_registry.get_inference_lock(size):
+        transcription_result: dict = model.transcribe(audio)
+    return transcription_result["text"].strip()
+
+
+def _transcribe_batch_in_process(size: str, audios: list[object]) -> list[str]:
+    """Transcribes several clips with one Whisper forward pass.
+
+    Clips of up to 30 seconds (one Whisper window) are padded to the window, stacked
+    and decoded together. Longer clips need Whisper's sliding window, so they are
+    transcribed individually.
+
+    Args:
+        size (str): The Whisper model size.
+        audios (list): The float32 sample arrays.
+
+    Returns:
+        list[str]: The text of each clip, in order.
+    """
+    model = whisper_model_registry.get_model(size)
+    texts: list[str] = [""] * len(audios)
+    batched: list[int] = []
+    for index, audio in enumerate(audios):
+        if len(audio) <= whisper.audio.N_SAMPLES:
+            batched.append(index)
+        else:
+            texts[index] = _transcribe_in_process(size, audio)
+
+    if batched:
+        mel = torch.stack(
+            [
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(audios[index]), n_mels=model.dims.n_mels
+                )
+                for index in batched
+            ]
+        ).to(model.device)
+        options = whisper.DecodingOptions(
+            without_timestamps=True, fp16=model.device.type == "cuda"
+        )
+        with whisper_model_registry.get_inference_lock(size):
+            results: list = whisper.decode(model, mel, options)
+        for index, result in zip(batched, results):
+            texts[index] = result.text.strip()
+    return texts
+
+
+class TranscriptionWorkerPool:
+    """A fixed-size pool of processes for transcription with a bounded job queue.
+
+    Each worker process keeps its own warm models in its registry. Capacity is the
+    number of workers plus the queue size; jobs beyond that are rejected immediately.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        warm_up_sizes: list[str] | None = None,
+        retry_after: int = 5,
+        timeout: float | None = None,
+    ) -> None:
+        """Initialises the pool. Worker processes are started on first use.
+
+        Args:
+            workers (int): The number of worker processes.
+            queue_size (int): The number of jobs allowed to wait for a free worker.
+            warm_up_sizes (list[str] | None): Model sizes each worker loads at start.
+            retry_after (int): Seconds suggested to clients when the queue is full.
+            timeout (float | None): Seconds to wait for a job's result.
+        """
+        self.workers: int = workers
+        self.queue_size: int = queue_size
+        self.retry_after: int = retry_after
+        self.timeout: float | None = timeout
+        self._slots: threading.BoundedSemaphore = threading.BoundedSemaphore(
+            workers + queue_size
+        )
+        self._executor: ProcessPoolExecutor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up_worker,
+            initargs=(list(warm_up_sizes or []),),
+        )
+        self._stats_lock: threading.Lock = threading.Lock()
+        self._in_flight: int = 0
+        self._completed: int = 0
+        self._rejected: int = 0
+        self._wait_seconds: collections.deque = collections.deque(maxlen=500)
+
+    def start(self) -> None:
+        """Starts every worker process so their models are loaded before traffic."""
+        for _ in range(self.workers):
+            self.submit(len, ())
+
+    def submit(self, func: object, *args: object) -> Future:
+        """Submits a job to the pool.
+
+        Args:
+            func: A picklable, module-level function to run in a worker.
+            *args: The arguments for the function.
+
+        Returns:
+            Future: Resolves to (seconds waited in the queue, result).
+
+        Raises:
+            TranscriptionQueueFullError: If every worker and queue slot is in use.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            raise TranscriptionQueueFullError(self.retry_after)
+
+        with self._stats_lock:
+            self._in_flight += 1
+        try:
+            future: Future = self._executor.submit(_run_job, time.time(), func, *args)
+        except Exception:
+            self._job_done(None)
+            raise
+        future.add_done_callback(self._job_done)
+        return future
+
+    def free_slots(self) -> int:
+        """Counts the jobs the pool can accept before it rejects them.
+
+        Returns:
+            int: The free worker and queue slots.
+        """
+        with self._stats_lock:
+            return max(0, self.workers + self.queue_size - self._in_flight)
+
+    def transcribe(self, size: str, audio: object) -> str:
+        """Transcribes audio in a worker process and waits for the text.
+
+        Args:
+            size (str): The Whisper model size.
+            audio: A path to an audio file or a float32 sample array.
+
+        Returns:
+            str: The transcribed text.
+        """
+        _, text = self.submit(_transcribe_in_process, size, audio).result(
+            timeout=self.timeout
+        )
+        return text
+
+    def stats(self) -> dict:
+        """Summarises the pool's load for monitoring and sizing.
+
+        Returns:
+            dict: Worker and queue sizes, current depth, counters and queue wait times.
+        """
+        with self._stats_lock:
+            wait_seconds: list[float] = sorted(self._wait_seconds)
+            in_flight: int = self._in_flight
+            completed: int = self._completed
+            rejected: int = self._rejected
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - self.workers),
+            "completed": completed,
+            "rejected": rejected,
+            "wait_seconds_avg": (
+                round(sum(wait_seconds) / len(wait_seconds), 3) if wait_seconds else 0.0
+            ),
+            "wait_seconds_p95": (
+                round(wait_seconds[int(0.95 * (len(wait_seconds) - 1))], 3)
+                if wait_seconds
+                else 0.0
+            ),
+            "wait_seconds_max": round(wait_seconds[-1], 3) if wait_seconds else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        """Stops the worker processes, waiting for running jobs to finish."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _job_done(self, future: Future | None) -> None:
+        """Frees a job's slot and records its queue wait once it finishes.
+
+        Args:
+            future (Future | None): The finished job, or None if submission failed.
+        """
+        self._slots.release()
+        with self._stats_lock:
+            self._in_flight -= 1
+            if future is not None and not future.cancelled():
+                self._completed += 1
+                if future.exception() is None:
+                    self._wait_seconds.append(future.result()[0])
+
+
+class TranscriptionCache:
+    """A bounded, expiring cache of transcriptions keyed by audio content.
+
+    Entries are evicted least recently used first once max_entries is reached, and
+    expire ttl_seconds after they were stored.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        """Initialises an empty cache.
+
+        Args:
+            max_entries (int): The most transcriptions to hold.
+            ttl_seconds (float): How long a transcription stays valid.
+        """
+        self.max_entries: int = max_entries
+        self.ttl_seconds: float = ttl_seconds
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @staticmethod
+    def make_key(audio_bytes: bytes, size: str) -> str:
+        """Builds the cache key for a clip transcribed by a model size.
+
+        Args:
+            audio_bytes (bytes): The raw bytes of the uploaded audio.
+            size (str): The Whisper model size.
+
+        Returns:
+            str: The cache key.
+        """
+        digest = hashlib.sha256(audio_bytes).hexdigest()
+        return f"{size}:{digest}"
+
+    def get(self, key: str) -> str | None:
+        """Returns a cached transcription, counting the hit or miss.
+
+        Args:
+            key (str): The cache key from make_key.
+
+        Returns:
+            str | None: The transcription, or None if absent or expired.
+        """
+        with self._lock:
+            entry: tuple[float, str] | None = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, text: str) -> None:
+        """Stores a transcription, evicting the least recently used if full.
+
+        Args:
+            key (str): The cache key from make_key.
+            text (str): The transcription.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Summarises the cache for monitoring.
+
+        Returns:
+            dict: The entry count, bounds and hit/miss counters.
+        """
+        with self._lock:
+            lookups: int = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def clear(self) -> None:
+        """Removes every entry and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_transcription_lock: threading.Lock = threading.Lock()
+_transcription_cache: TranscriptionCache | None = None
+
+
+def get_transcription_cache() -> TranscriptionCache | None:
+    """Returns the process's transcription cache, creating it from settings on first use.
+
+    Returns:
+        TranscriptionCache | None: The cache, or None if caching is disabled.
+    """
+    global _transcription_cache
+    if not settings.NOA_TRANSCRIPTION_CACHE_SIZE:
+        return None
+    if _transcription_cache is None:
+        with _transcription_lock:
+            if _transcription_cache is None:
+                _transcription_cache = TranscriptionCache(
+                    max_entries=settings.NOA_TRANSCRIPTION_CACHE_SIZE,
+                    ttl_seconds=settings.NOA_TRANSCRIPTION_CACHE_TTL,
+                )
+    return _transcription_cache
+
+
+_transcription_pool: TranscriptionWorkerPool | None = None
+
+
+def get_transcription_pool() -> TranscriptionWorkerPool | None:
+    """Returns the process's transcription pool, creating it from settings on first use.
+
+    Returns:
+        TranscriptionWorkerPool | None: The pool, or None if transcription runs in-process.
+    """
+    global _transcription_pool
+    if not settings.NOA_TRANSCRIPTION_WORKERS:
+        return None
+    if _transcription_pool is None:
+        with _transcription_lock:
+            if _transcription_pool is None:
+                _transcription_pool = TranscriptionWorkerPool(
+                    workers=settings.NOA_TRANSCRIPTION_WORKERS,
+                    queue_size=settings.NOA_TRANSCRIPTION_QUEUE_SIZE,
+                    warm_up_sizes=settings.NOA_WHISPER_WARMUP_MODELS,
+                    retry_after=settings.NOA_TRANSCRIPTION_RETRY_AFTER,
+                    timeout=settings.NOA_TRANSCRIPTION_TIMEOUT,
+                )
+                atexit.register(_transcription_pool.shutdown)
+    return _transcription_pool
+
+
+def warm_up_transcription(sizes: list[str]) -> None:
+    """Loads Whisper models wherever transcription will run.
+
+    Args:
+        sizes (list[str]): The Whisper model sizes to load.
+    """
+    pool: TranscriptionWorkerPool | None = get_transcription_pool()
+    if pool is not None:
+        pool.start()
+    else:
+        whisper_model_registry.warm_up(sizes)
+
+
+def transcribe_audio(size: str, audio: object) -> str:
+    """Transcribes audio in the worker pool if configured, otherwise in this process.
+
+    Args:
+        size (str): The Whisper model size.
+        audio: A path to an audio file or a float32 sample array.
+
+    Returns:
+        str: The transcribed text.
+
+    Raises:
+        TranscriptionQueueFullError: If the pool cannot accept another job.
+    """
+    pool: TranscriptionWorkerPool | None = get_transcription_pool()
+    if pool is not None:
+        return pool.transcribe(size, audio)
+    return _transcribe_in_process(size, audio)
+
+
+def _dispatch_transcription_batch(size: str, audios: list[object]) -> Future:
+    """Runs a batch of clips in the worker pool, or in this process if there is none.
+
+    Args:
+        size (str): The Whisper model size.
+        audios (list): The float32 sample arrays.
+
+    Returns:
+        Future: Resolves to the text of each clip, in order.
+
+    Raises:
+        TranscriptionQueueFullError: If the pool cannot accept the batch.
+    """
+    texts_future: Future = Future()
+    pool: TranscriptionWorkerPool | None = get_transcription_pool()
+    if pool is None:
+        try:
+            texts_future.set_result(_transcribe_batch_in_process(size, audios))
+        except Exception as e:
+            texts_future.set_exception(e)
+        return texts_future
+
+    def resolve(job: Future) -> None:
+        if job.exception() is not None:
+            texts_future.set_exception(job.exception())
+        else:
+            texts_future.set_result(job.result()[1])
+
+    pool.submit(_transcribe_batch_in_process, size, audios).add_done_callback(resolve)
+    return texts_future
+
+
+_transcription_batchers: dict[str, TranscriptionBatcher] = {}
+
+
+def get_transcription_batcher(size: str) -> TranscriptionBatcher | None:
+    """Returns the process's batcher for a model size, creating it on first use.
+
+    Args:
+        size (str): The Whisper model size.
+
+    Returns:
+        TranscriptionBatcher | None: The batcher, or None if batching is disabled.
+    """
+    if not settings.NOA_TRANSCRIPTION_BATCH_WINDOW_MS:
+        return None
+    with _transcription_lock:
+        if size not in _transcription_batchers:
+            _transcription_batchers[size] = TranscriptionBatcher(
+                dispatch=lambda audios: _dispatch_transcription_batch(size, audios),
+                window_seconds=settings.NOA_TRANSCRIPTION_BATCH_WINDOW_MS / 1000,
+                max_batch_size=settings.NOA_TRANSCRIPTION_BATCH_SIZE,
+            )
+        return _transcription_batchers[size]
+
+
+def transcribe_audio_segments(size: str, segments: list[object]) -> str:
+    """Transcribes chunks of one recording and joins the text in order.
+
+    With batching enabled the chunks join the current batch, alongside clips from any
+    other requests arriving at the same time. Otherwise, with a worker pool the chunks
+    are transcribed in parallel, merged into no more jobs than there are workers and
+    free slots so a long recording does not fill the pool by itself. Without a pool
+    they are transcribed one after another, since the process's Whisper model runs
+    one transcription at a time (see WhisperModelRegistry.get_inference_lock).
+
+    Args:
+        size (str): The Whisper model size.
+        segments (list): The float32 sample arrays, in recording order.
+
+    Returns:
+        str: The joined transcription.
+
+    Raises:
+        TranscriptionQueueFullError: If the pool cannot accept the chunks' jobs.
+    """
+    batcher: TranscriptionBatcher | None = get_transcription_batcher(size)
+    pool: TranscriptionWorkerPool | None = get_transcription_pool()
+    if batcher is not None:
+        futures: list[Future] = [batcher.submit(audio) for audio in segments]
+        texts: list[str] = [
+            future.result(timeout=pool.timeout if pool else None)
+            for future in futures
+        ]
+    elif pool is None:
+        texts = [_transcribe_in_process(size, audio) for audio in segments]
+    else:
+        jobs: int = max(1, min(len(segments), pool.workers, pool.free_slots()))
+        futures = []
+        try:
+            for audio in _merge_segments(segments, jobs):
+                futures.append(pool.submit(_transcribe_in_process, size, audio))
+            texts = [future.result(timeout=pool.timeout)[1] for future in futures]
+        except Exception:
+            # The request has failed, so its chunks still waiting are not run.
+            for future in futures:
+                future.cancel()
+            raise
+    return " ".join(text for text in texts if text)
+
+
+def _merge_segments(segments: list[object], count: int) -> list[object]:
+    """Joins adjacent chunks of a recording into a number of longer chunks.
+
+    Args:
+        segments (list): The float32 sample arrays, in recording order.
+        count (int): The most chunks to return.
+
+    Returns:
+        list: The chunks, each the concatenation of a run of adjacent segments.
+    """
+    if len(segments) <= count:
+        return list(segments)
+    return [
+        np.concatenate([segments[index] for index in group])
+        for group in np.array_split(np.arange(len(segments)), count)
+    ]
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Calculates the word error rate of a transcription against a reference.
+
+    Both texts are normalised with Whisper's English normaliser first, so differences in
+    case, punctuation and spelling of numbers are not counted as errors.
+
+    Args:
+        reference (str): What was actually said.
+        hypothesis (str): The transcription.
+
+    Returns:
+        float: Word substitutions, deletions and insertions over the reference length.
+    """
+    normalizer = EnglishTextNormalizer()
+    reference_words: list[str] = normalizer(reference).split()
+    hypothesis_words: list[str] = normalizer(hypothesis).split()
+    if not reference_words:
+        return float(bool(hypothesis_words))
+
+    # Edit distance between the word sequences, one row at a time.
+    previous: list[int] = list(range(len(hypothesis_words) + 1))
+    for row, reference_word in enumerate(reference_words, start=1):
+        current: list[int] = [row]
+        for column, hypothesis_word in enumerate(hypothesis_words, start=1):
+            current.append(
+                min(
+                    previous[column] + 1,
+                    current[column - 1] + 1,
+                    previous[column - 1] + (reference_word != hypothesis_word),
+                )
+            )
+        previous = current
+    return previous[-1] / len(reference_words)
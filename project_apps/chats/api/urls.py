@@ -1,7 +1,37 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import NOAMultiModalEndpoint
+from .views import (
+    AIModelStatusEndpoint,
+    AsyncNOAMultiModalEndpoint,
+    NOAMultiModalEndpoint,
+    PromptBatchEndpoint,
+    PromptBatchStatusEndpoint,
+    TranscriptionStatusEndpoint,
+)
+
+noa_endpoint = (
+    AsyncNOAMultiModalEndpoint
+    if settings.AIMODEL_ASYNC_VIEWS
+    else NOAMultiModalEndpoint
+)
 
 urlpatterns = [
-    path("mm/", NOAMultiModalEndpoint.as_view(), name="noa-mm-endpoint"),
+    path("mm/", noa_endpoint.as_view(), name="noa-mm-endpoint"),
+    path(
+        "transcription/status/",
+        TranscriptionStatusEndpoint.as_view(),
+        name="noa-transcription-status",
+    ),
+    path(
+        "aimodels/status/",
+        AIModelStatusEndpoint.as_view(),
+        name="noa-aimodel-status",
+    ),
+    path("batches/", PromptBatchEndpoint.as_view(), name="noa-prompt-batches"),
+    path(
+        "batches/<uuid:pk>/",
+        PromptBatchStatusEndpoint.as_view(),
+        name="noa-prompt-batch",
+    ),
 ]
@@ -2,22 +2,67 @@
 
 This module provides an API endpoint that mimics the NOA API for BrilliantLabs Frame AR glasses.
 It handles multimodal requests (text, audio, images) and returns structured responses using AI models.
+
+AsyncNOAMultiModalEndpoint is the same endpoint for ASGI deployments: it awaits the AI
+model instead of holding a worker thread while the provider generates the response.
+
+TranscriptionStatusEndpoint and AIModelStatusEndpoint report the worker process's
+speech-to-text and AI model state for monitoring.
+
+PromptBatchEndpoint submits batch jobs of prompts to be answered offline, and
+PromptBatchStatusEndpoint reports their progress.
 """
 
+import inspect
 import json
 import logging
 import tempfile
+import time
 
-import whisper
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from project_apps.aimodels.backends import get_backend_registry
+from project_apps.aimodels.caching import get_response_cache
+from project_apps.aimodels.circuits import CircuitOpenError, get_circuit_breakers
+from project_apps.aimodels.coalescing import get_request_coalescer
+from project_apps.aimodels.hedging import get_request_hedger
 from project_apps.aimodels.models import AIModel
-from project_apps.chats.models import ConversationItem, ConversationThread
-
-from .serializers import MultimodalRequestSerializer, MultimodalResponseSerializer
+from project_apps.aimodels.ratelimits import RateLimitExceededError, get_rate_limiter
+from project_apps.aimodels.routing import get_latency_tracker, get_model_router
+from project_apps.aimodels.semantic_cache import get_semantic_cache
+from project_apps.aimodels.tokens import ResponseText, TokenUsage, count_token_usage
+from project_apps.chats.batches import get_prompt_batch_runner
+from project_apps.chats.models import (
+    ConversationItem,
+    ConversationThread,
+    PromptBatchJob,
+)
+
+from .audio import AudioDecodeError, decode_audio, split_speech_segments
+from .pipeline import Stage, StagePipeline, get_stage_executor
+from .serializers import (
+    MultimodalRequestSerializer,
+    MultimodalResponseSerializer,
+    PromptBatchJobSerializer,
+    PromptBatchRequestSerializer,
+)
+from .transcription import (
+    TranscriptionCache,
+    TranscriptionQueueFullError,
+    get_transcription_batcher,
+    get_transcription_cache,
+    get_transcription_pool,
+    transcribe_audio,
+    transcribe_audio_segments,
+    whisper_model_registry,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +78,19 @@ class NOAMultiModalEndpoint(APIView):
     parser_classes = [MultiPartParser, FormParser]
     permission_classes = [AllowAny]  # No auth required per specs
     aimodel_name = "openai/gpt-oss-20b:free"
+    aimodel_use_case = (
+        "Voice assistant: conversational question answering, image description"
+    )
+
+    @property
+    def whisper_model_size(self) -> str:
+        """
+        The Whisper model used for speech-to-text, as configured for this deployment.
+
+        Returns:
+            str: The model name, e.g. "small" or "small-int8".
+        """
+        return settings.NOA_WHISPER_MODEL
 
     def post(self, request, *args, **kwargs) -> Response:
         """
@@ -50,56 +108,110 @@ class NOAMultiModalEndpoint(APIView):
         """
         try:
             return self._process_multimodal_request(request)
-        except json.JSONDecodeError:
-            return Response({"detail": "Invalid JSON in mm parameter"}, status=400)
         except Exception as e:
-            logger.exception("Error processing NOA request")
+            return self._get_error_response(e)
+
+    def _get_error_response(self, error: Exception) -> Response:
+        """
+        Builds the response for an error raised while processing a request.
+
+        Args:
+            error: The exception raised.
+
+        Returns:
+            Response: A DRF Response object with the error details.
+        """
+        if isinstance(error, json.JSONDecodeError):
+            return Response({"detail": "Invalid JSON in mm parameter"}, status=400)
+        if isinstance(
+            error,
+            (TranscriptionQueueFullError, CircuitOpenError, RateLimitExceededError),
+        ):
+            logger.warning(f"Rejecting NOA request: {error}")
             return Response(
-                {"detail": f"Exception: {str(e)}"},
-                status=e.status_code if hasattr(e, "status_code") else 500,
+                {"detail": str(error)},
+                status=error.status_code,
+                headers={"Retry-After": str(error.retry_after)},
             )
+        logger.error("Error processing NOA request", exc_info=error)
+        return Response(
+            {"detail": f"Exception: {str(error)}"},
+            status=error.status_code if hasattr(error, "status_code") else 500,
+        )
 
     def _process_multimodal_request(self, request) -> Response:
         """
         Processes the multimodal request and orchestrates extraction, validation, AI response,
         and formatting.
 
+        After validation the work runs as a graph of stages (see _get_pipeline_stages), so
+        audio transcription, image processing and the AI model lookup overlap. Each stage's
+        duration is returned in the response's timings.
+
         Args:
             request: The HTTP request object.
 
         Returns:
             Response: A DRF Response object with the validated AI response or error details.
         """
+        started: float = time.perf_counter()
+        pipeline: StagePipeline | None = self._get_pipeline(request)
+        if pipeline is None:
+            return Response({"detail": "Invalid multimodal data"}, status=400)
+        pipeline.timings["validate"] = time.perf_counter() - started
+        results: dict = pipeline.run()
+        return self._get_pipeline_response(pipeline, results, started)
+
+    def _get_pipeline(self, request) -> StagePipeline | None:
+        """
+        Extracts and validates the request data and builds the pipeline that answers it.
+
+        Args:
+            request: The HTTP request object.
+
+        Returns:
+            StagePipeline or None: The pipeline, or None if the request data is invalid.
+        """
         multimodal_data: dict = self._extract_multimodal_data(request.POST)
         validated_data: dict | None = self._validate_multimodal_data(multimodal_data)
         if not validated_data:
-            return Response({"detail": "Invalid multimodal data"}, status=400)
+            return None
 
-        prompt: str = validated_data.get("prompt", "No Prompt Provided")
         # other possible multimodal data items for processing
         # messages = validated_data.get("messages", [])
         # address = validated_data.get("address", "")
         # local_time = validated_data.get("local_time", "")
 
-        audio_text: str = self._transcribe_user_prompt_from_audio(
-            request.FILES.get("audio")
-        )
-        image = self._process_image_file(request.FILES.get("image"))
-
-        full_user_prompt: str = self._build_full_prompt(prompt, audio_text)
-        aimodel = self._get_aimodel()
-        aimodel_response = self._generate_response(full_user_prompt, aimodel)
-        response_text: str = (
-            aimodel_response.choices[0].message.content.strip()
-            if aimodel_response
-            else "No response generated"
+        return StagePipeline(
+            self._get_pipeline_stages(
+                validated_data, request.FILES.get("audio"), request.FILES.get("image")
+            ),
+            get_stage_executor(),
         )
 
-        self._save_conversation(aimodel, full_user_prompt, response_text)
+    def _get_pipeline_response(
+        self, pipeline: StagePipeline, results: dict, started: float
+    ) -> Response:
+        """
+        Formats the results of a finished pipeline as the NOA response.
+
+        Args:
+            pipeline: The pipeline that ran.
+            results: The pipeline's results.
+            started: When the request started, from time.perf_counter.
+
+        Returns:
+            Response: A DRF Response object with the validated AI response or error details.
+        """
+        pipeline.timings["total"] = time.perf_counter() - started
+        logger.info(f"NOA request timings: {pipeline.format_timings()}")
 
         response_data: dict = self._prepare_noa_response_data(
-            full_user_prompt, response_text
+            results["build_prompt"],
+            results["generate_response"],
+            results.get("get_aimodel"),
         )
+        response_data["timings"] = pipeline.format_timings()
 
         validated_response_data: dict | None = self._validate_response_data(
             response_data
@@ -110,6 +222,109 @@ class NOAMultiModalEndpoint(APIView):
             else Response({"detail": "Server error in response formatting"}, status=500)
         )
 
+    def _get_pipeline_stages(
+        self, validated_data: dict, audio_file, image_file
+    ) -> list[Stage]:
+        """
+        Builds the graph of stages that turn a validated request into a response.
+
+            transcribe_audio ──> build_prompt ──┬──> get_aimodel ──┐
+            load_aimodels ──────────────────────┘                 │
+            process_image ────────────────────────────────────────┴──> generate_response ──> save_conversation
+
+        transcribe_audio, process_image and load_aimodels have no dependencies and run
+        at the same time. get_aimodel waits for the prompt, as the router sizes it to
+        choose the AI model, but only ranks the AI models already loaded. Stages that
+        use the database run inline on the request thread.
+
+        Args:
+            validated_data: The validated multimodal data.
+            audio_file: The uploaded audio file, if any.
+            image_file: The uploaded image file, if any.
+
+        Returns:
+            list[Stage]: The stages for a StagePipeline.
+        """
+        prompt: str = validated_data.get("prompt", "No Prompt Provided")
+        return [
+            Stage(
+                "transcribe_audio",
+                lambda results: self._transcribe_user_prompt_from_audio(audio_file),
+            ),
+            Stage(
+                "process_image",
+                lambda results: self._process_image_file(image_file),
+            ),
+            Stage(
+                "load_aimodels",
+                lambda results: self._load_aimodels(),
+                inline=True,
+            ),
+            Stage(
+                "build_prompt",
+                lambda results: self._build_full_prompt(
+                    prompt, results["transcribe_audio"]
+                ),
+                depends_on=("transcribe_audio",),
+                inline=True,
+            ),
+            Stage(
+                "get_aimodel",
+                lambda results: self._get_aimodel(
+                    results["build_prompt"], results["load_aimodels"]
+                ),
+                depends_on=("build_prompt", "load_aimodels"),
+                inline=True,
+            ),
+            Stage(
+                "generate_response",
+                self._generate_response_stage,
+                depends_on=("build_prompt", "get_aimodel", "process_image"),
+                inline=True,
+            ),
+            Stage(
+                "save_conversation",
+                lambda results: self._save_conversation(
+                    results["get_aimodel"],
+                    results["build_prompt"],
+                    results["generate_response"],
+                ),
+                depends_on=("generate_response",),
+                inline=True,
+            ),
+        ]
+
+    def _generate_response_stage(self, results: dict) -> str:
+        """
+        Runs the generate_response stage: asks the AI model and extracts its text.
+
+        Args:
+            results: The results of the earlier stages.
+
+        Returns:
+            str: The response text.
+        """
+        return self._get_response_text(
+            self._generate_response(results["build_prompt"], results["get_aimodel"])
+        )
+
+    def _get_response_text(self, aimodel_response: object) -> str:
+        """
+        Tidies the AI model's response text.
+
+        Args:
+            aimodel_response: The AI model's response text, or None.
+
+        Returns:
+            str: The response text, with the provider's token usage if it reported it,
+                or a placeholder if no response was generated.
+        """
+        if not aimodel_response:
+            return "No response generated"
+        return ResponseText(
+            aimodel_response.strip(), getattr(aimodel_response, "usage", None)
+        )
+
     def _extract_multimodal_data(self, mm_data: dict) -> dict:
         """
         Extracts and transforms multimodal data from the request to match serializer expectations.
@@ -149,25 +364,82 @@ class NOAMultiModalEndpoint(APIView):
         """
         Transcribes audio input to text using the Whisper model.
 
+        The upload is decoded in memory and handed to Whisper as samples; a temporary
+        file is only used for formats that cannot be decoded that way.
+
+        Transcription runs in the transcription worker pool when one is configured, so
+        Whisper inference does not hold up the web worker's other requests. Results are
+        cached by audio content, so a retried upload is not transcribed again.
+
         Args:
             audio_file: The uploaded audio file.
 
         Returns:
             str: The transcribed text from the audio, or an empty string if no audio is provided.
+
+        Raises:
+            TranscriptionQueueFullError: If the transcription pool cannot accept the job.
         """
         audio_text: str = ""
         if audio_file:
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as temp_audio:
-                for chunk in audio_file.chunks():
-                    temp_audio.write(chunk)
-                temp_audio.flush()
-                model = whisper.load_model("small")
-                transcription_result: dict = model.transcribe(temp_audio.name)
-                audio_text = transcription_result["text"].strip()
-                logger.info(f"Received audio file: {audio_file.name}")
+            logger.info(f"Received audio file: {audio_file.name}")
+            audio_bytes: bytes = b"".join(audio_file.chunks())
+            cache: TranscriptionCache | None = get_transcription_cache()
+            cache_key: str = TranscriptionCache.make_key(
+                audio_bytes, self.whisper_model_size
+            )
+            cached_text: str | None = cache.get(cache_key) if cache else None
+            if cached_text is not None:
+                return cached_text
+
+            audio_text = self._transcribe_audio_bytes(audio_bytes)
+            if cache:
+                cache.set(cache_key, audio_text)
 
         return audio_text
 
+    def _transcribe_audio_bytes(self, audio_bytes: bytes) -> str:
+        """
+        Transcribes the raw bytes of an uploaded audio file.
+
+        Unless disabled by settings, silence is trimmed and the speech is split at
+        pauses so the chunks can be transcribed in parallel.
+
+        Args:
+            audio_bytes: The raw bytes of the uploaded audio file.
+
+        Returns:
+            str: The transcribed text from the audio.
+        """
+        try:
+            audio = decode_audio(audio_bytes)
+        except AudioDecodeError:
+            logger.info("Audio not decodable in memory, using a temporary file")
+            return self._transcribe_audio_from_temp_file(audio_bytes)
+        if not settings.NOA_TRANSCRIPTION_VAD:
+            return transcribe_audio_segments(self.whisper_model_size, [audio])
+
+        segments: list = split_speech_segments(audio)
+        logger.info(f"Audio split into {len(segments)} speech segments")
+        return transcribe_audio_segments(self.whisper_model_size, segments)
+
+    def _transcribe_audio_from_temp_file(self, audio_bytes: bytes) -> str:
+        """
+        Transcribes audio by writing it to a temporary file for Whisper to decode.
+
+        This is the fallback for formats that cannot be decoded in memory.
+
+        Args:
+            audio_bytes: The raw bytes of the uploaded audio file.
+
+        Returns:
+            str: The transcribed text from the audio.
+        """
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as temp_audio:
+            temp_audio.write(audio_bytes)
+            temp_audio.flush()
+            return transcribe_audio(self.whisper_model_size, temp_audio.name)
+
     def _process_image_file(self, image_file) -> object | None:
         """
         Processes the uploaded image file for vision features.
@@ -200,7 +472,9 @@ class NOAMultiModalEndpoint(APIView):
         # This could also include a system prompt or other context.
         return f"{prompt} {audio_text}".strip()
 
-    def _generate_response(self, full_user_prompt: str, aimodel: AIModel) -> object:
+    def _generate_response(
+        self, full_user_prompt: str, aimodel: AIModel
+    ) -> str | None:
         """
         Generates a response from the AI model based on the full user prompt.
 
@@ -209,14 +483,14 @@ class NOAMultiModalEndpoint(APIView):
             aimodel: The AIModel instance to use for generating the response.
 
         Returns:
-            object or None: The AI model's response object.
+            str or None: The AI model's response text, from its cache if it is there.
         """
         # In a real implementation, you might call an AI model here
         # Call the AI model to get a response
         # Model name is a placeholder.
         # This should grab models as required by prompt.
         return (
-            aimodel.get_aimodel_response(full_user_prompt) if full_user_prompt else None
+            aimodel.get_response_text(full_user_prompt)[0] if full_user_prompt else None
         )
 
     def _save_conversation(
@@ -285,26 +559,32 @@ class NOAMultiModalEndpoint(APIView):
             ConversationItem: Should return the conversation item
         """
         # Save the conversation item
+        # usage = count_token_usage(full_prompt, response_text)
         # item = ConversationItem.objects.create(
         #     id=uuid.uuid4(),
         #     conversation_thread=conversation_thread,
         #     prompt=full_prompt,
         #     response=response_text,
-        #     tokens=len(full_prompt.split())
-        #     + len(response_text.split()),  # Simple token counting
+        #     tokens=usage.total_tokens,
+        #     input_tokens=usage.input_tokens,
+        #     output_tokens=usage.output_tokens,
         #     is_full_saved=True,
         # )
         pass
 
     def _prepare_noa_response_data(
-        self, full_user_prompt: str, response_text: str
+        self,
+        full_user_prompt: str,
+        response_text: str,
+        aimodel: AIModel | None = None,
     ) -> dict:
         """
-        Prepares the response data structure for the NOA API.
+        Prepares the response data structure for the NOA API, with its token usage.
 
         Args:
             full_user_prompt: The full user prompt string.
             response_text: The AI-generated response text.
+            aimodel: The AIModel that generated it, if any.
 
         Returns:
             dict: The structured response data.
@@ -329,27 +609,56 @@ class NOAMultiModalEndpoint(APIView):
         #         "topic_changed": False
         #     },  # Empty string instead of "None"
         # }
+        usage: TokenUsage = count_token_usage(full_user_prompt, response_text)
         return {
             "user_prompt": full_user_prompt,
             "message": response_text,
             "debug": {"topic_changed": False},
+            "token_usage_by_model": (
+                {aimodel.name: usage.as_dict()} if aimodel is not None else {}
+            ),
+            **usage.as_dict(),
         }
 
-    def _get_aimodel(self) -> AIModel:
+    def _load_aimodels(self) -> list[AIModel]:
+        """
+        Loads the active AI models the router chooses from.
+
+        Returns:
+            list[AIModel]: The active AIModel instances.
+        """
+        return list(AIModel.objects.filter(is_active=True))
+
+    def _get_aimodel(self, prompt: str, aimodels: list[AIModel]) -> AIModel:
         """
-        Retrieves the AIModel instance by name.
+        Chooses the AI model to answer the prompt among the active AI models.
+
+        The choice is made by the model router's AIMODEL_ROUTER_POLICY, from the AI
+        models' measured latency, error rate and token costs (see routing.py).
+
+        Args:
+            prompt: The full user prompt.
+            aimodels: The active AI models, from _load_aimodels.
 
         Returns:
             AIModel: The AIModel instance.
         """
-        return AIModel.objects.get(name=self._get_aimodel_name())
+        decision = get_model_router().choose(
+            prompt or "",
+            aimodels,
+            default_name=self._get_aimodel_name(),
+            use_case=self.aimodel_use_case,
+        )
+        if decision.aimodel is None:
+            return AIModel.objects.get(name=self._get_aimodel_name())
+        return decision.aimodel
 
     def _get_aimodel_name(self) -> str:
         """
-        Retrieves the AIModel name.
+        Retrieves the default AIModel name.
 
-        This function can be a hook for more complicated decision-making logic about
-        AI models to use in the future.
+        The default is used by the fixed routing policy, and when no active AI model
+        can take the prompt.
 
         Returns:
             str: The AIModel name.
@@ -385,3 +694,259 @@ class NOAMultiModalEndpoint(APIView):
             if response_serializer.is_valid()
             else None
         )
+
+
+class AsyncNOAMultiModalEndpoint(NOAMultiModalEndpoint):
+    """
+    The NOA multimodal endpoint as an async view, for running under ASGI.
+
+    While the AI model generates a response the request is parked on the event loop
+    rather than holding a worker thread, so one process can keep hundreds of prompts in
+    flight. Parsing, transcription and database stages still run in threads.
+
+    DRF's APIView only calls handlers synchronously, so dispatch is reimplemented to
+    await them.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        Runs DRF's request handling around the async handlers.
+
+        Args:
+            request: The Django HTTP request object.
+            *args: Additional positional arguments.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            Response: The finalised DRF Response object.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            # Authentication, permissions and throttling may use the database.
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self, request.method.lower(), self.http_method_not_allowed
+                )
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def post(self, request, *args, **kwargs) -> Response:
+        """
+        Handles POST requests for the NOA multimodal endpoint without blocking.
+
+        Args:
+            request: The HTTP request object containing multimodal data.
+            *args: Additional positional arguments.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            Response: A DRF Response object containing the AI-generated structured response or error details.
+        """
+        try:
+            return await self._aprocess_multimodal_request(request)
+        except Exception as e:
+            return self._get_error_response(e)
+
+    async def options(self, request, *args, **kwargs) -> Response:
+        """
+        Handles OPTIONS requests. Django requires every handler of an async view to be async.
+
+        Args:
+            request: The HTTP request object.
+            *args: Additional positional arguments.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            Response: The endpoint's metadata.
+        """
+        return super().options(request, *args, **kwargs)
+
+    async def _aprocess_multimodal_request(self, request) -> Response:
+        """
+        Processes the multimodal request as _process_multimodal_request does, awaiting the stages.
+
+        Args:
+            request: The HTTP request object.
+
+        Returns:
+            Response: A DRF Response object with the validated AI response or error details.
+        """
+        started: float = time.perf_counter()
+        # Parsing reads the uploaded files, so it runs in a thread.
+        pipeline: StagePipeline | None = await sync_to_async(self._get_pipeline)(
+            request
+        )
+        if pipeline is None:
+            return Response({"detail": "Invalid multimodal data"}, status=400)
+        pipeline.timings["validate"] = time.perf_counter() - started
+        results: dict = await pipeline.arun()
+        return self._get_pipeline_response(pipeline, results, started)
+
+    async def _generate_response_stage(self, results: dict) -> str:
+        """
+        Runs the generate_response stage on the event loop.
+
+        Args:
+            results: The results of the earlier stages.
+
+        Returns:
+            str: The response text.
+        """
+        full_user_prompt: str = results["build_prompt"]
+        if not full_user_prompt:
+            return self._get_response_text(None)
+        response_text, _ = await results["get_aimodel"].aget_response_text(
+            full_user_prompt
+        )
+        return self._get_response_text(response_text)
+
+
+class TranscriptionStatusEndpoint(APIView):
+    """
+    Reports the state of the speech-to-text models held by this worker process.
+
+    Used for monitoring whether the Whisper models are warm and how much memory they hold,
+    the transcription pool's queue depth and wait times for sizing the pool, and the
+    transcription cache's hit rate, and how well clips are being batched.
+    """
+
+    def get(self, request, *args, **kwargs) -> Response:
+        """
+        Handles GET requests for the transcription status.
+
+        Args:
+            request: The HTTP request object.
+            *args: Additional positional arguments.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            Response: A DRF Response object with the status of the models, pool, cache and batching.
+        """
+        pool = get_transcription_pool()
+        cache = get_transcription_cache()
+        batcher = get_transcription_batcher(settings.NOA_WHISPER_MODEL)
+        return Response(
+            {
+                "model_size": settings.NOA_WHISPER_MODEL,
+                "warm": whisper_model_registry.is_warm(settings.NOA_WHISPER_MODEL),
+                "models": whisper_model_registry.status(),
+                "pool": pool.stats() if pool else None,
+                "cache": cache.stats() if cache else None,
+                "batching": batcher.stats() if batcher else None,
+            }
+        )
+
+
+class AIModelStatusEndpoint(APIView):
+    """
+    Reports how this worker process is serving AI model requests.
+
+    Used for monitoring the backends loaded and the provider clients they hold, the
+    response caches' hit rates, how many provider calls were saved by sharing
+    identical in-flight requests, the latencies the model router works from, how
+    often slow requests were hedged, the endpoints' circuit breakers, and how long
+    requests queued for their AI model's rate limits, apart from provider latency.
+    """
+
+    def get(self, request, *args, **kwargs) -> Response:
+        """
+        Handles GET requests for the AI model status.
+
+        Args:
+            request: The HTTP request object.
+            *args: Additional positional arguments.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            Response: A DRF Response object with the status of the backends, caches,
+                request coalescing, routing, hedging, circuits and rate limits.
+        """
+        coalescer = get_request_coalescer()
+        return Response(
+            {
+                "backends": get_backend_registry().status(),
+                "response_cache": get_response_cache().stats(),
+                "semantic_cache": get_semantic_cache().stats(),
+                "coalescing": coalescer.stats() if coalescer else None,
+                "routing": {
+                    "policy": get_model_router().policy,
+                    "latency": get_latency_tracker().status(),
+                },
+                "hedging": get_request_hedger().status(),
+                "circuits": get_circuit_breakers().status(),
+                "rate_limits": get_rate_limiter().status(),
+            }
+        )
+
+
+class PromptBatchEndpoint(APIView):
+    """
+    Submits a batch job of prompts to be answered offline (see batches.py).
+
+    The prompts are sent as a list, or as a JSONL file, with the name of the AI model to
+    answer them. The job is answered in the background, and its responses saved as the
+    items of a new API conversation thread.
+    """
+
+    def post(self, request, *args, **kwargs) -> Response:
+        """
+        Handles POST requests submitting a batch job.
+
+        Args:
+            request: The HTTP request object, with the AI model, the prompts or a JSONL
+                file of them, and optionally the job's name.
+            *args: Additional positional arguments.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            Response: A DRF Response object with the accepted job, or the errors.
+        """
+        serializer = PromptBatchRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        data: dict = serializer.validated_data
+        job: PromptBatchJob = get_prompt_batch_runner().submit(
+            data["aimodel"],
+            data["prompts"],
+            data.get("name") or f"Batch {timezone.now():%Y-%m-%d %H:%M:%S}",
+            request.user,
+        )
+        return Response(PromptBatchJobSerializer(job).data, status=202)
+
+
+class PromptBatchStatusEndpoint(APIView):
+    """
+    Reports the progress of one of the user's batch jobs, and its prompts per second.
+    """
+
+    def get(self, request, pk, *args, **kwargs) -> Response:
+        """
+        Handles GET requests for a batch job's progress.
+
+        Args:
+            request: The HTTP request object.
+            pk: The batch job's ID.
+            *args: Additional positional arguments.
+            **kwargs: Additional keyword arguments.
+
+        Returns:
+            Response: A DRF Response object with the job's progress.
+        """
+        job: PromptBatchJob = get_object_or_404(
+            PromptBatchJob.objects.select_related("aimodel"),
+            pk=pk,
+            created_by=request.user,
+        )
+        return Response(PromptBatchJobSerializer(job).data)
@@ -3,9 +3,17 @@
 It has the Config class:
 """
 from django.apps import AppConfig
+from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
 
 class ChatsConfig(AppConfig):
     name = "project_apps.chats"
     verbose_name = _("Chats")
+
+    def ready(self) -> None:
+        """Warms up any Whisper models configured to load at worker boot."""
+        if settings.NOA_WHISPER_WARMUP_MODELS:
+            from .api.transcription import warm_up_transcription
+
+            warm_up_transcription(settings.NOA_WHISPER_WARMUP_MODELS)
@@ -0,0 +1,414 @@
+"""project_apps.chats.batches.py
+
+This module answers batch jobs of prompts offline.
+
+Nightly jobs that push thousands of prompts through get_aimodel_response one blocking
+call at a time take as long as the sum of every call's latency. A batch job is instead
+submitted from a JSONL file (see the run_prompt_batch command) or the batches API
+endpoint. Its prompts are saved at once as the items of a new API conversation thread,
+and each item's response is filled in as it is answered, so the job's progress is in
+the database.
+
+A job is answered in one of two ways:
+    - provider: through the provider's batch API, when the AI model's backend supports
+      batching and the job has at least CHAT_BATCH_PROVIDER_MIN_PROMPTS prompts. The
+      provider answers offline, at its batch price, and the job is polled every
+      CHAT_BATCH_POLL_SECONDS until it finishes.
+    - worker_pool: otherwise, CHAT_BATCH_CONCURRENCY prompts at a time through
+      get_aimodel_response, within the AI model's rate limits. Requests that are turned
+      away by the rate limits or an open circuit wait and are sent again.
+
+Throughput is measured in prompts per second over the job's run. Prompts that fail
+are left unanswered, and are sent again if the job is run again, as is a job whose
+worker process stopped.
+
+class PromptBatchRunner
+    - submit: saves a job and its prompts, and answers it in the background.
+    - run: answers a job's unanswered prompts.
+
+parse_prompts_jsonl
+    - Reads prompts from JSONL lines.
+
+get_prompt_batch_runner
+    - Returns the runner shared by the whole worker process.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from project_apps.aimodels.circuits import CircuitOpenError
+from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.ratelimits import RateLimitExceededError
+from project_apps.aimodels.tokens import TokenUsage, count_token_usage
+
+from .models import ConversationItem, ConversationThread, PromptBatchJob
+
+logger = logging.getLogger(__name__)
+
+
+def parse_prompts_jsonl(lines: Iterable[str | bytes]) -> list[str]:
+    """Reads prompts from JSONL, one per line, as a string or a {"prompt": ...} object.
+
+    Blank lines are skipped.
+
+    Args:
+        lines (Iterable[str | bytes]): The JSONL lines, e.g. an open file.
+
+    Returns:
+        list[str]: The prompts, in order.
+
+    Raises:
+        ValueError: If a line is not JSON, or holds no prompt.
+    """
+    prompts: list[str] = []
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode()
+        if not line.strip():
+            continue
+        try:
+            value: object = json.loads(line)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"Line {number} is not JSON: {error}") from error
+        if isinstance(value, dict):
+            value = value.get("prompt")
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"Line {number} has no prompt")
+        prompts.append(value)
+    return prompts
+
+
+class PromptBatchRunner:
+    """Answers batch jobs of prompts, through provider batch APIs or a worker pool."""
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        provider_min_prompts: int = 100,
+        poll_interval: float = 60.0,
+        max_attempts: int = 3,
+        max_workers: int = 1,
+    ) -> None:
+        """Initialises the runner.
+
+        Args:
+            concurrency (int): The prompts a job sends at once through the worker pool.
+            provider_min_prompts (int): The fewest prompts sent through a provider's
+                batch API. 0 never uses batch APIs.
+            poll_interval (float): Seconds between checks on a provider batch.
+            max_attempts (int): The times a prompt is sent while it is turned away by
+                rate limits or an open circuit.
+            max_workers (int): The jobs answered at once in the background.
+        """
+        self.concurrency: int = concurrency
+        self.provider_min_prompts: int = provider_min_prompts
+        self.poll_interval: float = poll_interval
+        self.max_attempts: int = max_attempts
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="chat-batch"
+        )
+
+    def submit(
+        self,
+        aimodel: AIModel,
+        prompts: list[str],
+        name: str,
+        user: object | None = None,
+        background: bool = True,
+    ) -> PromptBatchJob:
+        """Saves a job with its prompts as the items of a new API thread.
+
+        Args:
+            aimodel (AIModel): The AI model to answer the prompts.
+            prompts (list[str]): The prompts.
+            name (str): The job's name, also given to its thread.
+            user (User | None): The user submitting the job.
+            background (bool): Answer the job on the runner's thread pool. Otherwise
+                the caller runs it.
+
+        Returns:
+            PromptBatchJob: The job.
+        """
+        with transaction.atomic():
+            conversation_thread: ConversationThread = (
+                ConversationThread.objects.create(
+                    name=name,
+                    aimodel=aimodel,
+                    chat_type="api",
+                    created_by=user,
+                    modified_by=user,
+                )
+            )
+            ConversationItem.objects.bulk_create(
+                ConversationItem(
+                    conversation_thread=conversation_thread,
+                    prompt=prompt,
+                    response="",
+                    tokens=0,
+                    ORDER=order,
+                    created_by=user,
+                    modified_by=user,
+                )
+                for order, prompt in enumerate(prompts, start=1)
+            )
+            job: PromptBatchJob = PromptBatchJob.objects.create(
+                name=name,
+                aimodel=aimodel,
+                conversation_thread=conversation_thread,
+                total_prompts=len(prompts),
+                created_by=user,
+            )
+        logger.info(f"Submitted batch job {job.id} of {len(prompts)} prompts")
+        if background:
+            transaction.on_commit(lambda: self.schedule(job.id))
+        return job
+
+    def schedule(self, job_id: object) -> Future:
+        """Answers a job on the runner's thread pool.
+
+        Args:
+            job_id (uuid.UUID): The job's id.
+
+        Returns:
+            Future: The task answering the job.
+        """
+        return self._executor.submit(self._run_in_background, job_id)
+
+    def run(self, job_id: object) -> PromptBatchJob:
+        """Answers a job's unanswered prompts, then records its throughput.
+
+        Args:
+            job_id (uuid.UUID): The job's id.
+
+        Returns:
+            PromptBatchJob: The job, completed, or failed if it could not be answered.
+        """
+        job: PromptBatchJob = PromptBatchJob.objects.select_related("aimodel").get(
+            id=job_id
+        )
+        items: list[ConversationItem] = list(
+            ConversationItem.objects.filter(
+                conversation_thread_id=job.conversation_thread_id, is_full_saved=False
+            )
+            .order_by("ORDER")
+            .only("id", "prompt")
+        )
+        job.mode = job.mode or self._get_mode(job.aimodel, len(items))
+        job.status = PromptBatchJob.STATUS_RUNNING
+        job.completed_prompts = job.total_prompts - len(items)
+        job.failed_prompts = 0
+        job.prompts_per_second = None
+        job.error = ""
+        job.started_at = timezone.now()
+        job.finished_at = None
+        job.save()
+        started: float = time.perf_counter()
+        try:
+            if job.aimodel is None:
+                raise ValueError("The job's AI model has been deleted")
+            if job.mode == PromptBatchJob.MODE_PROVIDER:
+                self._run_provider_batch(job, items)
+            else:
+                self._run_worker_pool(job, items)
+        except Exception as error:
+            logger.exception(f"Batch job {job.id} failed")
+            job.status = PromptBatchJob.STATUS_FAILED
+            job.error = str(error)
+        else:
+            job.status = PromptBatchJob.STATUS_COMPLETED
+        seconds: float = time.perf_counter() - started
+        job.refresh_from_db(fields=["completed_prompts", "failed_prompts"])
+        answered: int = job.completed_prompts - (job.total_prompts - len(items))
+        job.prompts_per_second = answered / seconds if seconds > 0 else None
+        job.finished_at = timezone.now()
+        job.save(
+            update_fields=["status", "error", "prompts_per_second", "finished_at"]
+        )
+        logger.info(
+            f"Batch job {job.id} {job.status} through {job.mode}: {answered} prompts "
+            f"answered, {job.failed_prompts} failed, in {seconds:.1f}s, "
+            f"{job.prompts_per_second or 0:.2f} prompts/s"
+        )
+        return job
+
+    def _get_mode(self, aimodel: AIModel | None, prompts: int) -> str:
+        """Chooses how to answer a job's prompts.
+
+        Args:
+            aimodel (AIModel | None): The job's AI model.
+            prompts (int): The prompts to answer.
+
+        Returns:
+            str: PromptBatchJob.MODE_PROVIDER if the AI model's backend supports
+                batching and there are enough prompts, otherwise MODE_WORKER_POOL.
+        """
+        if (
+            aimodel is not None
+            and self.provider_min_prompts
+            and prompts >= self.provider_min_prompts
+            and aimodel.get_backend().supports_batching
+        ):
+            return PromptBatchJob.MODE_PROVIDER
+        return PromptBatchJob.MODE_WORKER_POOL
+
+    def _run_worker_pool(
+        self, job: PromptBatchJob, items: list[ConversationItem]
+    ) -> None:
+        """Answers the prompts concurrently through get_aimodel_response.
+
+        Args:
+            job (PromptBatchJob): The job.
+            items (list[ConversationItem]): The items whose prompts to answer.
+        """
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="chat-batch-prompt"
+        ) as executor:
+            for future in [
+                executor.submit(self._answer, job, item) for item in items
+            ]:
+                future.result()
+
+    def _answer(self, job: PromptBatchJob, item: ConversationItem) -> None:
+        """Answers one prompt on the worker pool, recording it in the job's progress.
+
+        Args:
+            job (PromptBatchJob): The job.
+            item (ConversationItem): The item whose prompt to answer.
+        """
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    aimodel_response: object = job.aimodel.get_aimodel_response(
+                        item.prompt
+                    )
+                    break
+                except (CircuitOpenError, RateLimitExceededError) as error:
+                    if attempt == self.max_attempts:
+                        raise
+                    time.sleep(error.retry_after)
+            self._save_response(job, item.id, item.prompt, aimodel_response)
+        except Exception:
+            logger.warning(
+                f"Batch job {job.id} could not answer item {item.id}", exc_info=True
+            )
+            PromptBatchJob.objects.filter(id=job.id).update(
+                failed_prompts=F("failed_prompts") + 1
+            )
+        finally:
+            close_old_connections()
+
+    def _run_provider_batch(
+        self, job: PromptBatchJob, items: list[ConversationItem]
+    ) -> None:
+        """Answers the prompts through the provider's batch API, polling until done.
+
+        A job already submitted to the provider, e.g. by a worker that stopped, is
+        polled rather than submitted again.
+
+        Args:
+            job (PromptBatchJob): The job.
+            items (list[ConversationItem]): The items whose prompts to answer.
+
+        Raises:
+            RuntimeError: If the provider's batch did not complete.
+        """
+        backend = job.aimodel.get_backend()
+        if not job.provider_batch_id:
+            job.provider_batch_id = backend.submit_batch(
+                job.aimodel, {str(item.id): item.prompt for item in items}
+            )
+            job.save(update_fields=["provider_batch_id"])
+        state: dict = backend.get_batch(job.aimodel, job.provider_batch_id)
+        while state["status"] not in backend.BATCH_FINISHED_STATES:
+            time.sleep(self.poll_interval)
+            state = backend.get_batch(job.aimodel, job.provider_batch_id)
+        results: dict[str, object] = backend.get_batch_results(
+            job.aimodel, job.provider_batch_id
+        )
+        answered: int = 0
+        for item in items:
+            if str(item.id) in results:
+                self._save_response(job, item.id, item.prompt, results[str(item.id)])
+                answered += 1
+        PromptBatchJob.objects.filter(id=job.id).update(
+            failed_prompts=len(items) - answered
+        )
+        if state["status"] != "completed":
+            raise RuntimeError(
+                f"Provider batch {job.provider_batch_id} {state['status']}"
+            )
+
+    def _save_response(
+        self,
+        job: PromptBatchJob,
+        item_id: object,
+        prompt: str,
+        aimodel_response: object,
+    ) -> None:
+        """Saves a prompt's response to its item and counts it in the job's progress.
+
+        Args:
+            job (PromptBatchJob): The job.
+            item_id (uuid.UUID): The item's id.
+            prompt (str): The item's prompt.
+            aimodel_response (object): The AI model's response.
+        """
+        text: str = job.aimodel.get_response_content(aimodel_response)
+        usage: TokenUsage = count_token_usage(prompt, text)
+        ConversationItem.objects.filter(id=item_id).update(
+            response=str(text),
+            is_full_saved=True,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            tokens=usage.total_tokens,
+            modified_at=timezone.localdate(),
+        )
+        PromptBatchJob.objects.filter(id=job.id).update(
+            completed_prompts=F("completed_prompts") + 1
+        )
+
+    def _run_in_background(self, job_id: object) -> None:
+        """Answers a job on the pool, logging rather than raising errors.
+
+        Args:
+            job_id (uuid.UUID): The job's id.
+        """
+        try:
+            self.run(job_id)
+        except Exception:
+            logger.exception(f"Could not run batch job {job_id}")
+        finally:
+            close_old_connections()
+
+
+_prompt_batch_runner: PromptBatchRunner | None = None
+_prompt_batch_runner_lock: threading.Lock = threading.Lock()
+
+
+def get_prompt_batch_runner() -> PromptBatchRunner:
+    """Returns the process's batch runner, creating it from settings on first use.
+
+    Returns:
+        PromptBatchRunner: The runner.
+    """
+    global _prompt_batch_runner
+    if _prompt_batch_runner is None:
+        with _prompt_batch_runner_lock:
+            if _prompt_batch_runner is None:
+                _prompt_batch_runner = PromptBatchRunner(
+                    concurrency=settings.CHAT_BATCH_CONCURRENCY,
+                    provider_min_prompts=settings.CHAT_BATCH_PROVIDER_MIN_PROMPTS,
+                    poll_interval=settings.CHAT_BATCH_POLL_SECONDS,
+                    max_attempts=settings.CHAT_BATCH_MAX_ATTEMPTS,
+                    max_workers=settings.CHAT_BATCH_THREADS,
+                )
+    return _prompt_batch_runner
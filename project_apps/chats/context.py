@@ -0,0 +1,206 @@
+"""project_apps.chats.context.py
+
+This module builds the conversation history sent to the AI model with a prompt.
+
+Without it an AI model only sees the latest prompt, so a thread has no memory. Replaying
+every earlier item instead would outgrow the AI model's max_tokens and multiply the
+cost of long threads. The history is instead the thread's latest turns, newest first,
+up to a token budget: the AI model's max_tokens less the prompt and
+AIMODEL_ROUTER_OUTPUT_TOKENS for the reply.
+
+On a thread with a summary (see summaries.py), the summary is sent first, as a system
+message, with only the turns after it.
+
+Turns are kept per thread in the Django cache CHAT_CONTEXT_CACHE_ALIAS, with their
+token counts, up to CHAT_CONTEXT_MAX_TURNS of them. Each prompt then reads only the
+items added since the last one, with a single query bounded to that many rows and to
+the columns it needs, and counts tokens for those items only. Items whose response is
+still being generated are left out and read again next time: those whose job is queued
+or running, and streamed items with no answered item after them, as the page streams
+each response before sending the next prompt. Items whose job failed, or whose stream
+ended with nothing saved, are never answered, so they are skipped for good.
+
+class ConversationContextBuilder
+    - build: the history for a prompt, as chat messages, oldest first.
+    - get_budget: the tokens the history may use.
+
+get_context_builder
+    - Returns the context builder shared by the whole worker process.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from project_apps.aimodels.routing import estimate_tokens
+
+from .models import ConversationItem, ConversationThread, PromptJob
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationContextBuilder:
+    """Builds the history for a thread's prompts from its earlier items."""
+
+    def __init__(
+        self,
+        alias: str = "default",
+        max_turns: int = 50,
+        reply_tokens: int = 512,
+        timeout: float = 3600.0,
+    ) -> None:
+        """Initialises the builder.
+
+        Args:
+            alias (str): The name of the cache in the CACHES setting.
+            max_turns (int): The most earlier turns read and kept per thread. 0 sends
+                no history.
+            reply_tokens (int): The tokens kept free for the AI model's reply.
+            timeout (float): Seconds a thread's turns are kept since its last prompt.
+        """
+        self.alias: str = alias
+        self.max_turns: int = max_turns
+        self.reply_tokens: int = reply_tokens
+        self.timeout: float = timeout
+
+    def get_budget(self, aimodel: object, prompt: str) -> int:
+        """Gives the tokens the history may use for a prompt.
+
+        Args:
+            aimodel (object): The AIModel the prompt is sent to.
+            prompt (str): The prompt.
+
+        Returns:
+            int: The AI model's max_tokens less the prompt and the reply.
+        """
+        return max(0, aimodel.max_tokens - estimate_tokens(prompt) - self.reply_tokens)
+
+    def build(
+        self, conversation_thread: ConversationThread, prompt: str, order: int
+    ) -> list[dict]:
+        """Builds the history for a prompt from the thread's earlier turns.
+
+        Args:
+            conversation_thread (ConversationThread): The thread, with its AI model.
+            prompt (str): The prompt being sent.
+            order (int): The prompt's item's ORDER. Only items before it are used.
+
+        Returns:
+            list[dict]: The thread's summary, if it fits, then the latest turns after
+                it that fit the budget as user and assistant messages, oldest first.
+        """
+        if not self.max_turns or conversation_thread.aimodel is None:
+            return []
+        budget: int = self.get_budget(conversation_thread.aimodel, prompt)
+        summary: list[dict] = []
+        if conversation_thread.summary:
+            content: str = (
+                f"Summary of the conversation so far: {conversation_thread.summary}"
+            )
+            if estimate_tokens(content) <= budget:
+                budget -= estimate_tokens(content)
+                summary.append({"role": "system", "content": content})
+        summarized_order: int = conversation_thread.summarized_order if summary else 0
+        history: list[dict] = []
+        for turn_order, turn_prompt, response, tokens in reversed(
+            self._get_turns(conversation_thread.id, order)
+        ):
+            if turn_order <= summarized_order or tokens > budget:
+                break
+            budget -= tokens
+            history += [
+                {"role": "assistant", "content": response},
+                {"role": "user", "content": turn_prompt.strip()},
+            ]
+        history.reverse()
+        return summary + history
+
+    def _get_turns(self, thread_id: object, order: int) -> list[list]:
+        """Gets a thread's turns before an item, reading only items not yet kept.
+
+        Args:
+            thread_id (uuid.UUID): The thread's id.
+            order (int): The ORDER of the item being answered.
+
+        Returns:
+            list[list]: The turns' ORDER, prompt, response and tokens, oldest first.
+        """
+        cache = caches[self.alias]
+        key: str = f"chat-context:{thread_id}"
+        kept: dict = cache.get(key) or {"order": 0, "turns": []}
+        turns: dict[int, list] = {turn[0]: turn for turn in kept["turns"]}
+        read_to: int = kept["order"]
+        if read_to < order - 1:
+            rows: list[tuple] = list(
+                ConversationItem.objects.filter(
+                    conversation_thread_id=thread_id,
+                    ORDER__gt=read_to,
+                    ORDER__lt=order,
+                )
+                .order_by("-ORDER")
+                .values_list(
+                    "ORDER",
+                    "prompt",
+                    "response",
+                    "is_full_saved",
+                    "prompt_job__status",
+                )[: self.max_turns]
+            )
+            unfinished: list[int] = []
+            answered_after: bool = False
+            job_pending: tuple = (PromptJob.STATUS_QUEUED, PromptJob.STATUS_RUNNING)
+            for item_order, item_prompt, response, is_full_saved, job_status in rows:
+                if not response:
+                    pending: bool = (
+                        job_status in job_pending if job_status else not answered_after
+                    )
+                    if pending and not is_full_saved:
+                        unfinished.append(item_order)
+                    continue
+                answered_after = True
+                turns[item_order] = [
+                    item_order,
+                    item_prompt,
+                    response,
+                    estimate_tokens(item_prompt) + estimate_tokens(response),
+                ]
+            if rows:
+                read_to = min(unfinished) - 1 if unfinished else rows[0][0]
+            logger.debug(f"Read {len(rows)} items for thread {thread_id}'s context")
+        kept_turns: list[list] = [turns[turn_order] for turn_order in sorted(turns)][
+            -self.max_turns :
+        ]
+        cache.set(
+            key,
+            {
+                "order": read_to,
+                "turns": [turn for turn in kept_turns if turn[0] <= read_to],
+            },
+            timeout=self.timeout,
+        )
+        return [turn for turn in kept_turns if turn[0] < order]
+
+
+_context_builder: ConversationContextBuilder | None = None
+_context_builder_lock: threading.Lock = threading.Lock()
+
+
+def get_context_builder() -> ConversationContextBuilder:
+    """Returns the process's context builder, creating it from settings on first use.
+
+    Returns:
+        ConversationContextBuilder: The builder.
+    """
+    global _context_builder
+    if _context_builder is None:
+        with _context_builder_lock:
+            if _context_builder is None:
+                _context_builder = ConversationContextBuilder(
+                    settings.CHAT_CONTEXT_CACHE_ALIAS,
+                    max_turns=settings.CHAT_CONTEXT_MAX_TURNS,
+                    reply_tokens=settings.AIMODEL_ROUTER_OUTPUT_TOKENS,
+                    timeout=settings.CHAT_CONTEXT_CACHE_TIMEOUT,
+                )
+    return _context_builder
@@ -31,6 +31,8 @@ from django import forms
 from django.forms import BaseInlineFormSet, inlineformset_factory
 from django.utils.translation import gettext_lazy as _
 
+from project_apps.aimodels.tokens import count_token_usage
+
 from .models import ConversationItem, ConversationThread
 
 logger = logging.getLogger(__name__)
@@ -108,7 +110,7 @@ class ConversationItemForm(forms.ModelForm):
         self.fields["prompt"].required = True
 
     def save(self, commit: bool = ...) -> ConversationItem:
-        """Saves the ConversationItem instance, setting a default token value.
+        """Saves the ConversationItem instance, counting its prompt and response tokens.
 
         Args:
             commit: Whether to commit the save to the database.
@@ -116,8 +118,9 @@ class ConversationItemForm(forms.ModelForm):
         Returns:
             ConversationItem: The saved ConversationItem instance.
         """
-        # TODO: This is a default and actually needs to be calculated
-        self.instance.tokens = 2
+        self.instance.set_token_usage(
+            count_token_usage(self.instance.prompt, self.instance.response or "")
+        )
         return super().save(commit)
 
 
@@ -0,0 +1,360 @@
+"""project_apps.chats.jobs.py
+
+This module answers queued prompts in background workers.
+
+send_prompt otherwise holds the HTTP request, and a web worker, for the whole round
+trip to the provider, which slow models stretch past proxy timeouts. With
+AIMODEL_QUEUE_RESPONSES, the view instead saves the prompt as a pending
+ConversationItem, queues a PromptJob for it and returns at once, and the page polls
+prompt_response for the answer.
+
+The queue is the PromptJob table, so no broker is needed. Workers claim the oldest job
+that is due by updating its row only if it is still unclaimed, which is atomic on every
+database, and save the response to the job's item. A job is answered by one of:
+    - the web process: CHAT_QUEUE_THREADS threads take a job as each is queued.
+    - the run_prompt_worker command: dedicated processes poll the table for jobs. Set
+      CHAT_QUEUE_THREADS to 0 to leave every job to them.
+
+A thread that is woken answers jobs until none is due, and the web process also wakes
+its threads every CHAT_QUEUE_SWEEP_SECONDS, so jobs are not left waiting for the next
+prompt after it restarts or while every thread was busy.
+
+A job turned away by rate limits or an open circuit is queued again for when the AI
+model is expected to take it, up to CHAT_QUEUE_MAX_ATTEMPTS times. A job claimed by a
+worker that stopped is taken by another once CHAT_QUEUE_LEASE_SECONDS have passed, or
+failed if it has already been sent CHAT_QUEUE_MAX_ATTEMPTS times, as it may be what
+stops its workers.
+
+class PromptJobQueue
+    - enqueue: queues a job for a pending item.
+    - wake: has this process's threads answer the jobs that are due.
+    - claim: takes the oldest job that is due.
+    - run: answers a claimed job.
+    - work: claims and answers jobs until stopped, for dedicated workers.
+
+get_prompt_job_queue
+    - Returns the queue shared by the whole worker process.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q, QuerySet
+from django.utils import timezone
+
+from project_apps.aimodels.circuits import CircuitOpenError
+from project_apps.aimodels.ratelimits import RateLimitExceededError
+from project_apps.aimodels.tokens import count_token_usage
+
+from .context import get_context_builder
+from .models import ConversationItem, PromptJob
+from .summaries import get_conversation_summarizer
+
+logger = logging.getLogger(__name__)
+
+
+class PromptJobQueue:
+    """Queues prompts in the database and answers them on worker threads."""
+
+    def __init__(
+        self,
+        threads: int = 4,
+        max_attempts: int = 5,
+        lease_seconds: float = 300.0,
+        sweep_seconds: float = 30.0,
+    ) -> None:
+        """Initialises the queue.
+
+        Args:
+            threads (int): The jobs this process answers at once as they are queued.
+                0 leaves them to the run_prompt_worker command.
+            max_attempts (int): The times a job is sent while it is turned away by
+                rate limits or an open circuit, or taken from workers that stopped.
+            lease_seconds (float): How long a claimed job is held before another
+                worker may take it.
+            sweep_seconds (float): Seconds between wakes of this process's threads
+                for jobs that came due while none were queued. 0 stops them.
+        """
+        self.threads: int = threads
+        self.max_attempts: int = max_attempts
+        self.lease_seconds: float = lease_seconds
+        self.sweep_seconds: float = sweep_seconds
+        self._executor: ThreadPoolExecutor | None = (
+            ThreadPoolExecutor(max_workers=threads, thread_name_prefix="chat-queue")
+            if threads > 0
+            else None
+        )
+        if self._executor is not None and sweep_seconds > 0:
+            self._schedule_sweep()
+
+    def enqueue(self, conversation_item: ConversationItem) -> PromptJob:
+        """Queues a job to answer a pending item's prompt.
+
+        The job is woken in this process once the transaction commits, so workers
+        never claim a job whose item they cannot read.
+
+        Args:
+            conversation_item (ConversationItem): The saved item with no response.
+
+        Returns:
+            PromptJob: The queued job.
+        """
+        job: PromptJob = PromptJob.objects.create(conversation_item=conversation_item)
+        transaction.on_commit(self.wake)
+        return job
+
+    def wake(self) -> Future | None:
+        """Has a thread in this process answer jobs until none is due.
+
+        Returns:
+            Future | None: The thread's task, or None if this process takes no jobs.
+        """
+        if self._executor is None:
+            return None
+        return self._executor.submit(self._run_next)
+
+    def claim(self, worker_id: str | None = None) -> PromptJob | None:
+        """Takes the oldest job that is due, or whose worker's lease has run out.
+
+        Args:
+            worker_id (str | None): Who is claiming it, for the admin.
+
+        Returns:
+            PromptJob | None: The claimed job, with its item, thread and AI model, or
+                None if there is none due.
+        """
+        now = timezone.now()
+        candidates: list[PromptJob] = list(
+            PromptJob.objects.filter(
+                Q(status=PromptJob.STATUS_QUEUED, run_after__lte=now)
+                | Q(
+                    status=PromptJob.STATUS_RUNNING,
+                    claimed_at__lt=now - timedelta(seconds=self.lease_seconds),
+                )
+            ).order_by("run_after")[:10]
+        )
+        for candidate in candidates:
+            # Only one worker's update matches the row as it was read.
+            unchanged: QuerySet = PromptJob.objects.filter(
+                id=candidate.id,
+                status=candidate.status,
+                claimed_at=candidate.claimed_at,
+            )
+            if (
+                candidate.status == PromptJob.STATUS_RUNNING
+                and candidate.attempts >= self.max_attempts
+            ):
+                if unchanged.update(
+                    status=PromptJob.STATUS_FAILED,
+                    error="Its workers stopped before answering it",
+                    finished_at=now,
+                ):
+                    logger.warning(f"Prompt job {candidate.id} abandoned too often")
+                continue
+            claimed: int = unchanged.update(
+                status=PromptJob.STATUS_RUNNING,
+                claimed_by=worker_id or _get_worker_id(),
+                claimed_at=now,
+                attempts=F("attempts") + 1,
+            )
+            if claimed:
+                return PromptJob.objects.select_related(
+                    "conversation_item__conversation_thread__aimodel"
+                ).get(id=candidate.id)
+        return None
+
+    def run(self, job: PromptJob) -> None:
+        """Answers a claimed job's prompt and saves the response to its item.
+
+        Args:
+            job (PromptJob): The claimed job.
+        """
+        conversation_item: ConversationItem = job.conversation_item
+        conversation_thread = conversation_item.conversation_thread
+        try:
+            history: list[dict] = get_context_builder().build(
+                conversation_thread, conversation_item.prompt, conversation_item.ORDER
+            )
+            response_text, is_cached = conversation_thread.aimodel.get_response_text(
+                conversation_item.prompt, history
+            )
+        except (CircuitOpenError, RateLimitExceededError) as error:
+            if job.attempts < self.max_attempts:
+                self._retry_later(job, error.retry_after)
+            else:
+                self._finish(job, PromptJob.STATUS_FAILED, str(error))
+            return
+        except Exception as error:
+            logger.exception(f"Prompt job {job.id} could not be answered")
+            self._finish(job, PromptJob.STATUS_FAILED, str(error))
+            return
+
+        conversation_item.response = response_text
+        conversation_item.is_full_saved = True
+        conversation_item.is_cached = is_cached
+        conversation_item.set_token_usage(
+            count_token_usage(conversation_item.prompt, response_text, history)
+        )
+        conversation_item.save(
+            update_fields=[
+                "response",
+                "is_full_saved",
+                "is_cached",
+                "tokens",
+                "input_tokens",
+                "output_tokens",
+                "modified_at",
+            ]
+        )
+        self._finish(job, PromptJob.STATUS_COMPLETED)
+        get_conversation_summarizer().schedule(
+            conversation_thread, conversation_item.ORDER
+        )
+
+    def work(
+        self,
+        threads: int = 1,
+        poll_interval: float = 1.0,
+        stop_when_idle: bool = False,
+    ) -> int:
+        """Claims and answers jobs on a pool of threads, for dedicated workers.
+
+        Args:
+            threads (int): The jobs answered at once.
+            poll_interval (float): Seconds to wait for a job when none is due.
+            stop_when_idle (bool): Return once no job is due, rather than waiting.
+
+        Returns:
+            int: The jobs claimed.
+        """
+        claimed: int = 0
+        slots: threading.BoundedSemaphore = threading.BoundedSemaphore(threads)
+        with ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="chat-worker"
+        ) as executor:
+            while True:
+                slots.acquire()
+                job: PromptJob | None = self.claim()
+                if job is None:
+                    slots.release()
+                    if stop_when_idle:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                claimed += 1
+                executor.submit(self._run_claimed, job, slots)
+        return claimed
+
+    def _retry_later(self, job: PromptJob, delay: float) -> None:
+        """Queues a job again for when its AI model is expected to take it.
+
+        Args:
+            job (PromptJob): The job turned away.
+            delay (float): Seconds until it is sent again.
+        """
+        logger.info(f"Prompt job {job.id} turned away, sending again in {delay}s")
+        PromptJob.objects.filter(id=job.id).update(
+            status=PromptJob.STATUS_QUEUED,
+            run_after=timezone.now() + timedelta(seconds=delay),
+            claimed_at=None,
+        )
+        if self._executor is not None:
+            timer: threading.Timer = threading.Timer(delay, self.wake)
+            timer.daemon = True
+            timer.start()
+
+    def _finish(self, job: PromptJob, status: str, error: str = "") -> None:
+        """Records that a job completed or failed.
+
+        Args:
+            job (PromptJob): The job.
+            status (str): STATUS_COMPLETED or STATUS_FAILED.
+            error (str): Why it failed.
+        """
+        job.status = status
+        job.error = error
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+
+    def _schedule_sweep(self) -> None:
+        """Wakes this process's threads after sweep_seconds, and again after that."""
+        timer: threading.Timer = threading.Timer(self.sweep_seconds, self._sweep)
+        timer.daemon = True
+        timer.start()
+
+    def _sweep(self) -> None:
+        """Wakes every thread for the jobs that are due, then schedules the next."""
+        try:
+            for _ in range(self.threads):
+                self.wake()
+        except RuntimeError:
+            # The executor was shut down, so there is no one left to wake.
+            return
+        self._schedule_sweep()
+
+    def _run_next(self) -> None:
+        """Claims and answers jobs until none is due, logging errors."""
+        try:
+            while True:
+                job: PromptJob | None = self.claim()
+                if job is None:
+                    break
+                self.run(job)
+        except Exception:
+            logger.exception("Could not run the next prompt job")
+        finally:
+            close_old_connections()
+
+    def _run_claimed(self, job: PromptJob, slots: threading.BoundedSemaphore) -> None:
+        """Answers a job claimed by work, logging errors and freeing its slot.
+
+        Args:
+            job (PromptJob): The claimed job.
+            slots (threading.BoundedSemaphore): The work loop's free threads.
+        """
+        try:
+            self.run(job)
+        except Exception:
+            logger.exception(f"Could not run prompt job {job.id}")
+        finally:
+            close_old_connections()
+            slots.release()
+
+
+def _get_worker_id() -> str:
+    """Names the claiming thread, by host, process and thread.
+
+    Returns:
+        str: The worker's name.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+_prompt_job_queue: PromptJobQueue | None = None
+_prompt_job_queue_lock: threading.Lock = threading.Lock()
+
+
+def get_prompt_job_queue() -> PromptJobQueue:
+    """Returns the process's prompt job queue, creating it from settings on first use.
+
+    Returns:
+        PromptJobQueue: The queue.
+    """
+    global _prompt_job_queue
+    if _prompt_job_queue is None:
+        with _prompt_job_queue_lock:
+            if _prompt_job_queue is None:
+                _prompt_job_queue = PromptJobQueue(
+                    threads=settings.CHAT_QUEUE_THREADS,
+                    max_attempts=settings.CHAT_QUEUE_MAX_ATTEMPTS,
+                    lease_seconds=settings.CHAT_QUEUE_LEASE_SECONDS,
+                    sweep_seconds=settings.CHAT_QUEUE_SWEEP_SECONDS,
+                )
+    return _prompt_job_queue
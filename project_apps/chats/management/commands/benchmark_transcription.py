@@ -0,0 +1,168 @@
+"""This module provides the benchmark_transcription management command.
+
+It measures Whisper transcription on this machine's CPU, comparing the one-at-a-time
+path, where every request gets its own forward pass, with micro-batching, where
+requests arriving within a window share one forward pass.
+
+    Useage:
+        python manage.py benchmark_transcription --model small --clips a.wav b.wav
+        python manage.py benchmark_transcription --requests 32 --concurrency 8 --window-ms 50
+
+Without --clips, synthetic clips of --clip-seconds are used; they give realistic timings
+but meaningless text.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from project_apps.chats.api.audio import SAMPLE_RATE, decode_audio
+from project_apps.chats.api.batching import TranscriptionBatcher
+from project_apps.chats.api.transcription import (
+    _transcribe_batch_in_process,
+    _transcribe_in_process,
+    whisper_model_registry,
+)
+
+
+class Command(BaseCommand):
+    help = "Compares one-at-a-time and micro-batched Whisper transcription on CPU."
+
+    def add_arguments(self, parser) -> None:
+        """Adds the benchmark's options.
+
+        Args:
+            parser: The command's argument parser.
+        """
+        parser.add_argument("--model", default="small", help="Whisper model size.")
+        parser.add_argument(
+            "--clips", nargs="*", default=[], help="Audio files to transcribe."
+        )
+        parser.add_argument(
+            "--clip-seconds",
+            type=float,
+            default=5.0,
+            help="Length of synthetic clips when no --clips are given.",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=16, help="Requests per run."
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=8, help="Requests sent at once."
+        )
+        parser.add_argument(
+            "--window-ms", type=int, default=50, help="Batching window."
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=8, help="Largest batch."
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Runs both paths with the same clips and load, and prints the comparison.
+
+        Args:
+            *args: Positional arguments.
+            **options: The parsed options.
+        """
+        size: str = options["model"]
+        clips: list[np.ndarray] = self._load_clips(
+            options["clips"], options["clip_seconds"]
+        )
+        requests: list[np.ndarray] = [
+            clips[index % len(clips)] for index in range(options["requests"])
+        ]
+
+        self.stdout.write(f"Loading Whisper model '{size}'...")
+        whisper_model_registry.get_model(size)
+        _transcribe_in_process(size, clips[0])
+
+        model_lock: threading.Lock = threading.Lock()
+
+        def transcribe_one_at_a_time(audio: np.ndarray) -> str:
+            with model_lock:
+                return _transcribe_in_process(size, audio)
+
+        def run_batch(audios: list[np.ndarray]) -> Future:
+            texts_future: Future = Future()
+            texts_future.set_result(_transcribe_batch_in_process(size, audios))
+            return texts_future
+
+        batcher = TranscriptionBatcher(
+            run_batch, options["window_ms"] / 1000, options["batch_size"]
+        )
+
+        results: dict[str, dict] = {
+            "one-at-a-time": self._run(
+                transcribe_one_at_a_time, requests, options["concurrency"]
+            ),
+            "batched": self._run(
+                lambda audio: batcher.submit(audio).result(),
+                requests,
+                options["concurrency"],
+            ),
+        }
+
+        self.stdout.write(
+            f"\n{len(requests)} requests, concurrency {options['concurrency']}, "
+            f"window {options['window_ms']}ms, max batch {options['batch_size']}"
+        )
+        self.stdout.write(
+            f"{'path':<15}{'clips/s':>10}{'p50 (s)':>10}{'p95 (s)':>10}{'wall (s)':>10}"
+        )
+        for path, result in results.items():
+            self.stdout.write(
+                f"{path:<15}{result['throughput']:>10.2f}{result['p50']:>10.2f}"
+                f"{result['p95']:>10.2f}{result['wall']:>10.2f}"
+            )
+        self.stdout.write(f"batching: {batcher.stats()}")
+
+    def _load_clips(self, paths: list[str], clip_seconds: float) -> list[np.ndarray]:
+        """Decodes the given audio files, or makes synthetic clips if there are none.
+
+        Args:
+            paths (list[str]): Audio file paths.
+            clip_seconds (float): The length of synthetic clips.
+
+        Returns:
+            list[np.ndarray]: The clips as 16 kHz float32 samples.
+        """
+        if paths:
+            return [decode_audio(Path(path).read_bytes()) for path in paths]
+        generator = np.random.default_rng(0)
+        samples: int = int(clip_seconds * SAMPLE_RATE)
+        return [
+            (0.1 * generator.standard_normal(samples)).astype(np.float32)
+            for _ in range(4)
+        ]
+
+    def _run(self, transcribe: object, requests: list, concurrency: int) -> dict:
+        """Sends every request with the given concurrency and measures the results.
+
+        Args:
+            transcribe: Called with a clip, returns its text.
+            requests (list): The clips to send.
+            concurrency (int): How many requests are in flight at once.
+
+        Returns:
+            dict: Throughput in clips per second, p50 and p95 latency, and wall time.
+        """
+
+        def timed(audio: np.ndarray) -> float:
+            started: float = time.perf_counter()
+            transcribe(audio)
+            return time.perf_counter() - started
+
+        started: float = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies: list[float] = sorted(executor.map(timed, requests))
+        wall: float = time.perf_counter() - started
+        return {
+            "throughput": len(requests) / wall,
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "wall": wall,
+        }
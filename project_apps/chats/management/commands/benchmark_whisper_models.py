@@ -0,0 +1,183 @@
+"""This module provides the benchmark_whisper_models management command.
+
+It compares Whisper model names (sizes, and their int8 quantized variants) on this
+machine's CPU using a fixed set of sample clips with reference transcripts, to choose
+NOA_WHISPER_MODEL for a node type. For each model it reports:
+    - load time and the memory held by the model's weights,
+    - peak resident memory of a process that has loaded the model and transcribed the clips,
+    - real-time factor (RTF): transcription time over audio length, lower is faster,
+    - word error rate (WER) against the reference transcripts.
+
+Each model is measured in a fresh process so the memory figures do not overlap.
+
+    Useage:
+        python manage.py benchmark_whisper_models
+        python manage.py benchmark_whisper_models --models base small-int8 --repeats 3
+        python manage.py benchmark_whisper_models --manifest clips/manifest.json
+
+The manifest is a JSON list of {"audio": <path relative to the manifest>, "text": <reference>}.
+The default manifest holds the clips used by the NOA endpoint tests.
+"""
+
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from project_apps.chats.api.audio import SAMPLE_RATE, decode_audio
+from project_apps.chats.api.transcription import (
+    _transcribe_in_process,
+    whisper_model_registry,
+    word_error_rate,
+)
+
+
+def _peak_memory_bytes() -> int:
+    """Returns the peak resident memory of the current process.
+
+    Returns:
+        int: The peak resident set size in bytes.
+    """
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _benchmark_model(
+    name: str, clips: list[bytes], references: list[str], repeats: int
+) -> dict:
+    """Loads a model and transcribes every clip, in a worker process.
+
+    Args:
+        name (str): The model name, e.g. "small" or "small-int8".
+        clips (list[bytes]): The raw bytes of each clip.
+        references (list[str]): The reference transcript of each clip.
+        repeats (int): How many times each clip is transcribed for timing.
+
+    Returns:
+        dict: Load time, weight and peak memory, RTF and WER for the model.
+    """
+    started: float = time.perf_counter()
+    whisper_model_registry.get_model(name)
+    load_seconds: float = time.perf_counter() - started
+
+    audios: list = [decode_audio(clip) for clip in clips]
+    audio_seconds: float = sum(len(audio) for audio in audios) / SAMPLE_RATE
+    # One untimed pass so one-off allocations are not counted against the model.
+    texts: list[str] = [_transcribe_in_process(name, audio) for audio in audios]
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for audio in audios:
+            _transcribe_in_process(name, audio)
+    transcribe_seconds: float = (time.perf_counter() - started) / repeats
+
+    return {
+        "load_seconds": load_seconds,
+        "weights_mb": whisper_model_registry.memory_usage(name) / 1024 / 1024,
+        "peak_rss_mb": _peak_memory_bytes() / 1024 / 1024,
+        "rtf": transcribe_seconds / audio_seconds,
+        "wer": sum(map(word_error_rate, references, texts)) / len(texts),
+        "texts": texts,
+    }
+
+
+class Command(BaseCommand):
+    help = "Reports RTF, memory and WER for Whisper models on sample clips."
+
+    def add_arguments(self, parser) -> None:
+        """Adds the benchmark's options.
+
+        Args:
+            parser: The command's argument parser.
+        """
+        parser.add_argument(
+            "--models",
+            nargs="+",
+            default=["tiny", "base", "small", "tiny-int8", "base-int8", "small-int8"],
+            help="Model names to compare.",
+        )
+        parser.add_argument(
+            "--manifest",
+            default=str(
+                settings.BASE_DIR.joinpath(
+                    "project_apps", "chats", "tests", "whisper_benchmark_clips.json"
+                )
+            ),
+            help="JSON list of clips and their reference transcripts.",
+        )
+        parser.add_argument(
+            "--repeats", type=int, default=1, help="Timed passes over the clips."
+        )
+        parser.add_argument(
+            "--verbose-texts",
+            action="store_true",
+            help="Print each model's transcriptions.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Benchmarks each model in its own process and prints the comparison.
+
+        Args:
+            *args: Positional arguments.
+            **options: The parsed options.
+
+        Raises:
+            CommandError: If the manifest or one of its clips cannot be read.
+        """
+        clips, references = self._load_manifest(Path(options["manifest"]))
+        self.stdout.write(
+            f"{len(clips)} clips, {options['repeats']} timed pass(es) per model"
+        )
+        self.stdout.write(
+            f"{'model':<12}{'load (s)':>10}{'weights (MB)':>14}{'peak RSS (MB)':>15}"
+            f"{'RTF':>8}{'WER':>8}"
+        )
+        for name in options["models"]:
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                try:
+                    result: dict = executor.submit(
+                        _benchmark_model, name, clips, references, options["repeats"]
+                    ).result()
+                except Exception as e:
+                    self.stdout.write(f"{name:<12}failed: {e}")
+                    continue
+            self.stdout.write(
+                f"{name:<12}{result['load_seconds']:>10.2f}{result['weights_mb']:>14.0f}"
+                f"{result['peak_rss_mb']:>15.0f}{result['rtf']:>8.3f}{result['wer']:>8.1%}"
+            )
+            if options["verbose_texts"]:
+                for text in result["texts"]:
+                    self.stdout.write(f"    {text}")
+
+    def _load_manifest(self, manifest_path: Path) -> tuple[list[bytes], list[str]]:
+        """Reads the clips and reference transcripts listed in a manifest.
+
+        Args:
+            manifest_path (Path): The manifest file.
+
+        Returns:
+            tuple[list[bytes], list[str]]: The raw bytes of each clip and its reference.
+
+        Raises:
+            CommandError: If the manifest or one of its clips cannot be read.
+        """
+        try:
+            entries: list[dict] = json.loads(manifest_path.read_text())
+            clips: list[bytes] = [
+                manifest_path.parent.joinpath(entry["audio"]).read_bytes()
+                for entry in entries
+            ]
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Cannot read clips from {manifest_path}: {e}") from e
+        if not clips:
+            raise CommandError(f"No clips listed in {manifest_path}")
+        return clips, [entry["text"] for entry in entries]
@@ -0,0 +1,138 @@
+"""This module provides the run_prompt_batch management command.
+
+It answers a JSONL file of prompts with an AI model as a batch job (see batches.py),
+in the foreground, and reports the job's throughput in prompts per second. The
+responses are saved as the items of a new API conversation thread.
+
+    Useage:
+        python manage.py run_prompt_batch prompts.jsonl --aimodel "GPT OSS 20B"
+        python manage.py run_prompt_batch prompts.jsonl --aimodel "GPT OSS 20B" --user admin@example.com
+        python manage.py run_prompt_batch --resume 6f1c...
+
+Each line of the file is a prompt as a JSON string, or an object with a "prompt". A job
+whose run stopped, or that had failed prompts, is run again with --resume.
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from project_apps.aimodels.models import AIModel
+from project_apps.chats.batches import get_prompt_batch_runner, parse_prompts_jsonl
+from project_apps.chats.models import PromptBatchJob
+
+
+class Command(BaseCommand):
+    help = "Answers a JSONL file of prompts with an AI model as a batch job."
+
+    def add_arguments(self, parser) -> None:
+        """Adds the command's options.
+
+        Args:
+            parser: The command's argument parser.
+        """
+        parser.add_argument("file", nargs="?", help="JSONL file of prompts.")
+        parser.add_argument("--aimodel", help="Name of the AI model to answer them.")
+        parser.add_argument("--name", help="Name of the job and its thread.")
+        parser.add_argument("--user", help="Email of the user the job belongs to.")
+        parser.add_argument("--resume", help="ID of a job to run again.")
+
+    def handle(self, *args, **options) -> None:
+        """Submits the file's prompts, or takes the job to resume, and runs it.
+
+        Args:
+            *args: Positional arguments.
+            **options: The parsed options.
+
+        Raises:
+            CommandError: If the options, the file or the AI model are not valid.
+        """
+        runner = get_prompt_batch_runner()
+        if options["resume"]:
+            if not PromptBatchJob.objects.filter(id=options["resume"]).exists():
+                raise CommandError(f"No batch job {options['resume']}")
+            job_id: object = options["resume"]
+        else:
+            job_id = runner.submit(
+                self._get_aimodel(options["aimodel"]),
+                self._read_prompts(options["file"]),
+                options["name"] or Path(options["file"]).stem,
+                self._get_user(options["user"]),
+                background=False,
+            ).id
+
+        job: PromptBatchJob = runner.run(job_id)
+        self.stdout.write(
+            f"Batch job {job.id} {job.status} through {job.mode}: "
+            f"{job.completed_prompts} of {job.total_prompts} prompts answered, "
+            f"{job.failed_prompts} failed, "
+            f"{job.get_prompts_per_second() or 0:.2f} prompts/s"
+        )
+        if job.status == PromptBatchJob.STATUS_FAILED:
+            raise CommandError(job.error)
+
+    def _read_prompts(self, path: str | None) -> list[str]:
+        """Reads the prompts from a JSONL file.
+
+        Args:
+            path (str | None): The file's path.
+
+        Returns:
+            list[str]: The prompts.
+
+        Raises:
+            CommandError: If there is no file, it is not valid, or it has too many.
+        """
+        if not path:
+            raise CommandError("Give a JSONL file of prompts, or --resume a job")
+        try:
+            with open(path, encoding="utf-8") as prompts_file:
+                prompts: list[str] = parse_prompts_jsonl(prompts_file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"{path}: {error}") from error
+        if not prompts or len(prompts) > settings.CHAT_BATCH_MAX_PROMPTS:
+            raise CommandError(
+                f"{path} has {len(prompts)} prompts, a job takes 1 to "
+                f"{settings.CHAT_BATCH_MAX_PROMPTS}"
+            )
+        return prompts
+
+    def _get_aimodel(self, name: str | None) -> AIModel:
+        """Gets the active AI model with the name.
+
+        Args:
+            name (str | None): The AI model's name.
+
+        Returns:
+            AIModel: The AI model.
+
+        Raises:
+            CommandError: If there is no such active AI model.
+        """
+        aimodel: AIModel | None = AIModel.objects.filter(
+            name=name, is_active=True
+        ).first()
+        if aimodel is None:
+            raise CommandError(f"No active AI model named {name!r}")
+        return aimodel
+
+    def _get_user(self, email: str | None) -> object | None:
+        """Gets the user with the email, if one was given.
+
+        Args:
+            email (str | None): The user's email.
+
+        Returns:
+            User | None: The user.
+
+        Raises:
+            CommandError: If there is no such user.
+        """
+        if not email:
+            return None
+        user: object | None = get_user_model().objects.filter(email=email).first()
+        if user is None:
+            raise CommandError(f"No user with the email {email}")
+        return user
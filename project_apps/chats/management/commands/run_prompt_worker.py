@@ -0,0 +1,64 @@
+"""This module provides the run_prompt_worker management command.
+
+It answers the prompts queued by send_prompt with AIMODEL_QUEUE_RESPONSES (see
+jobs.py), so web processes need not. Run one or more alongside the web server, with
+CHAT_QUEUE_THREADS set to 0 to leave every prompt to them.
+
+    Useage:
+        python manage.py run_prompt_worker
+        python manage.py run_prompt_worker --threads 16
+        python manage.py run_prompt_worker --once
+
+Several workers may run at once, on any hosts that share the database, as each job is
+claimed by one of them. The command answers jobs on its --threads only: its queue has
+none of the web process's CHAT_QUEUE_THREADS threads or sweeps.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from project_apps.chats.jobs import PromptJobQueue
+
+
+class Command(BaseCommand):
+    help = "Answers queued chat prompts until stopped."
+
+    def add_arguments(self, parser) -> None:
+        """Adds the command's options.
+
+        Args:
+            parser: The command's argument parser.
+        """
+        parser.add_argument(
+            "--threads", type=int, default=4, help="Prompts answered at once."
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=1.0,
+            help="Seconds to wait for a prompt when none is queued.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Answer the prompts queued now, then stop.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Claims and answers queued prompts.
+
+        Args:
+            *args: Positional arguments.
+            **options: The parsed options.
+        """
+        queue: PromptJobQueue = PromptJobQueue(
+            threads=0,
+            max_attempts=settings.CHAT_QUEUE_MAX_ATTEMPTS,
+            lease_seconds=settings.CHAT_QUEUE_LEASE_SECONDS,
+        )
+        claimed: int = queue.work(
+            threads=max(options["threads"], 1),
+            poll_interval=options["poll"],
+            stop_when_idle=options["once"],
+        )
+        self.stdout.write(f"Answered {claimed} queued prompts")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0005_alter_conversationitem_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationitem',
+            name='is_cached',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0006_conversationitem_is_cached'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationthread',
+            name='summarized_order',
+            field=models.IntegerField(default=0, verbose_name='Summarized Up To'),
+        ),
+    ]
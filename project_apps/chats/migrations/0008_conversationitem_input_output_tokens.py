@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0007_conversationthread_summarized_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationitem',
+            name='input_tokens',
+            field=models.IntegerField(default=0, verbose_name='Input Tokens'),
+        ),
+        migrations.AddField(
+            model_name='conversationitem',
+            name='output_tokens',
+            field=models.IntegerField(default=0, verbose_name='Output Tokens'),
+        ),
+    ]
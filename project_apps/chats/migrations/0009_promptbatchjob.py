@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:22
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aimodels', '0011_aimodel_rate_limits'),
+        ('chats', '0008_conversationitem_input_output_tokens'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromptBatchJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=150, verbose_name='Batch Job Name')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='Batch Job Status')),
+                ('mode', models.CharField(blank=True, choices=[('provider', 'Provider Batch API'), ('worker_pool', 'Worker Pool')], max_length=20, verbose_name='Sent Through')),
+                ('provider_batch_id', models.CharField(blank=True, max_length=150, verbose_name='Provider Batch ID')),
+                ('total_prompts', models.PositiveIntegerField(default=0, verbose_name='Prompts')),
+                ('completed_prompts', models.PositiveIntegerField(default=0, verbose_name='Prompts Answered')),
+                ('failed_prompts', models.PositiveIntegerField(default=0, verbose_name='Prompts Failed')),
+                ('prompts_per_second', models.FloatField(blank=True, null=True, verbose_name='Prompts per Second')),
+                ('error', models.TextField(blank=True, verbose_name='Batch Job Error')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Batch Job Started At')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Batch Job Finished At')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Batch Job Created At')),
+                ('aimodel', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='prompt_batch_jobs', to='aimodels.aimodel', verbose_name='Batch Job AI Model')),
+                ('conversation_thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prompt_batch_jobs', to='chats.conversationthread', verbose_name='Batch Job Conversation')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_prompt_batch_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Batch Job Created By')),
+            ],
+            options={
+                'verbose_name': 'Prompt Batch Job',
+                'verbose_name_plural': 'Prompt Batch Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
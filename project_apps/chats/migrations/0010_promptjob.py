@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:31
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0009_promptbatchjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromptJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20, verbose_name='Prompt Job Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Prompt Job Attempts')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Prompt Job Run After')),
+                ('claimed_by', models.CharField(blank=True, max_length=150, verbose_name='Prompt Job Claimed By')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Prompt Job Claimed At')),
+                ('error', models.TextField(blank=True, verbose_name='Prompt Job Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Prompt Job Created At')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Prompt Job Finished At')),
+                ('conversation_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prompt_job', to='chats.conversationitem', verbose_name='Prompt Job Conversation Item')),
+            ],
+            options={
+                'verbose_name': 'Prompt Job',
+                'verbose_name_plural': 'Prompt Jobs',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='chats_promp_status_e286ff_idx')],
+            },
+        ),
+    ]
@@ -8,6 +8,7 @@ class ConversationThread(models.Model)
         id
         name
         summary
+        summarized_order
         aimodel
         chat_type
         created_by
@@ -25,7 +26,10 @@ class ConversationItem(models.Model)
         prompt
         response
         tokens
+        input_tokens
+        output_tokens
         is_full_saved
+        is_cached
         created_by
         created_at
         modified_by
@@ -33,7 +37,45 @@ class ConversationItem(models.Model)
         ORDER
     - str representation:
     - get_absolute_url: conversationthread_detail/parent_model_id
+    - set_token_usage: sets the input, output and total tokens.
 
+class PromptBatchJob(models.Model)
+    - A batch of prompts answered offline, whose items are in an API thread.
+    - fields
+        id
+        name
+        aimodel
+        conversation_thread
+        status
+        mode
+        provider_batch_id
+        total_prompts
+        completed_prompts
+        failed_prompts
+        prompts_per_second
+        error
+        started_at
+        finished_at
+        created_by
+        created_at
+    - str representation:
+    - get_prompts_per_second: the job's throughput so far.
+
+class PromptJob(models.Model)
+    - A prompt queued for a background worker to answer (see jobs.py).
+    - fields
+        id
+        conversation_item
+        status
+        attempts
+        run_after
+        claimed_by
+        claimed_at
+        error
+        created_at
+        finished_at
+    - str representation:
+    - is_pending: whether the prompt is still to be answered.
 
 """
 
@@ -42,9 +84,11 @@ import uuid
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from project_apps.aimodels.models import AIModel
+from project_apps.aimodels.tokens import TokenUsage
 
 # from django_cryptography.fields import encrypt # Removed due to incompatibility with Django 5
 
@@ -71,6 +115,10 @@ class ConversationThread(models.Model):
     summary: models.TextField = models.TextField(
         blank=True, null=True, verbose_name="Conversation Summary"
     )
+    # The ORDER of the last item folded into summary (see summaries.py).
+    summarized_order: models.IntegerField = models.IntegerField(
+        default=0, verbose_name=_("Summarized Up To")
+    )
 
     aimodel: models.ForeignKey = models.ForeignKey(
         AIModel,
@@ -185,8 +233,17 @@ class ConversationItem(models.Model):
         blank=False, null=False, verbose_name=_("Conversation's Item's Response")
     )
 
+    # The prompt's tokens with its history, and the response's (see aimodels/tokens.py).
     tokens: models.IntegerField = models.IntegerField()
+    input_tokens: models.IntegerField = models.IntegerField(
+        default=0, verbose_name=_("Input Tokens")
+    )
+    output_tokens: models.IntegerField = models.IntegerField(
+        default=0, verbose_name=_("Output Tokens")
+    )
     is_full_saved: models.BooleanField = models.BooleanField(default=False)
+    # The response came from the AI model's response cache rather than the provider.
+    is_cached: models.BooleanField = models.BooleanField(default=False)
     created_by: models.ForeignKey = models.ForeignKey(
         get_user_model(),
         on_delete=models.SET_NULL,
@@ -242,3 +299,225 @@ class ConversationItem(models.Model):
             str: The URL for the parent conversation thread detail page.
         """
         return reverse("conversationthread_detail", args=[self.conversation_thread.id])
+
+    def set_token_usage(self, usage: TokenUsage) -> None:
+        """Sets the item's token counts, without saving it.
+
+        Args:
+            usage (TokenUsage): The tokens its prompt and response used.
+        """
+        self.input_tokens = usage.input_tokens
+        self.output_tokens = usage.output_tokens
+        self.tokens = usage.total_tokens
+
+
+class PromptBatchJob(models.Model):
+    """Represents a batch of prompts sent to an AI model offline (see batches.py).
+
+    The prompts are saved as the items of an API conversation thread when the job is
+    submitted, and each item's response is filled in as it is answered.
+    """
+
+    STATUS_PENDING: str = "pending"
+    STATUS_RUNNING: str = "running"
+    STATUS_COMPLETED: str = "completed"
+    STATUS_FAILED: str = "failed"
+
+    STATUS_CHOICES: tuple = (
+        (STATUS_PENDING, _("Pending")),
+        (STATUS_RUNNING, _("Running")),
+        (STATUS_COMPLETED, _("Completed")),
+        (STATUS_FAILED, _("Failed")),
+    )
+
+    MODE_PROVIDER: str = "provider"
+    MODE_WORKER_POOL: str = "worker_pool"
+
+    MODE_CHOICES: tuple = (
+        (MODE_PROVIDER, _("Provider Batch API")),
+        (MODE_WORKER_POOL, _("Worker Pool")),
+    )
+
+    id: models.UUIDField = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False
+    )
+    name: models.CharField = models.CharField(
+        max_length=150, verbose_name=_("Batch Job Name")
+    )
+    aimodel: models.ForeignKey = models.ForeignKey(
+        AIModel,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="prompt_batch_jobs",
+        verbose_name=_("Batch Job AI Model"),
+    )
+    conversation_thread: models.ForeignKey = models.ForeignKey(
+        ConversationThread,
+        on_delete=models.CASCADE,
+        related_name="prompt_batch_jobs",
+        verbose_name=_("Batch Job Conversation"),
+    )
+    status: models.CharField = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name=_("Batch Job Status"),
+    )
+    mode: models.CharField = models.CharField(
+        max_length=20, choices=MODE_CHOICES, blank=True, verbose_name=_("Sent Through")
+    )
+    provider_batch_id: models.CharField = models.CharField(
+        max_length=150, blank=True, verbose_name=_("Provider Batch ID")
+    )
+    total_prompts: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0, verbose_name=_("Prompts")
+    )
+    completed_prompts: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0, verbose_name=_("Prompts Answered")
+    )
+    # Prompts that failed in the latest run. They are sent again if the job is re-run.
+    failed_prompts: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0, verbose_name=_("Prompts Failed")
+    )
+    prompts_per_second: models.FloatField = models.FloatField(
+        null=True, blank=True, verbose_name=_("Prompts per Second")
+    )
+    error: models.TextField = models.TextField(
+        blank=True, verbose_name=_("Batch Job Error")
+    )
+    started_at: models.DateTimeField = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Batch Job Started At")
+    )
+    finished_at: models.DateTimeField = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Batch Job Finished At")
+    )
+    created_by: models.ForeignKey = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="created_prompt_batch_jobs",
+        verbose_name=_("Batch Job Created By"),
+    )
+    created_at: models.DateTimeField = models.DateTimeField(
+        auto_now_add=True, verbose_name=_("Batch Job Created At")
+    )
+
+    class Meta:
+        """Meta options for PromptBatchJob.
+
+        Sets ordering for lists of jobs and verbose names for the admin interface.
+        """
+
+        ordering = ["-created_at"]
+
+        verbose_name = _("Prompt Batch Job")
+        verbose_name_plural = _("Prompt Batch Jobs")
+
+    def __str__(self) -> str:
+        """Returns the string representation of the batch job.
+
+        Returns:
+            str: The job's name, status and progress.
+        """
+        return (
+            f"{self.name} ({self.status}): {self.completed_prompts} of "
+            f"{self.total_prompts} prompts answered"
+        )
+
+    def get_prompts_per_second(self) -> float | None:
+        """Gives the job's throughput, so far if it is still running.
+
+        Returns:
+            float | None: Prompts answered per second since the job started, or None
+                if it has not started.
+        """
+        if self.prompts_per_second is not None:
+            return self.prompts_per_second
+        if self.started_at is None:
+            return None
+        seconds: float = (timezone.now() - self.started_at).total_seconds()
+        return self.completed_prompts / seconds if seconds > 0 else None
+
+
+class PromptJob(models.Model):
+    """Represents a prompt queued for a background worker to answer (see jobs.py).
+
+    The table is the queue: workers claim the oldest job that is due, and save the
+    response to the job's ConversationItem.
+    """
+
+    STATUS_QUEUED: str = "queued"
+    STATUS_RUNNING: str = "running"
+    STATUS_COMPLETED: str = "completed"
+    STATUS_FAILED: str = "failed"
+
+    STATUS_CHOICES: tuple = (
+        (STATUS_QUEUED, _("Queued")),
+        (STATUS_RUNNING, _("Running")),
+        (STATUS_COMPLETED, _("Completed")),
+        (STATUS_FAILED, _("Failed")),
+    )
+
+    id: models.UUIDField = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False
+    )
+    conversation_item: models.OneToOneField = models.OneToOneField(
+        ConversationItem,
+        on_delete=models.CASCADE,
+        related_name="prompt_job",
+        verbose_name=_("Prompt Job Conversation Item"),
+    )
+    status: models.CharField = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+        verbose_name=_("Prompt Job Status"),
+    )
+    attempts: models.PositiveIntegerField = models.PositiveIntegerField(
+        default=0, verbose_name=_("Prompt Job Attempts")
+    )
+    # A job turned away by rate limits or an open circuit waits until then.
+    run_after: models.DateTimeField = models.DateTimeField(
+        default=timezone.now, verbose_name=_("Prompt Job Run After")
+    )
+    claimed_by: models.CharField = models.CharField(
+        max_length=150, blank=True, verbose_name=_("Prompt Job Claimed By")
+    )
+    claimed_at: models.DateTimeField = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Prompt Job Claimed At")
+    )
+    error: models.TextField = models.TextField(
+        blank=True, verbose_name=_("Prompt Job Error")
+    )
+    created_at: models.DateTimeField = models.DateTimeField(
+        auto_now_add=True, verbose_name=_("Prompt Job Created At")
+    )
+    finished_at: models.DateTimeField = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Prompt Job Finished At")
+    )
+
+    class Meta:
+        """Meta options for PromptJob.
+
+        Orders jobs oldest first, as workers take them, indexes the columns workers
+        look them up by, and sets verbose names for the admin interface.
+        """
+
+        ordering = ["created_at"]
+        indexes = [models.Index(fields=["status", "run_after"])]
+
+        verbose_name = _("Prompt Job")
+        verbose_name_plural = _("Prompt Jobs")
+
+    def __str__(self) -> str:
+        """Returns the string representation of the prompt job.
+
+        Returns:
+            str: The job's item and status.
+        """
+        return f"{self.conversation_item_id} ({self.status})"
+
+    @property
+    def is_pending(self) -> bool:
+        """Whether the prompt is still queued or being answered."""
+        return self.status in (self.STATUS_QUEUED, self.STATUS_RUNNING)
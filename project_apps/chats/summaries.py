@@ -0,0 +1,217 @@
+"""project_apps.chats.summaries.py
+
+This module folds a thread's older turns into its summary, in the background.
+
+The context builder sends a thread's latest turns that fit the AI model, so on a long
+thread every prompt carries as many earlier turns as fit, and the oldest are lost.
+Once a thread has CHAT_SUMMARY_KEEP_TURNS + CHAT_SUMMARY_FOLD_TURNS turns after its
+summary, the oldest CHAT_SUMMARY_FOLD_TURNS of them are folded into
+ConversationThread.summary. The thread's AI model is sent only the previous summary
+and those turns, never the whole thread, and asked for the updated summary. The
+context builder then sends the summary and the turns after it, so each prompt stays
+about the same size however long the thread grows.
+
+Summaries are made on a thread pool after a response is saved, so they never hold up
+a reply. A thread is summarised by one task at a time in a process, and a summary is
+only saved if no other process has moved the thread's summary on meanwhile.
+
+class ConversationSummarizer
+    - schedule: summarises a thread in the background once it has grown enough.
+    - summarize: folds a thread's oldest turns into its summary while it has enough.
+
+get_conversation_summarizer
+    - Returns the summarizer shared by the whole worker process.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import ConversationItem, ConversationThread
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT: str = (
+    "Update the summary of a conversation with the turns that follow it. Keep the "
+    "facts, names, decisions and open questions needed to carry on the conversation, "
+    "in at most {max_words} words. Answer with the summary only.\n\n"
+    "Summary so far:\n{summary}\n\nNew turns:\n{turns}"
+)
+
+
+class ConversationSummarizer:
+    """Folds the older turns of long threads into their summaries."""
+
+    def __init__(
+        self,
+        keep_turns: int = 10,
+        fold_turns: int = 10,
+        max_words: int = 200,
+        max_workers: int = 2,
+    ) -> None:
+        """Initialises the summarizer.
+
+        Args:
+            keep_turns (int): The latest turns always sent as they are.
+            fold_turns (int): The turns folded into the summary at a time. 0 turns
+                summaries off.
+            max_words (int): The longest summary asked for, in words.
+            max_workers (int): The threads summarising in the background.
+        """
+        self.keep_turns: int = keep_turns
+        self.fold_turns: int = fold_turns
+        self.max_words: int = max_words
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="chat-summary"
+        )
+        self._scheduled: set[str] = set()
+        self._lock: threading.Lock = threading.Lock()
+
+    def is_due(self, conversation_thread: ConversationThread, order: int) -> bool:
+        """Tells whether a thread has enough turns after its summary to fold some.
+
+        Args:
+            conversation_thread (ConversationThread): The thread.
+            order (int): The ORDER of its latest item.
+
+        Returns:
+            bool: True if the summary should be updated.
+        """
+        return bool(self.fold_turns) and (
+            order - conversation_thread.summarized_order
+            >= self.keep_turns + self.fold_turns
+        )
+
+    def schedule(
+        self, conversation_thread: ConversationThread, order: int
+    ) -> Future | None:
+        """Summarises a thread in the background, if it is due and not already queued.
+
+        Args:
+            conversation_thread (ConversationThread): The thread.
+            order (int): The ORDER of the item just saved.
+
+        Returns:
+            Future | None: The summary task, or None if none was queued.
+        """
+        if not self.is_due(conversation_thread, order):
+            return None
+        thread_id: str = str(conversation_thread.id)
+        with self._lock:
+            if thread_id in self._scheduled:
+                return None
+            self._scheduled.add(thread_id)
+        return self._executor.submit(self._summarize_in_background, thread_id)
+
+    def summarize(self, thread_id: object) -> int:
+        """Folds a thread's oldest turns into its summary while it has enough of them.
+
+        Each round reads only the turns after the summary, and no more than
+        keep_turns + fold_turns of them.
+
+        Args:
+            thread_id (uuid.UUID): The thread's id.
+
+        Returns:
+            int: The number of turns folded into the summary.
+        """
+        folded: int = 0
+        while True:
+            conversation_thread: ConversationThread = (
+                ConversationThread.objects.select_related("aimodel")
+                .only("summary", "summarized_order", "aimodel")
+                .get(id=thread_id)
+            )
+            if conversation_thread.aimodel is None:
+                return folded
+            turns: list[tuple] = list(
+                ConversationItem.objects.filter(
+                    conversation_thread_id=thread_id,
+                    ORDER__gt=conversation_thread.summarized_order,
+                )
+                .order_by("ORDER")
+                .values_list("ORDER", "prompt", "response")[
+                    : self.keep_turns + self.fold_turns
+                ]
+            )
+            if not self.fold_turns or len(turns) < self.keep_turns + self.fold_turns:
+                return folded
+            aimodel = conversation_thread.aimodel
+            summary: str = aimodel.get_response_content(
+                aimodel.get_aimodel_response(
+                    self._get_prompt(
+                        conversation_thread.summary, turns[: self.fold_turns]
+                    )
+                )
+            ).strip()
+            summarized_order: int = turns[self.fold_turns - 1][0]
+            if not summary or not ConversationThread.objects.filter(
+                id=thread_id, summarized_order=conversation_thread.summarized_order
+            ).update(summary=summary, summarized_order=summarized_order):
+                return folded
+            folded += self.fold_turns
+            logger.info(
+                f"Folded {self.fold_turns} turns of thread {thread_id} into its "
+                f"summary, up to item {summarized_order}"
+            )
+
+    def _get_prompt(self, summary: str | None, turns: list[tuple]) -> str:
+        """Builds the prompt asking for the updated summary.
+
+        Args:
+            summary (str | None): The previous summary, if any.
+            turns (list[tuple]): The ORDER, prompt and response of the turns to fold.
+
+        Returns:
+            str: The prompt.
+        """
+        return SUMMARY_PROMPT.format(
+            max_words=self.max_words,
+            summary=summary or "(none)",
+            turns="\n".join(
+                f"User: {prompt.strip()}\nAssistant: {response.strip()}"
+                for _, prompt, response in turns
+                if response
+            ),
+        )
+
+    def _summarize_in_background(self, thread_id: str) -> None:
+        """Summarises a thread on the pool, logging rather than raising errors.
+
+        Args:
+            thread_id (str): The thread's id.
+        """
+        try:
+            self.summarize(thread_id)
+        except Exception:
+            logger.warning(f"Could not summarise thread {thread_id}", exc_info=True)
+        finally:
+            with self._lock:
+                self._scheduled.discard(thread_id)
+            close_old_connections()
+
+
+_conversation_summarizer: ConversationSummarizer | None = None
+_conversation_summarizer_lock: threading.Lock = threading.Lock()
+
+
+def get_conversation_summarizer() -> ConversationSummarizer:
+    """Returns the process's summarizer, creating it from settings on first use.
+
+    Returns:
+        ConversationSummarizer: The summarizer.
+    """
+    global _conversation_summarizer
+    if _conversation_summarizer is None:
+        with _conversation_summarizer_lock:
+            if _conversation_summarizer is None:
+                _conversation_summarizer = ConversationSummarizer(
+                    keep_turns=settings.CHAT_SUMMARY_KEEP_TURNS,
+                    fold_turns=settings.CHAT_SUMMARY_FOLD_TURNS,
+                    max_words=settings.CHAT_SUMMARY_MAX_WORDS,
+                    max_workers=settings.CHAT_SUMMARY_THREADS,
+                )
+    return _conversation_summarizer
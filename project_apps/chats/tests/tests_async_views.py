@@ -0,0 +1,214 @@
+"""This module unit tests the async views used when running under ASGI.
+
+It has the test cases:
+    AsyncNOAEndpointTest: This ensures the async NOA endpoint awaits the AI model and answers like the sync one.
+    AsyncSendPromptTest: This ensures the async send_prompt view saves and renders the AI model's response.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, TestCase, tag
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from project_apps.chats.api.views import AsyncNOAMultiModalEndpoint
+from project_apps.chats.models import ConversationItem, ConversationThread
+from project_apps.chats.views import asend_prompt
+from standard.tests.utils import UserSetupMixin
+
+
+def create_aimodel_response(content):
+    """
+    This is a helper function that creates a stand-in for a chat completion
+
+    args:
+        content: the text of the response
+
+    returns:
+        response: a mock with choices[0].message.content set
+    """
+    response = MagicMock()
+    response.choices[0].message.content = content
+    return response
+
+
+@tag("async")
+class AsyncNOAEndpointTest(UserSetupMixin, TestCase):
+    """
+    This class tests the async NOA multimodal endpoint
+
+    Attributes:
+
+    methods:
+        setUp
+        post
+        test_response_generated_by_awaiting_the_model
+        test_concurrent_requests_overlap_while_waiting
+        test_invalid_data_rejected
+    """
+
+    def setUp(self):
+        super().setUp()
+        create_ai_model(
+            self.user1,
+            "openai/gpt-oss-20b:free",
+            "Open-weight model",
+            0.0,
+            0.0,
+            "Edge devices and focused tasks.",
+        )
+        self.view = AsyncNOAMultiModalEndpoint.as_view()
+
+    def post(self, data):
+        """
+        This function sends a multipart POST to the async endpoint.
+
+        args:
+            data: the form data
+
+        returns:
+            response: the endpoint's response
+        """
+        request = APIRequestFactory().post("/noa/mm/", data, format="multipart")
+        return async_to_sync(self.view)(request)
+
+    def test_response_generated_by_awaiting_the_model(self):
+        """
+        This function tests that the async endpoint awaits aget_aimodel_response.
+
+        args:
+
+        returns:
+        """
+        with patch(
+            "project_apps.aimodels.models.AIModel.aget_aimodel_response",
+            new=AsyncMock(return_value=create_aimodel_response("Paris")),
+        ) as aget_aimodel_response:
+            response = self.post(
+                {
+                    "prompt": "What's the capital of France?",
+                    "location": "Liverpool, United Kingdom",
+                    "time": "2025-07-02 11:29:48.054846",
+                }
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "Paris")
+        self.assertIn("generate_response: ", response.data["timings"])
+        aget_aimodel_response.assert_awaited_once_with(
+            "What's the capital of France?", None
+        )
+
+    def test_concurrent_requests_overlap_while_waiting(self):
+        """
+        This function tests that requests waiting on the model do not wait on each other.
+
+        args:
+
+        returns:
+        """
+        in_flight = []
+        peak = []
+
+        async def slow_response(prompt, history=None):
+            in_flight.append(prompt)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.2)
+            in_flight.remove(prompt)
+            return create_aimodel_response(prompt)
+
+        async def post_many():
+            requests = [
+                APIRequestFactory().post(
+                    "/noa/mm/",
+                    {
+                        "prompt": f"Prompt {index}",
+                        "location": "Liverpool, United Kingdom",
+                        "time": "2025-07-02 11:29:48.054846",
+                    },
+                    format="multipart",
+                )
+                for index in range(5)
+            ]
+            return await asyncio.gather(*(self.view(request) for request in requests))
+
+        with patch(
+            "project_apps.aimodels.models.AIModel.aget_aimodel_response",
+            new=AsyncMock(side_effect=slow_response),
+        ):
+            responses = async_to_sync(post_many)()
+        self.assertEqual(
+            [response.status_code for response in responses], [status.HTTP_200_OK] * 5
+        )
+        self.assertEqual(max(peak), 5)
+
+    def test_invalid_data_rejected(self):
+        """
+        This function tests that invalid request data gives 400 as in the sync endpoint.
+
+        args:
+
+        returns:
+        """
+        response = self.post({"prompt": "Hello"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@tag("async")
+class AsyncSendPromptTest(UserSetupMixin, TestCase):
+    """
+    This class tests the async send_prompt view
+
+    Attributes:
+
+    methods:
+        setUp
+        test_prompt_response_saved_and_rendered
+    """
+
+    def setUp(self):
+        super().setUp()
+        aimodel = create_ai_model(
+            self.user1,
+            "openai/gpt-oss-20b:free",
+            "Open-weight model",
+            0.0,
+            0.0,
+            "Edge devices and focused tasks.",
+        )
+        self.conversation_thread = ConversationThread.objects.create(
+            name="Capitals",
+            aimodel=aimodel,
+            chat_type="web",
+            created_by=self.user1,
+        )
+
+    def test_prompt_response_saved_and_rendered(self):
+        """
+        This function tests that the awaited response is saved as a ConversationItem.
+
+        args:
+
+        returns:
+        """
+        request = RequestFactory().post(
+            f"/chats/send_prompt/{self.conversation_thread.id}",
+            {"prompt": "What's the capital of France?"},
+        )
+        request.user = self.user1
+        request.auser = AsyncMock(return_value=self.user1)
+        request._dont_enforce_csrf_checks = True
+        with patch(
+            "project_apps.aimodels.models.AIModel.aget_aimodel_response",
+            new=AsyncMock(return_value=create_aimodel_response("Paris")),
+        ):
+            response = async_to_sync(asend_prompt)(
+                request, thread_id=self.conversation_thread.id
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Paris")
+        item = ConversationItem.objects.get(conversation_thread=self.conversation_thread)
+        self.assertEqual(item.response, "Paris")
+        self.assertEqual(item.ORDER, 1)
@@ -0,0 +1,219 @@
+"""This module unit tests the in-memory audio decoding for the NOA endpoint.
+
+It has the test cases:
+    AudioDecodeTest: This ensures uploaded audio is decoded to 16 kHz mono float32 samples without temp files.
+    SpeechSegmentationTest: This ensures silence is trimmed and speech split at pauses.
+
+There is also a helper function that can be imported into other tests.
+    create_wav_bytes
+        Useage:
+            from project_apps.chats.tests.tests_audio import create_wav_bytes
+
+            create_wav_bytes(samples, frame_rate, channels)
+"""
+
+import io
+import wave
+from unittest.mock import patch
+
+import numpy as np
+from django.test import SimpleTestCase, tag
+
+from project_apps.chats.api.audio import (
+    SAMPLE_RATE,
+    AudioDecodeError,
+    decode_audio,
+    decode_wav,
+    resample,
+    split_speech_segments,
+)
+
+
+def create_wav_bytes(samples, frame_rate=SAMPLE_RATE, channels=1):
+    """
+    This is a helper function that creates 16-bit PCM WAV bytes in memory
+
+    args:
+        samples: float samples in [-1, 1], interleaved if there is more than one channel
+        frame_rate: the sample rate of the WAV
+        channels: the number of channels
+
+    returns:
+        bytes: the WAV file contents
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(frame_rate)
+        wav_file.writeframes(
+            (np.asarray(samples) * 32767).astype("<i2").tobytes()
+        )
+    return buffer.getvalue()
+
+
+def create_speech_like_audio(pattern, sample_rate=SAMPLE_RATE):
+    """
+    This is a helper function that creates audio alternating silence and tone
+
+    args:
+        pattern: a list of (is_speech, seconds) pairs
+        sample_rate: the sample rate of the audio
+
+    returns:
+        np.ndarray: float32 samples with a 220 Hz tone where is_speech is True
+    """
+    parts = []
+    for is_speech, seconds in pattern:
+        times = np.arange(int(seconds * sample_rate)) / sample_rate
+        tone = 0.3 * np.sin(2 * np.pi * 220 * times) if is_speech else 0 * times
+        parts.append(tone)
+    return np.concatenate(parts).astype(np.float32)
+
+
+@tag("transcription")
+class AudioDecodeTest(SimpleTestCase):
+    """
+    This class tests decoding uploaded audio in memory
+
+    Attributes:
+
+    methods:
+        test_wav_decoded_to_float32
+        test_stereo_wav_mixed_to_mono
+        test_wav_resampled_to_16khz
+        test_wav_does_not_use_ffmpeg
+        test_undecodable_audio_raises
+    """
+
+    def test_wav_decoded_to_float32(self):
+        """
+        This function tests that 16 kHz PCM WAV decodes to matching float32 samples.
+
+        args:
+
+        returns:
+        """
+        samples = np.array([0.0, 0.5, -0.5, 0.25])
+        decoded = decode_wav(create_wav_bytes(samples))
+        self.assertEqual(decoded.dtype, np.float32)
+        np.testing.assert_allclose(decoded, samples, atol=1e-3)
+
+    def test_stereo_wav_mixed_to_mono(self):
+        """
+        This function tests that stereo WAV channels are averaged to mono.
+
+        args:
+
+        returns:
+        """
+        decoded = decode_wav(create_wav_bytes([0.5, 0.0, -0.5, -0.5], channels=2))
+        np.testing.assert_allclose(decoded, [0.25, -0.5], atol=1e-3)
+
+    def test_wav_resampled_to_16khz(self):
+        """
+        This function tests that WAV at other sample rates is resampled to 16 kHz.
+
+        args:
+
+        returns:
+        """
+        decoded = decode_wav(create_wav_bytes(np.zeros(48000), frame_rate=48000))
+        self.assertEqual(len(decoded), SAMPLE_RATE)
+        self.assertEqual(len(resample(np.zeros(8000), 8000, SAMPLE_RATE)), SAMPLE_RATE)
+
+    def test_wav_does_not_use_ffmpeg(self):
+        """
+        This function tests that WAV is decoded without starting an ffmpeg process.
+
+        args:
+
+        returns:
+        """
+        with patch("project_apps.chats.api.audio.subprocess.run") as run:
+            decode_audio(create_wav_bytes(np.zeros(160)))
+        run.assert_not_called()
+
+    def test_undecodable_audio_raises(self):
+        """
+        This function tests that audio which cannot be decoded in memory raises AudioDecodeError.
+
+        args:
+
+        returns:
+        """
+        with patch(
+            "project_apps.chats.api.audio.subprocess.run", side_effect=OSError
+        ):
+            with self.assertRaises(AudioDecodeError):
+                decode_audio(b"not audio at all")
+
+
+@tag("transcription")
+class SpeechSegmentationTest(SimpleTestCase):
+    """
+    This class tests the energy-based voice activity segmentation
+
+    Attributes:
+
+    methods:
+        test_leading_and_trailing_silence_trimmed
+        test_speech_split_at_pauses
+        test_short_segments_joined_into_chunks
+        test_silence_only_has_no_segments
+    """
+
+    def test_leading_and_trailing_silence_trimmed(self):
+        """
+        This function tests that silence either side of the speech is dropped.
+
+        args:
+
+        returns:
+        """
+        audio = create_speech_like_audio([(False, 2), (True, 1), (False, 3)])
+        segments = split_speech_segments(audio)
+        self.assertEqual(len(segments), 1)
+        self.assertLess(len(segments[0]), 1.5 * SAMPLE_RATE)
+        self.assertGreaterEqual(len(segments[0]), SAMPLE_RATE)
+
+    def test_speech_split_at_pauses(self):
+        """
+        This function tests that a long enough pause starts a new segment.
+
+        args:
+
+        returns:
+        """
+        audio = create_speech_like_audio(
+            [(False, 1), (True, 1), (False, 1), (True, 1), (False, 0.2), (True, 1)]
+        )
+        segments = split_speech_segments(audio, min_chunk_seconds=0)
+        self.assertEqual(len(segments), 2)
+        self.assertGreater(len(segments[1]), len(segments[0]))
+
+    def test_short_segments_joined_into_chunks(self):
+        """
+        This function tests that short segments are joined without their pauses.
+
+        args:
+
+        returns:
+        """
+        audio = create_speech_like_audio(
+            [(True, 1), (False, 2), (True, 1), (False, 2), (True, 1)]
+        )
+        segments = split_speech_segments(audio, min_chunk_seconds=5)
+        self.assertEqual(len(segments), 1)
+        self.assertLess(len(segments[0]), 4 * SAMPLE_RATE)
+
+    def test_silence_only_has_no_segments(self):
+        """
+        This function tests that audio with no speech gives no segments.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(split_speech_segments(np.zeros(3 * SAMPLE_RATE)), [])
+        self.assertEqual(split_speech_segments(np.zeros(0)), [])
@@ -0,0 +1,381 @@
+"""This module unit tests batch jobs of prompts.
+
+It has the test cases:
+    ParsePromptsJSONLTest: This ensures prompts are read from JSONL lines, and bad lines are reported.
+    PromptBatchRunnerTest: This ensures jobs are answered concurrently or through provider batches, and can be resumed.
+    PromptBatchEndpointTest: This ensures jobs are submitted and their progress reported through the API.
+"""
+
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    tag,
+)
+from django.urls import reverse
+
+from project_apps.aimodels.backends import TransformerBackend
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from project_apps.chats import batches
+from project_apps.chats.batches import PromptBatchRunner, parse_prompts_jsonl
+from project_apps.chats.models import ConversationItem, PromptBatchJob
+from standard.tests.utils import UserSetupMixin
+
+
+@tag("model")
+class ParsePromptsJSONLTest(SimpleTestCase):
+    """
+    This class tests reading prompts from JSONL
+
+    Attributes:
+
+    methods:
+        test_strings_and_objects_read
+        test_bad_lines_reported
+    """
+
+    def test_strings_and_objects_read(self):
+        """
+        This function tests that prompts are strings or objects, and blanks skipped.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(
+            parse_prompts_jsonl(
+                ['"Capital of France?"\n', "\n", b'{"prompt": "Capital of Spain?"}\n']
+            ),
+            ["Capital of France?", "Capital of Spain?"],
+        )
+
+    def test_bad_lines_reported(self):
+        """
+        This function tests that a line without a prompt is reported by number.
+
+        args:
+
+        returns:
+        """
+        with self.assertRaisesMessage(ValueError, "Line 2 is not JSON"):
+            parse_prompts_jsonl(['"Hi"', "{not json"])
+        with self.assertRaisesMessage(ValueError, "Line 1 has no prompt"):
+            parse_prompts_jsonl(['{"text": "Hi"}'])
+
+
+@tag("model")
+@override_settings(AIMODEL_COALESCE_REQUESTS=False)
+class PromptBatchRunnerTest(UserSetupMixin, TransactionTestCase):
+    """
+    This class tests answering batch jobs. The worker pool's threads need the
+    prompts committed, hence TransactionTestCase.
+
+    Attributes:
+
+    methods:
+        setUp
+        answer_slowly
+        test_worker_pool_answers_prompts_at_once
+        test_failed_prompts_sent_again_when_resumed
+        test_provider_batch_submitted_and_polled
+        test_command_runs_jsonl_file
+    """
+
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        self.ai_model = create_ai_model(
+            self.user1, "batch", "Batch", 0.1, 0.1, "General.", "transformer"
+        )
+        self.runner = PromptBatchRunner(concurrency=8, poll_interval=0)
+        self.prompts = [f"Capital of country {number}?" for number in range(8)]
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.lock = threading.Lock()
+
+    def answer_slowly(self, aimodel, prompt, history=None):
+        """
+        This function stands in for the AI model, taking 0.1s to answer.
+
+        args:
+            aimodel: the AI model asked
+            prompt: the prompt
+            history: the earlier turns
+
+        returns:
+            text: the answer
+        """
+        with self.lock:
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        time.sleep(0.1)
+        with self.lock:
+            self.in_flight -= 1
+        return f"Answer to {prompt}"
+
+    def test_worker_pool_answers_prompts_at_once(self):
+        """
+        This function tests that prompts are answered concurrently and saved as items.
+
+        args:
+
+        returns:
+        """
+        job = self.runner.submit(
+            self.ai_model, self.prompts, "Capitals", self.user1, background=False
+        )
+        with patch.object(
+            TransformerBackend, "generate", side_effect=self.answer_slowly
+        ):
+            with self.assertLogs("project_apps.chats.batches", "INFO"):
+                job = self.runner.run(job.id)
+        self.assertEqual(job.status, PromptBatchJob.STATUS_COMPLETED)
+        self.assertEqual(job.mode, PromptBatchJob.MODE_WORKER_POOL)
+        self.assertEqual((job.completed_prompts, job.failed_prompts), (8, 0))
+        self.assertGreater(self.most_in_flight, 1)
+        self.assertGreater(job.prompts_per_second, 20)
+        self.assertEqual(job.conversation_thread.chat_type, "api")
+        item = ConversationItem.objects.get(
+            conversation_thread=job.conversation_thread, ORDER=3
+        )
+        self.assertEqual(item.response, "Answer to Capital of country 2?")
+        self.assertTrue(item.is_full_saved)
+        self.assertGreater(item.output_tokens, 0)
+
+    def test_failed_prompts_sent_again_when_resumed(self):
+        """
+        This function tests that only the prompts that failed are sent again.
+
+        args:
+
+        returns:
+        """
+
+        def fail_on_third(aimodel, prompt, history=None):
+            if prompt == self.prompts[2]:
+                raise ConnectionError("Provider unreachable")
+            return "Answered"
+
+        job = self.runner.submit(
+            self.ai_model, self.prompts, "Capitals", background=False
+        )
+        with patch.object(TransformerBackend, "generate", side_effect=fail_on_third):
+            with self.assertLogs("project_apps.chats.batches", "WARNING"):
+                job = self.runner.run(job.id)
+        self.assertEqual((job.completed_prompts, job.failed_prompts), (7, 1))
+        with patch.object(
+            TransformerBackend, "generate", return_value="Paris"
+        ) as generate:
+            job = self.runner.run(job.id)
+        generate.assert_called_once_with(self.ai_model, self.prompts[2], None)
+        self.assertEqual((job.completed_prompts, job.failed_prompts), (8, 0))
+
+    def test_provider_batch_submitted_and_polled(self):
+        """
+        This function tests that a backend's batch API is used for large enough jobs.
+
+        args:
+
+        returns:
+        """
+        self.runner.provider_min_prompts = 8
+        job = self.runner.submit(
+            self.ai_model, self.prompts, "Capitals", background=False
+        )
+        item_ids = [
+            str(item_id)
+            for item_id in ConversationItem.objects.filter(
+                conversation_thread=job.conversation_thread
+            )
+            .order_by("ORDER")
+            .values_list("id", flat=True)
+        ]
+        with (
+            patch.object(TransformerBackend, "supports_batching", True),
+            patch.object(
+                TransformerBackend, "submit_batch", return_value="batch_1"
+            ) as submit_batch,
+            patch.object(
+                TransformerBackend,
+                "get_batch",
+                side_effect=[{"status": "in_progress"}, {"status": "completed"}],
+            ),
+            patch.object(
+                TransformerBackend,
+                "get_batch_results",
+                return_value={item_id: "Paris" for item_id in item_ids[1:]},
+            ),
+            patch.object(TransformerBackend, "generate") as generate,
+        ):
+            job = self.runner.run(job.id)
+        generate.assert_not_called()
+        self.assertEqual(len(submit_batch.call_args.args[1]), 8)
+        self.assertEqual(job.mode, PromptBatchJob.MODE_PROVIDER)
+        self.assertEqual(job.provider_batch_id, "batch_1")
+        self.assertEqual((job.completed_prompts, job.failed_prompts), (7, 1))
+        self.assertFalse(ConversationItem.objects.get(id=item_ids[0]).is_full_saved)
+
+    def test_command_runs_jsonl_file(self):
+        """
+        This function tests that the command answers a JSONL file and reports prompts/s.
+
+        args:
+
+        returns:
+        """
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as prompts_file:
+            prompts_file.write(
+                '"Capital of France?"\n{"prompt": "Capital of Spain?"}\n'
+            )
+            prompts_file.flush()
+            output = StringIO()
+            with (
+                patch.object(batches, "_prompt_batch_runner", self.runner),
+                self.assertLogs("project_apps.chats.batches", "INFO"),
+            ):
+                call_command(
+                    "run_prompt_batch",
+                    prompts_file.name,
+                    aimodel="batch",
+                    user=self.user1.email,
+                    stdout=output,
+                )
+        self.assertIn("completed through worker_pool: 2 of 2", output.getvalue())
+        self.assertIn("prompts/s", output.getvalue())
+        self.assertEqual(
+            PromptBatchJob.objects.get(created_by=self.user1).name,
+            prompts_file.name.rsplit("/", 1)[-1][: -len(".jsonl")],
+        )
+
+
+@tag("model")
+class PromptBatchEndpointTest(UserSetupMixin, TestCase):
+    """
+    This class tests the batch job API endpoints
+
+    Attributes:
+
+    methods:
+        setUp
+        test_prompts_submitted_as_job
+        test_jsonl_file_submitted_as_job
+        test_bad_file_rejected
+        test_progress_reported_to_its_user_only
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.ai_model = create_ai_model(
+            self.user1, "batch", "Batch", 0.1, 0.1, "General.", "transformer"
+        )
+        self.client.force_login(self.user1)
+
+    def test_prompts_submitted_as_job(self):
+        """
+        This function tests that posted prompts are saved and run after the commit.
+
+        args:
+
+        returns:
+        """
+        with patch.object(PromptBatchRunner, "schedule") as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse("noa-prompt-batches"),
+                    {
+                        "aimodel": "batch",
+                        "name": "Capitals",
+                        "prompts": ["Capital of France?", "Capital of Spain?"],
+                    },
+                    content_type="application/json",
+                    secure=True,
+                )
+        self.assertEqual(response.status_code, 202)
+        job = PromptBatchJob.objects.get(id=response.data["id"])
+        schedule.assert_called_once_with(job.id)
+        self.assertEqual(response.data["status"], PromptBatchJob.STATUS_PENDING)
+        self.assertEqual(response.data["total_prompts"], 2)
+        self.assertEqual(
+            list(
+                job.conversation_thread.conversation_items.values_list(
+                    "prompt", flat=True
+                )
+            ),
+            ["Capital of France?", "Capital of Spain?"],
+        )
+
+    def test_jsonl_file_submitted_as_job(self):
+        """
+        This function tests that a JSONL file's prompts are submitted.
+
+        args:
+
+        returns:
+        """
+        with patch.object(PromptBatchRunner, "schedule"):
+            response = self.client.post(
+                reverse("noa-prompt-batches"),
+                {
+                    "aimodel": "batch",
+                    "file": SimpleUploadedFile(
+                        "prompts.jsonl", b'"Capital of France?"\n"Capital of Spain?"\n'
+                    ),
+                },
+                secure=True,
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["total_prompts"], 2)
+        self.assertEqual(response.data["aimodel"], "batch")
+
+    def test_bad_file_rejected(self):
+        """
+        This function tests that a file with a bad line is rejected with its number.
+
+        args:
+
+        returns:
+        """
+        response = self.client.post(
+            reverse("noa-prompt-batches"),
+            {
+                "aimodel": "batch",
+                "file": SimpleUploadedFile("prompts.jsonl", b'"Hi"\n{"text": 1}\n'),
+            },
+            secure=True,
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["file"], ["Line 2 has no prompt"])
+        self.assertFalse(PromptBatchJob.objects.exists())
+
+    def test_progress_reported_to_its_user_only(self):
+        """
+        This function tests that a job's progress is shown to the user who submitted it.
+
+        args:
+
+        returns:
+        """
+        job = PromptBatchRunner().submit(
+            self.ai_model, ["Hi"], "Greeting", self.user1, background=False
+        )
+        response = self.client.get(
+            reverse("noa-prompt-batch", args=[job.id]), secure=True
+        )
+        self.assertEqual(response.data["completed_prompts"], 0)
+        self.assertIsNone(response.data["prompts_per_second"])
+        self.client.force_login(self.user2)
+        response = self.client.get(
+            reverse("noa-prompt-batch", args=[job.id]), secure=True
+        )
+        self.assertEqual(response.status_code, 404)
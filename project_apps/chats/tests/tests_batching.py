@@ -0,0 +1,111 @@
+"""This module unit tests the micro-batching of Whisper inference for the NOA endpoint.
+
+It has the test cases:
+    TranscriptionBatcherTest: This ensures clips arriving together share a batch and get their own results.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+from django.test import SimpleTestCase, tag
+
+from project_apps.chats.api.batching import TranscriptionBatcher
+
+
+@tag("transcription")
+class TranscriptionBatcherTest(SimpleTestCase):
+    """
+    This class tests the TranscriptionBatcher
+
+    Attributes:
+
+    methods:
+        setUp
+        dispatch
+        test_clips_within_window_share_a_batch
+        test_batches_limited_to_max_size
+        test_clips_after_window_start_new_batch
+        test_batch_error_reaches_every_caller
+    """
+
+    def setUp(self):
+        self.batches = []
+        self.dispatch_lock = threading.Lock()
+
+    def dispatch(self, audios):
+        """
+        This function records each batch and answers every clip with its upper-cased text.
+
+        args:
+            audios: the clips in the batch
+
+        returns:
+            Future: resolved with one text per clip
+        """
+        with self.dispatch_lock:
+            self.batches.append(list(audios))
+        future = Future()
+        future.set_result([audio.upper() for audio in audios])
+        return future
+
+    def test_clips_within_window_share_a_batch(self):
+        """
+        This function tests that clips submitted inside the window are dispatched together.
+
+        args:
+
+        returns:
+        """
+        batcher = TranscriptionBatcher(self.dispatch, 0.2, 8)
+        futures = [batcher.submit(text) for text in ("a", "b", "c")]
+        self.assertEqual([f.result(timeout=5) for f in futures], ["A", "B", "C"])
+        self.assertEqual(self.batches, [["a", "b", "c"]])
+        self.assertEqual(batcher.stats()["largest_batch"], 3)
+
+    def test_batches_limited_to_max_size(self):
+        """
+        This function tests that a full batch is dispatched without waiting for the window.
+
+        args:
+
+        returns:
+        """
+        batcher = TranscriptionBatcher(self.dispatch, 5, 2)
+        started = time.monotonic()
+        futures = [batcher.submit(text) for text in ("a", "b", "c", "d")]
+        self.assertEqual([f.result(timeout=5) for f in futures], ["A", "B", "C", "D"])
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(self.batches, [["a", "b"], ["c", "d"]])
+
+    def test_clips_after_window_start_new_batch(self):
+        """
+        This function tests that a clip arriving after the window goes in the next batch.
+
+        args:
+
+        returns:
+        """
+        batcher = TranscriptionBatcher(self.dispatch, 0.05, 8)
+        self.assertEqual(batcher.submit("a").result(timeout=5), "A")
+        self.assertEqual(batcher.submit("b").result(timeout=5), "B")
+        self.assertEqual(self.batches, [["a"], ["b"]])
+        self.assertEqual(batcher.stats()["average_batch"], 1.0)
+
+    def test_batch_error_reaches_every_caller(self):
+        """
+        This function tests that a failed batch raises for each of its callers.
+
+        args:
+
+        returns:
+        """
+
+        def fail(audios):
+            raise RuntimeError("queue full")
+
+        batcher = TranscriptionBatcher(fail, 0.1, 8)
+        futures = [batcher.submit(text) for text in ("a", "b")]
+        for future in futures:
+            with self.assertRaisesMessage(RuntimeError, "queue full"):
+                future.result(timeout=5)
@@ -0,0 +1,265 @@
+"""This module unit tests building the conversation history sent with a prompt.
+
+It has the test cases:
+    ConversationContextBuilderTest: This ensures the history is the latest turns within the budget, read incrementally.
+    SendPromptContextTest: This ensures prompts are sent to the AI model with their thread's history.
+"""
+
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings, tag
+from django.urls import reverse
+
+from project_apps.aimodels.backends import TransformerBackend
+from project_apps.aimodels.routing import estimate_tokens
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from project_apps.chats import context
+from project_apps.chats.context import ConversationContextBuilder
+from project_apps.chats.models import PromptJob
+from project_apps.chats.tests.tests_models import (
+    create_conversation_item,
+    create_conversation_thread,
+)
+from standard.tests.utils import UserSetupMixin
+
+
+@tag("model")
+class ConversationContextBuilderTest(UserSetupMixin, TestCase):
+    """
+    This class tests the conversation context builder
+
+    Attributes:
+
+    methods:
+        setUp
+        test_history_is_latest_turns_oldest_first
+        test_history_kept_within_token_budget
+        test_only_new_items_read_and_counted
+        test_unfinished_item_read_again
+        test_failed_items_not_read_again
+    """
+
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        self.ai_model = create_ai_model(
+            self.user1, "context", "Context", 0.1, 0.1, "General.", "transformer"
+        )
+        self.conversation_thread = create_conversation_thread(
+            self.user1, "Capitals", "", "web", self.ai_model
+        )
+        for order, country, capital in (
+            (1, "France", "Paris"),
+            (2, "Spain", "Madrid"),
+            (3, "Italy", "Rome"),
+        ):
+            create_conversation_item(
+                self.user1,
+                self.conversation_thread,
+                f"Capital of {country}?",
+                capital,
+                ORDER=order,
+            )
+        self.builder = ConversationContextBuilder(reply_tokens=0)
+
+    def test_history_is_latest_turns_oldest_first(self):
+        """
+        This function tests that every earlier turn is sent in order when it fits.
+
+        args:
+
+        returns:
+        """
+        history = self.builder.build(self.conversation_thread, "And Germany?", 4)
+        self.assertEqual(
+            history,
+            [
+                {"role": "user", "content": "Capital of France?"},
+                {"role": "assistant", "content": "Paris"},
+                {"role": "user", "content": "Capital of Spain?"},
+                {"role": "assistant", "content": "Madrid"},
+                {"role": "user", "content": "Capital of Italy?"},
+                {"role": "assistant", "content": "Rome"},
+            ],
+        )
+        self.assertEqual(
+            self.builder.build(self.conversation_thread, "Hi", 3)[-1],
+            {"role": "assistant", "content": "Madrid"},
+        )
+
+    def test_history_kept_within_token_budget(self):
+        """
+        This function tests that the oldest turns are left out when over the budget.
+
+        args:
+
+        returns:
+        """
+        self.ai_model.max_tokens = 16
+        history = self.builder.build(self.conversation_thread, "And Germany?", 4)
+        self.assertEqual(
+            [message["content"] for message in history],
+            ["Capital of Spain?", "Madrid", "Capital of Italy?", "Rome"],
+        )
+        self.ai_model.max_tokens = 3
+        self.assertEqual(
+            self.builder.build(self.conversation_thread, "And Germany?", 4), []
+        )
+
+    def test_only_new_items_read_and_counted(self):
+        """
+        This function tests that later prompts read and count only the new items.
+
+        args:
+
+        returns:
+        """
+        with self.assertNumQueries(1):
+            self.builder.build(self.conversation_thread, "And Germany?", 4)
+        with self.assertNumQueries(0):
+            self.builder.build(self.conversation_thread, "And Germany?", 4)
+        create_conversation_item(
+            self.user1, self.conversation_thread, "And Germany?", "Berlin", ORDER=4
+        )
+        with patch.object(context, "estimate_tokens", wraps=estimate_tokens) as counted:
+            with self.assertNumQueries(1):
+                history = self.builder.build(self.conversation_thread, "Portugal?", 5)
+        self.assertEqual(counted.call_count, 3)
+        self.assertEqual(len(history), 8)
+
+    def test_unfinished_item_read_again(self):
+        """
+        This function tests that an item still being answered is added once answered.
+
+        args:
+
+        returns:
+        """
+        item = create_conversation_item(
+            self.user1, self.conversation_thread, "And Germany?", "", ORDER=4
+        )
+        PromptJob.objects.create(conversation_item=item)
+        create_conversation_item(
+            self.user1, self.conversation_thread, "Portugal?", "Lisbon", ORDER=5
+        )
+        history = self.builder.build(self.conversation_thread, "Greece?", 6)
+        self.assertEqual(len(history), 8)
+        self.assertNotIn("And Germany?", [message["content"] for message in history])
+        item.response = "Berlin"
+        item.save()
+        history = self.builder.build(self.conversation_thread, "Greece?", 6)
+        self.assertEqual(
+            [message["content"] for message in history[-4:]],
+            ["And Germany?", "Berlin", "Portugal?", "Lisbon"],
+        )
+
+    def test_failed_items_not_read_again(self):
+        """
+        This function tests that items whose job failed, or whose stream ended with
+        nothing, stop being read once a later item is answered.
+
+        args:
+
+        returns:
+        """
+        item = create_conversation_item(
+            self.user1, self.conversation_thread, "And Germany?", "", ORDER=4
+        )
+        PromptJob.objects.create(conversation_item=item, status=PromptJob.STATUS_FAILED)
+        item = create_conversation_item(
+            self.user1, self.conversation_thread, "And Greece?", "", ORDER=5
+        )
+        history = self.builder.build(self.conversation_thread, "Portugal?", 6)
+        self.assertEqual(len(history), 6)
+        with self.assertNumQueries(1):
+            self.builder.build(self.conversation_thread, "Portugal?", 6)
+        create_conversation_item(
+            self.user1, self.conversation_thread, "Portugal?", "Lisbon", ORDER=6
+        )
+        history = self.builder.build(self.conversation_thread, "Malta?", 7)
+        self.assertEqual(history[-2]["content"], "Portugal?")
+        with self.assertNumQueries(0):
+            history = self.builder.build(self.conversation_thread, "Malta?", 7)
+        self.assertEqual(len(history), 8)
+
+
+@tag("model")
+@override_settings(AIMODEL_COALESCE_REQUESTS=False)
+class SendPromptContextTest(UserSetupMixin, TestCase):
+    """
+    This class tests sending prompts with their thread's history
+
+    Attributes:
+
+    methods:
+        setUp
+        test_prompt_sent_with_earlier_turns
+        test_messages_follow_earlier_turns
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(context, "_context_builder", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        self.ai_model = create_ai_model(
+            self.user1, "context", "Context", 0.1, 0.1, "General.", "transformer"
+        )
+        self.conversation_thread = create_conversation_thread(
+            self.user1, "Capitals", "", "web", self.ai_model
+        )
+        create_conversation_item(
+            self.user1, self.conversation_thread, "Capital of France?", "Paris", ORDER=1
+        )
+        self.client.force_login(self.user1)
+
+    def test_prompt_sent_with_earlier_turns(self):
+        """
+        This function tests that the AI model is sent the thread's earlier turns.
+
+        args:
+
+        returns:
+        """
+        with patch.object(
+            TransformerBackend, "generate", return_value="Berlin"
+        ) as generate:
+            response = self.client.post(
+                reverse("send_prompt_with_id", args=[self.conversation_thread.id]),
+                {"prompt": "And Germany?"},
+                secure=True,
+            )
+        self.assertContains(response, "Berlin")
+        generate.assert_called_once_with(
+            self.ai_model,
+            "And Germany?",
+            [
+                {"role": "user", "content": "Capital of France?"},
+                {"role": "assistant", "content": "Paris"},
+            ],
+        )
+
+    def test_messages_follow_earlier_turns(self):
+        """
+        This function tests that the prompt's message follows the earlier turns.
+
+        args:
+
+        returns:
+        """
+        history = [
+            {"role": "user", "content": "Capital of France?"},
+            {"role": "assistant", "content": "Paris"},
+        ]
+        self.assertEqual(
+            self.ai_model.get_messages(" And Germany? ", history),
+            [*history, {"role": "user", "content": "And Germany?"}],
+        )
+        self.assertEqual(
+            self.ai_model._get_completion_kwargs("Hi")["messages"],
+            [{"role": "user", "content": "Hi"}],
+        )
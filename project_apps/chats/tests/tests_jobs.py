@@ -0,0 +1,402 @@
+"""This module unit tests answering queued prompts in background workers.
+
+It has the test cases:
+    QueuedSendPromptTest: This ensures prompts are queued and answered by workers, and the page polls for the response.
+    PromptWorkerTest: This ensures queued prompts are answered by the web process's threads or the worker command.
+"""
+
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import (
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    tag,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from project_apps.aimodels.backends import TransformerBackend
+from project_apps.aimodels.ratelimits import RateLimitExceededError
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from project_apps.chats import jobs
+from project_apps.chats.jobs import PromptJobQueue
+from project_apps.chats.models import ConversationItem, PromptJob
+from project_apps.chats.tests.tests_models import create_conversation_thread
+from project_apps.chats.views import aprompt_response
+from standard.tests.utils import UserSetupMixin
+
+
+class PromptJobSetupMixin(UserSetupMixin):
+    """
+    This class sets up a web conversation thread and a queue whose jobs the tests run
+
+    methods:
+        setUp
+        create_pending_item
+    """
+
+    queue_threads = 0
+
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        self.queue = PromptJobQueue(
+            threads=self.queue_threads, max_attempts=2, sweep_seconds=0
+        )
+        patcher = patch.object(jobs, "_prompt_job_queue", self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ai_model = create_ai_model(
+            self.user1, "queued", "Queued", 0.1, 0.1, "General.", "transformer"
+        )
+        self.conversation_thread = create_conversation_thread(
+            self.user1, "Capitals", "", "web", self.ai_model
+        )
+
+    def create_pending_item(self, prompt, order=1):
+        """
+        This function saves a prompt that has no response yet.
+
+        args:
+            prompt: the prompt
+            order: its ORDER in the thread
+
+        returns:
+            conversation_item: the item
+        """
+        return ConversationItem.objects.create(
+            conversation_thread=self.conversation_thread,
+            prompt=prompt,
+            response="",
+            tokens=0,
+            ORDER=order,
+            created_by=self.user1,
+        )
+
+
+@tag("model")
+@override_settings(AIMODEL_QUEUE_RESPONSES=True, AIMODEL_COALESCE_REQUESTS=False)
+class QueuedSendPromptTest(PromptJobSetupMixin, TestCase):
+    """
+    This class tests queued prompts, answered by running their jobs in the test
+
+    Attributes:
+
+    methods:
+        setUp
+        send_prompt
+        test_send_prompt_returns_before_answering
+        test_worker_response_polled
+        test_pending_response_polled_again
+        test_turned_away_job_queued_again
+        test_abandoned_job_claimed_again
+        test_job_abandoned_too_often_failed
+        test_history_error_fails_job
+        test_async_view_waits_for_response
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user1)
+
+    def send_prompt(self):
+        """
+        This function posts a prompt to the thread.
+
+        args:
+
+        returns:
+            response: the view's response
+        """
+        return self.client.post(
+            reverse("send_prompt_with_id", args=[self.conversation_thread.id]),
+            {"prompt": "Capital of France?"},
+            secure=True,
+        )
+
+    def test_send_prompt_returns_before_answering(self):
+        """
+        This function tests that the prompt is saved and queued without the AI model.
+
+        args:
+
+        returns:
+        """
+        with patch.object(TransformerBackend, "generate") as generate:
+            response = self.send_prompt()
+        generate.assert_not_called()
+        item = ConversationItem.objects.get(
+            conversation_thread=self.conversation_thread
+        )
+        self.assertEqual(item.response, "")
+        self.assertFalse(item.is_full_saved)
+        self.assertEqual(item.prompt_job.status, PromptJob.STATUS_QUEUED)
+        self.assertContains(response, reverse("prompt_response", args=[item.id]))
+
+    def test_worker_response_polled(self):
+        """
+        This function tests that a worker saves the response and the poll renders it.
+
+        args:
+
+        returns:
+        """
+        self.send_prompt()
+        job = self.queue.claim("worker-1")
+        with patch.object(TransformerBackend, "generate", return_value="Paris"):
+            self.queue.run(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PromptJob.STATUS_COMPLETED)
+        self.assertEqual((job.claimed_by, job.attempts), ("worker-1", 1))
+        item = job.conversation_item
+        item.refresh_from_db()
+        self.assertEqual(item.response, "Paris")
+        self.assertTrue(item.is_full_saved)
+        self.assertGreater(item.output_tokens, 0)
+        response = self.client.get(
+            reverse("prompt_response", args=[item.id]), secure=True
+        )
+        self.assertContains(response, "Paris")
+        self.assertNotContains(response, "hx-get")
+
+    def test_pending_response_polled_again(self):
+        """
+        This function tests that an unanswered prompt asks the page to poll again.
+
+        args:
+
+        returns:
+        """
+        self.send_prompt()
+        item = ConversationItem.objects.get(
+            conversation_thread=self.conversation_thread
+        )
+        url = reverse("prompt_response", args=[item.id])
+        response = self.client.get(url, secure=True)
+        self.assertContains(response, f'hx-get="{url}"')
+        self.client.force_login(self.user2)
+        self.assertEqual(self.client.get(url, secure=True).status_code, 404)
+
+    def test_turned_away_job_queued_again(self):
+        """
+        This function tests that a rate limited job waits, and fails after its attempts.
+
+        args:
+
+        returns:
+        """
+        self.send_prompt()
+        job = self.queue.claim()
+        error = RateLimitExceededError("queued", "requests per minute", 30)
+        with patch.object(TransformerBackend, "generate", side_effect=error):
+            with self.assertLogs("project_apps.chats.jobs", "INFO"):
+                self.queue.run(job)
+            job.refresh_from_db()
+            self.assertEqual(job.status, PromptJob.STATUS_QUEUED)
+            self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=20))
+            self.assertIsNone(self.queue.claim())
+
+            PromptJob.objects.filter(id=job.id).update(run_after=timezone.now())
+            self.queue.run(self.queue.claim())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (PromptJob.STATUS_FAILED, 2))
+        response = self.client.get(
+            reverse("prompt_response", args=[job.conversation_item_id]), secure=True
+        )
+        self.assertContains(response, "could not answer")
+
+    def test_abandoned_job_claimed_again(self):
+        """
+        This function tests that a job is taken from a worker whose lease ran out.
+
+        args:
+
+        returns:
+        """
+        self.send_prompt()
+        job = self.queue.claim("worker-1")
+        self.assertIsNone(self.queue.claim("worker-2"))
+        PromptJob.objects.filter(id=job.id).update(
+            claimed_at=timezone.now() - timedelta(seconds=301)
+        )
+        job = self.queue.claim("worker-2")
+        self.assertEqual((job.claimed_by, job.attempts), ("worker-2", 2))
+
+    def test_job_abandoned_too_often_failed(self):
+        """
+        This function tests that a job whose workers keep stopping is not taken again
+        once it has been sent max_attempts times.
+
+        args:
+
+        returns:
+        """
+        self.send_prompt()
+        for worker_id in ["worker-1", "worker-2"]:
+            job = self.queue.claim(worker_id)
+            PromptJob.objects.filter(id=job.id).update(
+                claimed_at=timezone.now() - timedelta(seconds=301)
+            )
+        with self.assertLogs("project_apps.chats.jobs", "WARNING"):
+            self.assertIsNone(self.queue.claim("worker-3"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (PromptJob.STATUS_FAILED, 2))
+        self.assertEqual(job.claimed_by, "worker-2")
+
+    def test_history_error_fails_job(self):
+        """
+        This function tests that a job whose history cannot be built fails rather
+        than staying claimed until its lease runs out.
+
+        args:
+
+        returns:
+        """
+        self.send_prompt()
+        job = self.queue.claim()
+        with patch.object(jobs, "get_context_builder") as get_context_builder:
+            get_context_builder.return_value.build.side_effect = ValueError("No cache")
+            with self.assertLogs("project_apps.chats.jobs", "ERROR"):
+                self.queue.run(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (PromptJob.STATUS_FAILED, "No cache"))
+
+    def test_async_view_waits_for_response(self):
+        """
+        This function tests that the async view holds the request until the answer.
+
+        args:
+
+        returns:
+        """
+        self.send_prompt()
+        job = self.queue.claim()
+
+        def answer():
+            with patch.object(TransformerBackend, "generate", return_value="Paris"):
+                self.queue.run(job)
+
+        async def answer_while_waiting(seconds):
+            await sync_to_async(answer)()
+
+        request = RequestFactory().get("/")
+        request.user = self.user1
+        request.auser = AsyncMock(return_value=self.user1)
+        with patch(
+            "project_apps.chats.views.asyncio.sleep", side_effect=answer_while_waiting
+        ) as sleep:
+            response = async_to_sync(aprompt_response)(
+                request, pk=job.conversation_item_id
+            )
+        sleep.assert_called_once_with(0.5)
+        self.assertContains(response, "Paris")
+        self.assertNotContains(response, "hx-get")
+
+
+@tag("model")
+@override_settings(AIMODEL_COALESCE_REQUESTS=False)
+class PromptWorkerTest(PromptJobSetupMixin, TransactionTestCase):
+    """
+    This class tests the worker threads answering queued prompts. They need the jobs
+    committed, hence TransactionTestCase.
+
+    Attributes:
+
+    methods:
+        test_web_process_answers_as_queued
+        test_woken_thread_answers_every_due_job
+        test_sweep_wakes_threads_for_due_jobs
+        test_command_answers_queued_prompts
+    """
+
+    queue_threads = 2
+
+    def test_web_process_answers_as_queued(self):
+        """
+        This function tests that the web process's threads take a job once committed.
+
+        args:
+
+        returns:
+        """
+        item = self.create_pending_item("Capital of France?")
+        with patch.object(TransformerBackend, "generate", return_value="Paris"):
+            self.queue.enqueue(item)
+            self.queue._executor.shutdown(wait=True)
+        item.refresh_from_db()
+        self.assertEqual(item.response, "Paris")
+        self.assertEqual(item.prompt_job.status, PromptJob.STATUS_COMPLETED)
+
+    def test_woken_thread_answers_every_due_job(self):
+        """
+        This function tests that one wake answers every job due, not only the first.
+
+        args:
+
+        returns:
+        """
+        for order, prompt in enumerate(["Capital of France?", "Capital of Spain?"], 1):
+            PromptJob.objects.create(
+                conversation_item=self.create_pending_item(prompt, order)
+            )
+        with patch.object(TransformerBackend, "generate", return_value="Madrid"):
+            self.queue.wake()
+            self.queue._executor.shutdown(wait=True)
+        self.assertEqual(
+            PromptJob.objects.filter(status=PromptJob.STATUS_COMPLETED).count(), 2
+        )
+
+    def test_sweep_wakes_threads_for_due_jobs(self):
+        """
+        This function tests that a sweep answers jobs queued without a wake, such as
+        those due after a restart, and schedules the next sweep.
+
+        args:
+
+        returns:
+        """
+        item = self.create_pending_item("Capital of France?")
+        PromptJob.objects.create(conversation_item=item)
+        with (
+            patch.object(TransformerBackend, "generate", return_value="Paris"),
+            patch.object(self.queue, "_schedule_sweep") as schedule_sweep,
+        ):
+            self.queue._sweep()
+            self.queue._executor.shutdown(wait=True)
+        schedule_sweep.assert_called_once_with()
+        item.refresh_from_db()
+        self.assertEqual(item.response, "Paris")
+
+    def test_command_answers_queued_prompts(self):
+        """
+        This function tests that the worker command answers the queued prompts on
+        its own threads, not the web process's queue.
+
+        args:
+
+        returns:
+        """
+        for order, prompt in enumerate(["Capital of France?", "Capital of Spain?"], 1):
+            PromptJob.objects.create(
+                conversation_item=self.create_pending_item(prompt, order)
+            )
+        output = StringIO()
+        with (
+            patch.object(TransformerBackend, "generate", return_value="Madrid"),
+            patch.object(jobs, "get_prompt_job_queue") as get_prompt_job_queue,
+        ):
+            call_command("run_prompt_worker", once=True, threads=2, stdout=output)
+        get_prompt_job_queue.assert_not_called()
+        self.assertIn("Answered 2 queued prompts", output.getvalue())
+        self.assertEqual(
+            PromptJob.objects.filter(status=PromptJob.STATUS_COMPLETED).count(), 2
+        )
+        self.assertEqual(ConversationItem.objects.filter(response="Madrid").count(), 2)
@@ -0,0 +1,301 @@
+"""This module unit tests the stage pipeline used by the NOA endpoint.
+
+It has the test cases:
+    StagePipelineTest: This ensures stages run in dependency order, overlap when independent and are timed.
+    NOAEndpointPipelineTest: This ensures the NOA endpoint runs its stages and reports their timings.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings, tag
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from project_apps.chats.api.pipeline import Stage, StagePipeline
+from standard.tests.utils import UserSetupMixin
+
+
+@tag("pipeline")
+class StagePipelineTest(SimpleTestCase):
+    """
+    This class tests the StagePipeline
+
+    Attributes:
+
+    methods:
+        setUp
+        test_independent_stages_run_concurrently
+        test_dependencies_see_earlier_results
+        test_inline_stages_run_on_calling_thread
+        test_stage_durations_recorded
+        test_unknown_dependency_rejected
+        test_circular_dependencies_rejected
+        test_stage_errors_propagate
+        test_first_listed_error_wins
+        test_arun_awaits_coroutine_stages
+        test_arun_runs_sync_stages_off_the_event_loop
+    """
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+
+    def test_independent_stages_run_concurrently(self):
+        """
+        This function tests that stages without dependencies overlap.
+
+        args:
+
+        returns:
+        """
+        pipeline = StagePipeline(
+            [
+                Stage("audio", lambda results: time.sleep(0.3)),
+                Stage("image", lambda results: time.sleep(0.3)),
+                Stage("aimodel", lambda results: time.sleep(0.3), inline=True),
+            ],
+            self.executor,
+        )
+        started = time.perf_counter()
+        pipeline.run()
+        self.assertLess(time.perf_counter() - started, 0.6)
+
+    def test_dependencies_see_earlier_results(self):
+        """
+        This function tests that a stage runs after, and receives, its dependencies' results.
+
+        args:
+
+        returns:
+        """
+        pipeline = StagePipeline(
+            [
+                Stage("reply", lambda results: f"{results['prompt']}!", ("prompt",)),
+                Stage("prompt", lambda results: f"{results['text']} world"),
+            ],
+            self.executor,
+        )
+        results = pipeline.run({"text": "hello"})
+        self.assertEqual(results["reply"], "hello world!")
+
+    def test_inline_stages_run_on_calling_thread(self):
+        """
+        This function tests that inline stages stay on the calling thread.
+
+        args:
+
+        returns:
+        """
+        pipeline = StagePipeline(
+            [
+                Stage("inline", lambda results: threading.get_ident(), inline=True),
+                Stage("pooled", lambda results: threading.get_ident()),
+            ],
+            self.executor,
+        )
+        results = pipeline.run()
+        self.assertEqual(results["inline"], threading.get_ident())
+        self.assertNotEqual(results["pooled"], threading.get_ident())
+
+    def test_stage_durations_recorded(self):
+        """
+        This function tests that each stage and the total are timed.
+
+        args:
+
+        returns:
+        """
+        pipeline = StagePipeline(
+            [Stage("audio", lambda results: time.sleep(0.05))], self.executor
+        )
+        pipeline.run()
+        self.assertGreaterEqual(pipeline.timings["audio"], 0.05)
+        self.assertGreaterEqual(pipeline.timings["total"], pipeline.timings["audio"])
+        self.assertRegex(pipeline.format_timings(), r"^Total: \d+\.\d\ds, audio: ")
+
+    def test_unknown_dependency_rejected(self):
+        """
+        This function tests that depending on a missing stage is an error.
+
+        args:
+
+        returns:
+        """
+        with self.assertRaises(ValueError):
+            StagePipeline([Stage("a", lambda results: 1, ("missing",))], self.executor)
+
+    def test_circular_dependencies_rejected(self):
+        """
+        This function tests that a dependency cycle is an error rather than a hang.
+
+        args:
+
+        returns:
+        """
+        pipeline = StagePipeline(
+            [
+                Stage("a", lambda results: 1, ("b",)),
+                Stage("b", lambda results: 2, ("a",)),
+            ],
+            self.executor,
+        )
+        with self.assertRaises(ValueError):
+            pipeline.run()
+
+    def test_stage_errors_propagate(self):
+        """
+        This function tests that an exception in a pooled stage reaches the caller.
+
+        args:
+
+        returns:
+        """
+
+        def fail(results):
+            raise RuntimeError("transcription failed")
+
+        pipeline = StagePipeline([Stage("audio", fail)], self.executor)
+        with self.assertRaisesMessage(RuntimeError, "transcription failed"):
+            pipeline.run()
+
+    def test_first_listed_error_wins(self):
+        """
+        This function tests that the first listed stage's error is raised when several fail.
+
+        args:
+
+        returns:
+        """
+
+        def fail_slowly(results):
+            time.sleep(0.1)
+            raise RuntimeError("queue full")
+
+        def fail(results):
+            raise LookupError("no model")
+
+        pipeline = StagePipeline(
+            [Stage("audio", fail_slowly), Stage("aimodel", fail, inline=True)],
+            self.executor,
+        )
+        with self.assertRaisesMessage(RuntimeError, "queue full"):
+            pipeline.run()
+
+    def test_arun_awaits_coroutine_stages(self):
+        """
+        This function tests that arun awaits coroutine stages alongside sync ones.
+
+        args:
+
+        returns:
+        """
+
+        async def generate(results):
+            await asyncio.sleep(0.01)
+            return f"answer to {results['prompt']}"
+
+        pipeline = StagePipeline(
+            [
+                Stage("prompt", lambda results: "hello", inline=True),
+                Stage("generate", generate, depends_on=("prompt",)),
+            ],
+            self.executor,
+        )
+        results = async_to_sync(pipeline.arun)()
+        self.assertEqual(results["generate"], "answer to hello")
+        self.assertIn("generate", pipeline.timings)
+
+    def test_arun_runs_sync_stages_off_the_event_loop(self):
+        """
+        This function tests that arun runs sync stages in threads, not on the loop's thread.
+
+        args:
+
+        returns:
+        """
+        loop_threads = []
+
+        async def record_loop_thread(results):
+            loop_threads.append(threading.get_ident())
+
+        pipeline = StagePipeline(
+            [
+                Stage("loop", record_loop_thread),
+                Stage("pool", lambda results: threading.get_ident()),
+                Stage("inline", lambda results: threading.get_ident(), inline=True),
+            ],
+            self.executor,
+        )
+        results = async_to_sync(pipeline.arun)()
+        self.assertNotEqual(results["pool"], loop_threads[0])
+        self.assertNotEqual(results["inline"], loop_threads[0])
+
+
+@tag("pipeline")
+@override_settings(SECURE_SSL_REDIRECT=False)
+class NOAEndpointPipelineTest(UserSetupMixin, APITestCase):
+    """
+    This class tests the NOA endpoint's stage pipeline end to end
+
+    Attributes:
+
+    methods:
+        setUp
+        test_response_includes_stage_timings
+    """
+
+    def setUp(self):
+        super().setUp()
+        create_ai_model(
+            self.user1,
+            "openai/gpt-oss-20b:free",
+            "Open-weight model",
+            0.0,
+            0.0,
+            "Edge devices and focused tasks.",
+        )
+
+    def test_response_includes_stage_timings(self):
+        """
+        This function tests that a text prompt is answered with every stage timed.
+
+        args:
+
+        returns:
+        """
+        aimodel_response = MagicMock()
+        aimodel_response.choices[0].message.content = "Paris"
+        with patch(
+            "project_apps.aimodels.models.AIModel.get_aimodel_response",
+            return_value=aimodel_response,
+        ):
+            response = self.client.post(
+                reverse("noa-mm-endpoint"),
+                {
+                    "prompt": "What's the capital of France?",
+                    "location": "Liverpool, United Kingdom",
+                    "time": "2025-07-02 11:29:48.054846",
+                },
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["message"], "Paris")
+        for stage in (
+            "Total",
+            "validate",
+            "transcribe_audio",
+            "process_image",
+            "load_aimodels",
+            "get_aimodel",
+            "build_prompt",
+            "generate_response",
+            "save_conversation",
+        ):
+            self.assertIn(f"{stage}: ", response.data["timings"])
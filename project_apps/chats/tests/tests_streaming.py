@@ -0,0 +1,393 @@
+"""This module unit tests streaming chat responses to the web UI.
+
+It has the test cases:
+    StreamingSendPromptTest: This ensures prompts are saved pending and the page is pointed at the response stream.
+    StreamResponseTest: This ensures responses are streamed as events, saved when the stream completes or is dropped, and errors shown.
+    AsyncStreamResponseTest: This ensures the async stream view streams and saves responses in the same way.
+"""
+
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, TestCase, override_settings, tag
+from django.urls import reverse
+
+from project_apps.aimodels.circuits import CircuitOpenError
+from project_apps.aimodels.ratelimits import RateLimitExceededError
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from project_apps.chats.models import ConversationItem, ConversationThread
+from project_apps.chats.views import astream_response
+from standard.tests.utils import UserSetupMixin
+
+
+class StreamingSetupMixin(UserSetupMixin):
+    """
+    This class sets up a web conversation thread and a prompt waiting for its response
+
+    methods:
+        setUp
+        read_events
+    """
+
+    def setUp(self):
+        super().setUp()
+        aimodel = create_ai_model(
+            self.user1,
+            "openai/gpt-oss-20b:free",
+            "Open-weight model",
+            0.0,
+            0.0,
+            "Edge devices and focused tasks.",
+        )
+        self.conversation_thread = ConversationThread.objects.create(
+            name="Capitals",
+            aimodel=aimodel,
+            chat_type="web",
+            created_by=self.user1,
+        )
+        self.conversation_item = ConversationItem.objects.create(
+            conversation_thread=self.conversation_thread,
+            prompt="What's the capital of France?",
+            response="",
+            tokens=5,
+            ORDER=1,
+            created_by=self.user1,
+        )
+
+    def read_events(self, chunks):
+        """
+        This function splits streamed chunks into (event, data) pairs.
+
+        args:
+            chunks: the response's streamed content
+
+        returns:
+            events: the events in order
+        """
+        text = "".join(
+            chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in chunks
+        )
+        events = []
+        for block in filter(None, text.split("\n\n")):
+            event_line, data_line = block.split("\n")
+            events.append(
+                (event_line.removeprefix("event: "), data_line.removeprefix("data: "))
+            )
+        return events
+
+
+@tag("streaming")
+@override_settings(AIMODEL_STREAM_RESPONSES=True)
+class StreamingSendPromptTest(StreamingSetupMixin, TestCase):
+    """
+    This class tests send_prompt in streaming mode
+
+    Attributes:
+
+    methods:
+        test_prompt_saved_pending_and_stream_connected
+    """
+
+    def test_prompt_saved_pending_and_stream_connected(self):
+        """
+        This function tests that the prompt is saved without waiting for the model.
+
+        args:
+
+        returns:
+        """
+        self.client.force_login(self.user1)
+        with patch(
+            "project_apps.aimodels.models.AIModel.get_aimodel_response"
+        ) as get_aimodel_response:
+            response = self.client.post(
+                reverse("send_prompt_with_id", args=[self.conversation_thread.id]),
+                {"prompt": "And of Spain?"},
+                secure=True,
+            )
+        get_aimodel_response.assert_not_called()
+        item = ConversationItem.objects.get(prompt="And of Spain?")
+        self.assertEqual(item.response, "")
+        self.assertFalse(item.is_full_saved)
+        self.assertContains(
+            response, f'sse-connect="{reverse("stream_response", args=[item.id])}"'
+        )
+
+
+@tag("streaming")
+class StreamResponseTest(StreamingSetupMixin, TestCase):
+    """
+    This class tests streaming a response as server-sent events
+
+    Attributes:
+
+    methods:
+        setUp
+        test_tokens_streamed_then_response_saved
+        test_disconnect_saves_partial_response
+        test_generated_response_replayed_not_regenerated
+        test_cached_response_sent_and_flagged
+        test_failure_sends_error_event
+        test_unavailable_sends_retry_delay
+        test_other_users_items_not_streamed
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user1)
+        self.url = reverse("stream_response", args=[self.conversation_item.id])
+
+    def test_tokens_streamed_then_response_saved(self):
+        """
+        This function tests that each piece is sent as an event and the whole is saved.
+
+        args:
+
+        returns:
+        """
+        with patch(
+            "project_apps.aimodels.models.AIModel.stream_aimodel_response",
+            return_value=iter(["Paris", " is <b>it</b>\n"]),
+        ):
+            response = self.client.get(self.url, secure=True)
+            events = self.read_events(response.streaming_content)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(
+            events,
+            [
+                ("token", "Paris"),
+                ("token", " is &lt;b&gt;it&lt;/b&gt;<br>"),
+                ("done", ""),
+            ],
+        )
+        self.conversation_item.refresh_from_db()
+        self.assertEqual(self.conversation_item.response, "Paris is <b>it</b>\n")
+        self.assertTrue(self.conversation_item.is_full_saved)
+
+    def test_disconnect_saves_partial_response(self):
+        """
+        This function tests that closing the stream early saves the response so far.
+
+        args:
+
+        returns:
+        """
+        with patch(
+            "project_apps.aimodels.models.AIModel.stream_aimodel_response",
+            return_value=iter(["Paris", " is", " the capital."]),
+        ):
+            response = self.client.get(self.url, secure=True)
+            next(iter(response.streaming_content))
+            response.close()
+        self.conversation_item.refresh_from_db()
+        self.assertEqual(self.conversation_item.response, "Paris")
+        self.assertFalse(self.conversation_item.is_full_saved)
+
+    def test_generated_response_replayed_not_regenerated(self):
+        """
+        This function tests that a reconnecting page gets the saved response again.
+
+        args:
+
+        returns:
+        """
+        self.conversation_item.response = "Paris"
+        self.conversation_item.is_full_saved = True
+        self.conversation_item.save()
+        with patch(
+            "project_apps.aimodels.models.AIModel.stream_aimodel_response"
+        ) as stream_aimodel_response:
+            response = self.client.get(self.url, secure=True)
+            events = self.read_events(response.streaming_content)
+        stream_aimodel_response.assert_not_called()
+        self.assertEqual(events, [("token", "Paris"), ("done", "")])
+
+    def test_cached_response_sent_and_flagged(self):
+        """
+        This function tests that a cached response is sent whole and saved as cached.
+
+        args:
+
+        returns:
+        """
+        with (
+            patch(
+                "project_apps.aimodels.models.AIModel.get_cached_response",
+                return_value="Paris",
+            ),
+            patch(
+                "project_apps.aimodels.models.AIModel.stream_aimodel_response"
+            ) as stream_aimodel_response,
+        ):
+            response = self.client.get(self.url, secure=True)
+            events = self.read_events(response.streaming_content)
+        stream_aimodel_response.assert_not_called()
+        self.assertEqual(events, [("token", "Paris"), ("done", "")])
+        self.conversation_item.refresh_from_db()
+        self.assertEqual(self.conversation_item.response, "Paris")
+        self.assertTrue(self.conversation_item.is_full_saved)
+        self.assertTrue(self.conversation_item.is_cached)
+
+    def test_failure_sends_error_event(self):
+        """
+        This function tests that a provider failure mid-stream is shown to the user.
+
+        args:
+
+        returns:
+        """
+
+        def stream(prompt, history=None):
+            yield "Paris"
+            raise ConnectionError("reset")
+
+        with (
+            patch(
+                "project_apps.aimodels.models.AIModel.stream_aimodel_response",
+                side_effect=stream,
+            ),
+            self.assertLogs("project_apps.chats.views", "ERROR"),
+        ):
+            response = self.client.get(self.url, secure=True)
+            events = self.read_events(response.streaming_content)
+        self.assertEqual(
+            events,
+            [
+                ("token", "Paris"),
+                (
+                    "error",
+                    "The AI model could not answer. Please send the prompt again.",
+                ),
+                ("done", ""),
+            ],
+        )
+        self.conversation_item.refresh_from_db()
+        self.assertEqual(self.conversation_item.response, "Paris")
+        self.assertFalse(self.conversation_item.is_full_saved)
+
+    def test_unavailable_sends_retry_delay(self):
+        """
+        This function tests that an open circuit or a rate limit tells the user when to
+        try again.
+
+        args:
+
+        returns:
+        """
+        for error in (
+            CircuitOpenError("openai_api:", 30),
+            RateLimitExceededError("openai/gpt-oss-20b:free", "concurrency", 30),
+        ):
+            with (
+                patch(
+                    "project_apps.aimodels.models.AIModel.stream_aimodel_response",
+                    side_effect=error,
+                ),
+                self.assertLogs("project_apps.chats.views", "ERROR"),
+            ):
+                response = self.client.get(self.url, secure=True)
+                events = self.read_events(response.streaming_content)
+            self.assertEqual(
+                events,
+                [
+                    (
+                        "error",
+                        "The AI model is unavailable. Please try again in 30 seconds.",
+                    ),
+                    ("done", ""),
+                ],
+            )
+
+    def test_other_users_items_not_streamed(self):
+        """
+        This function tests that a user cannot stream another user's response.
+
+        args:
+
+        returns:
+        """
+        self.client.force_login(self.user2)
+        response = self.client.get(self.url, secure=True)
+        self.assertEqual(response.status_code, 404)
+
+
+@tag("streaming")
+class AsyncStreamResponseTest(StreamingSetupMixin, TestCase):
+    """
+    This class tests the async stream view
+
+    Attributes:
+
+    methods:
+        test_tokens_streamed_then_response_saved
+        test_unavailable_sends_retry_delay
+    """
+
+    def test_tokens_streamed_then_response_saved(self):
+        """
+        This function tests that the async view streams each piece and saves the whole.
+
+        args:
+
+        returns:
+        """
+
+        async def stream(aimodel, prompt, history=None):
+            for piece in ("Paris", "!"):
+                yield piece
+
+        async def read_stream():
+            request = RequestFactory().get("/")
+            request.user = self.user1
+            request.auser = AsyncMock(return_value=self.user1)
+            response = await astream_response(request, pk=self.conversation_item.id)
+            return [chunk async for chunk in response.streaming_content]
+
+        with patch(
+            "project_apps.aimodels.models.AIModel.astream_aimodel_response",
+            new=stream,
+        ):
+            events = self.read_events(async_to_sync(read_stream)())
+        self.assertEqual(events, [("token", "Paris"), ("token", "!"), ("done", "")])
+        self.conversation_item.refresh_from_db()
+        self.assertEqual(self.conversation_item.response, "Paris!")
+        self.assertTrue(self.conversation_item.is_full_saved)
+
+    def test_unavailable_sends_retry_delay(self):
+        """
+        This function tests that the async view tells the user when to try again.
+
+        args:
+
+        returns:
+        """
+
+        async def stream(aimodel, prompt, history=None):
+            raise CircuitOpenError("openai_api:", 30)
+            yield
+
+        async def read_stream():
+            request = RequestFactory().get("/")
+            request.user = self.user1
+            request.auser = AsyncMock(return_value=self.user1)
+            response = await astream_response(request, pk=self.conversation_item.id)
+            return [chunk async for chunk in response.streaming_content]
+
+        with (
+            patch(
+                "project_apps.aimodels.models.AIModel.astream_aimodel_response",
+                new=stream,
+            ),
+            self.assertLogs("project_apps.chats.views", "ERROR"),
+        ):
+            events = self.read_events(async_to_sync(read_stream)())
+        self.assertEqual(
+            events,
+            [
+                (
+                    "error",
+                    "The AI model is unavailable. Please try again in 30 seconds.",
+                ),
+                ("done", ""),
+            ],
+        )
@@ -0,0 +1,189 @@
+"""This module unit tests folding a thread's older turns into its summary.
+
+It has the test cases:
+    ConversationSummarizerTest: This ensures older turns are folded in from the previous summary, in the background.
+"""
+
+import threading
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase, tag
+
+from project_apps.aimodels.backends import TransformerBackend
+from project_apps.aimodels.tests.tests_models import create_ai_model
+from project_apps.chats.context import ConversationContextBuilder
+from project_apps.chats.models import ConversationThread
+from project_apps.chats.summaries import ConversationSummarizer
+from project_apps.chats.tests.tests_models import (
+    create_conversation_item,
+    create_conversation_thread,
+)
+from standard.tests.utils import UserSetupMixin
+
+
+@tag("model")
+class ConversationSummarizerTest(UserSetupMixin, TestCase):
+    """
+    This class tests the conversation summarizer
+
+    Attributes:
+
+    methods:
+        setUp
+        summarize_turns
+        test_oldest_turns_folded_from_previous_summary
+        test_due_once_enough_turns_after_summary
+        test_scheduled_once_in_background
+        test_summary_moved_on_elsewhere_not_overwritten
+        test_summary_sent_with_turns_after_it
+    """
+
+    def setUp(self):
+        super().setUp()
+        caches["default"].clear()
+        self.addCleanup(caches["default"].clear)
+        self.ai_model = create_ai_model(
+            self.user1, "summary", "Summary", 0.1, 0.1, "General.", "transformer"
+        )
+        self.conversation_thread = create_conversation_thread(
+            self.user1, "Numbers", "", "web", self.ai_model
+        )
+        for order in range(1, 7):
+            create_conversation_item(
+                self.user1,
+                self.conversation_thread,
+                f"Question {order}?",
+                f"Answer {order}",
+                ORDER=order,
+            )
+        self.summarizer = ConversationSummarizer(keep_turns=2, fold_turns=2)
+        self.prompts = []
+
+    def summarize_turns(self, aimodel, prompt, history=None):
+        """
+        This function stands in for the AI model, numbering its summaries.
+
+        args:
+            aimodel: the AI model asked
+            prompt: the summary prompt
+            history: the earlier turns
+
+        returns:
+            text: the summary
+        """
+        self.prompts.append(prompt)
+        return f"Summary {len(self.prompts)}"
+
+    def test_oldest_turns_folded_from_previous_summary(self):
+        """
+        This function tests that each update is sent only the summary and new turns.
+
+        args:
+
+        returns:
+        """
+        with patch.object(
+            TransformerBackend, "generate", side_effect=self.summarize_turns
+        ):
+            with self.assertLogs("project_apps.chats.summaries", "INFO"):
+                folded = self.summarizer.summarize(self.conversation_thread.id)
+        self.assertEqual(folded, 4)
+        self.conversation_thread.refresh_from_db()
+        self.assertEqual(self.conversation_thread.summary, "Summary 2")
+        self.assertEqual(self.conversation_thread.summarized_order, 4)
+        self.assertIn("Question 2?\nAssistant: Answer 2", self.prompts[0])
+        self.assertNotIn("Question 3?", self.prompts[0])
+        self.assertIn("Summary so far:\nSummary 1", self.prompts[1])
+        self.assertIn("Question 3?", self.prompts[1])
+        self.assertNotIn("Question 1?", self.prompts[1])
+        self.assertNotIn("Question 5?", self.prompts[1])
+
+    def test_due_once_enough_turns_after_summary(self):
+        """
+        This function tests that a thread is due once enough turns are unsummarised.
+
+        args:
+
+        returns:
+        """
+        self.assertFalse(self.summarizer.is_due(self.conversation_thread, 3))
+        self.assertTrue(self.summarizer.is_due(self.conversation_thread, 4))
+        self.conversation_thread.summarized_order = 2
+        self.assertFalse(self.summarizer.is_due(self.conversation_thread, 5))
+        self.assertIsNone(self.summarizer.schedule(self.conversation_thread, 5))
+        self.summarizer.fold_turns = 0
+        self.assertFalse(self.summarizer.is_due(self.conversation_thread, 100))
+
+    def test_scheduled_once_in_background(self):
+        """
+        This function tests that a thread is not queued again while it is summarised.
+
+        args:
+
+        returns:
+        """
+        release = threading.Event()
+        self.addCleanup(release.set)
+        with patch.object(
+            self.summarizer, "summarize", side_effect=lambda thread_id: release.wait(5)
+        ) as summarize:
+            first = self.summarizer.schedule(self.conversation_thread, 6)
+            self.assertIsNone(self.summarizer.schedule(self.conversation_thread, 6))
+            release.set()
+            first.result(5)
+            second = self.summarizer.schedule(self.conversation_thread, 6)
+            second.result(5)
+        summarize.assert_called_with(str(self.conversation_thread.id))
+        self.assertEqual(summarize.call_count, 2)
+
+    def test_summary_moved_on_elsewhere_not_overwritten(self):
+        """
+        This function tests that a summary is not saved over one saved meanwhile.
+
+        args:
+
+        returns:
+        """
+
+        def summarize_elsewhere_first(aimodel, prompt, history=None):
+            ConversationThread.objects.filter(id=self.conversation_thread.id).update(
+                summary="Elsewhere", summarized_order=2
+            )
+            return "Here"
+
+        with patch.object(
+            TransformerBackend, "generate", side_effect=summarize_elsewhere_first
+        ):
+            folded = self.summarizer.summarize(self.conversation_thread.id)
+        self.assertEqual(folded, 0)
+        self.conversation_thread.refresh_from_db()
+        self.assertEqual(self.conversation_thread.summary, "Elsewhere")
+
+    def test_summary_sent_with_turns_after_it(self):
+        """
+        This function tests that the context is the summary and the turns after it.
+
+        args:
+
+        returns:
+        """
+        self.conversation_thread.summary = "Questions 1 to 4 were answered."
+        self.conversation_thread.summarized_order = 4
+        history = ConversationContextBuilder(reply_tokens=0).build(
+            self.conversation_thread, "Question 7?", 7
+        )
+        self.assertEqual(
+            history,
+            [
+                {
+                    "role": "system",
+                    "content": "Summary of the conversation so far: "
+                    "Questions 1 to 4 were answered.",
+                },
+                {"role": "user", "content": "Question 5?"},
+                {"role": "assistant", "content": "Answer 5"},
+                {"role": "user", "content": "Question 6?"},
+                {"role": "assistant", "content": "Answer 6"},
+            ],
+        )
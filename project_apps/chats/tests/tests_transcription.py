@@ -0,0 +1,608 @@
+"""This module unit tests the speech-to-text support for the NOA endpoint.
+
+It has the test cases:
+    WhisperModelRegistryTest: This ensures Whisper models are loaded once per process and reused.
+    QuantizedWhisperModelTest: This ensures "-int8" model names load a quantized CPU model.
+    WordErrorRateTest: This ensures transcriptions are scored against references as the benchmark expects.
+    TranscriptionWorkerPoolTest: This ensures the transcription pool bounds its queue and reports its load.
+    TranscribeAudioSegmentsTest: This ensures speech chunks are transcribed and joined in order.
+    TranscriptionCacheTest: This ensures transcriptions are cached by content with LRU and TTL eviction.
+    NOAEndpointBackpressureTest: This ensures the NOA endpoint fails fast when the pool is full.
+    NOAEndpointTranscriptionCacheTest: This ensures retried uploads are not transcribed twice.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import torch
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings, tag
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from project_apps.chats.api.transcription import (
+    TranscriptionCache,
+    TranscriptionQueueFullError,
+    TranscriptionWorkerPool,
+    WhisperModelRegistry,
+    _transcribe_in_process,
+    parse_model_name,
+    quantize_model,
+    transcribe_audio_segments,
+    word_error_rate,
+)
+
+
+def create_fake_whisper_model(parameter_bytes=1024):
+    """
+    This is a helper function that creates a stand-in for a loaded Whisper model
+
+    args:
+        parameter_bytes: the number of bytes held by the model's single parameter
+
+    returns:
+        model: a mock with parameters() and buffers() like a torch module
+    """
+    parameter = MagicMock()
+    parameter.numel.return_value = parameter_bytes // 4
+    parameter.element_size.return_value = 4
+    model = MagicMock()
+    model.parameters.return_value = [parameter]
+    model.buffers.return_value = []
+    return model
+
+
+@tag("transcription")
+class WhisperModelRegistryTest(SimpleTestCase):
+    """
+    This class tests the process-wide Whisper model registry
+
+    Attributes:
+
+    methods:
+        setUp
+        test_model_loaded_once_and_reused
+        test_each_size_loaded_separately
+        test_warm_up_loads_models
+        test_memory_usage_and_status
+        test_clear_drops_models
+        test_shared_model_transcribes_one_clip_at_a_time
+    """
+
+    def setUp(self):
+        self.registry = WhisperModelRegistry()
+        patcher = patch(
+            "project_apps.chats.api.transcription.whisper.load_model",
+            side_effect=lambda size: create_fake_whisper_model(),
+        )
+        self.load_model = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_model_loaded_once_and_reused(self):
+        """
+        This function tests that repeated requests for a size share one loaded model.
+
+        args:
+
+        returns:
+        """
+        self.assertFalse(self.registry.is_warm("small"))
+        first = self.registry.get_model("small")
+        second = self.registry.get_model("small")
+        self.assertIs(first, second)
+        self.assertTrue(self.registry.is_warm("small"))
+        self.load_model.assert_called_once_with("small")
+
+    def test_each_size_loaded_separately(self):
+        """
+        This function tests that different sizes are held as different models.
+
+        args:
+
+        returns:
+        """
+        tiny = self.registry.get_model("tiny")
+        small = self.registry.get_model("small")
+        self.assertIsNot(tiny, small)
+        self.assertEqual(self.load_model.call_count, 2)
+
+    def test_warm_up_loads_models(self):
+        """
+        This function tests that warm_up eagerly loads every listed size.
+
+        args:
+
+        returns:
+        """
+        self.registry.warm_up(["tiny", "base"])
+        self.assertTrue(self.registry.is_warm("tiny"))
+        self.assertTrue(self.registry.is_warm("base"))
+        self.assertFalse(self.registry.is_warm("small"))
+
+    def test_memory_usage_and_status(self):
+        """
+        This function tests that memory use and status are reported for loaded models.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(self.registry.memory_usage("small"), 0)
+        self.registry.get_model("small")
+        self.assertEqual(self.registry.memory_usage("small"), 1024)
+        status = self.registry.status()
+        self.assertEqual(list(status), ["small"])
+        self.assertTrue(status["small"]["warm"])
+        self.assertEqual(status["small"]["memory_bytes"], 1024)
+
+    def test_clear_drops_models(self):
+        """
+        This function tests that clear empties the registry.
+
+        args:
+
+        returns:
+        """
+        self.registry.get_model("small")
+        self.registry.clear()
+        self.assertFalse(self.registry.is_warm("small"))
+        self.assertEqual(self.registry.status(), {})
+
+    def test_shared_model_transcribes_one_clip_at_a_time(self):
+        """
+        This function tests that threads sharing a model never transcribe at once.
+
+        args:
+
+        returns:
+        """
+        in_flight = []
+        most_in_flight = []
+        lock = threading.Lock()
+
+        def transcribe(audio):
+            with lock:
+                in_flight.append(audio)
+                most_in_flight.append(len(in_flight))
+            time.sleep(0.02)
+            with lock:
+                in_flight.remove(audio)
+            return {"text": f" clip {audio} "}
+
+        self.registry.get_model("small").transcribe.side_effect = transcribe
+        with patch(
+            "project_apps.chats.api.transcription.whisper_model_registry",
+            self.registry,
+        ):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                texts = list(
+                    executor.map(
+                        lambda audio: _transcribe_in_process("small", audio), range(4)
+                    )
+                )
+        self.assertEqual(texts, ["clip 0", "clip 1", "clip 2", "clip 3"])
+        self.assertEqual(max(most_in_flight), 1)
+
+
+@tag("transcription")
+class QuantizedWhisperModelTest(SimpleTestCase):
+    """
+    This class tests loading Whisper models dynamically quantized to int8
+
+    Attributes:
+
+    methods:
+        test_model_name_parsed
+        test_registry_quantizes_int8_names
+        test_linear_layers_quantized
+    """
+
+    def test_model_name_parsed(self):
+        """
+        This function tests that the "-int8" suffix is split from the Whisper size.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(parse_model_name("small"), ("small", False))
+        self.assertEqual(parse_model_name("base-int8"), ("base", True))
+
+    def test_registry_quantizes_int8_names(self):
+        """
+        This function tests that an "-int8" name loads the size on the CPU and quantizes it.
+
+        args:
+
+        returns:
+        """
+        registry = WhisperModelRegistry()
+        quantized = create_fake_whisper_model()
+        with patch(
+            "project_apps.chats.api.transcription.whisper.load_model"
+        ) as load_model, patch(
+            "project_apps.chats.api.transcription.quantize_model",
+            return_value=quantized,
+        ) as quantize:
+            self.assertIs(registry.get_model("tiny-int8"), quantized)
+        load_model.assert_called_once_with("tiny", device="cpu")
+        quantize.assert_called_once_with(load_model.return_value)
+        self.assertTrue(registry.is_warm("tiny-int8"))
+        self.assertFalse(registry.is_warm("tiny"))
+
+    def test_linear_layers_quantized(self):
+        """
+        This function tests that Whisper-style linear layers get int8 weights.
+
+        args:
+
+        returns:
+        """
+
+        class CastingLinear(torch.nn.Linear):
+            def forward(self, x):
+                return super().forward(x)
+
+        model = quantize_model(torch.nn.Sequential(CastingLinear(8, 8), torch.nn.ReLU()))
+        self.assertIsInstance(model[0], torch.ao.nn.quantized.dynamic.Linear)
+        self.assertEqual(model(torch.ones(2, 8)).shape, (2, 8))
+
+
+@tag("transcription")
+class WordErrorRateTest(SimpleTestCase):
+    """
+    This class tests scoring transcriptions for the model benchmark
+
+    Attributes:
+
+    methods:
+        test_normalised_match_scores_zero
+        test_substitutions_deletions_and_insertions_counted
+    """
+
+    def test_normalised_match_scores_zero(self):
+        """
+        This function tests that case, punctuation and contractions are not errors.
+
+        args:
+
+        returns:
+        """
+        self.assertEqual(
+            word_error_rate("What's the capital of France?", "what is the capital of france"),
+            0.0,
+        )
+
+    def test_substitutions_deletions_and_insertions_counted(self):
+        """
+        This function tests that each kind of word error counts against the reference.
+
+        args:
+
+        returns:
+        """
+        self.assertAlmostEqual(
+            word_error_rate("the cat sat on the mat", "the bat sat on mat today"), 0.5
+        )
+
+
+@tag("transcription")
+class TranscriptionWorkerPoolTest(SimpleTestCase):
+    """
+    This class tests the bounded transcription worker pool
+
+    Attributes:
+
+    methods:
+        setUp
+        test_jobs_beyond_capacity_are_rejected
+        test_stats_report_completed_jobs_and_wait_times
+    """
+
+    def setUp(self):
+        self.pool = TranscriptionWorkerPool(workers=1, queue_size=1, retry_after=7)
+        self.addCleanup(self.pool.shutdown)
+
+    def test_jobs_beyond_capacity_are_rejected(self):
+        """
+        This function tests that a job is rejected once every worker and queue slot is used.
+
+        args:
+
+        returns:
+        """
+        running = self.pool.submit(time.sleep, 1)
+        queued = self.pool.submit(time.sleep, 0)
+        with self.assertRaises(TranscriptionQueueFullError) as raised:
+            self.pool.submit(time.sleep, 0)
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(raised.exception.retry_after, 7)
+        self.assertEqual(self.pool.stats()["in_flight"], 2)
+        self.assertEqual(self.pool.stats()["queue_depth"], 1)
+        self.assertEqual(self.pool.free_slots(), 0)
+        running.result(timeout=60)
+        queued.result(timeout=60)
+
+    def test_stats_report_completed_jobs_and_wait_times(self):
+        """
+        This function tests that finished jobs free their slots and record their wait.
+
+        args:
+
+        returns:
+        """
+        futures = [self.pool.submit(abs, -1), self.pool.submit(abs, -2)]
+        results = [future.result(timeout=60)[1] for future in futures]
+        self.assertEqual(results, [1, 2])
+        stats = self.pool.stats()
+        self.assertEqual(stats["completed"], 2)
+        self.assertEqual(stats["in_flight"], 0)
+        self.assertEqual(stats["rejected"], 0)
+        self.assertGreaterEqual(stats["wait_seconds_max"], 0.0)
+
+
+@tag("transcription")
+@override_settings(NOA_TRANSCRIPTION_WORKERS=0)
+class TranscribeAudioSegmentsTest(SimpleTestCase):
+    """
+    This class tests transcribing the speech chunks of one recording
+
+    Attributes:
+
+    methods:
+        create_pool
+        test_segments_joined_in_order
+        test_chunks_beyond_capacity_merged_into_jobs
+        test_submitted_chunks_cancelled_when_pool_fills
+    """
+
+    def create_pool(self, free_slots, submit):
+        """
+        This function creates a stand-in for a two worker transcription pool.
+
+        args:
+            free_slots: the jobs the pool can accept
+            submit: the side effect of submitting a job
+
+        returns:
+            pool: a mock with the pool's interface
+        """
+        pool = MagicMock(spec=TranscriptionWorkerPool, workers=2, timeout=None)
+        pool.free_slots.return_value = free_slots
+        pool.submit.side_effect = submit
+        return pool
+
+    def test_segments_joined_in_order(self):
+        """
+        This function tests that chunk transcriptions are joined in recording order.
+
+        args:
+
+        returns:
+        """
+        with patch(
+            "project_apps.chats.api.transcription._transcribe_in_process",
+            side_effect=lambda size, audio: audio,
+        ):
+            text = transcribe_audio_segments("small", ["What's", "", "the capital?"])
+        self.assertEqual(text, "What's the capital?")
+
+
+    def test_chunks_beyond_capacity_merged_into_jobs(self):
+        """
+        This function tests that more chunks than the pool holds are merged into jobs.
+
+        args:
+
+        returns:
+        """
+
+        def submit(func, size, audio):
+            future = Future()
+            future.set_result((0.0, f"{len(audio)} samples"))
+            return future
+
+        pool = self.create_pool(10, submit)
+        segments = [np.full(5, index, dtype=np.float32) for index in range(12)]
+        with patch(
+            "project_apps.chats.api.transcription.get_transcription_pool",
+            return_value=pool,
+        ):
+            text = transcribe_audio_segments("small", segments)
+        self.assertEqual(text, "30 samples 30 samples")
+        self.assertEqual(pool.submit.call_count, 2)
+        first_job = pool.submit.call_args_list[0].args[2]
+        np.testing.assert_array_equal(first_job, np.repeat(np.arange(6), 5))
+
+    def test_submitted_chunks_cancelled_when_pool_fills(self):
+        """
+        This function tests that queued chunks are cancelled if a later one is rejected.
+
+        args:
+
+        returns:
+        """
+        waiting = Future()
+        pool = self.create_pool(2, [waiting, TranscriptionQueueFullError(5)])
+        segments = [np.zeros(5, dtype=np.float32) for _ in range(3)]
+        with patch(
+            "project_apps.chats.api.transcription.get_transcription_pool",
+            return_value=pool,
+        ):
+            with self.assertRaises(TranscriptionQueueFullError):
+                transcribe_audio_segments("small", segments)
+        self.assertTrue(waiting.cancelled())
+
+
+@tag("transcription")
+class TranscriptionCacheTest(SimpleTestCase):
+    """
+    This class tests the content-hash transcription cache
+
+    Attributes:
+
+    methods:
+        setUp
+        test_key_depends_on_content_and_model_size
+        test_hits_and_misses_counted
+        test_least_recently_used_evicted
+        test_entries_expire_after_ttl
+    """
+
+    def setUp(self):
+        self.cache = TranscriptionCache(max_entries=2, ttl_seconds=60)
+
+    def test_key_depends_on_content_and_model_size(self):
+        """
+        This function tests that keys differ by audio bytes and by model size.
+
+        args:
+
+        returns:
+        """
+        key = TranscriptionCache.make_key(b"audio", "small")
+        self.assertEqual(key, TranscriptionCache.make_key(b"audio", "small"))
+        self.assertNotEqual(key, TranscriptionCache.make_key(b"audio", "tiny"))
+        self.assertNotEqual(key, TranscriptionCache.make_key(b"other", "small"))
+
+    def test_hits_and_misses_counted(self):
+        """
+        This function tests that lookups are counted as hits or misses.
+
+        args:
+
+        returns:
+        """
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.set("a", "hello")
+        self.assertEqual(self.cache.get("a"), "hello")
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_least_recently_used_evicted(self):
+        """
+        This function tests that the least recently used entry is evicted when full.
+
+        args:
+
+        returns:
+        """
+        self.cache.set("a", "first")
+        self.cache.set("b", "second")
+        self.cache.get("a")
+        self.cache.set("c", "third")
+        self.assertEqual(self.cache.get("a"), "first")
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.stats()["entries"], 2)
+
+    def test_entries_expire_after_ttl(self):
+        """
+        This function tests that entries are not returned after their TTL.
+
+        args:
+
+        returns:
+        """
+        with patch(
+            "project_apps.chats.api.transcription.time.monotonic", return_value=100.0
+        ):
+            self.cache.set("a", "hello")
+        with patch(
+            "project_apps.chats.api.transcription.time.monotonic", return_value=161.0
+        ):
+            self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+@tag("transcription")
+@override_settings(SECURE_SSL_REDIRECT=False)
+class NOAEndpointBackpressureTest(APITestCase):
+    """
+    This class tests that the NOA endpoint sheds load when transcription is saturated
+
+    Attributes:
+
+    methods:
+        test_full_queue_returns_503_with_retry_after
+    """
+
+    def test_full_queue_returns_503_with_retry_after(self):
+        """
+        This function tests that a full transcription queue gives 503 and Retry-After.
+
+        args:
+
+        returns:
+        """
+        audio = SimpleUploadedFile(
+            "test_audio.wav", b"RIFF audio", content_type="audio/wav"
+        )
+        with patch(
+            "project_apps.chats.api.views.transcribe_audio",
+            side_effect=TranscriptionQueueFullError(9),
+        ):
+            response = self.client.post(
+                reverse("noa-mm-endpoint"),
+                {
+                    "prompt": "Hello",
+                    "location": "Liverpool, United Kingdom",
+                    "time": "2025-07-02 11:29:48.054846",
+                    "audio": audio,
+                },
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response.headers["Retry-After"], "9")
+
+
+@tag("transcription")
+@override_settings(SECURE_SSL_REDIRECT=False)
+class NOAEndpointTranscriptionCacheTest(APITestCase):
+    """
+    This class tests that the NOA endpoint reuses cached transcriptions
+
+    Attributes:
+
+    methods:
+        setUp
+        test_retried_upload_transcribed_once
+    """
+
+    def setUp(self):
+        patcher = patch(
+            "project_apps.chats.api.views.get_transcription_cache",
+            return_value=TranscriptionCache(max_entries=4, ttl_seconds=60),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retried_upload_transcribed_once(self):
+        """
+        This function tests that the same clip sent twice only reaches Whisper once.
+
+        args:
+
+        returns:
+        """
+        with patch(
+            "project_apps.chats.api.views.NOAMultiModalEndpoint._transcribe_audio_bytes",
+            return_value="What's the capital of France?",
+        ) as transcribe:
+            for _ in range(2):
+                self.client.post(
+                    reverse("noa-mm-endpoint"),
+                    {
+                        "location": "Liverpool, United Kingdom",
+                        "time": "2025-07-02 11:29:48.054846",
+                        "audio": SimpleUploadedFile(
+                            "test_audio.wav", b"RIFF same clip", content_type="audio/wav"
+                        ),
+                    },
+                    format="multipart",
+                )
+        transcribe.assert_called_once()
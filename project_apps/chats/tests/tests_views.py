@@ -5,18 +5,22 @@ It has the test cases:
     DetailViewTest: Showing the details of an instance of ConversationThread model.
     CreateViewTest: Enabling the creation of an instance of ConversationThread model.
     DeleteViewTest Enabling the delete of an instance of ConversationThread model.
+    SendPromptCacheTest: Recording responses from the AI model's response cache.
 
 """
 
 from http import HTTPStatus
+from unittest.mock import MagicMock, patch
 
 from django.test import TestCase, tag
+from django.urls import reverse
 
 from standard.tests import utils as test_utils
 from standard.tests.utils import UserSetupMixin
 from standard.tests.views import BaseViewEditTestMixin, BaseViewTestMixin
 
-from project_apps.chats.models import ConversationThread
+from project_apps.aimodels import caching
+from project_apps.chats.models import ConversationItem, ConversationThread
 
 from project_apps.chats.forms import ConversationThreadForm
 
@@ -456,3 +460,93 @@ class DeleteViewTest(UserSetupMixin, BaseViewEditTestMixin, TestCase):
 
         saved_conversation_threads = self.model.objects.all()
         self.assertEqual(saved_conversation_threads.count(), 0)
+
+
+@tag("view")
+class SendPromptCacheTest(UserSetupMixin, TestCase):
+    """
+    This class tests send_prompt with an AI model that caches its responses
+
+    Attributes:
+
+    methods:
+        setUp
+        test_cached_response_saved_as_conversation_item
+        test_follow_up_not_answered_from_other_turns
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(caching, "_response_cache", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ai_model = create_ai_model(
+            self.user1,
+            "openai/gpt-oss-20b:free",
+            "Open-weight model",
+            0.0,
+            0.0,
+            "Edge devices and focused tasks.",
+        )
+        self.ai_model.cache_responses = True
+        self.ai_model.save()
+        self.conversation_thread = create_conversation_thread(
+            self.user1, "Capitals", "", "web", self.ai_model
+        )
+
+    def test_cached_response_saved_as_conversation_item(self):
+        """
+        This function tests that a prompt repeated to open another thread is answered
+        from the cache and still saved, flagged as cached.
+
+        args:
+
+        returns:
+        """
+        self.client.force_login(self.user1)
+        other_thread = create_conversation_thread(
+            self.user1, "More capitals", "", "web", self.ai_model
+        )
+        aimodel_response = MagicMock()
+        aimodel_response.choices[0].message.content = "Paris"
+        with patch(
+            "project_apps.aimodels.models.AIModel.get_aimodel_response",
+            return_value=aimodel_response,
+        ) as get_aimodel_response:
+            for conversation_thread in [self.conversation_thread, other_thread]:
+                response = self.client.post(
+                    reverse("send_prompt_with_id", args=[conversation_thread.id]),
+                    {"prompt": "Capital of France?"},
+                    secure=True,
+                )
+        get_aimodel_response.assert_called_once()
+        self.assertContains(response, "Paris")
+        items = [
+            ConversationItem.objects.get(conversation_thread=conversation_thread)
+            for conversation_thread in [self.conversation_thread, other_thread]
+        ]
+        self.assertEqual([item.response for item in items], ["Paris", "Paris"])
+        self.assertEqual([item.is_cached for item in items], [False, True])
+
+    def test_follow_up_not_answered_from_other_turns(self):
+        """
+        This function tests that a prompt repeated after other turns is sent to the AI
+        model, as its answer depends on them.
+
+        args:
+
+        returns:
+        """
+        self.client.force_login(self.user1)
+        url = reverse("send_prompt_with_id", args=[self.conversation_thread.id])
+        with patch(
+            "project_apps.aimodels.models.AIModel.get_aimodel_response"
+        ) as get_aimodel_response:
+            get_aimodel_response.return_value.choices[0].message.content = "Paris"
+            self.client.post(url, {"prompt": "Capital of France?"}, secure=True)
+            self.client.post(url, {"prompt": "Capital of France?"}, secure=True)
+        self.assertEqual(get_aimodel_response.call_count, 2)
+        items = ConversationItem.objects.filter(
+            conversation_thread=self.conversation_thread
+        )
+        self.assertEqual([item.is_cached for item in items], [False, False])
@@ -14,8 +14,14 @@ It has the URLs:
     API endpoints
     send_prompt_with_id: send a prompt with a specific ConversationThreads ID
     send_prompt: send a prompt without a specific ConversationThreads ID (creates a new ConversationThreads)
+    stream_response: stream the response to a ConversationItem's prompt as server-sent events
+    prompt_response: the response to a queued ConversationItem's prompt, polled until it is answered
+
+    With AIMODEL_ASYNC_VIEWS these URLs use the async views, asend_prompt, astream_response
+    and aprompt_response.
 """
 
+from django.conf import settings
 from django.urls import include, path
 
 from .views import (
@@ -23,9 +29,18 @@ from .views import (
     ConversationThreadDeleteView,
     ConversationThreadDetailView,
     ConversationThreadListView,
+    aprompt_response,
+    asend_prompt,
+    astream_response,
+    prompt_response,
     send_prompt,
+    stream_response,
 )
 
+prompt_view = asend_prompt if settings.AIMODEL_ASYNC_VIEWS else send_prompt
+stream_view = astream_response if settings.AIMODEL_ASYNC_VIEWS else stream_response
+response_view = aprompt_response if settings.AIMODEL_ASYNC_VIEWS else prompt_response
+
 urlpatterns = [
     path("", ConversationThreadListView.as_view(), name="conversationthreads"),
     path(
@@ -44,6 +59,8 @@ urlpatterns = [
         name="conversation_thread_delete",
     ),
     # Include API endpoints
-    path("send_prompt/<uuid:thread_id>", send_prompt, name="send_prompt_with_id"),
-    path("send_prompt/", send_prompt, name="send_prompt"),
+    path("send_prompt/<uuid:thread_id>", prompt_view, name="send_prompt_with_id"),
+    path("send_prompt/", prompt_view, name="send_prompt"),
+    path("stream_response/<uuid:pk>", stream_view, name="stream_response"),
+    path("prompt_response/<uuid:pk>", response_view, name="prompt_response"),
 ]
@@ -16,26 +16,52 @@ This module provides the views for the conversationthreads app accessed by the U
 
     class ChatsDeleteView(LoginRequiredMixin, DeleteView):
         - Delete view for chat
+
+    ---------- Prompt views -------------
+    send_prompt
+        - Sends a prompt to a chat's AI model and renders the response
+    asend_prompt
+        - The async version of send_prompt for ASGI deployments
+    stream_response
+        - Streams a prompt's response to the page as it is generated
+    astream_response
+        - The async version of stream_response for ASGI deployments
+    prompt_response
+        - Renders a queued prompt's response, or asks the page to poll again
+    aprompt_response
+        - The async version of prompt_response, which long-polls for the response
 """
 
+import asyncio
 import logging
+import time
+from collections.abc import AsyncIterator, Iterator
 from http import HTTPStatus
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.db.models import QuerySet
-from django.http import Http404, HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse_lazy
+from django.utils.html import escape
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.csrf import csrf_protect
 from django.views.generic import DetailView, ListView
 from django.views.generic.edit import CreateView, DeleteView
 
+from project_apps.aimodels.circuits import CircuitOpenError
+from project_apps.aimodels.ratelimits import RateLimitExceededError
+from project_apps.aimodels.tokens import count_token_usage
 from standard.views.mixins import ProjectNameMixin
 
+from .context import get_context_builder
 from .forms import ConversationItemForm, ConversationThreadForm
-from .models import ConversationItem, ConversationThread
+from .jobs import get_prompt_job_queue
+from .models import ConversationItem, ConversationThread, PromptJob
+from .summaries import get_conversation_summarizer
 
 logger = logging.getLogger(__name__)
 
@@ -324,6 +350,7 @@ def send_prompt(request, thread_id=None) -> HttpResponse:
     """Handle sending a prompt to a conversation thread.
 
     Processes POST requests to add a prompt to a conversation thread and returns the updated conversation.
+    The prompt is sent with the thread's latest turns (see context.py).
     For GET requests, displays an empty prompt form.
 
     Args:
@@ -334,73 +361,628 @@ def send_prompt(request, thread_id=None) -> HttpResponse:
         HttpResponse: The HTTP response with the updated conversation or form.
     """
     if request.method == "POST":
-        # Get or create thread
-        if thread_id:
-            conversation_thread: ConversationThread = get_object_or_404(
-                ConversationThread, id=thread_id, created_by=request.user
+        conversation_thread, form_from_prompt, error_response = _bind_prompt_form(
+            request, thread_id
+        )
+        if error_response:
+            return error_response
+
+        if settings.AIMODEL_STREAM_RESPONSES:
+            # The page fetches the response from stream_response as it is generated.
+            return _save_prompt_response(
+                request, conversation_thread, form_from_prompt, "", streaming=True
             )
-        else:
-            conversation_thread: ConversationThread = ConversationThread.objects.create(
-                name="New Conversation", created_by=request.user, chat_type="web"
+
+        if settings.AIMODEL_QUEUE_RESPONSES:
+            # A background worker answers it, and the page polls prompt_response.
+            return _save_prompt_response(
+                request, conversation_thread, form_from_prompt, "", queued=True
+            )
+
+        prompt: str = form_from_prompt.cleaned_data["prompt"]
+        history: list[dict] = get_context_builder().build(
+            conversation_thread, prompt, form_from_prompt.instance.ORDER
+        )
+        try:
+            response_text, is_cached = conversation_thread.aimodel.get_response_text(
+                prompt, history
             )
-        aimodel = conversation_thread.aimodel
-
-        post_data: dict = request.POST.copy()
-        post_data["conversation_thread"] = conversation_thread.id
-
-        # Bind form with POST data (now includes conversation_thread)
-        form_from_prompt: ConversationItemForm = ConversationItemForm(post_data)
-        form_from_prompt.instance.conversation_thread = conversation_thread
-        form_from_prompt.instance.created_by = request.user
-        form_from_prompt.instance.modified_by = request.user
-
-        # Set ORDER if not provided
-        if not form_from_prompt.instance.ORDER:
-            last_item: ConversationItem | None = (
-                ConversationItem.objects.filter(conversation_thread=conversation_thread)
-                .order_by("-ORDER")
-                .first()
+        except (CircuitOpenError, RateLimitExceededError) as error:
+            return _render_unavailable(
+                request, conversation_thread, form_from_prompt, error
             )
-            form_from_prompt.instance.ORDER = (last_item.ORDER + 1) if last_item else 1
+        return _save_prompt_response(
+            request,
+            conversation_thread,
+            form_from_prompt,
+            response_text,
+            is_cached=is_cached,
+            history=history,
+        )
+    else:
+        return _render_empty_prompt_form(request, thread_id)
 
-        if not form_from_prompt.is_valid():
-            # Return form with errors
-            return render(
-                request,
-                "home/logged_in_sections/chat_prompt.html",
-                {"form": form_from_prompt, "thread_id": conversation_thread.id},
-                status=400,
+
+@login_required
+@csrf_protect
+async def asend_prompt(request, thread_id=None) -> HttpResponse:
+    """Handle sending a prompt to a conversation thread, as an async view.
+
+    The same as send_prompt, but the AI model is awaited rather than holding a worker
+    thread while the provider generates the response. Database work runs in a thread.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        thread_id (int | None): The ID of the conversation thread, if any.
+
+    Returns:
+        HttpResponse: The HTTP response with the updated conversation or form.
+    """
+    if request.method == "POST":
+        conversation_thread, form_from_prompt, error_response = await sync_to_async(
+            _bind_prompt_form
+        )(request, thread_id)
+        if error_response:
+            return error_response
+
+        if settings.AIMODEL_STREAM_RESPONSES:
+            return await sync_to_async(_save_prompt_response)(
+                request, conversation_thread, form_from_prompt, "", streaming=True
+            )
+
+        if settings.AIMODEL_QUEUE_RESPONSES:
+            return await sync_to_async(_save_prompt_response)(
+                request, conversation_thread, form_from_prompt, "", queued=True
             )
 
         prompt: str = form_from_prompt.cleaned_data["prompt"]
-        aimodel_response = aimodel.get_aimodel_response(prompt)
-
-        conversation_item: ConversationItem = form_from_prompt.save(commit=False)
-        conversation_item.response = aimodel_response.choices[0].message.content
-        conversation_item.tokens = len(prompt.split())
-        conversation_item.save()
-
-        # Render updated prompt/response and new form
-        form_for_response: ConversationItemForm = ConversationItemForm(
-            initial={
-                "conversation_thread": conversation_thread.id,
-                "ORDER": form_from_prompt.instance.ORDER + 1,
-            }
+        history: list[dict] = await sync_to_async(get_context_builder().build)(
+            conversation_thread, prompt, form_from_prompt.instance.ORDER
         )
-        return render(
+        try:
+            response_text, is_cached = (
+                await conversation_thread.aimodel.aget_response_text(prompt, history)
+            )
+        except (CircuitOpenError, RateLimitExceededError) as error:
+            return await sync_to_async(_render_unavailable)(
+                request, conversation_thread, form_from_prompt, error
+            )
+        return await sync_to_async(_save_prompt_response)(
             request,
-            "home/logged_in_sections/send_prompt.html",
-            {
-                "conversation_item": conversation_item,
-                "form": form_for_response,
-                "latest_conversation": conversation_thread,
-            },
+            conversation_thread,
+            form_from_prompt,
+            response_text,
+            is_cached=is_cached,
+            history=history,
         )
     else:
-        # GET: show empty form
-        form_from_prompt: ConversationItemForm = ConversationItemForm()
-        return render(
-            request,
-            "home/logged_in_sections/chat_prompt.html",
-            {"form": form_from_prompt, "thread_id": thread_id},
+        return await sync_to_async(_render_empty_prompt_form)(request, thread_id)
+
+
+def _bind_prompt_form(
+    request, thread_id
+) -> tuple[ConversationThread, ConversationItemForm, HttpResponse | None]:
+    """Gets or creates the conversation thread and binds the posted prompt to a form.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        thread_id (int | None): The ID of the conversation thread, if any.
+
+    Returns:
+        tuple: The conversation thread, the bound form, and an error response if the
+            form is invalid (otherwise None).
+    """
+    # Get or create thread, with its AI model so async callers need not query for it
+    if thread_id:
+        conversation_thread: ConversationThread = get_object_or_404(
+            ConversationThread.objects.select_related("aimodel"),
+            id=thread_id,
+            created_by=request.user,
+        )
+    else:
+        conversation_thread: ConversationThread = ConversationThread.objects.create(
+            name="New Conversation", created_by=request.user, chat_type="web"
+        )
+
+    post_data: dict = request.POST.copy()
+    post_data["conversation_thread"] = conversation_thread.id
+
+    # Bind form with POST data (now includes conversation_thread)
+    form_from_prompt: ConversationItemForm = ConversationItemForm(post_data)
+    form_from_prompt.instance.conversation_thread = conversation_thread
+    form_from_prompt.instance.created_by = request.user
+    form_from_prompt.instance.modified_by = request.user
+
+    # Set ORDER if not provided
+    if not form_from_prompt.instance.ORDER:
+        last_item: ConversationItem | None = (
+            ConversationItem.objects.filter(conversation_thread=conversation_thread)
+            .order_by("-ORDER")
+            .first()
+        )
+        form_from_prompt.instance.ORDER = (last_item.ORDER + 1) if last_item else 1
+
+    if not form_from_prompt.is_valid():
+        # Return form with errors
+        return (
+            conversation_thread,
+            form_from_prompt,
+            render(
+                request,
+                "home/logged_in_sections/chat_prompt.html",
+                {"form": form_from_prompt, "thread_id": conversation_thread.id},
+                status=400,
+            ),
+        )
+    return conversation_thread, form_from_prompt, None
+
+
+def _render_unavailable(
+    request,
+    conversation_thread: ConversationThread,
+    form_from_prompt: ConversationItemForm,
+    error: CircuitOpenError | RateLimitExceededError,
+) -> HttpResponse:
+    """Renders the prompt form with an error when the AI model is unavailable or busy.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        conversation_thread (ConversationThread): The thread the prompt was sent to.
+        form_from_prompt (ConversationItemForm): The valid bound prompt form.
+        error (CircuitOpenError | RateLimitExceededError): The error from the AI
+            model's circuit breaker or rate limiter.
+
+    Returns:
+        HttpResponse: The prompt form with the error, and the error's status.
+    """
+    form_from_prompt.add_error(None, _get_error_message(error))
+    response: HttpResponse = render(
+        request,
+        "home/logged_in_sections/chat_prompt.html",
+        {"form": form_from_prompt, "thread_id": conversation_thread.id},
+        status=error.status_code,
+    )
+    response["Retry-After"] = str(error.retry_after)
+    return response
+
+
+def _get_error_message(error: Exception) -> str:
+    """Words an AI model error for the user.
+
+    Args:
+        error (Exception): The error the AI model's request raised.
+
+    Returns:
+        str: When to try again if the AI model is unavailable or busy, otherwise that
+            it could not answer.
+    """
+    if isinstance(error, (CircuitOpenError, RateLimitExceededError)):
+        return _(
+            "The AI model is unavailable. Please try again in %(seconds)s seconds."
+        ) % {"seconds": error.retry_after}
+    return _("The AI model could not answer. Please send the prompt again.")
+
+
+def _save_prompt_response(
+    request,
+    conversation_thread: ConversationThread,
+    form_from_prompt: ConversationItemForm,
+    response_text: str,
+    streaming: bool = False,
+    is_cached: bool = False,
+    history: list[dict] | None = None,
+    queued: bool = False,
+) -> HttpResponse:
+    """Saves the prompt and the AI model's response and renders them with a new form.
+
+    A thread that has grown long enough is then summarised in the background. A
+    queued prompt is saved without its response, for a background worker to answer.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        conversation_thread (ConversationThread): The thread the prompt was sent to.
+        form_from_prompt (ConversationItemForm): The valid bound prompt form.
+        response_text (str): The AI model's response, or "" if it is to be streamed
+            or queued.
+        streaming (bool): Render the response as a stream from stream_response.
+        is_cached (bool): The response came from the AI model's response cache.
+        history (list[dict] | None): The earlier turns sent with the prompt.
+        queued (bool): Queue the prompt for a background worker, and render the
+            response as polled from prompt_response.
+
+    Returns:
+        HttpResponse: The HTTP response with the updated conversation.
+    """
+    prompt: str = form_from_prompt.cleaned_data["prompt"]
+    conversation_item: ConversationItem = form_from_prompt.save(commit=False)
+    conversation_item.response = response_text
+    conversation_item.set_token_usage(count_token_usage(prompt, response_text, history))
+    conversation_item.is_full_saved = not (streaming or queued)
+    conversation_item.is_cached = is_cached
+    conversation_item.save()
+    if queued:
+        get_prompt_job_queue().enqueue(conversation_item)
+    elif not streaming:
+        get_conversation_summarizer().schedule(
+            conversation_thread, conversation_item.ORDER
+        )
+
+    # Render updated prompt/response and new form
+    form_for_response: ConversationItemForm = ConversationItemForm(
+        initial={
+            "conversation_thread": conversation_thread.id,
+            "ORDER": form_from_prompt.instance.ORDER + 1,
+        }
+    )
+    return render(
+        request,
+        "home/logged_in_sections/send_prompt.html",
+        {
+            "conversation_item": conversation_item,
+            "form": form_for_response,
+            "latest_conversation": conversation_thread,
+            "streaming": streaming,
+            "queued": queued,
+        },
+    )
+
+
+def _render_empty_prompt_form(request, thread_id) -> HttpResponse:
+    """Renders an empty prompt form.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        thread_id (int | None): The ID of the conversation thread, if any.
+
+    Returns:
+        HttpResponse: The HTTP response with the form.
+    """
+    form_from_prompt: ConversationItemForm = ConversationItemForm()
+    return render(
+        request,
+        "home/logged_in_sections/chat_prompt.html",
+        {"form": form_from_prompt, "thread_id": thread_id},
+    )
+
+
+@login_required
+def prompt_response(request, pk) -> HttpResponse:
+    """Renders a queued prompt's response, or a placeholder that asks again shortly.
+
+    The page polls this for a prompt saved by send_prompt in queued mode until a
+    background worker has answered it (see jobs.py).
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        pk (uuid.UUID): The ID of the ConversationItem being answered.
+
+    Returns:
+        HttpResponse: The response, or the placeholder.
+    """
+    conversation_item: ConversationItem = _get_streamed_item(request, pk)
+    return _render_prompt_response(
+        request, conversation_item, _get_prompt_job(conversation_item)
+    )
+
+
+@login_required
+async def aprompt_response(request, pk) -> HttpResponse:
+    """Renders a queued prompt's response as prompt_response does, as an async view.
+
+    Rather than the page polling, the request is held until the response is saved
+    or CHAT_QUEUE_LONG_POLL_SECONDS pass, checking the job twice a second. Waiting
+    costs the server no thread.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        pk (uuid.UUID): The ID of the ConversationItem being answered.
+
+    Returns:
+        HttpResponse: The response, or the placeholder.
+    """
+    conversation_item: ConversationItem = await sync_to_async(_get_streamed_item)(
+        request, pk
+    )
+    prompt_job: PromptJob | None = await sync_to_async(_get_prompt_job)(
+        conversation_item
+    )
+    deadline: float = time.monotonic() + settings.CHAT_QUEUE_LONG_POLL_SECONDS
+    while prompt_job is not None and prompt_job.is_pending:
+        if time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(0.5)
+        await prompt_job.arefresh_from_db(fields=["status"])
+    if prompt_job is not None and not prompt_job.is_pending:
+        await conversation_item.arefresh_from_db()
+    return await sync_to_async(_render_prompt_response)(
+        request, conversation_item, prompt_job
+    )
+
+
+def _get_prompt_job(conversation_item: ConversationItem) -> PromptJob | None:
+    """Gets the job answering an item, if it was queued.
+
+    Args:
+        conversation_item (ConversationItem): The item.
+
+    Returns:
+        PromptJob | None: The job, or None if the item was not queued.
+    """
+    return PromptJob.objects.filter(conversation_item=conversation_item).first()
+
+
+def _render_prompt_response(
+    request, conversation_item: ConversationItem, prompt_job: PromptJob | None
+) -> HttpResponse:
+    """Renders an item's response, or a placeholder while its job is pending.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        conversation_item (ConversationItem): The item.
+        prompt_job (PromptJob | None): The job answering it, if it was queued.
+
+    Returns:
+        HttpResponse: The rendered response.
+    """
+    return render(
+        request,
+        "home/logged_in_sections/chat_response.html",
+        {
+            "conversation_item": conversation_item,
+            "prompt_job": prompt_job,
+            "is_pending": prompt_job is not None and prompt_job.is_pending,
+        },
+    )
+
+
+@login_required
+def stream_response(request, pk) -> StreamingHttpResponse:
+    """Streams the AI model's response to a prompt as server-sent events.
+
+    The page opens this stream for a prompt saved by send_prompt in streaming mode. Each
+    piece of the response is sent as a "token" event as soon as the provider produces it,
+    followed by a "done" event. The ConversationItem is saved when the stream completes,
+    or with the response so far if the client disconnects.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        pk (uuid.UUID): The ID of the ConversationItem being answered.
+
+    Returns:
+        StreamingHttpResponse: The event stream.
+    """
+    conversation_item: ConversationItem = _get_streamed_item(request, pk)
+    return _get_event_stream_response(_stream_response_events(conversation_item))
+
+
+@login_required
+async def astream_response(request, pk) -> StreamingHttpResponse:
+    """Streams the AI model's response as stream_response does, as an async view.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        pk (uuid.UUID): The ID of the ConversationItem being answered.
+
+    Returns:
+        StreamingHttpResponse: The event stream.
+    """
+    conversation_item: ConversationItem = await sync_to_async(_get_streamed_item)(
+        request, pk
+    )
+    return _get_event_stream_response(_astream_response_events(conversation_item))
+
+
+def _get_streamed_item(request, pk) -> ConversationItem:
+    """Gets the user's ConversationItem with its thread and AI model.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        pk (uuid.UUID): The ID of the ConversationItem.
+
+    Returns:
+        ConversationItem: The item.
+
+    Raises:
+        Http404: If the item does not exist or is in another user's thread.
+    """
+    return get_object_or_404(
+        ConversationItem.objects.select_related("conversation_thread__aimodel"),
+        pk=pk,
+        conversation_thread__created_by=request.user,
+    )
+
+
+def _get_event_stream_response(events) -> StreamingHttpResponse:
+    """Wraps server-sent events in a response that proxies will not buffer.
+
+    Args:
+        events: An iterator or async iterator of formatted events.
+
+    Returns:
+        StreamingHttpResponse: The event stream response.
+    """
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _stream_response_events(conversation_item: ConversationItem) -> Iterator[str]:
+    """Generates the events for stream_response, saving the response at the end.
+
+    A response that has already been generated (e.g. when the browser reconnects) is
+    sent again rather than generated twice, and a cached response is sent in one piece.
+    If the AI model fails, is unavailable or is busy, an error event tells the user
+    before the stream is done.
+
+    Args:
+        conversation_item (ConversationItem): The item being answered.
+
+    Yields:
+        str: Formatted server-sent events.
+    """
+    if conversation_item.response or conversation_item.is_full_saved:
+        yield _format_event("token", conversation_item.response)
+        yield _format_event("done", "")
+        return
+
+    aimodel = conversation_item.conversation_thread.aimodel
+    history: list[dict] = get_context_builder().build(
+        conversation_item.conversation_thread,
+        conversation_item.prompt,
+        conversation_item.ORDER,
+    )
+    cached_text: str | None = aimodel.get_cached_response(
+        conversation_item.prompt, history
+    )
+    if cached_text is not None:
+        _save_streamed_response(
+            conversation_item, cached_text, True, is_cached=True, history=history
+        )
+        yield _format_event("token", cached_text)
+        yield _format_event("done", "")
+        return
+
+    pieces: list[str] = []
+    completed: bool = False
+    error_message: str = ""
+    started: float = time.perf_counter()
+    try:
+        for piece in aimodel.stream_aimodel_response(conversation_item.prompt, history):
+            if not pieces:
+                logger.info(f"First token after {time.perf_counter() - started:.2f}s")
+            pieces.append(piece)
+            yield _format_event("token", piece)
+        completed = True
+    except Exception as error:
+        logger.exception("Error streaming AI model response")
+        error_message = _get_error_message(error)
+    finally:
+        # Runs when the client disconnects too, as the server closes the generator.
+        _save_streamed_response(
+            conversation_item, "".join(pieces), completed, history=history
+        )
+    if completed:
+        aimodel.cache_response(conversation_item.prompt, "".join(pieces), history)
+    if error_message:
+        yield _format_event("error", error_message)
+    yield _format_event("done", "")
+
+
+async def _astream_response_events(
+    conversation_item: ConversationItem,
+) -> AsyncIterator[str]:
+    """Generates the events for astream_response, as _stream_response_events does.
+
+    Args:
+        conversation_item (ConversationItem): The item being answered.
+
+    Yields:
+        str: Formatted server-sent events.
+    """
+    if conversation_item.response or conversation_item.is_full_saved:
+        yield _format_event("token", conversation_item.response)
+        yield _format_event("done", "")
+        return
+
+    aimodel = conversation_item.conversation_thread.aimodel
+    history: list[dict] = await sync_to_async(get_context_builder().build)(
+        conversation_item.conversation_thread,
+        conversation_item.prompt,
+        conversation_item.ORDER,
+    )
+    cached_text: str | None = await sync_to_async(aimodel.get_cached_response)(
+        conversation_item.prompt, history
+    )
+    if cached_text is not None:
+        await sync_to_async(_save_streamed_response)(
+            conversation_item, cached_text, True, is_cached=True, history=history
+        )
+        yield _format_event("token", cached_text)
+        yield _format_event("done", "")
+        return
+
+    pieces: list[str] = []
+    completed: bool = False
+    error_message: str = ""
+    started: float = time.perf_counter()
+    try:
+        async for piece in aimodel.astream_aimodel_response(
+            conversation_item.prompt, history
+        ):
+            if not pieces:
+                logger.info(f"First token after {time.perf_counter() - started:.2f}s")
+            pieces.append(piece)
+            yield _format_event("token", piece)
+        completed = True
+    except Exception as error:
+        logger.exception("Error streaming AI model response")
+        error_message = _get_error_message(error)
+    finally:
+        await sync_to_async(_save_streamed_response)(
+            conversation_item, "".join(pieces), completed, history=history
+        )
+    if completed:
+        await sync_to_async(aimodel.cache_response)(
+            conversation_item.prompt, "".join(pieces), history
+        )
+    if error_message:
+        yield _format_event("error", error_message)
+    yield _format_event("done", "")
+
+
+def _format_event(event: str, text: str) -> str:
+    """Formats text as a server-sent event carrying HTML for htmx to swap in.
+
+    Args:
+        event (str): The event name.
+        text (str): The text to send.
+
+    Returns:
+        str: The formatted event.
+    """
+    # An event's data may not contain newlines, so they are sent as line breaks.
+    data: str = escape(text).replace("\r", "").replace("\n", "<br>")
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _save_streamed_response(
+    conversation_item: ConversationItem,
+    response_text: str,
+    completed: bool,
+    is_cached: bool = False,
+    history: list[dict] | None = None,
+) -> None:
+    """Saves a streamed response to its ConversationItem, with its token counts.
+
+    Streams carry no usage from the provider, so the tokens are counted. A thread that
+    has grown long enough is then summarised in the background.
+
+    Args:
+        conversation_item (ConversationItem): The item being answered.
+        response_text (str): The response streamed so far.
+        completed (bool): Whether the whole response was streamed.
+        is_cached (bool): The response came from the AI model's response cache.
+        history (list[dict] | None): The earlier turns sent with the prompt.
+    """
+    conversation_item.response = response_text
+    conversation_item.is_full_saved = completed
+    conversation_item.is_cached = is_cached
+    conversation_item.set_token_usage(
+        count_token_usage(conversation_item.prompt, response_text, history)
+    )
+    conversation_item.save(
+        update_fields=[
+            "response",
+            "is_full_saved",
+            "is_cached",
+            "tokens",
+            "input_tokens",
+            "output_tokens",
+            "modified_at",
+        ]
+    )
+    if completed:
+        get_conversation_summarizer().schedule(
+            conversation_item.conversation_thread, conversation_item.ORDER
         )